@@ -0,0 +1,538 @@
+import copy
+import json
+from dataclasses import dataclass, field, replace
+from typing import Any, AsyncGenerator, Dict, List, Optional
+from utils.logger import Logger
+from utils.tracing import span
+from llm.chat_llm import AsyncChatClientWrapper
+from tools.tool_factory import get_tool_definitions, execute_tool
+from tools.tool_context import ToolContext
+from models import ReportEvent, MessageEvent, ToolCallEvent, ToolResultEvent, BaseEvent, BaseFlow
+from agents.memory import Memory
+from agents.step_scheduler import READ_ONLY_TOOLS, FlowStep, StepGraph, StepScheduler
+from tools.command_tool import is_read_only_command
+from prompts.flow_prompt import (
+    SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT,
+    STEP_EXECUTION_PROMPT,
+    STEP_RESULTS_PROMPT,
+)
+
+logger = Logger('flow_engine', log_to_file=False)
+
+
+@dataclass
+class StepContext:
+    """Execution state of one step: its memory view, session and failure counters."""
+    step: FlowStep
+    memory: Memory
+    session_id: str
+    is_main: bool = True
+    iteration: int = 0
+    consecutive_failures: int = 0
+    consecutive_search_replace_failures: int = 0
+    # Track recent search_replace results for child agents (last 2 attempts)
+    recent_search_replace_results: List[bool] = field(default_factory=list)
+    last_tool_result: Optional[Dict[str, Any]] = None
+    report: Optional[str] = None
+
+
+class FlowEngine(BaseFlow):
+    """
+    Shared agent loop for ReActFlow and PlanActFlow.
+
+    A request is executed as a StepGraph. The main step runs on the agent's own
+    memory; plan steps run on forked memories as soon as their dependencies are
+    done. Steps that only use read-only tools run concurrently (up to
+    MAX_STEP_CONCURRENCY); all other steps run one at a time. ReAct is the
+    degenerate graph that only contains the main step.
+
+    Subclasses customise the loop through the `_iteration_message`,
+    `_prepare_messages`, `_build_step_graph` and `_on_*` hooks.
+    """
+
+    MAX_ITERATION = 30
+    MAX_STEP_CONCURRENCY = 3
+    PARALLEL_TOOL_NAME = "execute_parallel_tasks"
+    SEARCH_REPLACE_TOOL_NAME = "search_replace"
+    LINTER_TOOL_NAME = "lint_code"
+    MAX_SEARCH_REPLACE_FAILURES = 5
+    FLOW_TYPE = "react"
+
+    def __init__(self, workspace_dir: str, is_parent: bool = True, max_step_concurrency: Optional[int] = None):
+        self.llm_client = AsyncChatClientWrapper()
+        logger.info("LLM client initialized successfully")
+        self.is_parent = is_parent
+        self.tools_definitions = get_tool_definitions(is_parent=is_parent)
+        self.workspace_dir = workspace_dir
+        # Tools are shared by all agents of the process; this agent's state travels with each call
+        self.tool_context = ToolContext(workspace_dir=workspace_dir, is_parent=is_parent, flow_type=self.FLOW_TYPE)
+        self.memory = Memory(workspace_dir, is_parent=is_parent)
+        self.scheduler = StepScheduler(max_step_concurrency or self.MAX_STEP_CONCURRENCY)
+        # Iterations are a budget shared by all steps of a request
+        self.iterations_used = 0
+
+    # ------------------------------------------------------------------
+    # Hooks
+    # ------------------------------------------------------------------
+
+    def _iteration_message(self, iteration: int) -> str:
+        return f"Thinking... (Iteration: {iteration})"
+
+    def _prepare_messages(self, ctx: StepContext) -> List[Dict[str, Any]]:
+        """Messages sent to the LLM for the next iteration of a step."""
+        return ctx.memory.get_messages()
+
+    def _reset_state(self) -> None:
+        """Reset per-request state before a new user message is processed."""
+        self.iterations_used = 0
+
+    async def _before_steps(self, session_id: str) -> AsyncGenerator[BaseEvent, None]:
+        """Runs once before the step graph is executed (e.g. planning)."""
+        return
+        yield
+
+    def _build_step_graph(self, message: str) -> StepGraph:
+        return StepGraph.single(message)
+
+    async def _on_tool_failure(self, ctx: StepContext, tool_name: str, tool_result: Dict[str, Any]) -> AsyncGenerator[BaseEvent, None]:
+        """Called after every failed tool call; ctx.consecutive_failures is already updated."""
+        return
+        yield
+
+    async def _on_search_replace_reflection(self, ctx: StepContext) -> AsyncGenerator[BaseEvent, None]:
+        """Called after the max-failures reflection prompt was added to memory."""
+        return
+        yield
+
+    async def _on_report_blocked(self, ctx: StepContext) -> AsyncGenerator[BaseEvent, None]:
+        """
+        Called when a report is blocked by the search_replace/linter gate.
+        The gate is re-checked afterwards; the report is only accepted if it passes.
+        """
+        error_msg = "⚠️ Search_replace tool was used but linter was not run successfully after the last search_replace. Please run the linter tool to verify the code changes."
+        logger.warning(f"Report blocked: {error_msg}")
+        yield self._message(ctx, error_msg)
+        ctx.memory.messages.append({
+            "role": "user",
+            "content": error_msg
+        })
+
+    # ------------------------------------------------------------------
+    # Shared helpers
+    # ------------------------------------------------------------------
+
+    def _tool_context(self, ctx: StepContext) -> ToolContext:
+        """Tool context for calls made by a step (shares the agent's resources)."""
+        return replace(self.tool_context, session_id=ctx.session_id)
+
+    def _message(self, ctx: StepContext, message: str) -> MessageEvent:
+        return self._attribute(ctx, MessageEvent(message=message))
+
+    def _attribute(self, ctx: StepContext, event: BaseEvent) -> BaseEvent:
+        """Set agent information on an event and label events of plan steps."""
+        if event.is_parent is None:
+            event.is_parent = self.is_parent
+        if not ctx.is_main and isinstance(event, (MessageEvent, ToolCallEvent, ToolResultEvent)):
+            event.message = f"[Step {ctx.step.step_id}] {event.message or ''}"
+        return event
+
+    @staticmethod
+    def _is_read_only_call(tool_name: str, tool_args: Dict[str, Any]) -> bool:
+        if tool_name == "execute_command":
+            return is_read_only_command(tool_args.get("command", ""))
+        return tool_name in READ_ONLY_TOOLS
+
+    @staticmethod
+    def _is_failed_result(tool_result: Any) -> bool:
+        return isinstance(tool_result, dict) and (
+            tool_result.get("success") is False or "error" in tool_result
+        )
+
+    def _validate_search_replace_linter_sequence(self, memory: Optional[Memory] = None) -> bool:
+        """
+        Validate that if search_replace tool was used, linter tool was run successfully after the last search_replace.
+
+        Args:
+            memory: Memory to validate (default: the agent's own memory)
+
+        Returns:
+            True if validation passes (no search_replace calls or linter ran successfully after last search_replace)
+            False if validation fails (search_replace exists but no successful linter after last search_replace)
+        """
+        messages = (memory or self.memory).get_messages()
+
+        last_search_replace_index = -1
+        last_linter_index = -1
+        last_linter_result = None
+
+        # Find the last search_replace tool call and last linter tool call
+        for i, msg in enumerate(messages):
+            if msg.get("role") == "assistant" and msg.get("tool_calls"):
+                tool_calls = msg.get("tool_calls", [])
+                for tool_call in tool_calls:
+                    function_name = tool_call.get("function", {}).get("name", "")
+                    if function_name == self.SEARCH_REPLACE_TOOL_NAME:
+                        last_search_replace_index = i
+                    elif function_name == self.LINTER_TOOL_NAME:
+                        last_linter_index = i
+                        # Get the result of this linter call (should be in the next tool message)
+                        if i + 1 < len(messages) and messages[i + 1].get("role") == "tool":
+                            try:
+                                last_linter_result = json.loads(messages[i + 1].get("content", "{}"))
+                            except:
+                                last_linter_result = None
+
+        # If no search_replace tool was used, validation passes
+        if last_search_replace_index == -1:
+            logger.debug("No search_replace tool calls found, validation passes")
+            return True
+
+        # If search_replace was used but no linter was run after it, validation fails
+        if last_linter_index <= last_search_replace_index:
+            logger.warning(f"Search_replace tool used at index {last_search_replace_index}, but no linter call after it (last linter at {last_linter_index})")
+            return False
+
+        # Check if the last linter call was successful
+        if last_linter_result is None:
+            logger.warning("Last linter result is None")
+            return False
+
+        # Check if linter tool itself failed to execute
+        if last_linter_result.get("success") is False or "error" in last_linter_result:
+            logger.warning(f"Linter tool execution failed: {last_linter_result}")
+            return False
+
+        # Check if linter found any syntax errors in the code
+        error_count = last_linter_result.get("error_count", 0)
+        if error_count > 0:
+            logger.warning(f"Linter found {error_count} error(s) in the code")
+            return False
+
+        logger.info("Search_replace-linter sequence validation passed: no syntax errors found")
+        return True
+
+    def _fallback_parent_information(self, memory: Memory) -> str:
+        """Summarize recent context when the LLM did not provide parent_information."""
+        recent_context = []
+        for msg in memory.get_messages()[-10:]:  # Last 10 messages
+            if msg.get("role") == "assistant" and msg.get("content"):
+                recent_context.append(f"Assistant: {msg['content'][:200]}")
+            elif msg.get("role") == "tool" and msg.get("content"):
+                try:
+                    tool_result = json.loads(msg.get("content", "{}"))
+                    if tool_result.get("success") and tool_result.get("result"):
+                        recent_context.append(f"Tool result: {str(tool_result.get('result'))[:200]}")
+                except:
+                    pass
+        return "\n".join(recent_context) if recent_context else "No specific context available."
+
+    async def _dispatch_tool(self, ctx: StepContext, tool_name: str, tool_args: Dict[str, Any], iteration: int) -> AsyncGenerator[BaseEvent, None]:
+        """
+        Execute a tool, forward its events and record the call in the step's memory.
+        Sets ctx.last_tool_result, and ctx.report when the tool produced a final report.
+        Reports of plan steps are not forwarded: they are step results, not final messages.
+        """
+        ctx.last_tool_result = None
+        ctx.report = None
+
+        async for event in execute_tool(ToolCallEvent(
+            message=f"Calling {tool_name}",
+            tool_name=tool_name,
+            tool_args=tool_args,
+        ), self._tool_context(ctx)):
+            if isinstance(event, ReportEvent):
+                ctx.report = event.message
+                if ctx.is_main:
+                    yield self._attribute(ctx, event)
+                continue
+            if isinstance(event, ToolResultEvent) and not event.progress:
+                ctx.last_tool_result = event.result
+            yield self._attribute(ctx, event)
+
+        # Check if tool execution returned a result (after loop completes)
+        if ctx.last_tool_result is None:
+            ctx.last_tool_result = {"error": "Tool execution returned no result"}
+
+        # Add tool call and result to memory (only once, after loop completes)
+        ctx.memory.add_tool_call(ctx.session_id, iteration, tool_name, tool_args)
+        ctx.memory.add_tool_result(ctx.session_id, iteration, ctx.last_tool_result)
+
+    async def _track_search_replace(self, ctx: StepContext, tool_args: Dict[str, Any], tool_result: Dict[str, Any]) -> AsyncGenerator[BaseEvent, None]:
+        """Track search_replace failures and inject suggestions or reflection prompts."""
+        is_search_replace_failed = (
+            tool_result is not None and
+            (isinstance(tool_result, dict) and
+             (tool_result.get("success") is False or
+              "error" in tool_result or
+              tool_result.get("status") == "failed"))
+        )
+
+        # Track recent results (keep last 2 for child agents)
+        ctx.recent_search_replace_results.append(not is_search_replace_failed)  # True for success, False for failure
+        if len(ctx.recent_search_replace_results) > 2:
+            ctx.recent_search_replace_results.pop(0)
+
+        if not is_search_replace_failed:
+            if ctx.consecutive_search_replace_failures > 0:
+                logger.info(f"Search_replace tool succeeded. Resetting failure counter from {ctx.consecutive_search_replace_failures} to 0.")
+            ctx.consecutive_search_replace_failures = 0
+            return
+
+        ctx.consecutive_search_replace_failures += 1
+        logger.warning(f"Search_replace tool failed. Consecutive failures: {ctx.consecutive_search_replace_failures}/{self.MAX_SEARCH_REPLACE_FAILURES}")
+
+        # Check if failure is due to function not found (anchor not found)
+        error_msg = tool_result.get("error", "") if isinstance(tool_result, dict) else ""
+        is_anchor_not_found = (
+            "anchor not found" in error_msg.lower() or
+            ("not found" in error_msg.lower() and ("start line" in error_msg.lower() or "end line" in error_msg.lower()))
+        )
+
+        if is_anchor_not_found:
+            file_path = tool_args.get("file_path", "")
+            new_string = tool_args.get("new_string", "")
+            logger.info(f"Search_replace failed because function/block not found. Suggesting to re-read file and reconsider approach.")
+            suggestion_message = (
+                f"⚠️ search_replace failed: Could not find the function/code block to modify.\n\n"
+                f"Please follow these steps:\n"
+                f"1. First, use `cat {file_path}` to re-read the file and see its current actual content\n"
+                f"2. Based on the file's actual content, decide on a strategy:\n"
+                f"   - Option (1): If the function exists but the content is slightly different, adjust the start_line_content and end_line_content in search_replace to match the actual code in the current file\n"
+                f"   - Option (2): If the function truly doesn't exist, use append to add new code:\n"
+                f"     * Use `execute_command` with `echo '...' >> {file_path}` to append single-line content\n"
+                f"     * Or use `execute_command` with a here-document to append multi-line content\n"
+                f"3. The content you wanted to add/modify is:\n{new_string[:500]}{'...' if len(new_string) > 500 else ''}\n\n"
+                f"Please re-read the file first, then choose the appropriate approach based on the actual situation."
+            )
+            ctx.memory.messages.append({
+                "role": "user",
+                "content": suggestion_message
+            })
+            yield self._message(ctx, "💡 search_replace failed - target not found. Please re-read the file first, then decide whether to adjust parameters or use append.")
+            return
+
+        # For child agents: trigger reflection if last 2 attempts both failed
+        if not self.is_parent and len(ctx.recent_search_replace_results) >= 2:
+            last_two_failed = not ctx.recent_search_replace_results[-1] and not ctx.recent_search_replace_results[-2]
+            if last_two_failed:
+                logger.warning(f"Child agent: Last 2 search_replace attempts failed. Triggering reflection to fix approach.")
+                reflection_message = SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT.format(
+                    failure_count=2,
+                    workspace_dir=self.workspace_dir
+                )
+                # Add a more specific prompt for child agents
+                child_reflection_prompt = (
+                    f"⚠️ CRITICAL: Your last 2 search_replace attempts on this file have failed. "
+                    f"You need to stop and think about why they failed before trying again.\n\n"
+                    f"{reflection_message}\n\n"
+                    f"Please analyze the error messages from the failed attempts, re-read the file to see its current state, "
+                    f"and develop a better strategy before attempting another search_replace."
+                )
+                ctx.memory.messages.append({
+                    "role": "user",
+                    "content": child_reflection_prompt
+                })
+                yield self._message(ctx, "🤔 Reflecting on search_replace failures... Analyzing the issue to develop a better approach.")
+                return
+
+        if ctx.consecutive_search_replace_failures >= self.MAX_SEARCH_REPLACE_FAILURES:
+            logger.error(f"Reached max consecutive search_replace failures ({self.MAX_SEARCH_REPLACE_FAILURES}). Triggering reflection.")
+            reflection_message = SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT.format(
+                failure_count=self.MAX_SEARCH_REPLACE_FAILURES,
+                workspace_dir=self.workspace_dir
+            )
+            ctx.memory.messages.append({
+                "role": "user",
+                "content": reflection_message
+            })
+            ctx.consecutive_search_replace_failures = 0
+            yield self._message(ctx, reflection_message)
+            async for event in self._on_search_replace_reflection(ctx):
+                yield event
+
+    # ------------------------------------------------------------------
+    # Step execution
+    # ------------------------------------------------------------------
+
+    async def _run_step(self, ctx: StepContext) -> AsyncGenerator[BaseEvent, None]:
+        """Run the tool-calling loop of one step until it reports or the iteration budget is exhausted."""
+        while self.iterations_used < self.MAX_ITERATION:
+            self.iterations_used += 1
+            ctx.iteration += 1
+            iteration = ctx.iteration
+            logger.debug(f"Step {ctx.step.step_id} iteration {iteration} ({self.iterations_used}/{self.MAX_ITERATION})")
+            with span("iteration", step_id=ctx.step.step_id, iteration=iteration, session_id=ctx.session_id):
+                yield self._message(ctx, self._iteration_message(iteration))
+
+                result = await self.llm_client.ask(
+                    messages=self._prepare_messages(ctx),
+                    tools=self.tools_definitions,
+                )
+
+                if result["type"] != "tool_call":
+                    # LLM returned text response without tool calls
+                    answer_text = result.get("answer", "") or ""
+                    if answer_text:
+                        # According to the prompt, LLM should use send_message/send_report tools
+                        # But handle gracefully if it doesn't
+                        logger.warning(f"LLM returned text response without calling a tool: {answer_text[:100]}")
+                        ctx.memory.add_assistant_message(ctx.session_id, answer_text)
+                        yield self._message(ctx, answer_text)
+                    ctx.report = answer_text
+                    return
+
+                tool_name = result["tool_name"]
+                tool_args = dict(result.get("tool_args") or {})
+
+                if tool_name == self.PARALLEL_TOOL_NAME:
+                    # Check if this agent is allowed to create sub-agents
+                    if not self.is_parent:
+                        error_msg = "⚠️ This agent is not allowed to create sub-agents. Only parent agents can use execute_parallel_tasks."
+                        logger.warning(f"Blocked parallel task execution: agent is not a parent (session: {ctx.session_id})")
+                        yield self._message(ctx, error_msg)
+                        ctx.memory.add_tool_call(ctx.session_id, iteration, tool_name, tool_args)
+                        ctx.memory.add_tool_result(ctx.session_id, iteration, {"success": False, "error": error_msg})
+                        ctx.consecutive_failures += 1
+                        continue
+
+                    # parent_information should be provided by LLM; otherwise summarize the current context
+                    parent_information = tool_args.get("parent_information")
+                    if not parent_information:
+                        parent_information = self._fallback_parent_information(ctx.memory)
+                        logger.warning("parent_information not provided, using fallback summary")
+
+                    tool_args.setdefault("parent_information", parent_information)
+                    tool_args.setdefault("parent_session_id", ctx.session_id)
+                    tool_args.setdefault("parent_flow_type", self.FLOW_TYPE)
+
+                if not ctx.is_main and ctx.step.read_only and not self._is_read_only_call(tool_name, tool_args):
+                    # Read-only steps run next to other steps, which must not see their edits
+                    error_msg = (
+                        f"⚠️ Step {ctx.step.step_id} is planned with read-only tools ({ctx.step.tool}) and runs "
+                        f"concurrently with other steps, so {tool_name} cannot modify the workspace here. "
+                        "Report what needs to change instead."
+                    )
+                    logger.warning(f"Blocked {tool_name} in read-only step {ctx.step.step_id}")
+                    yield self._message(ctx, error_msg)
+                    ctx.memory.add_tool_call(ctx.session_id, iteration, tool_name, tool_args)
+                    ctx.memory.add_tool_result(ctx.session_id, iteration, {"success": False, "error": error_msg})
+                    ctx.consecutive_failures += 1
+                    continue
+
+                logger.info(f"Tool call: {tool_name} with args: {tool_args}")
+
+                async for event in self._dispatch_tool(ctx, tool_name, tool_args, iteration):
+                    yield event
+                tool_result = ctx.last_tool_result
+
+                if self._is_failed_result(tool_result):
+                    ctx.consecutive_failures += 1
+                    logger.warning(f"Tool {tool_name} failed. Consecutive failures: {ctx.consecutive_failures}")
+                    async for event in self._on_tool_failure(ctx, tool_name, tool_result):
+                        yield event
+                else:
+                    ctx.consecutive_failures = 0
+
+                if tool_name == self.SEARCH_REPLACE_TOOL_NAME:
+                    async for event in self._track_search_replace(ctx, tool_args, tool_result):
+                        yield event
+
+                if ctx.report is not None:
+                    # Before returning, validate that if search_replace was used, linter was run after
+                    if not self._validate_search_replace_linter_sequence(ctx.memory):
+                        async for event in self._on_report_blocked(ctx):
+                            yield event
+                        if not self._validate_search_replace_linter_sequence(ctx.memory):
+                            ctx.report = None
+                            continue
+                    if not ctx.is_main:
+                        yield self._message(ctx, f"✅ Step completed: {ctx.report}")
+                    return
+
+        logger.warning(f"Reached max iterations ({self.MAX_ITERATION}) in step {ctx.step.step_id}")
+        ctx.report = None
+        if ctx.is_main:
+            error_message = "Sorry. Hit max iterations limit"
+            event = ReportEvent(message=error_message)
+            event.is_parent = self.is_parent
+            yield event
+
+    def _create_step_context(self, step: FlowStep, graph: StepGraph, session_id: str) -> StepContext:
+        if step.step_id == StepGraph.MAIN_STEP_ID:
+            if step.depends_on:
+                step_results = "\n".join(
+                    f"- Step {dep.step_id} ({dep.description}): {dep.result or 'Not completed'}"
+                    for dep in graph.plan_steps
+                )
+                self.memory.messages.append({
+                    "role": "user",
+                    "content": STEP_RESULTS_PROMPT.format(step_results=step_results)
+                })
+            return StepContext(step=step, memory=self.memory, session_id=session_id)
+
+        dependency_results = "\n".join(
+            f"- Step {dep_id}: {graph.steps[dep_id].result or 'Not completed'}"
+            for dep_id in step.depends_on
+        ) or "None"
+        memory = self.memory.fork()
+        memory.messages.append({
+            "role": "user",
+            "content": STEP_EXECUTION_PROMPT.format(
+                step_id=step.step_id,
+                step_description=step.description,
+                dependency_results=dependency_results,
+            )
+        })
+        return StepContext(
+            step=step,
+            memory=memory,
+            session_id=f"{session_id}_step_{step.step_id}",
+            is_main=False,
+        )
+
+    async def _run_step_graph(self, graph: StepGraph, session_id: str) -> AsyncGenerator[BaseEvent, None]:
+        if len(graph) > 1:
+            logger.info(
+                f"Executing {len(graph.plan_steps)} plan steps with up to "
+                f"{self.scheduler.max_concurrency} running concurrently"
+            )
+
+        async def run_step(step: FlowStep) -> AsyncGenerator[BaseEvent, None]:
+            ctx = self._create_step_context(step, graph, session_id)
+            async for event in self._run_step(ctx):
+                yield event
+            step.result = ctx.report
+
+        async for _, event in self.scheduler.run(graph, run_step):
+            yield event
+
+    async def process(
+        self,
+        message: str,
+        session_id: str,
+        parent_history: Optional[List[Dict[str, Any]]] = None,
+        parent_information: Optional[str] = None,
+    ):
+        logger.debug(f"Processing new message for session {session_id}: {message[:80]}{'...' if len(message) > 80 else ''}")
+        if parent_history is None and parent_information is None:
+            self.memory.add_user_message(session_id, message)
+            await self.memory.initialize_messages(session_id)
+        elif parent_information is not None:
+            # Child agent: use parent_information and task in system prompt
+            self.memory.add_user_message(session_id, message)
+            await self.memory.initialize_messages(session_id, parent_information=parent_information, task=message)
+        else:
+            # Legacy support: if parent_history is provided, use it
+            self.memory.messages = copy.deepcopy(parent_history)
+            self.memory.messages.append({"role": "user", "content": message})
+            self.memory.add_user_message(session_id, message)
+
+        # Reset counters for new user message
+        self._reset_state()
+
+        async for event in self._before_steps(session_id):
+            yield event
+
+        graph = self._build_step_graph(message)
+        async for event in self._run_step_graph(graph, session_id):
+            yield event
@@ -1,9 +1,11 @@
+import copy
 import json
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from utils.logger import Logger
 from tools.tool_factory import execute_tool
+from tools.tool_context import ToolContext
 from models import ToolResultEvent, ToolCallEvent
 from prompts.flow_prompt import get_system_prompt
 
@@ -84,6 +86,15 @@ class Memory:
     def get_session_history(self, session_id: str) -> List[Dict[str, Any]]:
         return self.get_history(session_id)
 
+    def fork(self) -> "Memory":
+        """
+        Create a memory view with its own copy of the current messages.
+        The history store is shared, so the fork must write under its own session id.
+        """
+        forked = copy.copy(self)
+        forked.messages = copy.deepcopy(self.messages)
+        return forked
+
     async def generate_system_prompt(self, parent_information: Optional[str] = None, task: Optional[str] = None) -> str:
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         workspace_structure = ''
@@ -97,7 +108,8 @@ class Memory:
                     "include_files": True,
                     "include_hidden": False
                 }
-            )
+            ),
+            ToolContext(workspace_dir=self.workspace_dir, is_parent=self.is_parent),
         ):
             if isinstance(event, ToolResultEvent):
                 workspace_structure = event.result
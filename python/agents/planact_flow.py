@@ -1,12 +1,13 @@
 import copy
+import json
 from typing import Any, Dict, List, Optional
 from utils.logger import Logger
-from llm.chat_llm import AsyncChatClientWrapper
-from tools.tool_factory import get_tool_definitions, set_workspace_dir, execute_tool
-from models import ReportEvent, MessageEvent, ToolCallEvent, ToolResultEvent, BaseFlow
+from tools.tool_factory import execute_tool
+from models import MessageEvent, ToolCallEvent, ToolResultEvent
+from agents.flow_engine import FlowEngine, StepContext
 from agents.memory import Memory
+from agents.step_scheduler import StepGraph
 from prompts.flow_prompt import (
-    SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT,
     PLANNING_PROMPT,
     PLAN_REVISION_PROMPT
 )
@@ -14,32 +15,24 @@ from prompts.flow_prompt import (
 logger = Logger('planact_flow', log_to_file=False)
 
 
-class PlanActFlow(BaseFlow):
+class PlanActFlow(FlowEngine):
     """
     Plan-Act Flow: A two-phase agent that first creates a plan, then executes it.
     
     Phase 1 (Planning): LLM generates a structured plan with steps
-    Phase 2 (Acting): Execute each step, potentially revising the plan based on results
+    Phase 2 (Acting): Execute the plan, potentially revising it based on results.
+        Steps that declare dependencies are scheduled as a StepGraph, so independent
+        steps run concurrently (up to MAX_STEP_CONCURRENCY); plans without declared
+        dependencies are executed by a single loop.
     """
     
     MAX_ITERATION = 40 # Higher limit since planning adds overhead
     MAX_PLANNING_ITERATIONS = 3  # Max times to revise the plan
-    PARALLEL_TOOL_NAME = "execute_parallel_tasks"
-    SEARCH_REPLACE_TOOL_NAME = "search_replace"
-    LINTER_TOOL_NAME = "lint_code"
-    MAX_SEARCH_REPLACE_FAILURES = 5
+    MAX_CONSECUTIVE_FAILURES = 3  # Consecutive tool failures before revising the plan
+    FLOW_TYPE = "planact"
     
-    def __init__(self, workspace_dir: str, is_parent: bool = True):
-        self.llm_client = AsyncChatClientWrapper()
-        logger.info("LLM client initialized successfully")
-        self.is_parent = is_parent
-        self.tools_definitions = get_tool_definitions(is_parent=is_parent)
-        self.workspace_dir = workspace_dir
-        set_workspace_dir(workspace_dir)
-        self.memory = Memory(workspace_dir, is_parent=is_parent)
-        self.consecutive_search_replace_failures = 0
-        # Track recent search_replace results for child agents (last 2 attempts)
-        self.recent_search_replace_results: List[bool] = []
+    def __init__(self, workspace_dir: str, is_parent: bool = True, max_step_concurrency: Optional[int] = None):
+        super().__init__(workspace_dir, is_parent=is_parent, max_step_concurrency=max_step_concurrency)
         self.current_plan = None
         self.plan_revision_count = 0
         logger.info(f"PlanAct Flow agent initialized with {len(self.tools_definitions)} tools, is_parent={is_parent}")
@@ -90,13 +83,13 @@ class PlanActFlow(BaseFlow):
         logger.warning("Failed to generate a valid plan, proceeding without explicit plan")
         self.current_plan = None
     
-    async def _revise_plan(self, session_id: str, reason: str):
+    async def _revise_plan(self, ctx: StepContext, reason: str):
         """
         Revise the current plan based on execution results.
         Updates self.current_plan if successful.
         
         Args:
-            session_id: Current session ID
+            ctx: Context of the step that triggered the revision
             reason: Reason for plan revision (e.g., tool failure, unexpected result)
             
         Yields:
@@ -114,7 +107,7 @@ class PlanActFlow(BaseFlow):
             original_plan=self.current_plan
         )
         
-        self.memory.messages.append({
+        ctx.memory.messages.append({
             "role": "user",
             "content": revision_prompt
         })
@@ -124,7 +117,7 @@ class PlanActFlow(BaseFlow):
         yield event
         
         result = await self.llm_client.ask(
-            messages=self.memory.get_messages(),
+            messages=ctx.memory.get_messages(),
             tools=None,
         )
         
@@ -134,7 +127,7 @@ class PlanActFlow(BaseFlow):
             if revised_plan and "PLAN" in revised_plan.upper():
                 logger.info(f"Plan revised successfully:\n{revised_plan}")
                 self.current_plan = revised_plan
-                self.memory.messages.append({
+                ctx.memory.messages.append({
                     "role": "assistant",
                     "content": revised_plan
                 })
@@ -145,14 +138,17 @@ class PlanActFlow(BaseFlow):
         
         logger.warning("Failed to revise plan")
     
-    def _get_last_search_replace_file_path(self) -> Optional[str]:
+    def _get_last_search_replace_file_paths(self, memory: Optional[Memory] = None) -> List[str]:
         """
-        Get the file path from the last search_replace tool call.
+        Get the files touched by the last search_replace tool call.
+        
+        Args:
+            memory: Memory to search (default: the agent's own memory)
         
         Returns:
-            File path if found, None otherwise
+            The top-level file_path and the file_path of every edit, in order (empty if none found)
         """
-        messages = self.memory.get_messages()
+        messages = (memory or self.memory).get_messages()
         
         # Find the last search_replace tool call
         for i in range(len(messages) - 1, -1, -1):
@@ -163,34 +159,36 @@ class PlanActFlow(BaseFlow):
                     function_name = tool_call.get("function", {}).get("name", "")
                     if function_name == self.SEARCH_REPLACE_TOOL_NAME:
                         args = tool_call.get("function", {}).get("arguments", "{}")
-                        import json
                         try:
                             args_dict = json.loads(args) if isinstance(args, str) else args
-                            file_path = args_dict.get("file_path")
-                            if file_path:
-                                return file_path
+                            default_path = args_dict.get("file_path")
+                            file_paths = [default_path] if default_path else []
+                            for edit in args_dict.get("edits") or []:
+                                path = edit.get("file_path") if isinstance(edit, dict) else None
+                                if path and path not in file_paths:
+                                    file_paths.append(path)
+                            if file_paths:
+                                return file_paths
                         except:
                             pass
-        return None
+        return []
     
-    async def _auto_run_linter(self, file_path: str, session_id: str, iteration: int):
+    async def _auto_run_linter(self, ctx: StepContext, file_paths: List[str]):
         """
-        Automatically run linter on a file after search_replace.
+        Automatically run linter on the files of a search_replace call.
         
         Args:
-            file_path: Path to the file to lint
-            session_id: Current session ID
-            iteration: Current iteration number
+            ctx: Context of the step whose report was blocked
+            file_paths: Paths of the files to lint
             
         Yields:
             Events from tool execution
         """
+        file_path = ", ".join(file_paths)
         logger.info(f"Auto-running linter on {file_path} after search_replace")
-        event = MessageEvent(message=f"🔍 Auto-running linter on {file_path}...")
-        event.is_parent = self.is_parent
-        yield event
+        yield self._message(ctx, f"🔍 Auto-running linter on {file_path}...")
         
-        tool_args = {"file_path": file_path}
+        tool_args = {"file_path": file_paths[0]} if len(file_paths) == 1 else {"file_paths": file_paths}
         tool_result = None
         
         # Execute linter tool
@@ -198,126 +196,48 @@ class PlanActFlow(BaseFlow):
             message=f"Auto-calling lint_code on {file_path}",
             tool_name=self.LINTER_TOOL_NAME,
             tool_args=tool_args,
-        )):
-            if isinstance(event, MessageEvent):
-                yield event
-            elif isinstance(event, ToolCallEvent):
-                yield event
+        ), self._tool_context(ctx)):
+            if isinstance(event, (MessageEvent, ToolCallEvent)):
+                yield self._attribute(ctx, event)
             elif isinstance(event, ToolResultEvent):
-                yield event
+                yield self._attribute(ctx, event)
                 tool_result = event.result
         
         # Add to memory after tool execution completes
         if tool_result is None:
             tool_result = {"error": "Tool execution returned no result"}
         
-        self.memory.add_tool_call(session_id, iteration, self.LINTER_TOOL_NAME, tool_args)
-        self.memory.add_tool_result(session_id, iteration, tool_result)
+        ctx.memory.add_tool_call(ctx.session_id, ctx.iteration, self.LINTER_TOOL_NAME, tool_args)
+        ctx.memory.add_tool_result(ctx.session_id, ctx.iteration, tool_result)
         
         # Check result
         if tool_result and isinstance(tool_result, dict):
             if tool_result.get("success") is True and tool_result.get("error_count", 0) == 0:
                 logger.info(f"Auto-linter passed: {file_path} has no errors")
-                event = MessageEvent(message=f"✅ Linter check passed: {file_path} has no syntax errors")
-                event.is_parent = self.is_parent
-                yield event
+                yield self._message(ctx, f"✅ Linter check passed: {file_path} has no syntax errors")
             else:
                 error_count = tool_result.get("error_count", 0)
                 logger.warning(f"Auto-linter found {error_count} error(s) in {file_path}")
-                event = MessageEvent(message=f"⚠️ Linter found {error_count} error(s) in {file_path}. Please fix them before reporting.")
-                event.is_parent = self.is_parent
-                yield event
-    
-    def _validate_search_replace_linter_sequence(self) -> bool:
-        """
-        Validate that if search_replace tool was used, linter tool was run successfully after the last search_replace.
-        
-        Returns:
-            True if validation passes (no search_replace calls or linter ran successfully after last search_replace)
-            False if validation fails (search_replace exists but no successful linter after last search_replace)
-        """
-        messages = self.memory.get_messages()
-        
-        last_search_replace_index = -1
-        last_linter_index = -1
-        last_linter_result = None
-        
-        # Find the last search_replace tool call and last linter tool call
-        for i, msg in enumerate(messages):
-            if msg.get("role") == "assistant" and msg.get("tool_calls"):
-                tool_calls = msg.get("tool_calls", [])
-                for tool_call in tool_calls:
-                    function_name = tool_call.get("function", {}).get("name", "")
-                    if function_name == self.SEARCH_REPLACE_TOOL_NAME:
-                        last_search_replace_index = i
-                    elif function_name == self.LINTER_TOOL_NAME:
-                        last_linter_index = i
-                        # Get the result of this linter call (should be in the next tool message)
-                        if i + 1 < len(messages) and messages[i + 1].get("role") == "tool":
-                            import json
-                            try:
-                                last_linter_result = json.loads(messages[i + 1].get("content", "{}"))
-                            except:
-                                last_linter_result = None
-        
-        # If no search_replace tool was used, validation passes
-        if last_search_replace_index == -1:
-            logger.debug("No search_replace tool calls found, validation passes")
-            return True
-        
-        # If search_replace was used but no linter was run after it, validation fails
-        if last_linter_index <= last_search_replace_index:
-            logger.warning(f"Search_replace tool used at index {last_search_replace_index}, but no linter call after it (last linter at {last_linter_index})")
-            return False
-        
-        # Check if the last linter call was successful
-        if last_linter_result is None:
-            logger.warning("Last linter result is None")
-            return False
-        
-        # Check if linter tool itself failed to execute
-        if last_linter_result.get("success") is False or "error" in last_linter_result:
-            logger.warning(f"Linter tool execution failed: {last_linter_result}")
-            return False
-        
-        # Check if linter found any syntax errors in the code
-        error_count = last_linter_result.get("error_count", 0)
-        if error_count > 0:
-            logger.warning(f"Linter found {error_count} error(s) in the code")
-            return False
-        
-        logger.info("Search_replace-linter sequence validation passed: no syntax errors found")
-        return True
-    
-    async def process(
-        self,
-        message: str,
-        session_id: str,
-        parent_history: Optional[List[Dict[str, Any]]] = None,
-        parent_information: Optional[str] = None,
-    ):
-        logger.debug(f"Processing new message for session {session_id}: {message[:80]}{'...' if len(message) > 80 else ''}")
-        
-        # Initialize memory
-        if parent_history is None and parent_information is None:
-            self.memory.add_user_message(session_id, message)
-            await self.memory.initialize_messages(session_id)
-        elif parent_information is not None:
-            # Child agent: use parent_information and task in system prompt
-            self.memory.add_user_message(session_id, message)
-            await self.memory.initialize_messages(session_id, parent_information=parent_information, task=message)
-        else:
-            # Legacy support: if parent_history is provided, use it
-            self.memory.messages = copy.deepcopy(parent_history)
-            self.memory.messages.append({"role": "user", "content": message})
-            self.memory.add_user_message(session_id, message)
-        
-        # Reset counters for new user message
-        self.consecutive_search_replace_failures = 0
-        self.recent_search_replace_results = []
+                yield self._message(ctx, f"⚠️ Linter found {error_count} error(s) in {file_path}. Please fix them before reporting.")
+
+    def _iteration_message(self, iteration: int) -> str:
+        return f"⚙️ Executing... (Step: {iteration})"
+
+    def _prepare_messages(self, ctx: StepContext) -> List[Dict[str, Any]]:
+        messages = ctx.memory.get_messages()
+        # Remind the main loop of the plan to help the LLM stay on track;
+        # plan steps already carry their own step prompt
+        if self.current_plan and ctx.is_main:
+            execution_context = f"\n\nReminder - Current Plan:\n{self.current_plan}\n\nPlease follow the plan step by step."
+            return messages + [{"role": "user", "content": execution_context}]
+        return messages
+
+    def _reset_state(self) -> None:
+        super()._reset_state()
         self.current_plan = None
         self.plan_revision_count = 0
-        
+
+    async def _before_steps(self, session_id: str):
         # Phase 1: Planning
         async for event in self._generate_plan(session_id):
             yield event
@@ -328,299 +248,50 @@ class PlanActFlow(BaseFlow):
             event = MessageEvent(message="⚠️ Could not generate plan, proceeding with reactive execution...")
             event.is_parent = True
             yield event
-        
+
+    def _build_step_graph(self, message: str) -> StepGraph:
         # Phase 2: Acting
-        iteration = 0
-        consecutive_failures = 0
-        MAX_CONSECUTIVE_FAILURES = 3
+        if not self.current_plan:
+            return StepGraph.single(message)
+        return StepGraph.from_plan(self.current_plan, message)
+
+    async def _on_tool_failure(self, ctx: StepContext, tool_name: str, tool_result: Dict[str, Any]):
+        # Consider plan revision after multiple failures
+        if ctx.consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES and self.current_plan:
+            logger.info("Multiple consecutive failures detected, considering plan revision")
+            revision_reason = f"Multiple tool failures occurred. Last failure: {tool_result.get('error', 'Unknown error')}"
+            async for event in self._revise_plan(ctx, revision_reason):
+                yield event
+            ctx.consecutive_failures = 0  # Reset after revision
+
+    async def _on_search_replace_reflection(self, ctx: StepContext):
+        # Also trigger plan revision
+        if self.current_plan:
+            async for event in self._revise_plan(ctx, "Repeated search_replace failures"):
+                yield event
+
+    async def _on_report_blocked(self, ctx: StepContext):
+        # Try to auto-run linter on the last modified file
+        last_file_paths = self._get_last_search_replace_file_paths(ctx.memory)
+        if not last_file_paths:
+            async for event in super()._on_report_blocked(ctx):
+                yield event
+            return
+
+        logger.info(f"Report blocked: auto-running linter on {', '.join(last_file_paths)}")
+        yield self._message(ctx, "⚠️ Search_replace tool was used but linter was not run. Auto-running linter now...")
         
-        while iteration < self.MAX_ITERATION:
-            iteration += 1
-            logger.debug(f"PlanAct iteration {iteration}")
-            event = MessageEvent(message=f"⚙️ Executing... (Step: {iteration})")
-            event.is_parent = self.is_parent
+        async for event in self._auto_run_linter(ctx, last_file_paths):
             yield event
-            
-            # Add context about the plan to help LLM stay on track
-            execution_context = ""
-            if self.current_plan:
-                execution_context = f"\n\nReminder - Current Plan:\n{self.current_plan}\n\nPlease follow the plan step by step."
-                
-            # Temporarily add execution context
-            if execution_context:
-                self.memory.messages.append({
-                    "role": "user",
-                    "content": execution_context
-                })
-            
-            result = await self.llm_client.ask(
-                messages=self.memory.get_messages(),
-                tools=self.tools_definitions,
-            )
-            
-            # Remove the temporary context
-            if execution_context:
-                self.memory.messages.pop()
-            
-            if result["type"] == "tool_call":
-                tool_name = result["tool_name"]
-                tool_args = dict(result.get("tool_args") or {})
-                
-                # Handle parallel tasks
-                if tool_name == self.PARALLEL_TOOL_NAME:
-                    if not self.is_parent:
-                        error_msg = "⚠️ This agent is not allowed to create sub-agents. Only parent agents can use execute_parallel_tasks."
-                        logger.warning(f"Blocked parallel task execution: agent is not a parent (session: {session_id})")
-                        event = MessageEvent(message=error_msg)
-                        event.is_parent = self.is_parent
-                        yield event
-                        self.memory.add_tool_call(session_id, iteration, tool_name, tool_args)
-                        self.memory.add_tool_result(session_id, iteration, {"success": False, "error": error_msg})
-                        consecutive_failures += 1
-                        continue
-                    
-                    # Extract parent_information from tool_args (should be provided by LLM)
-                    # If not provided, generate a summary from current context
-                    parent_information = tool_args.get("parent_information")
-                    if not parent_information:
-                        # Fallback: create a summary from recent messages
-                        messages = self.memory.get_messages()
-                        # Extract key information from recent assistant and tool messages
-                        recent_context = []
-                        for msg in messages[-10:]:  # Last 10 messages
-                            if msg.get("role") == "assistant" and msg.get("content"):
-                                recent_context.append(f"Assistant: {msg['content'][:200]}")
-                            elif msg.get("role") == "tool" and msg.get("content"):
-                                try:
-                                    import json
-                                    tool_result = json.loads(msg.get("content", "{}"))
-                                    if tool_result.get("success") and tool_result.get("result"):
-                                        recent_context.append(f"Tool result: {str(tool_result.get('result'))[:200]}")
-                                except:
-                                    pass
-                        parent_information = "\n".join(recent_context) if recent_context else "No specific context available."
-                        logger.warning("parent_information not provided, using fallback summary")
-                    
-                    tool_args.setdefault("parent_information", parent_information)
-                    tool_args.setdefault("parent_session_id", session_id)
-                    tool_args.setdefault("parent_flow_type", "planact")
-                
-                logger.info(f"Tool call: {tool_name} with args: {tool_args}")
-                
-                is_report = False
-                tool_result = None
-                
-                # Execute tool
-                async for event in execute_tool(ToolCallEvent(
-                    message=f"Calling {tool_name}",
-                    tool_name=tool_name,
-                    tool_args=tool_args,
-                )):
-                    # Set agent information for parent agent if not already set
-                    if event.is_parent is None:
-                        event.is_parent = self.is_parent
-                    if event.is_parent and event.agent_index is None:
-                        event.agent_index = None  # Parent agent has no index
-                    
-                    if isinstance(event, MessageEvent):
-                        yield event
-                    elif isinstance(event, ToolCallEvent):
-                        yield event
-                    elif isinstance(event, ToolResultEvent):
-                        yield event
-                        tool_result = event.result
-                    elif isinstance(event, ReportEvent):
-                        is_report = True
-                        yield event
-                
-                if tool_result is None:
-                    tool_result = {"error": "Tool execution returned no result"}
-                
-                self.memory.add_tool_call(session_id, iteration, tool_name, tool_args)
-                self.memory.add_tool_result(session_id, iteration, tool_result)
-                
-                # Check if tool execution was successful
-                tool_failed = (
-                    isinstance(tool_result, dict) and 
-                    (tool_result.get("success") is False or 
-                     "error" in tool_result)
-                )
-                
-                if tool_failed:
-                    consecutive_failures += 1
-                    logger.warning(f"Tool {tool_name} failed. Consecutive failures: {consecutive_failures}")
-                    
-                    # Consider plan revision after multiple failures
-                    if consecutive_failures >= MAX_CONSECUTIVE_FAILURES and self.current_plan:
-                        logger.info("Multiple consecutive failures detected, considering plan revision")
-                        revision_reason = f"Multiple tool failures occurred. Last failure: {tool_result.get('error', 'Unknown error')}"
-                        async for event in self._revise_plan(session_id, revision_reason):
-                            yield event
-                        consecutive_failures = 0  # Reset after revision
-                else:
-                    # Success - reset failure counter
-                    consecutive_failures = 0
-                
-                # Track search_replace tool failures specifically
-                if tool_name == self.SEARCH_REPLACE_TOOL_NAME:
-                    is_search_replace_failed = (
-                        tool_result is not None and 
-                        (isinstance(tool_result, dict) and 
-                         (tool_result.get("success") is False or 
-                          "error" in tool_result or 
-                          tool_result.get("status") == "failed"))
-                    )
-                    
-                    # Track recent results (keep last 2 for child agents)
-                    self.recent_search_replace_results.append(not is_search_replace_failed)  # True for success, False for failure
-                    if len(self.recent_search_replace_results) > 2:
-                        self.recent_search_replace_results.pop(0)
-                    
-                    if is_search_replace_failed:
-                        self.consecutive_search_replace_failures += 1
-                        logger.warning(f"Search_replace tool failed. Consecutive failures: {self.consecutive_search_replace_failures}/{self.MAX_SEARCH_REPLACE_FAILURES}")
-                        
-                        # Check if failure is due to function not found (anchor not found)
-                        error_msg = tool_result.get("error", "") if isinstance(tool_result, dict) else ""
-                        is_anchor_not_found = (
-                            "anchor not found" in error_msg.lower() or 
-                            ("not found" in error_msg.lower() and ("start line" in error_msg.lower() or "end line" in error_msg.lower()))
-                        )
-                        
-                        if is_anchor_not_found:
-                            file_path = tool_args.get("file_path", "")
-                            new_string = tool_args.get("new_string", "")
-                            logger.info(f"Search_replace failed because function/block not found. Suggesting to re-read file and reconsider approach.")
-                            suggestion_message = (
-                                f"⚠️ search_replace failed: Could not find the function/code block to modify.\n\n"
-                                f"Please follow these steps:\n"
-                                f"1. First, use `cat {file_path}` to re-read the file and see its current actual content\n"
-                                f"2. Based on the file's actual content, decide on a strategy:\n"
-                                f"   - Option (1): If the function exists but the content is slightly different, adjust the start_line_content and end_line_content in search_replace to match the actual code in the current file\n"
-                                f"   - Option (2): If the function truly doesn't exist, use append to add new code:\n"
-                                f"     * Use `execute_command` with `echo '...' >> {file_path}` to append single-line content\n"
-                                f"     * Or use `execute_command` with a here-document to append multi-line content\n"
-                                f"3. The content you wanted to add/modify is:\n{new_string[:500]}{'...' if len(new_string) > 500 else ''}\n\n"
-                                f"Please re-read the file first, then choose the appropriate approach based on the actual situation."
-                            )
-                            self.memory.messages.append({
-                                "role": "user",
-                                "content": suggestion_message
-                            })
-                            event = MessageEvent(message="💡 search_replace failed - target not found. Please re-read the file first, then decide whether to adjust parameters or use append.")
-                            event.is_parent = self.is_parent
-                            yield event
-                            # Continue to next iteration to let LLM re-read file and decide
-                            continue
-                        
-                        # For child agents: trigger reflection if last 2 attempts both failed
-                        if not self.is_parent and len(self.recent_search_replace_results) >= 2:
-                            last_two_failed = not self.recent_search_replace_results[-1] and not self.recent_search_replace_results[-2]
-                            if last_two_failed:
-                                logger.warning(f"Child agent: Last 2 search_replace attempts failed. Triggering reflection to fix approach.")
-                                reflection_message = SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT.format(
-                                    failure_count=2,
-                                    workspace_dir=self.workspace_dir
-                                )
-                                # Add a more specific prompt for child agents
-                                child_reflection_prompt = (
-                                    f"⚠️ CRITICAL: Your last 2 search_replace attempts on this file have failed. "
-                                    f"You need to stop and think about why they failed before trying again.\n\n"
-                                    f"{reflection_message}\n\n"
-                                    f"Please analyze the error messages from the failed attempts, re-read the file to see its current state, "
-                                    f"and develop a better strategy before attempting another search_replace."
-                                )
-                                self.memory.messages.append({
-                                    "role": "user",
-                                    "content": child_reflection_prompt
-                                })
-                                event = MessageEvent(message="🤔 Reflecting on search_replace failures... Analyzing the issue to develop a better approach.")
-                                event.is_parent = self.is_parent
-                                yield event
-                                # Continue to next iteration to let LLM think and respond
-                                continue
-                        
-                        if self.consecutive_search_replace_failures >= self.MAX_SEARCH_REPLACE_FAILURES:
-                            logger.error(f"Reached max consecutive search_replace failures ({self.MAX_SEARCH_REPLACE_FAILURES}). Triggering reflection.")
-                            reflection_message = SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT.format(
-                                failure_count=self.MAX_SEARCH_REPLACE_FAILURES,
-                                workspace_dir=self.workspace_dir
-                            )
-                            self.memory.messages.append({
-                                "role": "user",
-                                "content": reflection_message
-                            })
-                            self.consecutive_search_replace_failures = 0
-                            event = MessageEvent(message=reflection_message)
-                            event.is_parent = self.is_parent
-                            yield event
-                            
-                            # Also trigger plan revision
-                            if self.current_plan:
-                                async for event in self._revise_plan(session_id, "Repeated search_replace failures"):
-                                    yield event
-                    else:
-                        # Search_replace succeeded
-                        if self.consecutive_search_replace_failures > 0:
-                            logger.info(f"Search_replace tool succeeded. Resetting failure counter from {self.consecutive_search_replace_failures} to 0.")
-                        self.consecutive_search_replace_failures = 0
-                
-                if is_report:
-                    # Before returning, validate that if search_replace was used, linter was run after
-                    if not self._validate_search_replace_linter_sequence():
-                        # Try to auto-run linter on the last modified file
-                        last_file_path = self._get_last_search_replace_file_path()
-                        if last_file_path:
-                            logger.info(f"Report blocked: auto-running linter on {last_file_path}")
-                            event = MessageEvent(message="⚠️ Search_replace tool was used but linter was not run. Auto-running linter now...")
-                            event.is_parent = self.is_parent
-                            yield event
-                            
-                            # Auto-run linter
-                            async for event in self._auto_run_linter(last_file_path, session_id, iteration):
-                                yield event
-                            
-                            # Re-validate after auto-running linter
-                            if not self._validate_search_replace_linter_sequence():
-                                error_msg = "⚠️ Linter check failed or found errors. Please fix the errors before reporting."
-                                logger.warning(f"Report still blocked after auto-linter: {error_msg}")
-                                event = MessageEvent(message=error_msg)
-                                event.is_parent = self.is_parent
-                                yield event
-                                self.memory.messages.append({
-                                    "role": "user",
-                                    "content": error_msg
-                                })
-                                continue
-                            else:
-                                logger.info("Linter validation passed after auto-run, allowing report")
-                                # Continue to return and allow the report
-                        else:
-                            error_msg = "⚠️ Search_replace tool was used but linter was not run successfully after the last search_replace. Please run the linter tool to verify the code changes."
-                            logger.warning(f"Report blocked: {error_msg}")
-                            event = MessageEvent(message=error_msg)
-                            event.is_parent = self.is_parent
-                            yield event
-                            self.memory.messages.append({
-                                "role": "user",
-                                "content": error_msg
-                            })
-                            continue
-                    return
-                    
-            else:
-                # Text response (no tool call)
-                answer_text = result.get("answer", "") or ""
-                if answer_text:
-                    self.memory.add_assistant_message(session_id, answer_text)
-                event = MessageEvent(message=answer_text)
-                event.is_parent = self.is_parent
-                yield event
-                return
         
-        logger.warning(f"Reached max iterations ({self.MAX_ITERATION}), returning error message")
-        error_message = "Sorry. Hit max iterations limit"
-        event = ReportEvent(message=error_message)
-        event.is_parent = self.is_parent
-        yield event
-
+        # Re-validate after auto-running linter
+        if not self._validate_search_replace_linter_sequence(ctx.memory):
+            error_msg = "⚠️ Linter check failed or found errors. Please fix the errors before reporting."
+            logger.warning(f"Report still blocked after auto-linter: {error_msg}")
+            yield self._message(ctx, error_msg)
+            ctx.memory.messages.append({
+                "role": "user",
+                "content": error_msg
+            })
+        else:
+            logger.info("Linter validation passed after auto-run, allowing report")
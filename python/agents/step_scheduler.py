@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Step Scheduler - Dependency-aware concurrent execution of flow steps
+"""
+
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.logger import Logger
+from utils.event_channel import FanInChannel
+from models import BaseEvent
+
+logger = Logger('step_scheduler', log_to_file=False)
+
+# "Step 2: Update parser - Tool: search_replace - Depends on: Step 1"
+STEP_LINE_PATTERN = re.compile(r'^\W*Step\s+(\d+)\s*[:.)]\s*(.+)$', re.IGNORECASE)
+DEPENDS_PATTERN = re.compile(r'\s*[-–|]?\s*Depends\s+on\s*:\s*(.*)$', re.IGNORECASE)
+TOOL_PATTERN = re.compile(r'\s*[-–|]\s*Tools?\s*:\s*(.*)$', re.IGNORECASE)
+
+# Tools that never change the workspace. Only steps limited to these tools run
+# concurrently; file edits and shell commands of plan steps are not isolated.
+READ_ONLY_TOOLS = frozenset({
+    "get_workspace_structure", "workspace_rag_retrieve", "lint_code",
+    "fetch_url", "web_search", "send_message", "send_report",
+})
+
+
+@dataclass
+class FlowStep:
+    """A single node of a step graph."""
+    step_id: str
+    description: str
+    depends_on: List[str] = field(default_factory=list)
+    tool: Optional[str] = None
+    result: Optional[str] = None
+
+    @property
+    def tools(self) -> List[str]:
+        """Tool names declared by the plan ("Tool: a, b")."""
+        return re.findall(r'[A-Za-z_]\w*', self.tool or "")
+
+    @property
+    def read_only(self) -> bool:
+        """True if the step declares tools and all of them are read-only."""
+        tools = self.tools
+        return bool(tools) and all(tool in READ_ONLY_TOOLS for tool in tools)
+
+
+class StepGraph:
+    """
+    Directed acyclic graph of flow steps.
+
+    Every graph ends with a main step that depends on all other steps and runs
+    on the agent's own memory. A ReAct run is the degenerate graph that only
+    contains the main step.
+    """
+
+    MAIN_STEP_ID = "main"
+
+    def __init__(self, steps: Iterable[FlowStep]):
+        self.steps: Dict[str, FlowStep] = {}
+        for step in steps:
+            if step.step_id in self.steps:
+                raise ValueError(f"Duplicate step id: {step.step_id}")
+            self.steps[step.step_id] = step
+
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f"Step {step.step_id} depends on unknown step {dependency}")
+
+        self._depths = self._compute_depths()
+
+    @classmethod
+    def single(cls, description: str = "") -> "StepGraph":
+        """Build the degenerate graph containing only the main step."""
+        return cls([FlowStep(step_id=cls.MAIN_STEP_ID, description=description)])
+
+    @classmethod
+    def from_plan(cls, plan: str, description: str = "") -> "StepGraph":
+        """
+        Build a step graph from an execution plan.
+
+        Plan steps become nodes only when the plan declares dependencies and at
+        least two independent steps are read-only (only those run concurrently).
+        Otherwise the whole plan is executed by the main step, exactly like a
+        sequential PlanAct run.
+
+        Args:
+            plan: Plan text produced by the planning prompt
+            description: Description of the main step
+
+        Returns:
+            StepGraph (degenerate single-step graph if the plan cannot run in parallel)
+        """
+        steps = parse_plan_steps(plan or "")
+        if not steps or not any(step.depends_on is not None for step in steps):
+            return cls.single(description)
+
+        for step in steps:
+            step.depends_on = step.depends_on or []
+
+        try:
+            graph = cls(steps + [FlowStep(
+                step_id=cls.MAIN_STEP_ID,
+                description=description,
+                depends_on=[step.step_id for step in steps],
+            )])
+        except ValueError as e:
+            logger.warning(f"Invalid plan dependencies, executing plan sequentially: {e}")
+            return cls.single(description)
+
+        if not graph.is_parallelizable():
+            logger.debug("No two read-only plan steps can run concurrently, executing plan sequentially")
+            return cls.single(description)
+        return graph
+
+    def _compute_depths(self) -> Dict[str, int]:
+        """Longest dependency path for each step. Raises ValueError on cycles."""
+        depths: Dict[str, int] = {}
+        visiting: Set[str] = set()
+
+        def visit(step_id: str) -> int:
+            if step_id in depths:
+                return depths[step_id]
+            if step_id in visiting:
+                raise ValueError(f"Dependency cycle detected at step {step_id}")
+            visiting.add(step_id)
+            dependencies = self.steps[step_id].depends_on
+            depth = 1 + max((visit(dep) for dep in dependencies), default=-1)
+            visiting.discard(step_id)
+            depths[step_id] = depth
+            return depth
+
+        for step_id in self.steps:
+            visit(step_id)
+        return depths
+
+    def is_parallelizable(self) -> bool:
+        """True if at least two read-only plan steps could run at the same time."""
+        plan_depths = [
+            depth for step_id, depth in self._depths.items()
+            if step_id != self.MAIN_STEP_ID and self.steps[step_id].read_only
+        ]
+        return len(plan_depths) != len(set(plan_depths))
+
+    def ready(self, done: Set[str], started: Set[str]) -> List[FlowStep]:
+        """Steps whose dependencies are all done and which have not started yet."""
+        return [
+            step for step_id, step in self.steps.items()
+            if step_id not in started and all(dep in done for dep in step.depends_on)
+        ]
+
+    @property
+    def plan_steps(self) -> List[FlowStep]:
+        return [step for step_id, step in self.steps.items() if step_id != self.MAIN_STEP_ID]
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps.values())
+
+
+def parse_plan_steps(plan: str) -> List[FlowStep]:
+    """
+    Parse "Step N: ..." lines of an execution plan.
+
+    `depends_on` is None for steps that do not declare dependencies, so callers
+    can tell "no dependencies declared" from "Depends on: none".
+
+    Args:
+        plan: Plan text
+
+    Returns:
+        List of FlowStep in plan order
+    """
+    steps = []
+    for line in plan.splitlines():
+        match = STEP_LINE_PATTERN.match(line.strip())
+        if not match:
+            continue
+        step_id, body = match.group(1), match.group(2)
+
+        depends_on = None
+        depends_match = DEPENDS_PATTERN.search(body)
+        if depends_match:
+            depends_on = re.findall(r'\d+', depends_match.group(1))
+            body = body[:depends_match.start()]
+
+        tool = None
+        tool_match = TOOL_PATTERN.search(body)
+        if tool_match:
+            tool = tool_match.group(1).strip(" *`") or None
+            body = body[:tool_match.start()]
+
+        steps.append(FlowStep(
+            step_id=step_id,
+            description=body.strip(" -*"),
+            depends_on=depends_on,
+            tool=tool,
+        ))
+    return steps
+
+
+class StepScheduler:
+    """
+    Runs the steps of a StepGraph, starting every step as soon as its
+    dependencies are done, with at most `max_concurrency` steps in flight.
+    Events from all running steps are merged into one stream.
+
+    Only read-only steps (see FlowStep.read_only) share the workspace with
+    other running steps; any other step runs alone.
+    """
+
+    def __init__(self, max_concurrency: int = 3):
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def run(
+        self,
+        graph: StepGraph,
+        run_step: Callable[[FlowStep], AsyncGenerator[BaseEvent, None]],
+    ) -> AsyncGenerator[Tuple[FlowStep, BaseEvent], None]:
+        """
+        Execute the graph and yield (step, event) pairs as they are produced.
+
+        Args:
+            graph: Step graph to execute
+            run_step: Factory returning the event stream of one step
+
+        Raises:
+            Exception: The first exception raised by any step; remaining steps are cancelled
+        """
+        if len(graph) == 1:
+            # Degenerate graph: run inline, no tasks or queues needed
+            step = next(iter(graph))
+            async for event in run_step(step):
+                yield step, event
+            return
+
+        channel = FanInChannel()
+        running: Dict[str, asyncio.Task] = {}
+        done: Set[str] = set()
+
+        async def pump(step: FlowStep) -> None:
+            try:
+                async for event in run_step(step):
+                    await channel.send(step, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                await channel.close(step, exc)
+                return
+            await channel.close(step)
+
+        def launch_ready() -> None:
+            for step in graph.ready(done, done | set(running)):
+                if len(running) >= self.max_concurrency:
+                    break
+                if running and not (step.read_only and all(graph.steps[s].read_only for s in running)):
+                    continue
+                logger.debug(f"Starting step {step.step_id} ({len(running) + 1}/{self.max_concurrency} running)")
+                channel.register()
+                running[step.step_id] = asyncio.create_task(pump(step))
+
+        try:
+            launch_ready()
+            async for batch in channel.batches():
+                for message in batch:
+                    step = message.source
+                    if not message.closed:
+                        yield step, message.item
+                        continue
+
+                    running.pop(step.step_id, None)
+                    if message.error is not None:
+                        logger.error(f"Step {step.step_id} failed: {message.error}")
+                        raise message.error
+                    done.add(step.step_id)
+                    logger.debug(f"Step {step.step_id} completed ({len(done)}/{len(graph)})")
+                    launch_ready()
+        finally:
+            for task in running.values():
+                task.cancel()
+            if running:
+                await asyncio.gather(*running.values(), return_exceptions=True)
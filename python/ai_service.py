@@ -4,8 +4,11 @@ import asyncio
 from typing import Dict, Any, Optional
 from dataclasses import asdict
 from utils.logger import Logger
+from utils.metrics import get_metrics
+from utils.tracing import get_tracer
 from agents.react_flow import ReActFlow
 from agents.planact_flow import PlanActFlow
+from tools import close_tools
 
 logger = Logger('ai_service', log_to_file=False)
 
@@ -102,15 +105,19 @@ async def get_ai_response(
     try:
         logger.info(f"Processing message: {message[:50]}{'...' if len(message) > 50 else ''}")
         
-        # Delegate to flow agent for processing (async generator)
-        async for msg in agent.process(message=message, session_id=session_id):
-            msg_dict = _message_to_dict(msg)
-            yield msg_dict
+        # Delegate to flow agent for processing (async generator); the run is traced per session
+        with get_tracer().start_trace("request", session_id, agent_type=agent_type, message_chars=len(message)):
+            async for msg in agent.process(message=message, session_id=session_id):
+                msg_dict = _message_to_dict(msg)
+                yield msg_dict
 
     except Exception as e:
         logger.error(f"Error in get_ai_response: {e}", exc_info=True)
         yield {"type": "final_message", "message": f"Error: {str(e)}"}
         raise
+    finally:
+        # Per-tool latency, error and payload statistics of this request
+        get_metrics().dump()
 
 
 async def get_session_history(session_id: str, workspace_dir: str, agent_type: str = "react"):
@@ -190,6 +197,9 @@ async def async_main():
         error_msg = {"type": "final_message", "message": f"Error: {str(e)}"}
         print(json.dumps(error_msg, ensure_ascii=False), flush=True)
         sys.exit(1)
+    finally:
+        # Reap persistent shells before asyncio.run closes the loop
+        await close_tools()
 
 def main():
     """Synchronous wrapper for async main"""
@@ -0,0 +1 @@
+# Benchmark harness: local OpenAI-compatible stub, synthetic workspaces and per-stage measurements
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Benchmark Run - End-to-end throughput, latency and memory of the Python services
+
+Drives ai_service.get_ai_response, ParallelTaskExecutorTool and
+RagService.initiate/update/retrieve against the local stub server on
+generated workspaces, and reports per stage the throughput, p50/p99 latency
+and peak RSS. Provider latency is whatever the stub is configured with
+(none by default), so the numbers measure the Python side.
+
+Usage:
+    python -m benchmarks.run --files 100 1000 --stages agent rag_init rag_retrieve
+    python -m benchmarks.run --files 5000 --latency 0.2 --json bench.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Make the project importable when run as a script
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.stub_server import ChatScript, StubOpenAIServer, tool_call
+from benchmarks.synthetic_workspace import generate_workspace, modify_files
+
+STAGES = ("agent", "parallel", "rag_init", "rag_update", "rag_retrieve")
+SUBTASK_MARKER = "Benchmark subtask"
+QUERIES = ("parse config records", "update the session cache", "render metric vectors", "validate user tokens")
+
+
+class RssSampler:
+    """Samples the resident set size in a background thread and keeps the peak."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def current() -> int:
+        """Current RSS in bytes (peak RSS of the process where /proc is unavailable)."""
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self) -> "RssSampler":
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+@dataclass
+class StageResult:
+    stage: str
+    files: int
+    operations: int
+    unit: str
+    seconds: float
+    latencies: List[float] = field(default_factory=list)
+    peak_rss_bytes: int = 0
+    llm_requests: int = 0
+    embedding_requests: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "files": self.files,
+            "operations": self.operations,
+            "unit": self.unit,
+            "seconds": round(self.seconds, 4),
+            "throughput": round(self.operations / self.seconds, 3) if self.seconds else 0.0,
+            "p50_ms": round(percentile(self.latencies, 0.5) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 0.99) * 1000, 2),
+            "peak_rss_mb": round(self.peak_rss_bytes / 2 ** 20, 1),
+            "llm_requests": self.llm_requests,
+            "embedding_requests": self.embedding_requests,
+        }
+
+
+@dataclass
+class BenchContext:
+    args: argparse.Namespace
+    workspace: Path
+    paths: List[str]
+    server: Optional[StubOpenAIServer]
+    rag_service: Any = None
+    revision: int = 0
+
+
+def chat_script(paths: List[str]) -> ChatScript:
+    """Requests lint a file, report progress and finish; sub-agents lint their own file."""
+    return ChatScript(
+        default=[
+            tool_call("lint_code", file_path=paths[0], check_style=False),
+            tool_call("send_message", message="Checked the file."),
+            tool_call("send_report", message="Benchmark request done."),
+        ],
+        rules=[(SUBTASK_MARKER, [
+            tool_call("lint_code", file_path=paths[-1], check_style=False),
+            tool_call("send_report", message="Subtask done."),
+        ])],
+    )
+
+
+def configure_environment(base_url: str, args: argparse.Namespace) -> None:
+    """Point the services at the stub; must run before the project modules are imported."""
+    os.environ.update({
+        "OPENAI_API_KEY": "benchmark",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_MODEL": "stub-chat",
+        "OPENAI_EMBEDDING_MODEL": "text-embedding-3-small",
+        "OPENAI_RANKING_MODEL": "gpt-4o-mini",
+        "RAG_DESCRIPTION_CONCURRENCY": str(args.concurrency),
+        "RAG_INDEXING_CONCURRENCY": str(args.concurrency),
+    })
+    os.environ.pop("OPENAI_PROXY", None)
+    # Measure the real requests, without tracing files unless asked for
+    os.environ["LLM_CACHE_MODE"] = "off"
+    os.environ.setdefault("TRACE_ENABLED", "false")
+
+
+async def stage_agent(ctx: BenchContext) -> List[float]:
+    from ai_service import get_ai_response
+
+    latencies = []
+    for i in range(ctx.args.requests):
+        started = time.perf_counter()
+        async for _ in get_ai_response(f"Benchmark request {i}: check the workspace", session_id=f"bench-{ctx.revision}-{i}",
+                                       workspace_dir=str(ctx.workspace), agent_type=ctx.args.agent_type):
+            pass
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def stage_parallel(ctx: BenchContext) -> List[float]:
+    from tools.parallel_task_executor import ParallelTaskExecutorTool
+    from tools.tool_context import ToolContext
+
+    tool = ParallelTaskExecutorTool()
+    latencies = []
+    for run in range(ctx.args.parallel_runs):
+        tasks = [f"{SUBTASK_MARKER} {run}.{i}: lint {ctx.paths[-1]}" for i in range(ctx.args.subtasks)]
+        started = time.perf_counter()
+        result = await tool.execute(
+            tasks=tasks, parent_information="Synthetic benchmark workspace.", parent_session_id=f"bench-parallel-{run}",
+            context=ToolContext(workspace_dir=str(ctx.workspace), flow_type="react"),
+        )
+        latencies.append(time.perf_counter() - started)
+        if not result.get("success"):
+            raise RuntimeError(f"Parallel run failed: {result}")
+    return latencies
+
+
+async def stage_rag_init(ctx: BenchContext) -> List[float]:
+    from llm.chat_llm import AsyncChatClientWrapper
+    from rag.rag_service import RagService
+
+    ctx.rag_service = RagService(llm=AsyncChatClientWrapper(), enable_rerank=False)
+    started = time.perf_counter()
+    await ctx.rag_service.initiate(str(ctx.workspace))
+    return [time.perf_counter() - started]
+
+
+async def stage_rag_update(ctx: BenchContext) -> List[float]:
+    latencies = []
+    batch = ctx.paths[:ctx.args.update_files]
+    for _ in range(ctx.args.update_rounds):
+        ctx.revision += 1
+        modify_files(ctx.workspace, batch, ctx.revision)
+        started = time.perf_counter()
+        await ctx.rag_service.update(str(ctx.workspace), changed_files=batch, deleted_files=[])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def stage_rag_retrieve(ctx: BenchContext) -> List[float]:
+    latencies = []
+    for i in range(ctx.args.queries):
+        started = time.perf_counter()
+        await ctx.rag_service.retrieve(QUERIES[i % len(QUERIES)])
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+STAGE_FUNCTIONS: Dict[str, Callable[[BenchContext], Awaitable[List[float]]]] = {
+    "agent": stage_agent,
+    "parallel": stage_parallel,
+    "rag_init": stage_rag_init,
+    "rag_update": stage_rag_update,
+    "rag_retrieve": stage_rag_retrieve,
+}
+
+
+def stage_operations(stage: str, ctx: BenchContext, latencies: List[float]) -> Tuple[int, str]:
+    """Operations a stage's throughput is reported in."""
+    if stage == "rag_init":
+        return len(ctx.paths), "files"
+    if stage == "rag_update":
+        return len(latencies) * ctx.args.update_files, "files"
+    if stage == "parallel":
+        return len(latencies) * ctx.args.subtasks, "subtasks"
+    if stage == "rag_retrieve":
+        return len(latencies), "queries"
+    return len(latencies), "requests"
+
+
+async def run_stage(stage: str, ctx: BenchContext) -> StageResult:
+    chat_before = ctx.server.chat_requests if ctx.server else 0
+    embeddings_before = ctx.server.embedding_requests if ctx.server else 0
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        latencies = await STAGE_FUNCTIONS[stage](ctx)
+        seconds = time.perf_counter() - started
+    operations, unit = stage_operations(stage, ctx, latencies)
+    return StageResult(
+        stage=stage, files=len(ctx.paths), operations=operations, unit=unit, seconds=seconds,
+        latencies=latencies, peak_rss_bytes=rss.peak,
+        llm_requests=(ctx.server.chat_requests - chat_before) if ctx.server else 0,
+        embedding_requests=(ctx.server.embedding_requests - embeddings_before) if ctx.server else 0,
+    )
+
+
+async def run_benchmark(args: argparse.Namespace, files: int, server: Optional[StubOpenAIServer]) -> List[StageResult]:
+    from agents import memory
+    from rag.hash import get_workspace_storage_path
+
+    stages = list(args.stages)
+    # Update and retrieval need the indices built by rag_init
+    if any(stage in stages for stage in ("rag_update", "rag_retrieve")) and "rag_init" not in stages:
+        stages.insert(0, "rag_init")
+    stages.sort(key=STAGES.index)
+
+    scratch = Path(tempfile.mkdtemp(prefix="branchcoder-bench-"))
+    workspace = scratch / f"workspace_{files}"
+    # Keep benchmark sessions out of the user's conversation history
+    memory.DEFAULT_HISTORY_FILE = scratch / "conversation_history.json"
+    try:
+        paths = generate_workspace(workspace, files, args.functions, args.classes)
+        if server is not None:
+            server.script = chat_script(paths)
+        ctx = BenchContext(args=args, workspace=workspace, paths=paths, server=server)
+        results = []
+        for stage in stages:
+            result = await run_stage(stage, ctx)
+            print(format_row(result), flush=True)
+            results.append(result)
+        return results
+    finally:
+        shutil.rmtree(get_workspace_storage_path(str(workspace)), ignore_errors=True)
+        if not args.keep_workspace:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+HEADER = f"{'stage':<13} {'files':>6} {'ops':>6} {'unit':<9} {'total(s)':>9} {'ops/s':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'rss(MB)':>8} {'llm':>6} {'embed':>6}"
+
+
+def format_row(result: StageResult) -> str:
+    data = result.to_dict()
+    return (
+        f"{data['stage']:<13} {data['files']:>6} {data['operations']:>6} {data['unit']:<9} {data['seconds']:>9.2f} "
+        f"{data['throughput']:>9.2f} {data['p50_ms']:>9.1f} {data['p99_ms']:>9.1f} {data['peak_rss_mb']:>8.1f} "
+        f"{data['llm_requests']:>6} {data['embedding_requests']:>6}"
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks against a local OpenAI-compatible stub")
+    parser.add_argument("--files", type=int, nargs="+", default=[100], help="Workspace sizes to benchmark (100 to 50000)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--functions", type=int, default=4, help="Functions per generated file")
+    parser.add_argument("--classes", type=int, default=1, help="Classes per generated file")
+    parser.add_argument("--requests", type=int, default=5, help="Agent requests (agent stage)")
+    parser.add_argument("--agent-type", choices=("react", "planact"), default="react")
+    parser.add_argument("--parallel-runs", type=int, default=3, help="Parallel executions (parallel stage)")
+    parser.add_argument("--subtasks", type=int, default=4, help="Subtasks per parallel execution")
+    parser.add_argument("--update-files", type=int, default=10, help="Files changed per update round")
+    parser.add_argument("--update-rounds", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=20, help="Retrieval queries (rag_retrieve stage)")
+    parser.add_argument("--concurrency", type=int, default=8, help="RAG description and indexing concurrency")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests answered with 429")
+    parser.add_argument("--base-url", help="Use a stub server that is already running instead of starting one")
+    parser.add_argument("--json", help="Append the results as JSON lines to this file")
+    parser.add_argument("--keep-workspace", action="store_true", help="Keep the generated workspaces")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = StubOpenAIServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+        base_url = server.start()
+    configure_environment(base_url, args)
+
+    print(HEADER, flush=True)
+    results: List[StageResult] = []
+    try:
+        for files in args.files:
+            results.extend(asyncio.run(run_benchmark(args, files, server)))
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({"recorded_at": time.time(), **result.to_dict()}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Stub Server - Local OpenAI-compatible endpoint for chat completions and embeddings
+
+Chat requests with tools are answered from a script of tool calls; the position
+in the script is the number of assistant turns already in the conversation, so
+the server is stateless and concurrent agents each follow their own script.
+Description prompts of the RAG pipeline get a description in the expected
+format, and embeddings are hashed bags of words (similar texts get similar
+vectors, so retrieval returns meaningful results).
+
+Run standalone with `python -m benchmarks.stub_server --port 8765 --latency 0.2`.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import re
+import socket
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from utils.logger import Logger
+
+logger = Logger('stub_server', log_to_file=False)
+
+DEFAULT_EMBEDDING_DIM = 256
+WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+@dataclass
+class ScriptedTurn:
+    """One assistant turn: a tool call, or a plain answer when tool_name is None."""
+    tool_name: Optional[str] = None
+    tool_args: Dict[str, Any] = field(default_factory=dict)
+    answer: str = ""
+
+
+def tool_call(tool_name: str, **tool_args: Any) -> ScriptedTurn:
+    return ScriptedTurn(tool_name=tool_name, tool_args=tool_args)
+
+
+def answer(text: str) -> ScriptedTurn:
+    return ScriptedTurn(answer=text)
+
+
+class ChatScript:
+    """
+    Tool-call sequences per conversation.
+
+    A conversation uses the first rule whose marker occurs in its first user
+    message (the request, or the task of a sub-agent), else the default
+    sequence. Past the end of a sequence its last turn is repeated.
+    """
+
+    def __init__(self, default: Sequence[ScriptedTurn], rules: Sequence[Tuple[str, Sequence[ScriptedTurn]]] = ()):
+        self.default = list(default)
+        self.rules = [(marker, list(turns)) for marker, turns in rules]
+
+    def turn_for(self, messages: List[Dict[str, Any]]) -> ScriptedTurn:
+        first_user = next((m.get("content") or "" for m in messages if m.get("role") == "user"), "")
+        turns = next((turns for marker, turns in self.rules if marker in str(first_user)), self.default)
+        position = sum(1 for m in messages if m.get("role") == "assistant")
+        return turns[min(position, len(turns) - 1)]
+
+
+def describe_prompt(prompt: str) -> str:
+    """Answer a DescriptionGenerator prompt with one line per listed function and class."""
+    file_match = re.search(r"^\s*File: (.+)$", prompt, re.MULTILINE)
+    name = file_match.group(1).strip() if file_match else "the file"
+    sections = {"Functions:": [], "Classes:": []}
+    current = None
+    for line in prompt.splitlines():
+        stripped = line.strip()
+        if stripped in sections:
+            current = sections[stripped]
+        elif current is not None and stripped.startswith("- ") and stripped != "- <none>":
+            current.append(stripped[2:])
+        elif stripped.startswith("Class list"):
+            current = None
+    lines = ["[FILE]", f"{name} defines {len(sections['Functions:'])} functions and {len(sections['Classes:'])} classes.",
+             "[FUNCTIONS]"]
+    lines += [f"{qualname}: Implements {qualname.replace('_', ' ').replace('.', ' ')}." for qualname in sections["Functions:"]]
+    lines.append("[CLASSES]")
+    lines += [f"{qualname}: Holds the state of {qualname.replace('_', ' ')}." for qualname in sections["Classes:"]]
+    return "\n".join(lines)
+
+
+def embed(text: str, dim: int = DEFAULT_EMBEDDING_DIM) -> List[float]:
+    """Normalized hashed bag of words."""
+    vector = [0.0] * dim
+    for word in WORD_PATTERN.findall(text.lower()):
+        vector[zlib.crc32(word.encode()) % dim] += 1.0
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def _estimate_tokens(payload: Any) -> int:
+    return max(1, len(json.dumps(payload, ensure_ascii=False, default=str)) // 4)
+
+
+class StubOpenAIServer:
+    """
+    OpenAI-compatible HTTP server for /v1/chat/completions and /v1/embeddings.
+
+    Usable as a context manager, which runs the server on its own event loop in
+    a background thread and exposes `base_url`.
+    """
+
+    def __init__(
+        self,
+        script: Optional[ChatScript] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        embedding_dim: int = DEFAULT_EMBEDDING_DIM,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            script: Tool-call sequences for chat requests with tools
+            latency: Seconds added to every response
+            jitter: Additional uniformly distributed delay of up to this many seconds
+            error_rate: Fraction of requests answered with 429 (retry-after-ms: 10)
+            embedding_dim: Length of the returned embedding vectors
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            seed: Seed of the jitter and error sampling
+        """
+        self.script = script or ChatScript([answer("Done.")])
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.embedding_dim = embedding_dim
+        self.host = host
+        self.port = port
+        self.chat_requests = 0
+        self.embedding_requests = 0
+        self._random = random.Random(seed)
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def make_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        app.router.add_post("/v1/embeddings", self._embeddings)
+        return app
+
+    async def _delay(self) -> Optional[web.Response]:
+        """Apply the configured latency; returns a 429 response for sampled errors."""
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached (stub)", "type": "rate_limit_error", "code": "rate_limit"}},
+                status=429, headers={"retry-after-ms": "10"},
+            )
+        return None
+
+    async def _chat_completions(self, request: web.Request) -> web.Response:
+        self.chat_requests += 1
+        body = await request.json()
+        error = await self._delay()
+        if error is not None:
+            return error
+        messages = body.get("messages") or []
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        if body.get("tools"):
+            turn = self.script.turn_for(messages)
+        else:
+            prompt = str(messages[-1].get("content") or "") if messages else ""
+            turn = answer(describe_prompt(prompt) if "[FUNCTIONS]" in prompt else self.script.turn_for(messages).answer or "Done.")
+        if turn.tool_name:
+            message["tool_calls"] = [{
+                "id": f"call_{self.chat_requests}",
+                "type": "function",
+                "function": {"name": turn.tool_name, "arguments": json.dumps(turn.tool_args)},
+            }]
+            finish_reason = "tool_calls"
+        else:
+            message["content"] = turn.answer
+            finish_reason = "stop"
+        prompt_tokens = _estimate_tokens(messages)
+        completion_tokens = _estimate_tokens(message)
+        return web.json_response({
+            "id": f"chatcmpl-stub-{self.chat_requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        self.embedding_requests += 1
+        body = await request.json()
+        error = await self._delay()
+        if error is not None:
+            return error
+        inputs = body.get("input")
+        if isinstance(inputs, str) or (isinstance(inputs, list) and inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        data = []
+        for index, item in enumerate(inputs or []):
+            text = item if isinstance(item, str) else " ".join(f"t{token}" for token in item)
+            vector = embed(text, self.embedding_dim)
+            if body.get("encoding_format") == "base64":
+                encoded: Any = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+            else:
+                encoded = vector
+            data.append({"object": "embedding", "index": index, "embedding": encoded})
+        tokens = sum(_estimate_tokens(item) for item in inputs or [])
+        return web.json_response({
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub-embedding"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def start(self) -> str:
+        """Serve in a background thread; returns the base URL."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+        ready = threading.Event()
+
+        def serve() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.make_app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            self._loop.run_until_complete(web.SockSite(self._runner, sock).start())
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="stub-openai-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"Stub OpenAI server listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self) -> None:
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubOpenAIServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args(argv)
+
+    server = StubOpenAIServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              host=args.host, port=args.port)
+    web.run_app(server.make_app(), host=args.host, port=args.port, access_log=None)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Synthetic Workspace - Deterministic Python workspaces of arbitrary size for benchmarks
+"""
+
+import random
+from pathlib import Path
+from typing import List
+
+# Files per directory and directories per package of the generated layout
+FILES_PER_DIR = 50
+DIRS_PER_PACKAGE = 50
+
+WORDS = (
+    "account", "buffer", "cache", "config", "cursor", "digest", "event", "filter", "graph", "handler",
+    "index", "job", "key", "ledger", "metric", "node", "order", "parser", "queue", "record",
+    "session", "token", "user", "vector", "window", "worker",
+)
+VERBS = ("load", "save", "build", "parse", "merge", "split", "render", "validate", "update", "resolve")
+
+
+def relative_path(index: int) -> str:
+    """Path of the index-th file: pkg_XX/mod_YY/file_NNNNN.py."""
+    directory = index // FILES_PER_DIR
+    return f"pkg_{directory // DIRS_PER_PACKAGE:02d}/mod_{directory % DIRS_PER_PACKAGE:02d}/file_{index:05d}.py"
+
+
+def render_file(index: int, functions: int, classes: int, revision: int = 0) -> str:
+    rng = random.Random(index)
+    noun = WORDS[index % len(WORDS)]
+    lines = [f'"""Module {index}: {noun} utilities (revision {revision})."""', "", "import json", ""]
+    for c in range(classes):
+        name = f"{noun.capitalize()}{rng.choice(WORDS).capitalize()}{c}"
+        lines += [
+            "",
+            f"class {name}:",
+            f'    """Keeps {noun} state for {rng.choice(WORDS)} processing."""',
+            "",
+            "    def __init__(self, items=None):",
+            "        self.items = list(items or [])",
+            "",
+            f"    def {rng.choice(VERBS)}_{rng.choice(WORDS)}(self, value):",
+            "        self.items.append(value)",
+            "        return len(self.items)",
+            "",
+        ]
+    for f in range(functions):
+        verb, obj = rng.choice(VERBS), rng.choice(WORDS)
+        lines += [
+            "",
+            f"def {verb}_{obj}_{f}(data, limit={rng.randint(1, 100)}):",
+            f'    """{verb.capitalize()} the {obj} entries of data."""',
+            f"    result = [item for item in data if item.get('{obj}')][:limit]",
+            "    return json.dumps(result)",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def generate_workspace(root: Path, files: int, functions_per_file: int = 4, classes_per_file: int = 1) -> List[str]:
+    """
+    Write `files` Python modules under root (same content for the same arguments).
+
+    Returns:
+        Relative paths of the generated files
+    """
+    root = Path(root)
+    paths = []
+    for index in range(files):
+        rel = relative_path(index)
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render_file(index, functions_per_file, classes_per_file), encoding="utf-8")
+        paths.append(rel)
+    return paths
+
+
+def modify_files(root: Path, paths: List[str], revision: int, functions_per_file: int = 4, classes_per_file: int = 1) -> None:
+    """Rewrite files with a new revision and one extra function (for incremental updates)."""
+    for rel in paths:
+        index = int(Path(rel).stem.split("_")[-1])
+        (Path(root) / rel).write_text(
+            render_file(index, functions_per_file + 1, classes_per_file, revision=revision), encoding="utf-8"
+        )
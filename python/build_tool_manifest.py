@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Tool Manifest Builder
+Imports every tool once and writes tools/tool_manifest.json, which lets the
+services advertise tools without importing their modules at startup.
+Run after adding a tool or changing a tool definition.
+"""
+
+import sys
+
+from utils.logger import Logger
+from tools.tool_factory import MANIFEST_PATH, write_manifest
+
+logger = Logger('build_tool_manifest', log_to_file=False)
+
+
+def main():
+    try:
+        entries = write_manifest(MANIFEST_PATH)
+    except RuntimeError as e:
+        # A module that fails to import here (e.g. missing env vars) would drop its tools
+        print(f"Manifest not written: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {len(entries)} tools to {MANIFEST_PATH}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
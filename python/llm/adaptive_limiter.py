@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Adaptive Limiter - AIMD concurrency limit for bulk LLM and embedding work
+
+The limit grows by one after a full window of healthy completions (latency
+within a tolerance of the recent median, few errors) and is multiplied by a
+backoff factor when a request is throttled (429) or times out, or when latency
+degrades. Overload reported by requests that started before the last decrease
+is ignored, so one burst of 429s halves the limit once instead of collapsing it.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import openai
+
+from llm.resilience import status_code
+from utils.logger import Logger
+
+logger = Logger('adaptive_limiter', log_to_file=False)
+
+DEFAULT_INITIAL_LIMIT = 2
+DEFAULT_MAX_LIMIT = 16
+DEFAULT_BACKOFF = 0.5
+# A completion slower than this multiple of the median recent latency counts as degraded
+DEFAULT_LATENCY_TOLERANCE = 3.0
+# Latencies kept for the median, and how many are needed before latency is judged
+LATENCY_WINDOW = 50
+LATENCY_MIN_SAMPLES = 10
+# Recent outcomes for the error rate; no increase while it is above the threshold
+ERROR_WINDOW = 20
+ERROR_RATE_THRESHOLD = 0.1
+# Completions counted for the reported throughput
+THROUGHPUT_WINDOW = 30.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def is_overload(exc: BaseException) -> bool:
+    """Whether an error means the provider is saturated (429 or a timeout)."""
+    return status_code(exc) == 429 or isinstance(exc, (openai.APITimeoutError, asyncio.TimeoutError))
+
+
+class _Slot:
+    """One admitted request; `overloaded` is set by note_overload while it runs."""
+
+    def __init__(self, sequence: int):
+        self.sequence = sequence
+        self.overloaded = False
+
+
+_current_slot: "contextvars.ContextVar[Optional[_Slot]]" = contextvars.ContextVar("adaptive_slot", default=None)
+
+
+def note_overload() -> None:
+    """Report a throttled or timed-out attempt of the current request (e.g. one that is retried)."""
+    slot = _current_slot.get()
+    if slot is not None:
+        slot.overloaded = True
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    With `adaptive` off the limit stays at `initial` (a plain semaphore).
+    """
+
+    def __init__(
+        self,
+        initial: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        backoff: float = DEFAULT_BACKOFF,
+        latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+        adaptive: bool = True,
+        name: str = "rag",
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.adaptive = adaptive
+        self.name = name
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.overloads = 0
+        self._started = 0
+        self._decreased_at = 0
+        self._healthy_streak = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._outcomes: Deque[bool] = deque(maxlen=ERROR_WINDOW)
+        self._completion_times: Deque[float] = deque()
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveLimiter":
+        """Shared limiter starting at the larger of the description and indexing concurrency."""
+        return cls(
+            initial=max(_env_int("RAG_DESCRIPTION_CONCURRENCY", DEFAULT_INITIAL_LIMIT),
+                        _env_int("RAG_INDEXING_CONCURRENCY", DEFAULT_INITIAL_LIMIT)),
+            max_limit=_env_int("RAG_MAX_CONCURRENCY", DEFAULT_MAX_LIMIT),
+        )
+
+    async def acquire(self) -> _Slot:
+        while self.in_flight >= self.limit:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    # Woken and cancelled at once: pass the wakeup on
+                    self._wake()
+                raise
+        self.in_flight += 1
+        self._started += 1
+        return _Slot(self._started)
+
+    def _wake(self) -> None:
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def release(self, slot: _Slot, seconds: float, error: bool = False, sample_latency: bool = True) -> None:
+        """
+        Record the outcome of an admitted request and adapt the limit.
+
+        Args:
+            slot: Slot returned by acquire
+            seconds: Duration of the request
+            error: Whether the request failed
+            sample_latency: Whether the duration is comparable across requests
+        """
+        self.in_flight -= 1
+        self.completed += 1
+        now = time.monotonic()
+        self._completion_times.append(now)
+        while self._completion_times and now - self._completion_times[0] > THROUGHPUT_WINDOW:
+            self._completion_times.popleft()
+        self._outcomes.append(error)
+        self.errors += int(error)
+
+        if slot.overloaded:
+            self.overloads += 1
+            self._decrease(slot, "throttled")
+        elif not error:
+            degraded = (
+                sample_latency
+                and len(self._latencies) >= LATENCY_MIN_SAMPLES
+                and seconds > self._median_latency() * self.latency_tolerance
+            )
+            if degraded:
+                self._decrease(slot, f"latency {seconds:.1f}s")
+            else:
+                if sample_latency:
+                    self._latencies.append(seconds)
+                self._increase()
+        self._wake()
+
+    def _median_latency(self) -> float:
+        ordered = sorted(self._latencies)
+        return ordered[len(ordered) // 2]
+
+    def _increase(self) -> None:
+        if not self.adaptive or self.error_rate() > ERROR_RATE_THRESHOLD:
+            return
+        self._healthy_streak += 1
+        if self._healthy_streak >= self.limit and self.limit < self.max_limit:
+            self.limit += 1
+            self._healthy_streak = 0
+            logger.debug(f"{self.name} concurrency limit raised to {self.limit}")
+
+    def _decrease(self, slot: _Slot, reason: str) -> None:
+        self._healthy_streak = 0
+        # Requests started before the last decrease saw the old limit
+        if not self.adaptive or slot.sequence <= self._decreased_at:
+            return
+        new_limit = max(self.min_limit, int(self.limit * self.backoff))
+        self._decreased_at = self._started
+        if new_limit < self.limit:
+            logger.info(f"{self.name} concurrency limit lowered from {self.limit} to {new_limit} ({reason})")
+            self.limit = new_limit
+
+    def error_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def throughput(self) -> float:
+        """Completions per second over the last THROUGHPUT_WINDOW seconds."""
+        if len(self._completion_times) < 2:
+            return 0.0
+        elapsed = max(time.monotonic() - self._completion_times[0], 1e-6)
+        return len(self._completion_times) / elapsed
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": self.limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "errors": self.errors,
+            "throttled": self.overloads,
+            "throughput": round(self.throughput(), 3),
+        }
+
+    @asynccontextmanager
+    async def slot(self, sample_latency: bool = True) -> AsyncIterator[_Slot]:
+        """Hold one unit of concurrency for the body; errors and overload adapt the limit."""
+        slot = await self.acquire()
+        token = _current_slot.set(slot)
+        started = time.perf_counter()
+        error = False
+        try:
+            yield slot
+        except Exception as e:
+            error = True
+            if is_overload(e):
+                slot.overloaded = True
+            raise
+        finally:
+            _current_slot.reset(token)
+            self.release(slot, time.perf_counter() - started, error=error, sample_latency=sample_latency)
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def get_rag_limiter(kind: str = "description") -> AdaptiveLimiter:
+    """
+    Limiter for bulk RAG work of a kind ("description" or "indexing").
+
+    Adaptive limiters are shared by all kinds (they talk to the same provider)
+    and start at the larger configured concurrency. With
+    RAG_ADAPTIVE_CONCURRENCY=false each kind keeps its own static limit.
+    """
+    adaptive = os.getenv("RAG_ADAPTIVE_CONCURRENCY", "true").lower() in ("true", "1", "yes", "on")
+    key = "shared" if adaptive else kind
+    limiter = _limiters.get(key)
+    if limiter is None:
+        if adaptive:
+            limiter = AdaptiveLimiter.from_env()
+        else:
+            var = "RAG_INDEXING_CONCURRENCY" if kind == "indexing" else "RAG_DESCRIPTION_CONCURRENCY"
+            limit = _env_int(var, DEFAULT_INITIAL_LIMIT)
+            limiter = AdaptiveLimiter(initial=limit, max_limit=limit, adaptive=False, name=kind)
+        _limiters[key] = limiter
+    return limiter
@@ -1,14 +1,80 @@
+import asyncio
 import json
 import os
-from typing import Any, Dict, List, Optional, Literal, TypedDict
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Literal, Tuple, TypedDict
 from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
 from dotenv import load_dotenv
+from llm.adaptive_limiter import is_overload, note_overload
+from llm.response_cache import get_response_cache
+from llm.resilience import HedgePolicy, RateLimiter, RetryPolicy, first_successful, is_retryable, status_code
 from utils.logger import Logger
+from utils.metrics import get_metrics, payload_size
+from utils.tracing import span
 
 load_dotenv()
 
 logger = Logger('chat_llm', log_to_file=True)
 
+DEFAULT_TIMEOUT = 300.0
+# Rough characters-per-token ratio used to reserve tokens before the request
+CHARS_PER_TOKEN = 4
+
+# One AsyncOpenAI (and connection pool) per event loop and endpoint; httpx pools cannot cross loops
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+_rate_limiter: Optional[RateLimiter] = None
+_retry_policy: Optional[RetryPolicy] = None
+_hedge_policy: Optional[HedgePolicy] = None
+
+
+def get_shared_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """
+    Process-wide AsyncOpenAI client for an endpoint, created on first use in the running loop.
+
+    Retries are disabled in the SDK; AsyncChatClientWrapper.ask retries with the shared limiter.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _new_client(api_key, base_url)
+    clients = _clients.setdefault(loop, {})
+    client = clients.get((api_key, base_url))
+    if client is None:
+        client = clients[(api_key, base_url)] = _new_client(api_key, base_url)
+    return client
+
+
+def _new_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    try:
+        timeout = float(os.getenv("LLM_TIMEOUT", str(DEFAULT_TIMEOUT)))
+    except ValueError:
+        timeout = DEFAULT_TIMEOUT
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limiter shared by every wrapper in the process."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter.from_env()
+    return _rate_limiter
+
+
+def get_retry_policy() -> RetryPolicy:
+    global _retry_policy
+    if _retry_policy is None:
+        _retry_policy = RetryPolicy.from_env()
+    return _retry_policy
+
+
+def get_hedge_policy() -> HedgePolicy:
+    global _hedge_policy
+    if _hedge_policy is None:
+        _hedge_policy = HedgePolicy.from_env()
+    return _hedge_policy
+
 class CompletionResult(TypedDict):
     type: Literal["tool_call", "answer"]
     answer: Optional[str]
@@ -20,7 +86,11 @@ class CompletionResult(TypedDict):
 
 class AsyncChatClientWrapper:
 
-    def __init__(self):
+    def __init__(self, client: Optional[Any] = None):
+        """
+        Args:
+            client: AsyncOpenAI-compatible client to use instead of the shared one
+        """
         api_key = os.getenv("OPENAI_API_KEY")
         model = os.getenv("OPENAI_MODEL")
         base_url = os.getenv("OPENAI_BASE_URL")
@@ -36,12 +106,18 @@ class AsyncChatClientWrapper:
             os.environ["HTTP_PROXY"] = proxy
             os.environ["HTTPS_PROXY"] = proxy
 
-        self.client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=base_url,
-            timeout=300.0,
-        )
+        self._client = client
+        self._api_key = api_key
+        self._base_url = base_url
         self.model = model
+        self.limiter = get_rate_limiter()
+        self.retry_policy = get_retry_policy()
+        self.hedge_policy = get_hedge_policy()
+        self.response_cache = get_response_cache()
+
+    @property
+    def client(self) -> Any:
+        return self._client or get_shared_client(self._api_key, self._base_url)
 
     async def ask(
         self,
@@ -67,79 +143,132 @@ class AsyncChatClientWrapper:
         if response_format:
             kwargs["response_format"] = response_format
 
-        # Log LLM request
-        logger.info("=" * 80)
-        logger.info("LLM Request:")
-        logger.info(f"Model: {self.model}")
-        logger.info(f"Temperature: {temperature}")
-        logger.info(f"Tool Choice: {kwargs.get('tool_choice', 'none')}")
-        logger.info(f"Tools Count: {len(tools) if tools else 0}")
-        if tools:
-            tool_names = [tool.get('function', {}).get('name', 'unknown') for tool in tools if isinstance(tool, dict)]
-            logger.info(f"Available Tools: {', '.join(tool_names[:10])}{'...' if len(tool_names) > 10 else ''}")
+        # Log LLM request; the summary is cheap, message previews are sampled payload logs
+        logger.info(
+            "LLM Request: model=%s, temperature=%s, tool_choice=%s, tools=%d, messages=%d",
+            self.model, temperature, kwargs.get('tool_choice', 'none'), len(tools) if tools else 0, len(messages)
+        )
+        logger.payload("LLM Request Messages", lambda: self._format_messages(messages))
         
-        # Log messages (with truncation for very long messages)
-        logger.info(f"Messages Count: {len(messages)}")
-        for i, msg in enumerate(messages):
-            role = msg.get('role', 'unknown')
-            content = msg.get('content', '')
-            if isinstance(content, str):
-                content_preview = content[:200] + "..." if len(content) > 200 else content
-                logger.info(f"  Message {i+1} [{role}]: {content_preview}")
-            elif isinstance(content, list):
-                logger.info(f"  Message {i+1} [{role}]: [Complex content with {len(content)} parts]")
+        with span("llm_call", model=self.model, messages=len(messages), tools=len(tools) if tools else 0) as llm_span:
+            recorded = self.response_cache.lookup(kwargs)
+            if recorded is not None:
+                completion = ChatCompletion.model_validate(recorded)
+                get_metrics().record_llm_call(self.model, 0.0, cached=True, attempts=0)
+                llm_span.set(cached=True)
             else:
-                logger.info(f"  Message {i+1} [{role}]: [Non-string content]")
-        
-        logger.info("-" * 80)
-        
-        completion = await self.client.chat.completions.create(**kwargs)
-        result = self._parse_completion(completion)
+                completion, stats = await self._create_with_retries(kwargs, payload_size(messages) // CHARS_PER_TOKEN)
+                if hasattr(completion, "model_dump"):
+                    self.response_cache.store(kwargs, completion.model_dump(mode="json"), stats["seconds"])
+                llm_span.set(attempts=stats["attempts"], hedged=stats["hedged"],
+                             throttled_seconds=round(stats["throttled_seconds"], 3))
+            result = self._parse_completion(completion)
+            llm_span.set(response=result.get("type"), **(result.get("usage") or {}))
+            if result.get("type") == "tool_call":
+                llm_span.set(tool=result.get("tool_name"))
         
         # Log LLM response
-        logger.info("LLM Response:")
-        logger.info(f"Type: {result.get('type', 'unknown')}")
         if result.get("type") == "tool_call":
-            logger.info(f"Tool Name: {result.get('tool_name', 'unknown')}")
-            tool_args = result.get('tool_args', {})
-            tool_args_str = json.dumps(tool_args, ensure_ascii=False, indent=2)
-            # Truncate very long tool args
-            if len(tool_args_str) > 2000:
-                logger.info(f"Tool Args (length: {len(tool_args_str)}):")
-                logger.info(tool_args_str[:1000] + "\n... [truncated] ...\n" + tool_args_str[-1000:])
-            else:
-                logger.info(f"Tool Args:")
-                logger.info(tool_args_str)
+            logger.info("LLM Response: tool_call %s", result.get('tool_name', 'unknown'))
+            logger.payload("Tool Args", lambda: json.dumps(result.get('tool_args', {}), ensure_ascii=False, indent=2))
         else:
-            response_text = result.get("answer", "") or ""
-            # Log full response, but truncate if extremely long
-            if len(response_text) > 5000:
-                logger.info(f"Response (length: {len(response_text)}):")
-                logger.info(response_text[:2500] + "\n... [truncated] ...\n" + response_text[-2500:])
-            elif len(response_text) > 1000:
-                logger.info(f"Response (length: {len(response_text)}):")
-                logger.info(response_text[:500] + "\n... [truncated] ...\n" + response_text[-500:])
-            else:
-                logger.info(f"Response (length: {len(response_text)}):")
-                logger.info(response_text)
+            logger.info("LLM Response: answer")
+            logger.payload("Response", result.get("answer", "") or "")
         
         # Log token usage
         usage = result.get("usage", {})
         if usage:
-            prompt_tokens = usage.get('prompt_tokens', 0)
-            completion_tokens = usage.get('completion_tokens', 0)
-            total_tokens = usage.get('total_tokens', 0)
-            logger.info(f"Token Usage: prompt={prompt_tokens}, completion={completion_tokens}, total={total_tokens}")
+            logger.info(
+                "Token Usage: prompt=%s, completion=%s, total=%s",
+                usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0), usage.get('total_tokens', 0)
+            )
         else:
             logger.warning("No token usage information available")
-        logger.info("=" * 80)
         
         return result
 
-    def _parse_completion(self, completion: Any) -> CompletionResult:
-        choice = completion.choices[0]
-        message = choice.message
+    async def _create_with_retries(self, kwargs: Dict[str, Any], estimated_tokens: int) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Send the request through the shared rate limiter, hedging slow requests and
+        retrying transient failures (connection errors, 408/409/429, 5xx) with backoff.
+
+        Args:
+            kwargs: Arguments of chat.completions.create
+            estimated_tokens: Tokens to reserve before the usage is known
+
+        Returns:
+            The completion, and the attempts / throttling / hedging / latency of the call
+        """
+        stats: Dict[str, Any] = {"attempts": 0, "rate_limited": 0, "throttled_seconds": 0.0,
+                                 "hedged": False, "hedge_won": False}
+        started = time.perf_counter()
+        usage: Dict[str, int] = {}
+        succeeded = False
+
+        async def start() -> "asyncio.Task[Any]":
+            stats["throttled_seconds"] += await self.limiter.acquire(estimated_tokens)
+            return asyncio.ensure_future(self.client.chat.completions.create(**kwargs))
+
+        try:
+            while True:
+                stats["attempts"] += 1
+                attempt_started = time.perf_counter()
+                try:
+                    completion, hedged, hedge_won = await first_successful(
+                        await start(), self.hedge_policy.delay(), start
+                    )
+                except Exception as e:
+                    if status_code(e) == 429:
+                        stats["rate_limited"] += 1
+                    if is_overload(e):
+                        # Retries hide throttling from callers; let an adaptive limiter back off
+                        note_overload()
+                    if not is_retryable(e) or stats["attempts"] > self.retry_policy.max_retries:
+                        raise
+                    delay = self.retry_policy.delay(stats["attempts"], e)
+                    if status_code(e) == 429:
+                        self.limiter.pause(delay)
+                    logger.warning(
+                        "LLM request failed (attempt %d): %s; retrying in %.1fs",
+                        stats["attempts"], f"{type(e).__name__}: {e}"[:200], delay
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self.hedge_policy.observe(time.perf_counter() - attempt_started)
+                stats["hedged"] = stats["hedged"] or hedged
+                stats["hedge_won"] = stats["hedge_won"] or hedge_won
+                usage = self._usage_of(completion)
+                # A hedged request was reserved twice; the loser's tokens are left reserved
+                self.limiter.settle(estimated_tokens, usage.get("total_tokens", 0))
+                succeeded = True
+                stats["seconds"] = time.perf_counter() - started
+                return completion, stats
+        finally:
+            get_metrics().record_llm_call(
+                self.model, time.perf_counter() - started, error=not succeeded, attempts=stats["attempts"],
+                rate_limited=stats["rate_limited"], hedged=stats["hedged"], hedge_won=stats["hedge_won"],
+                throttled_seconds=stats["throttled_seconds"], prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+            )
 
+    @staticmethod
+    def _format_messages(messages: List[Dict[str, Any]]) -> str:
+        """One preview line (first 200 characters) per message, for the request log."""
+        lines = []
+        for i, msg in enumerate(messages):
+            role = msg.get('role', 'unknown')
+            content = msg.get('content', '')
+            if isinstance(content, str):
+                content_preview = content[:200] + "..." if len(content) > 200 else content
+                lines.append(f"  Message {i+1} [{role}]: {content_preview}")
+            elif isinstance(content, list):
+                lines.append(f"  Message {i+1} [{role}]: [Complex content with {len(content)} parts]")
+            else:
+                lines.append(f"  Message {i+1} [{role}]: [Non-string content]")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _usage_of(completion: Any) -> Dict[str, int]:
         # token 统计
         usage = getattr(completion, "usage", None)
         if usage:
@@ -165,6 +294,12 @@ class AsyncChatClientWrapper:
                 "completion_tokens": 0,
                 "total_tokens": 0,
             }
+        return usage_dict
+
+    def _parse_completion(self, completion: Any) -> CompletionResult:
+        choice = completion.choices[0]
+        message = choice.message
+        usage_dict = self._usage_of(completion)
 
         # tool_calls（新版接口）
         if getattr(message, "tool_calls", None):
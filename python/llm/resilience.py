@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Resilience - Client-side rate limiting, retry backoff and request hedging for LLM calls
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Optional
+
+import openai
+
+# Status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429}
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+# Latencies kept for the adaptive hedge delay, and the minimum before hedging starts
+HEDGE_WINDOW = 100
+HEDGE_MIN_SAMPLES = 20
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def status_code(exc: BaseException) -> Optional[int]:
+    return getattr(exc, "status_code", None) if isinstance(exc, openai.APIStatusError) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed request may succeed when repeated (connection problems, 408/409/429, 5xx)."""
+    if isinstance(exc, (openai.APIConnectionError, asyncio.TimeoutError)):
+        # APITimeoutError is an APIConnectionError
+        return True
+    status = status_code(exc)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Delay the server asked for (retry-after-ms / Retry-After, in seconds or as an HTTP date)."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Jittered exponential backoff ("full jitter"); a Retry-After from the server takes precedence."""
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        try:
+            max_retries = int(os.getenv("LLM_MAX_RETRIES", str(DEFAULT_MAX_RETRIES)))
+        except ValueError:
+            max_retries = DEFAULT_MAX_RETRIES
+        return cls(
+            max_retries=max_retries,
+            base_delay=_env_float("LLM_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY),
+            max_delay=_env_float("LLM_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY),
+        )
+
+    def delay(self, attempt: int, exc: Optional[BaseException] = None) -> float:
+        """
+        Seconds to wait before retrying.
+
+        Args:
+            attempt: Number of the failed attempt (1 for the first request)
+            exc: The error of the failed attempt
+
+        Returns:
+            The delay
+        """
+        requested = retry_after(exc) if exc is not None else None
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class TokenBucket:
+    """Bucket refilled at `per_minute` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests larger than the bucket wait for a full bucket)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        """Take `amount`; the level may go negative (debt that later callers wait off)."""
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Process-wide client-side limits on requests and tokens per minute.
+
+    Token usage is reserved with an estimate before the request and corrected
+    with the actual usage afterwards. A 429 pauses every caller until the
+    server's Retry-After has passed.
+    """
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+
+    @classmethod
+    def from_env(cls) -> "RateLimiter":
+        return cls(
+            requests_per_minute=_env_float("LLM_REQUESTS_PER_MINUTE", 0),
+            tokens_per_minute=_env_float("LLM_TOKENS_PER_MINUTE", 0),
+        )
+
+    async def acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        Wait until a request of `estimated_tokens` fits the limits, and reserve it.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            delay = max(0.0, self._paused_until - time.monotonic())
+            if self.requests is not None:
+                delay = max(delay, self.requests.wait_time(1))
+            if self.tokens is not None and estimated_tokens:
+                delay = max(delay, self.tokens.wait_time(estimated_tokens))
+            if delay <= 0:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.take(estimated_tokens)
+        return waited
+
+    def settle(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Correct a reservation with the usage the server reported."""
+        if self.tokens is not None and actual_tokens:
+            self.tokens.take(actual_tokens - estimated_tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all callers for `seconds` (after a 429)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class HedgePolicy:
+    """
+    When to send a second, identical request while the first is still running.
+
+    `after` is a fixed delay in seconds; with `adaptive` the delay is the p95
+    of recent latencies (once enough were observed). Disabled by default.
+    """
+
+    def __init__(self, after: Optional[float] = None, adaptive: bool = False, quantile: float = 0.95):
+        self.after = after
+        self.adaptive = adaptive
+        self.quantile = quantile
+        self._latencies: Deque[float] = deque(maxlen=HEDGE_WINDOW)
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        value = os.getenv("LLM_HEDGE_AFTER", "").strip().lower()
+        if value == "auto":
+            return cls(adaptive=True)
+        try:
+            after = float(value) if value else None
+        except ValueError:
+            after = None
+        return cls(after=after if after and after > 0 else None)
+
+    def observe(self, seconds: float) -> None:
+        self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds after which to hedge, or None to not hedge."""
+        if self.adaptive:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+            return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+        return self.after
+
+
+async def first_successful(primary: "asyncio.Future[Any]", hedge_after: Optional[float], start_hedge) -> Any:
+    """
+    Await `primary`; if it is still running after `hedge_after` seconds, start a
+    hedge with `start_hedge()` (an awaitable returning a future) and return the
+    first successful result. The slower request is cancelled.
+
+    Returns:
+        (result, hedged, hedge_won)
+    """
+    tasks = {primary}
+    try:
+        if hedge_after is None:
+            return await primary, False, False
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return primary.result(), False, False
+        hedge = await start_hedge()
+        tasks.add(hedge)
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True, task is hedge
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
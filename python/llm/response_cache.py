@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Content-addressed on-disk cache of LLM responses with record/replay modes
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.logger import Logger
+
+logger = Logger('response_cache', log_to_file=False)
+
+# off: always call the API; cache: serve temperature-0 requests from disk and store misses;
+# record: always call the API and store every response; replay: never call the API
+MODES = ("off", "cache", "record", "replay")
+
+
+class ResponseCacheMiss(Exception):
+    """Replay mode has no recorded response for a request."""
+
+
+class ResponseCache:
+    """
+    LLM responses stored as one JSON file per request.
+
+    The key is the SHA-256 of the canonical JSON of the request arguments
+    (model, messages, tools, tool_choice, temperature, response_format), so a
+    recorded transcript replays wherever the same requests are made. Entries
+    hold the request, the response as returned by the API and the original
+    latency.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, mode: str = "off"):
+        if directory is None:
+            project_root = Path(__file__).parent.parent.parent
+            directory = project_root / "logs" / "llm_cache"
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        directory = os.getenv("LLM_CACHE_DIR")
+        mode = os.getenv("LLM_CACHE_MODE", "off").strip().lower() or "off"
+        if mode not in MODES:
+            logger.warning(f"Ignoring unknown LLM_CACHE_MODE={mode!r}")
+            mode = "off"
+        return cls(directory=Path(directory) if directory else None, mode=mode)
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def cacheable(self, request: Dict[str, Any]) -> bool:
+        """Whether the request takes part in caching (in cache mode only deterministic requests do)."""
+        if self.mode in ("record", "replay"):
+            return True
+        return self.mode == "cache" and not request.get("temperature")
+
+    def lookup(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Recorded response for a request.
+
+        Args:
+            request: Arguments of chat.completions.create
+
+        Returns:
+            The response as a dict, or None if the API has to be called
+
+        Raises:
+            ResponseCacheMiss: In replay mode, when nothing was recorded
+        """
+        if self.mode not in ("cache", "replay") or not self.cacheable(request):
+            return None
+        key = self.make_key(request)
+        try:
+            with open(self.path_for(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            entry = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable LLM cache entry {key}: {e}")
+            entry = None
+        if entry is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise ResponseCacheMiss(f"No recorded LLM response for request {key} in {self.directory}")
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def store(self, request: Dict[str, Any], response: Dict[str, Any], seconds: float = 0.0) -> None:
+        """
+        Record a response (cache and record modes).
+
+        Args:
+            request: Arguments of chat.completions.create
+            response: The response as a JSON-serializable dict
+            seconds: Latency of the original call
+        """
+        if self.mode not in ("cache", "record") or not self.cacheable(request):
+            return
+        key = self.make_key(request)
+        path = self.path_for(key)
+        entry = {"key": key, "recorded_at": time.time(), "seconds": round(seconds, 6),
+                 "request": request, "response": response}
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write and rename, so concurrent readers never see a partial entry
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Failed to store LLM cache entry {key}: {e}")
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache used by AsyncChatClientWrapper."""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache.from_env()
+    return _response_cache
@@ -24,6 +24,8 @@ class ToolResultEvent(BaseEvent):
     result: dict = None
     is_parent: Optional[bool] = None
     agent_index: Optional[int] = None
+    cached: Optional[bool] = None  # True if the result was reused from the tool result cache
+    progress: Optional[bool] = None  # True for intermediate output of a running tool
 
 @dataclass
 class MessageEvent(BaseEvent):
@@ -170,17 +170,35 @@ PATCH_FAILURE_REFLECTION_PROMPT = SEARCH_REPLACE_FAILURE_REFLECTION_PROMPT
 
 PLANNING_PROMPT = """
 Create an execution plan:
-1. Break down into sequential steps
+1. Break down into steps
 2. Identify tools needed
-3. Note dependencies and edge cases
+3. Note dependencies and edge cases. Independent steps that only use read-only tools (get_workspace_structure, workspace_rag_retrieve, lint_code, fetch_url, web_search) are executed concurrently; steps that edit files or run commands are executed one at a time. Only declare real dependencies.
 
 Format:
 **EXECUTION PLAN:**
-Step 1: [Description] - Tool: [tool_name]
-Step 2: [Description] - Tool: [tool_name]
+Step 1: [Description] - Tool: [tool_name] - Depends on: none
+Step 2: [Description] - Tool: [tool_name] - Depends on: Step 1
 ...
 """
 
+STEP_EXECUTION_PROMPT = """
+You are now executing ONLY Step {step_id} of the plan:
+{step_description}
+
+Results of the steps this step depends on:
+{dependency_results}
+
+Other plan steps may be executed concurrently. Do NOT work on them and do NOT modify files outside the scope of this step.
+When this step is done, call send_report with a short summary of what was done (files changed, findings) and STOP.
+"""
+
+STEP_RESULTS_PROMPT = """
+All plan steps have been executed. Results:
+{step_results}
+
+Verify the combined result where necessary, finish any remaining work, then call send_report with the final answer.
+"""
+
 PLAN_REVISION_PROMPT = """
 The current plan needs to be revised due to: {revision_reason}
 
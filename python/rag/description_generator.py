@@ -1,11 +1,12 @@
 import os
 import asyncio
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
 from pydantic import BaseModel
 import json
 from dotenv import load_dotenv
 
+from llm.adaptive_limiter import get_rag_limiter
 from llm.chat_llm import AsyncChatClientWrapper
 from rag.function_slicer import FunctionSlice, WorkspaceFunctionSlices, FunctionSlicer
 from rag.class_slicer import ClassSlice, ClassSlicer
@@ -17,9 +18,6 @@ load_dotenv()
 # Initialize logger instance
 logger = Logger('description_generator', log_to_file=False)
 
-# Concurrency limit for description generation (from .env file, default: 2)
-DEFAULT_DESCRIPTION_CONCURRENCY = int(os.getenv("RAG_DESCRIPTION_CONCURRENCY"))
-
 # -------------------------------------
 # New models for descriptions & outputs
 # -------------------------------------
@@ -98,12 +96,16 @@ class DescriptionGenerator:
     def __init__(
             self,
             llm: AsyncChatClientWrapper,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
     ):
         self.llm = llm
-        # Semaphore to limit concurrent LLM calls (from .env file, default: 2)
-        self._llm_semaphore = asyncio.Semaphore(DEFAULT_DESCRIPTION_CONCURRENCY)
+        # Called after each described file with progress and the live concurrency limit
+        self.on_progress = on_progress
+        # Adaptive limit on concurrent LLM calls, shared with index building
+        self._llm_limiter = get_rag_limiter("description")
         # Lock to protect shared caches during concurrent processing
         self._cache_lock = asyncio.Lock()
+        self._files_done = 0
 
     def _build_prompt(
         self,
@@ -200,7 +202,7 @@ class DescriptionGenerator:
         total_files: int,
         file_index: int,
     ) -> Tuple[FileDescription, List[DescribedFunction], List[DescribedClass]]:
-        """Process a single file concurrently with semaphore limiting."""
+        """Process a single file concurrently under the adaptive concurrency limit."""
         def _normalize_key_global(name: str) -> str:
             s = name.strip()
             if s.startswith("-"):
@@ -222,15 +224,17 @@ class DescriptionGenerator:
             raise Exception(file_text)
 
         prompt = self._build_prompt(rel_file, file_text, fns, file_classes)
-        logger.info(f"Processing file {file_index}/{total_files}: {rel_file}")
-        logger.info(prompt)
+        logger.info("Processing file %d/%d: %s", file_index, total_files, rel_file)
+        # Prompts contain whole source files: sampled and size-capped
+        logger.payload(f"Prompt for {rel_file}", prompt)
 
-        # Use semaphore to limit concurrent LLM calls
-        async with self._llm_semaphore:
+        # Limit concurrent LLM calls; throttling and timeouts lower the limit. Latency grows
+        # with the size of the file in the prompt, so it is not a sign of overload here.
+        async with self._llm_limiter.slot(sample_latency=False):
             resp = await self.llm.ask(
                 messages=[{"role": "user", "content": prompt}],
             )
-        logger.info(resp)
+        logger.payload(f"Response for {rel_file}", lambda: str(resp))
 
         try:
             content = resp.get("answer", "") if isinstance(resp, dict) else ""
@@ -242,6 +246,9 @@ class DescriptionGenerator:
 
         # Update global caches with lock protection
         async with self._cache_lock:
+            self._files_done += 1
+            self._report_progress(total_files)
+
             # Update global class description cache
             for k, v in cls_descs.items():
                 key_norm = _normalize_key_global(k)
@@ -320,6 +327,17 @@ class DescriptionGenerator:
 
         return fd, described_items, described_classes
 
+    def _report_progress(self, total_files: int) -> None:
+        progress = {"stage": "describe", "done": self._files_done, "total": total_files,
+                    **self._llm_limiter.snapshot()}
+        logger.info("Described %d/%d files (concurrency limit %d, %.1f files/s)",
+                    progress["done"], total_files, progress["concurrency_limit"], progress["throughput"])
+        if self.on_progress is not None:
+            try:
+                self.on_progress(progress)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
     async def describe_workspace(self, workspace_dir, output_path: Optional[str] = None) -> DescribeOutput:
         """核心入口（并发版本）：
         1) 按文件分组函数
@@ -354,6 +372,7 @@ class DescriptionGenerator:
 
         # Create concurrent tasks for processing all files
         total = len(grouped.items())
+        self._files_done = 0
         tasks = []
         for file_index, (rel_file, fns) in enumerate(grouped.items(), 1):
             task = self._process_single_file(
@@ -3,7 +3,6 @@ from __future__ import annotations
 
 import asyncio
 import json
-import os
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
@@ -25,11 +24,9 @@ from llm.rag_llm import (
     DEFAULT_EMBED_MODEL,
     DEFAULT_LLM_MODEL_FOR_RERANK,
 )
+from llm.adaptive_limiter import get_rag_limiter
 from utils.logger import Logger
 
-# Concurrency limit for async indexing operations (from .env file, default: 2)
-DEFAULT_BUILD_CONCURRENCY = int(os.getenv("RAG_INDEXING_CONCURRENCY", "2"))
-
 # Initialize logger for indexing module
 logger = Logger('indexing', log_to_file=False)
 
@@ -98,8 +95,8 @@ class Indexing:
         self._build_lock = asyncio.Lock()
         self._retrieve_lock = asyncio.Lock()
         
-        # 并发信号量：限制异步构建时的并发数量（从 .env 文件读取，默认: 2）
-        self._build_semaphore = asyncio.Semaphore(DEFAULT_BUILD_CONCURRENCY)
+        # 自适应并发限制：与描述生成共享，遇到限流或超时自动降低
+        self._build_limiter = get_rag_limiter("indexing")
 
         # 设置持久化目录
         self.persist_root_dir = self._resolve_persist_root(persist_root_dir)
@@ -177,10 +174,11 @@ class Indexing:
         return docs, len(docs), skipped
 
     async def _build_index_async(self, docs: List[Document]) -> Optional[VectorStoreIndex]:
-        """异步构建单个索引，使用信号量限制并发。"""
+        """异步构建单个索引，使用自适应并发限制。"""
         if not docs:
             return None
-        async with self._build_semaphore:
+        # Build time scales with the number of documents, so it is not a latency sample
+        async with self._build_limiter.slot(sample_latency=False):
             # Run synchronous from_documents in executor to make it async
             loop = asyncio.get_event_loop()
             return await loop.run_in_executor(
@@ -198,7 +196,7 @@ class Indexing:
             func_docs, func_indexed, func_skipped = self._docs_from_items(functions, "function")
             class_docs, class_indexed, class_skipped = self._docs_from_items(classes, "class")
 
-            # Build three indexes concurrently with semaphore limiting
+            # Build three indexes concurrently under the adaptive limit
             build_tasks = [
                 self._build_index_async(file_docs),
                 self._build_index_async(func_docs),
@@ -206,6 +204,7 @@ class Indexing:
             ]
             results = await asyncio.gather(*build_tasks)
             self.file_index, self.func_index, self.class_index = results
+            logger.info(f"Indexes built ({self._build_limiter.snapshot()})")
 
             # 持久化到磁盘
             self._persist_index(self.file_index, "file")
@@ -406,7 +405,7 @@ class Indexing:
                     
                     # Insert documents one by one
                     # LlamaIndex's insert() method expects single Document or needs to be called per document
-                    async with self._build_semaphore:
+                    async with self._build_limiter.slot(sample_latency=False):
                         loop = asyncio.get_event_loop()
                         # Insert documents one by one to avoid list wrapping issues
                         def insert_single_doc(doc: Document):
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Shared pytest setup: keep log files and saved patches of test runs out of the repository.
+"""
+
+import os
+import tempfile
+
+# Set before the modules under test create their loggers at import time
+_output_dir = tempfile.mkdtemp(prefix="branchcoder-tests-")
+os.environ.setdefault("LOG_DIR", os.path.join(_output_dir, "logs"))
+os.environ.setdefault("APPLY_PATCH_SAVE_DIR", os.path.join(_output_dir, "patches"))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test suite for the adaptive (AIMD) concurrency limiter of the RAG pipeline.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llm import adaptive_limiter
+from llm.adaptive_limiter import AdaptiveLimiter, get_rag_limiter
+from llm.chat_llm import AsyncChatClientWrapper
+from llm.resilience import HedgePolicy, RateLimiter, RetryPolicy
+from rag.description_generator import DescriptionGenerator
+
+
+def rate_limit_error():
+    response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=httpx.Request("POST", "http://llm.test/v1"))
+    return openai.RateLimitError("status 429", response=response, body=None)
+
+
+def complete(limiter, seconds=0.1, **kwargs):
+    """Run one request through the limiter without waiting."""
+    slot = asyncio.run(limiter.acquire())
+    limiter.release(slot, seconds, **kwargs)
+    return slot
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(adaptive_limiter, "_limiters", {})
+
+
+class TestAdaptiveLimiter:
+    """Additive increase, multiplicative decrease and the static fallback."""
+
+    def test_limit_grows_after_healthy_windows_up_to_the_maximum(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for _ in range(2):
+            complete(limiter)
+        assert limiter.limit == 3
+        for _ in range(20):
+            complete(limiter)
+        assert limiter.limit == 4
+
+    def test_one_burst_of_429s_halves_the_limit_once(self):
+        limiter = AdaptiveLimiter(initial=8)
+
+        async def burst():
+            slots = [await limiter.acquire() for _ in range(8)]
+            for slot in slots:
+                slot.overloaded = True
+                limiter.release(slot, 0.1)
+
+        asyncio.run(burst())
+        assert limiter.limit == 4 and limiter.overloads == 8
+        # A request admitted after the decrease can lower it again
+        slot = asyncio.run(limiter.acquire())
+        slot.overloaded = True
+        limiter.release(slot, 0.1)
+        assert limiter.limit == 2
+
+    def test_latency_degradation_lowers_the_limit(self):
+        limiter = AdaptiveLimiter(initial=16, max_limit=16)
+        for _ in range(10):
+            complete(limiter, 0.1)
+        complete(limiter, 0.5)
+        assert limiter.limit == 8
+        complete(limiter, 5.0, sample_latency=False)
+        assert limiter.limit == 8
+
+    def test_errors_block_increases(self):
+        limiter = AdaptiveLimiter(initial=1)
+        for _ in range(3):
+            complete(limiter, error=True)
+        complete(limiter)
+        assert limiter.limit == 1 and limiter.errors == 3
+
+    def test_static_limiters_without_adaptation(self, monkeypatch):
+        monkeypatch.setenv("RAG_ADAPTIVE_CONCURRENCY", "false")
+        monkeypatch.setenv("RAG_DESCRIPTION_CONCURRENCY", "3")
+        monkeypatch.setenv("RAG_INDEXING_CONCURRENCY", "5")
+        description, indexing = get_rag_limiter("description"), get_rag_limiter("indexing")
+        assert (description.limit, indexing.limit) == (3, 5)
+        for _ in range(10):
+            complete(description)
+        slot = asyncio.run(description.acquire())
+        slot.overloaded = True
+        description.release(slot, 0.1)
+        assert description.limit == 3
+
+    def test_shared_limiter_starts_from_the_larger_setting(self, monkeypatch):
+        monkeypatch.delenv("RAG_ADAPTIVE_CONCURRENCY", raising=False)
+        monkeypatch.setenv("RAG_DESCRIPTION_CONCURRENCY", "3")
+        monkeypatch.setenv("RAG_INDEXING_CONCURRENCY", "not a number")
+        limiter = get_rag_limiter("description")
+        assert limiter is get_rag_limiter("indexing") and limiter.limit == 3
+
+    @pytest.mark.asyncio
+    async def test_concurrency_stays_within_the_limit(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        running = peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with limiter.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work() for _ in range(10)))
+        assert peak == 2 and limiter.completed == 10 and limiter.in_flight == 0
+        assert limiter.snapshot()["concurrency_limit"] == 2
+
+
+class TestIntegration:
+    """Overload reported by retried LLM calls and the description generator setup."""
+
+    @pytest.mark.asyncio
+    async def test_retried_429_lowers_the_limit(self, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_MODEL", "test-model")
+        monkeypatch.setenv("OPENAI_BASE_URL", "http://llm.test/v1")
+        script = [rate_limit_error()]
+
+        async def create(**kwargs):
+            if script:
+                raise script.pop()
+            message = SimpleNamespace(content="ok", tool_calls=None, function_call=None)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+        wrapper = AsyncChatClientWrapper(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+        wrapper.retry_policy = RetryPolicy(max_retries=2, base_delay=0.01, max_delay=0.05)
+        wrapper.hedge_policy = HedgePolicy()
+        wrapper.limiter = RateLimiter()
+        limiter = AdaptiveLimiter(initial=4)
+        async with limiter.slot():
+            result = await wrapper.ask([{"role": "user", "content": "hi"}])
+        assert result["answer"] == "ok"
+        assert limiter.limit == 2 and limiter.errors == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_description_of_a_large_file_keeps_the_limit(self, tmp_path):
+        class SlowLLM:
+            async def ask(self, messages, **kwargs):
+                await asyncio.sleep(0.05)
+                return {"answer": "big.py: a large module"}
+
+        (tmp_path / "big.py").write_text("x = 1\n" * 1000)
+        generator = DescriptionGenerator(llm=SlowLLM())
+        limiter = generator._llm_limiter = AdaptiveLimiter(initial=8)
+        limiter._latencies.extend([0.001] * 20)
+
+        await generator._process_single_file("big.py", [], tmp_path, {}, {}, {}, {}, {}, {}, 1, 1)
+        assert limiter.limit == 8 and limiter.completed == 1
+
+    def test_generator_works_without_concurrency_settings(self, monkeypatch):
+        monkeypatch.delenv("RAG_DESCRIPTION_CONCURRENCY", raising=False)
+        monkeypatch.delenv("RAG_INDEXING_CONCURRENCY", raising=False)
+        events = []
+        generator = DescriptionGenerator(llm=None, on_progress=events.append)
+        assert generator._llm_limiter.limit == adaptive_limiter.DEFAULT_INITIAL_LIMIT
+        generator._files_done = 1
+        generator._report_progress(4)
+        assert events[0]["stage"] == "describe" and (events[0]["done"], events[0]["total"]) == (1, 4)
+        assert events[0]["concurrency_limit"] == 2
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test suite for multi-file, multi-hunk patches applied in one apply_patch call.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools import ToolContext
+from tools import apply_patch_tool
+from tools.apply_patch_tool import ApplyPatchTool
+from utils.patch_parser import PatchHunk, parse_hunks
+
+
+MULTI_FILE_PATCH = """--- a/a.py
++++ b/a.py
+@@ -1,3 +1,3 @@
+ x = 1
+-y = 2
++y = 20
+ z = 3
+--- a/pkg/b.py
++++ b/pkg/b.py
+@@ -1,2 +1,2 @@
+-name = 'old'
++name = 'new'
+ print(name)
+"""
+
+
+@pytest.fixture(autouse=True)
+def no_patch_save(monkeypatch):
+    monkeypatch.setattr(apply_patch_tool, "ENABLE_PATCH_SAVE", False)
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\ny = 2\nz = 3\n")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "b.py").write_text("name = 'old'\nprint(name)\n")
+    return tmp_path
+
+
+class TestParseHunks:
+    """Splitting a file patch into hunks."""
+
+    def test_hunks_keep_header_start_and_drop_trailing_newline(self):
+        hunks = parse_hunks(
+            "--- a/x.py\n+++ b/x.py\n"
+            "@@ -2,2 +2,2 @@\n a\n-b\n+B\n"
+            "@@ -10,1 +10,2 @@\n c\n+d\n"
+        )
+        assert hunks == [
+            PatchHunk(2, ["a", "b"], ["a", "B"]),
+            PatchHunk(10, ["c"], ["c", "d"]),
+        ]
+
+    def test_hunk_without_header(self):
+        assert parse_hunks("-old\n+new\n") == [PatchHunk(None, ["old"], ["new"])]
+
+
+class TestMultiFilePatch:
+    """apply_patch with diffs that touch several files."""
+
+    @pytest.mark.asyncio
+    async def test_applies_every_file_from_headers(self, workspace):
+        result = await ApplyPatchTool().execute(
+            patch_content=MULTI_FILE_PATCH, context=ToolContext(workspace_dir=str(workspace))
+        )
+        assert result["success"], result
+        assert result["patches_applied"] == result["patches_total"] == 2
+        assert (workspace / "a.py").read_text() == "x = 1\ny = 20\nz = 3\n"
+        assert (workspace / "pkg" / "b.py").read_text() == "name = 'new'\nprint(name)\n"
+
+    @pytest.mark.asyncio
+    async def test_failing_file_leaves_all_files_unchanged(self, workspace):
+        patch = MULTI_FILE_PATCH.replace("-name = 'old'", "-name = 'missing'")
+        result = await ApplyPatchTool().execute(
+            patch_content=patch, context=ToolContext(workspace_dir=str(workspace))
+        )
+        assert not result["success"]
+        assert result["patches_applied"] == 0
+        assert result["error_details"]["file_path"].endswith("b.py")
+        assert (workspace / "a.py").read_text() == "x = 1\ny = 2\nz = 3\n"
+        assert (workspace / "pkg" / "b.py").read_text() == "name = 'old'\nprint(name)\n"
+
+    @pytest.mark.asyncio
+    async def test_dry_run_does_not_write(self, workspace):
+        result = await ApplyPatchTool().execute(
+            patch_content=MULTI_FILE_PATCH, dry_run=True, context=ToolContext(workspace_dir=str(workspace))
+        )
+        assert result["success"] and result["dry_run"]
+        assert [r["lines_to_replace"] for r in result["results"]] == [3, 2]
+        assert (workspace / "a.py").read_text() == "x = 1\ny = 2\nz = 3\n"
+
+
+class TestMultiHunk:
+    """Several hunks of one file applied in a single pass."""
+
+    @pytest.mark.asyncio
+    async def test_hunks_follow_offset_of_previous_hunk(self, tmp_path):
+        # Three lines were inserted at the top since the patch was made,
+        # and "return 0" occurs in both functions
+        target = tmp_path / "m.py"
+        target.write_text("import os\nimport sys\n\ndef f():\n    return 0\n\ndef g():\n    return 0\n")
+        patch = (
+            "--- a/m.py\n+++ b/m.py\n"
+            "@@ -1,2 +1,2 @@\n def f():\n-    return 0\n+    return 1\n"
+            "@@ -4,2 +4,2 @@\n def g():\n-    return 0\n+    return 2\n"
+        )
+        result = await ApplyPatchTool().execute(patch_content=patch, target_file_path=str(target))
+        assert result["success"], result
+        assert [hunk["patch_location"] for hunk in result["results"][0]["hunks"]] == [3, 6]
+        assert target.read_text() == "import os\nimport sys\n\ndef f():\n    return 1\n\ndef g():\n    return 2\n"
+
+    @pytest.mark.asyncio
+    async def test_overlapping_hunks_are_rejected(self, tmp_path):
+        target = tmp_path / "o.py"
+        target.write_text("a\nb\nc\n")
+        patch = "@@ -1,2 +1,2 @@\n a\n-b\n+B\n@@ -2,2 +2,2 @@\n b\n-c\n+C\n"
+        result = await ApplyPatchTool().execute(patch_content=patch, target_file_path=str(target))
+        assert not result["success"]
+        assert result["error_details"]["hunk"] == 2
+        assert target.read_text() == "a\nb\nc\n"
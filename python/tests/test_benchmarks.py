@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test suite for the OpenAI-compatible stub server and the benchmark harness.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from openai import AsyncOpenAI
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents import memory
+from benchmarks import run
+from benchmarks.stub_server import ChatScript, StubOpenAIServer, answer, describe_prompt, tool_call
+from rag.description_generator import DescriptionGenerator
+
+TOOLS = [{"type": "function", "function": {"name": "send_report", "parameters": {"type": "object", "properties": {}}}}]
+
+
+def test_script_follows_the_conversation():
+    script = ChatScript(
+        default=[tool_call("lint_code", file_path="a.py"), tool_call("send_report", message="done")],
+        rules=[("subtask", [answer("sub")])],
+    )
+    messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "request"}]
+    assert script.turn_for(messages).tool_name == "lint_code"
+    messages += [{"role": "assistant", "content": None}, {"role": "tool", "content": "{}"}]
+    assert script.turn_for(messages).tool_name == "send_report"
+    messages += [{"role": "assistant", "content": None}]
+    assert script.turn_for(messages).tool_name == "send_report"
+    assert script.turn_for([{"role": "user", "content": "a subtask"}]).answer == "sub"
+
+
+def test_descriptions_parse_like_real_responses():
+    generator = DescriptionGenerator(llm=None)
+    prompt = generator._build_prompt("pkg/a.py", "code", [], [])
+    prompt = prompt.replace("Functions:\n    - <none>", "Functions:\n    - a.load_cache_0\n    - a.Worker.run")
+    file_desc, functions, classes = generator.parse_llm_response(describe_prompt(prompt))
+    assert "pkg/a.py" in file_desc
+    assert set(functions) == {"a.load_cache_0", "a.Worker.run"}
+    assert classes == {}
+
+
+@pytest.mark.asyncio
+async def test_stub_serves_chat_and_embeddings():
+    with StubOpenAIServer(script=ChatScript([tool_call("send_report", message="hi")])) as server:
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        completion = await client.chat.completions.create(
+            model="stub", messages=[{"role": "user", "content": "hello"}], tools=TOOLS,
+        )
+        call = completion.choices[0].message.tool_calls[0]
+        assert call.function.name == "send_report" and json.loads(call.function.arguments) == {"message": "hi"}
+        assert completion.usage.total_tokens > 0
+
+        # The SDK requests base64 embeddings by default
+        response = await client.embeddings.create(
+            model="text-embedding-3-small", input=["parse the config", "parse config", "render window"],
+        )
+        vectors = [item.embedding for item in response.data]
+        assert len(vectors[0]) == 256
+        similarity = [sum(a * b for a, b in zip(vectors[0], other)) for other in vectors[1:]]
+        assert similarity[0] > similarity[1]
+        assert (server.chat_requests, server.embedding_requests) == (1, 1)
+        await client.close()
+
+
+def test_harness_runs_agent_and_parallel_stages(monkeypatch, tmp_path, capsys):
+    # Keep the environment and history changes of the harness local to this test
+    for name in ("OPENAI_API_KEY", "OPENAI_BASE_URL", "OPENAI_MODEL", "OPENAI_EMBEDDING_MODEL",
+                 "OPENAI_RANKING_MODEL", "RAG_DESCRIPTION_CONCURRENCY", "RAG_INDEXING_CONCURRENCY",
+                 "LLM_CACHE_MODE", "TRACE_ENABLED"):
+        monkeypatch.setenv(name, "unset")
+    monkeypatch.delenv("TRACE_ENABLED")
+    monkeypatch.setattr(memory, "DEFAULT_HISTORY_FILE", memory.DEFAULT_HISTORY_FILE)
+    output = tmp_path / "bench.jsonl"
+
+    assert run.main(["--files", "20", "--stages", "agent", "parallel", "--requests", "2",
+                     "--parallel-runs", "1", "--subtasks", "2", "--json", str(output)]) == 0
+    results = {row["stage"]: row for row in map(json.loads, output.read_text().splitlines())}
+    assert results["agent"]["operations"] == 2 and results["agent"]["llm_requests"] == 6
+    assert results["parallel"]["operations"] == 2 and results["parallel"]["llm_requests"] == 4
+    assert results["agent"]["p99_ms"] >= results["agent"]["p50_ms"] > 0
+    assert results["parallel"]["peak_rss_mb"] > 0
+    assert "agent" in capsys.readouterr().out
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test suite for streamed, size-capped command execution.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ToolCallEvent, ToolResultEvent
+from tools import ToolContext, execute_tool
+from tools.command_runner import OutputCapture, run_command
+
+posix_only = pytest.mark.skipif(sys.platform == "win32", reason="uses POSIX shell commands")
+
+
+class TestOutputCapture:
+    """Head/tail retention and spilling."""
+
+    def test_small_output_is_kept(self):
+        capture = OutputCapture("stdout", max_bytes=100)
+        capture.write(b"hello\n")
+        capture.close()
+        assert capture.text() == "hello\n"
+        assert not capture.truncated
+
+    def test_large_output_keeps_head_and_tail(self):
+        capture = OutputCapture("stdout", max_bytes=100)
+        data = b"".join(f"line {i}\n".encode() for i in range(1000))
+        for start in range(0, len(data), 37):
+            capture.write(data[start:start + 37])
+        capture.close()
+
+        text = capture.text()
+        assert capture.truncated
+        assert capture.total_bytes == len(data)
+        assert text.startswith("line 0\n")
+        assert text.endswith("line 999\n")
+        assert "bytes omitted" in text
+        assert Path(capture.spill_path).read_bytes() == data
+        os.unlink(capture.spill_path)
+
+
+@posix_only
+class TestRunCommand:
+    """Streaming, progress and process-group cleanup."""
+
+    @pytest.mark.asyncio
+    async def test_progress_is_reported(self, tmp_path):
+        updates = []
+        result = await run_command(
+            "for i in 1 2 3; do echo tick $i; sleep 0.1; done",
+            cwd=str(tmp_path),
+            timeout=10,
+            on_progress=updates.append,
+            progress_interval=0.05,
+        )
+        assert result.returncode == 0
+        assert "tick 3" in result.stdout.text()
+        assert updates
+        assert "tick" in updates[0]["recent_output"]
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_background_children(self, tmp_path):
+        marker = tmp_path / "child_survived"
+        started = time.perf_counter()
+        result = await run_command(
+            f"(sleep 1; touch {marker}) & sleep 30",
+            cwd=str(tmp_path),
+            timeout=0.3,
+        )
+        assert result.timed_out
+        assert result.returncode is None
+        assert time.perf_counter() - started < 5
+        time.sleep(1.2)
+        assert not marker.exists()
+
+    @pytest.mark.asyncio
+    async def test_background_child_is_killed_after_the_shell_exits(self, tmp_path):
+        marker = tmp_path / "child_survived"
+        started = time.perf_counter()
+        result = await run_command(
+            f"(sleep 1; touch {marker}) & echo hi",
+            cwd=str(tmp_path),
+            timeout=0.3,
+        )
+        # The shell finished in time; only its background child held the output open
+        assert not result.timed_out
+        assert result.returncode == 0
+        assert result.stdout.text() == "hi\n"
+        assert time.perf_counter() - started < 5
+        time.sleep(1.2)
+        assert not marker.exists()
+
+
+@posix_only
+class TestCommandToolOutput:
+    """Capped results and progress events through execute_tool."""
+
+    @pytest.mark.asyncio
+    async def test_output_is_capped(self, tmp_path):
+        context = ToolContext(workspace_dir=str(tmp_path))
+        events = []
+        async for event in execute_tool(
+            ToolCallEvent(tool_name="execute_command", tool_args={"command": "seq 1 200000"}), context
+        ):
+            events.append(event)
+
+        result = [e for e in events if isinstance(e, ToolResultEvent) and not e.progress][-1].result
+        assert result["success"] is True
+        assert result["stdout_truncated"] is True
+        assert len(result["stdout"]) < 40 * 1024
+        assert result["stdout"].endswith("200000\n")
+        assert Path(result["stdout_file"]).read_text().count("\n") == 200000
+        os.unlink(result["stdout_file"])
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Test suite for the edit coordinator: three-way merge, copy-on-write overlays and
+conflict handling of parallel sub-agents. Sub-agents are replaced by a fake flow.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ReportEvent
+from tools.edit_coordinator import EditCoordinator, merge3
+from tools.parallel_task_executor import ParallelTaskExecutorTool
+from tools.search_replace_tool import SearchReplaceTool
+from tools.subtask_scheduler import SubtaskBudget, SubtaskScheduler
+
+BASE = "a = 1\nb = 2\nc = 3\nd = 4\n"
+
+
+class EditingFlow:
+    """Stand-in for ReActFlow: tasks look like 'path|old|new' and run one search_replace."""
+
+    attempts = []
+
+    def __init__(self, workspace_dir, is_parent=True):
+        self.llm_client = None
+        self.MAX_ITERATION = 30
+
+    async def process(self, message, session_id, parent_information=None):
+        EditingFlow.attempts.append(message)
+        path, old, new = message.splitlines()[-1].split("|")
+        result = await SearchReplaceTool().execute(file_path=path, old_string=old, new_string=new)
+        # Give the sibling a chance to run in between
+        await asyncio.sleep(0.01)
+        yield ReportEvent(message="ok" if result["success"] else result["error"])
+
+
+@pytest.fixture
+def editing_flow(monkeypatch):
+    monkeypatch.setattr("agents.react_flow.ReActFlow", EditingFlow)
+    EditingFlow.attempts = []
+    return EditingFlow
+
+
+def make_tool():
+    tool = ParallelTaskExecutorTool()
+    tool.scheduler = SubtaskScheduler(max_concurrency=4)
+    tool.budget = SubtaskBudget()
+    tool.edit_isolation = True
+    return tool
+
+
+class TestMerge3:
+    """Line-based three-way merge."""
+
+    def test_disjoint_edits_merge(self):
+        ours = BASE.replace("a = 1", "a = 10")
+        theirs = BASE.replace("d = 4", "d = 40")
+        merged, conflicts = merge3(BASE, ours, theirs)
+        assert conflicts == []
+        assert merged == "a = 10\nb = 2\nc = 3\nd = 40\n"
+
+    def test_identical_edits_apply_once(self):
+        ours = BASE.replace("b = 2", "b = 20")
+        merged, conflicts = merge3(BASE, ours, ours)
+        assert conflicts == []
+        assert merged == ours
+
+    def test_overlapping_edits_conflict(self):
+        ours = BASE.replace("b = 2", "b = 20")
+        theirs = BASE.replace("b = 2", "b = 21")
+        merged, conflicts = merge3(BASE, ours, theirs)
+        assert conflicts == [(2, 2)]
+        assert merged == ours
+
+    def test_insertions_at_same_line_conflict(self):
+        ours = BASE.replace("c = 3\n", "x = 0\nc = 3\n")
+        theirs = BASE.replace("c = 3\n", "y = 0\nc = 3\n")
+        _, conflicts = merge3(BASE, ours, theirs)
+        assert conflicts
+
+
+class TestOverlay:
+    """Copy-on-write routing of file tools."""
+
+    @pytest.mark.asyncio
+    async def test_edits_stay_in_overlay_until_merge(self, tmp_path):
+        target = tmp_path / "module.py"
+        target.write_text(BASE)
+        coordinator = EditCoordinator()
+
+        async def child(index, old, new):
+            coordinator.activate(index)
+            return await SearchReplaceTool().execute(file_path=str(target), old_string=old, new_string=new)
+
+        results = await asyncio.gather(
+            asyncio.create_task(child(0, "a = 1", "a = 10")),
+            asyncio.create_task(child(1, "d = 4", "d = 40")),
+        )
+        assert all(result["success"] for result in results)
+        assert target.read_text() == BASE
+
+        assert coordinator.merge([0, 1]) == {}
+        assert target.read_text() == "a = 10\nb = 2\nc = 3\nd = 40\n"
+
+    @pytest.mark.asyncio
+    async def test_file_deleted_on_disk_is_a_conflict(self, tmp_path):
+        target = tmp_path / "module.py"
+        target.write_text(BASE)
+        coordinator = EditCoordinator()
+        coordinator.activate(0)
+        result = await SearchReplaceTool().execute(file_path=str(target), old_string="a = 1", new_string="a = 10")
+        assert result["success"]
+        target.unlink()
+
+        assert coordinator.merge([0]) == {0: {str(target.resolve()): [(1, 4)]}}
+        assert not target.exists()
+
+    def test_new_files_are_created(self, tmp_path):
+        target = tmp_path / "new.py"
+        coordinator = EditCoordinator()
+        coordinator.overlay(0).write(target, "x = 1\n")
+
+        assert coordinator.merge([0]) == {}
+        assert target.read_text() == "x = 1\n"
+
+
+class TestParallelEdits:
+    """ParallelTaskExecutorTool merging and rescheduling."""
+
+    def test_isolation_is_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("PARALLEL_EDIT_ISOLATION", raising=False)
+        assert ParallelTaskExecutorTool().edit_isolation is False
+        monkeypatch.setenv("PARALLEL_EDIT_ISOLATION", "on")
+        assert ParallelTaskExecutorTool().edit_isolation is True
+
+    @pytest.mark.asyncio
+    async def test_disjoint_edits_are_merged(self, tmp_path, editing_flow):
+        target = tmp_path / "module.py"
+        target.write_text(BASE)
+
+        result = await make_tool().execute(tasks=[f"{target}|a = 1|a = 10", f"{target}|d = 4|d = 40"])
+
+        assert [task["status"] for task in result["tasks"]] == ["completed", "completed"]
+        assert target.read_text() == "a = 10\nb = 2\nc = 3\nd = 40\n"
+        assert len(editing_flow.attempts) == 2
+
+    @pytest.mark.asyncio
+    async def test_conflicting_subtask_is_rescheduled(self, tmp_path, editing_flow):
+        target = tmp_path / "module.py"
+        target.write_text(BASE)
+
+        # The second task re-runs on the merged file, where "b = 20" is now present
+        result = await make_tool().execute(tasks=[f"{target}|b = 2|b = 20", f"{target}|b = 2|b = 21"])
+
+        second = result["tasks"][1]
+        assert second["rescheduled"] is True
+        assert second["conflicts"] == [str(target.resolve())]
+        assert len(editing_flow.attempts) == 3
+        assert editing_flow.attempts[-1].startswith("NOTE:")
+        assert target.read_text() == "a = 1\nb = 210\nc = 3\nd = 4\n"
+        assert "Edit conflicts" in result["summary"]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test suite for FanInChannel, the bounded event channel used to merge subtask streams.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.event_channel import FanInChannel
+
+
+async def produce(channel, source, count, delay=0.0):
+    for i in range(count):
+        await channel.send(source, i)
+        if delay:
+            await asyncio.sleep(delay)
+    await channel.close(source)
+
+
+class TestFanInChannel:
+    """Merging, batching and backpressure."""
+
+    @pytest.mark.asyncio
+    async def test_merges_all_producers_in_order(self):
+        channel = FanInChannel(maxsize=4)
+        producers = []
+        for source in range(8):
+            channel.register()
+            producers.append(asyncio.create_task(produce(channel, source, 5, delay=0.001)))
+
+        received = {source: [] for source in range(8)}
+        closed = []
+        async for batch in channel.batches():
+            for message in batch:
+                if message.closed:
+                    closed.append(message.source)
+                else:
+                    received[message.source].append(message.item)
+
+        await asyncio.gather(*producers)
+        assert sorted(closed) == list(range(8))
+        assert all(items == list(range(5)) for items in received.values())
+        assert channel.open_producers == 0
+
+    @pytest.mark.asyncio
+    async def test_batches_queued_items(self):
+        channel = FanInChannel(maxsize=16)
+        channel.register()
+        for i in range(10):
+            await channel.send("a", i)
+        await channel.close("a")
+
+        batches = [batch async for batch in channel.batches(max_batch=4)]
+        assert [len(batch) for batch in batches] == [4, 4, 3]
+        assert batches[-1][-1].closed
+
+    @pytest.mark.asyncio
+    async def test_full_channel_blocks_producer(self):
+        channel = FanInChannel(maxsize=2)
+        channel.register()
+        producer = asyncio.create_task(produce(channel, "a", 5))
+        await asyncio.sleep(0.01)
+        # Two items fit; the producer waits for the consumer before sending more
+        assert not producer.done()
+
+        items = [message.item async for batch in channel.batches() for message in batch if not message.closed]
+        await producer
+        assert items == list(range(5))
+
+    @pytest.mark.asyncio
+    async def test_error_is_carried_on_close(self):
+        channel = FanInChannel()
+        channel.register()
+        await channel.close("a", RuntimeError("boom"))
+
+        batch = [batch async for batch in channel.batches()][0]
+        assert isinstance(batch[0].error, RuntimeError)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Test suite for the shared flow engine and the step scheduler.
+Uses a scripted chat client, so no LLM endpoint is required.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.step_scheduler import FlowStep, StepGraph, StepScheduler, parse_plan_steps
+from models import MessageEvent, ReportEvent
+
+
+PARALLEL_PLAN = """**EXECUTION PLAN:**
+Step 1: Update a.py - Tool: search_replace - Depends on: none
+Step 2: Update b.py - Tool: search_replace - Depends on: none
+Step 3: Summarize both changes - Tool: send_report - Depends on: Step 1, Step 2
+"""
+
+MIXED_PLAN = """**EXECUTION PLAN:**
+Step 1: Update x in a.py - Tool: search_replace - Depends on: none
+Step 2: Update y in a.py - Tool: search_replace - Depends on: none
+Step 3: Find the callers - Tool: workspace_rag_retrieve - Depends on: none
+Step 4: Look up the spec - Tool: fetch_url - Depends on: none
+Step 5: Summarize - Tool: send_report - Depends on: Step 1, Step 2, Step 3, Step 4
+"""
+
+READ_ONLY_PLAN = """**EXECUTION PLAN:**
+Step 1: Find the parser - Tool: workspace_rag_retrieve - Depends on: none
+Step 2: Look up the spec - Tool: fetch_url, web_search - Depends on: none
+Step 3: Summarize the findings - Tool: send_report - Depends on: Step 1, Step 2
+"""
+
+
+class ScriptedChatClient:
+    """Answers planning with `plan`, runs the scripted `edits` of a step, then reports it."""
+
+    plan = PARALLEL_PLAN
+    edits = {}
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self):
+        self.calls = []
+
+    async def ask(self, messages, tools=None, **kwargs):
+        last_user = next(msg for msg in reversed(messages) if msg.get("role") == "user")
+        content = last_user.get("content", "")
+        self.calls.append(content)
+
+        if tools is None:
+            return {"type": "answer", "answer": ScriptedChatClient.plan}
+
+        ScriptedChatClient.in_flight += 1
+        ScriptedChatClient.max_in_flight = max(ScriptedChatClient.max_in_flight, ScriptedChatClient.in_flight)
+        await asyncio.sleep(0.05)
+        ScriptedChatClient.in_flight -= 1
+
+        for step_id in ("1", "2", "3", "4", "5"):
+            if f"ONLY Step {step_id} " in content:
+                edits = ScriptedChatClient.edits.get(step_id)
+                if edits:
+                    return {"type": "tool_call", "tool_name": "search_replace", "tool_args": edits.pop(0)}
+                return {"type": "tool_call", "tool_name": "send_report", "tool_args": {"message": f"step {step_id} done"}}
+        return {"type": "tool_call", "tool_name": "send_report", "tool_args": {"message": "all done"}}
+
+
+@pytest.fixture
+def flow_env(monkeypatch, tmp_path):
+    monkeypatch.setattr("agents.flow_engine.AsyncChatClientWrapper", ScriptedChatClient)
+    monkeypatch.setattr("agents.memory.DEFAULT_HISTORY_FILE", tmp_path / "history.json")
+    monkeypatch.setattr(ScriptedChatClient, "plan", PARALLEL_PLAN)
+    monkeypatch.setattr(ScriptedChatClient, "edits", {})
+    ScriptedChatClient.in_flight = 0
+    ScriptedChatClient.max_in_flight = 0
+    return tmp_path
+
+
+class TestStepGraph:
+    """Plan parsing and graph construction."""
+
+    def test_parse_plan_steps(self):
+        steps = parse_plan_steps(PARALLEL_PLAN)
+        assert [step.step_id for step in steps] == ["1", "2", "3"]
+        assert steps[0].description == "Update a.py"
+        assert steps[0].tool == "search_replace"
+        assert steps[0].depends_on == []
+        assert steps[2].depends_on == ["1", "2"]
+
+    def test_plan_without_dependencies_is_single_step(self):
+        graph = StepGraph.from_plan("Step 1: Read - Tool: execute_command\nStep 2: Edit - Tool: search_replace")
+        assert len(graph) == 1
+
+    def test_chain_plan_is_single_step(self):
+        graph = StepGraph.from_plan("Step 1: Read - Depends on: none\nStep 2: Edit - Depends on: Step 1")
+        assert len(graph) == 1
+
+    def test_all_edit_plan_is_single_step(self):
+        graph = StepGraph.from_plan(PARALLEL_PLAN)
+        assert len(graph) == 1
+
+    def test_parallel_plan_builds_graph(self):
+        graph = StepGraph.from_plan(READ_ONLY_PLAN)
+        assert len(graph) == 4
+        assert graph.is_parallelizable()
+        assert graph.steps[StepGraph.MAIN_STEP_ID].depends_on == ["1", "2", "3"]
+
+    def test_cycle_falls_back_to_single_step(self):
+        graph = StepGraph.from_plan("Step 1: A - Depends on: Step 2\nStep 2: B - Depends on: Step 1\nStep 3: C - Depends on: none")
+        assert len(graph) == 1
+
+
+class TestStepScheduler:
+    """Concurrency cap and dependency ordering."""
+
+    @pytest.mark.asyncio
+    async def test_respects_dependencies_and_cap(self):
+        graph = StepGraph([
+            FlowStep("1", "a", tool="workspace_rag_retrieve"),
+            FlowStep("2", "b", tool="workspace_rag_retrieve"),
+            FlowStep("3", "c", tool="workspace_rag_retrieve"),
+            FlowStep("4", "d", depends_on=["1", "2", "3"]),
+        ])
+        running = set()
+        max_running = 0
+        finished = []
+
+        async def run_step(step):
+            nonlocal max_running
+            running.add(step.step_id)
+            max_running = max(max_running, len(running))
+            if step.step_id == "4":
+                assert set(finished) == {"1", "2", "3"}
+            await asyncio.sleep(0.02)
+            yield MessageEvent(message=step.step_id)
+            running.discard(step.step_id)
+            finished.append(step.step_id)
+
+        scheduler = StepScheduler(max_concurrency=2)
+        events = [event.message async for _, event in scheduler.run(graph, run_step)]
+
+        assert sorted(events) == ["1", "2", "3", "4"]
+        assert events[-1] == "4"
+        assert max_running == 2
+
+    @pytest.mark.asyncio
+    async def test_only_read_only_steps_run_concurrently(self):
+        graph = StepGraph([
+            FlowStep("1", "read", tool="workspace_rag_retrieve"),
+            FlowStep("2", "read", tool="get_workspace_structure, lint_code"),
+            FlowStep("3", "edit", tool="search_replace"),
+            FlowStep("4", "command", tool="execute_command"),
+        ])
+        running = set()
+        overlaps = []
+
+        async def run_step(step):
+            running.add(step.step_id)
+            overlaps.append(set(running))
+            await asyncio.sleep(0.02)
+            yield MessageEvent(message=step.step_id)
+            running.discard(step.step_id)
+
+        events = [event.message async for _, event in StepScheduler(max_concurrency=4).run(graph, run_step)]
+
+        assert sorted(events) == ["1", "2", "3", "4"]
+        assert {"1", "2"} in overlaps
+        assert all(len(together) == 1 for together in overlaps if together & {"3", "4"})
+        assert not FlowStep("5", "no tool").read_only
+
+    @pytest.mark.asyncio
+    async def test_step_error_propagates(self):
+        graph = StepGraph([FlowStep("1", "a"), FlowStep("2", "b")])
+
+        async def run_step(step):
+            if step.step_id == "1":
+                raise RuntimeError("boom")
+            await asyncio.sleep(1)
+            yield MessageEvent(message=step.step_id)
+
+        with pytest.raises(RuntimeError):
+            async for _ in StepScheduler(max_concurrency=2).run(graph, run_step):
+                pass
+
+
+class TestFlowEngine:
+    """ReAct as a single-step graph and concurrent PlanAct steps."""
+
+    @pytest.mark.asyncio
+    async def test_react_single_step(self, flow_env):
+        from agents.react_flow import ReActFlow
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = ReActFlow(tmpdir)
+            events = [event async for event in agent.process("Do something", "react-session")]
+
+        reports = [event for event in events if isinstance(event, ReportEvent)]
+        assert [report.message for report in reports] == ["all done"]
+        assert agent.iterations_used == 1
+
+    @pytest.mark.asyncio
+    async def test_planact_runs_independent_steps_concurrently(self, flow_env):
+        from agents.planact_flow import PlanActFlow
+
+        ScriptedChatClient.plan = READ_ONLY_PLAN
+        with tempfile.TemporaryDirectory() as tmpdir:
+            agent = PlanActFlow(tmpdir, max_step_concurrency=3)
+            events = [event async for event in agent.process("Find the parser and its spec", "planact-session")]
+
+        reports = [event for event in events if isinstance(event, ReportEvent)]
+        assert [report.message for report in reports] == ["all done"]
+        assert ScriptedChatClient.max_in_flight == 2
+
+        step_messages = [event.message for event in events if isinstance(event, MessageEvent)]
+        assert any(message.startswith("[Step 1] ✅ Step completed: step 1 done") for message in step_messages)
+        assert any(message.startswith("[Step 3] ✅ Step completed: step 3 done") for message in step_messages)
+
+        # The main step receives all step results before it runs
+        assert any("step 1 done" in (msg.get("content") or "") for msg in agent.memory.get_messages())
+
+    @pytest.mark.asyncio
+    async def test_all_edit_plan_runs_as_a_single_step(self, flow_env):
+        from agents.planact_flow import PlanActFlow
+
+        agent = PlanActFlow(str(flow_env), max_step_concurrency=3)
+        events = [event async for event in agent.process("Update a.py and b.py", "planact-session")]
+
+        reports = [event for event in events if isinstance(event, ReportEvent)]
+        assert [report.message for report in reports] == ["all done"]
+        messages = [event.message for event in events if isinstance(event, MessageEvent)]
+        assert not any(message.startswith("[Step") for message in messages)
+        assert not any("ONLY Step" in call for call in agent.llm_client.calls)
+
+    @pytest.mark.asyncio
+    async def test_parallel_steps_editing_the_same_file_run_one_at_a_time(self, flow_env):
+        from agents.planact_flow import PlanActFlow
+
+        target = flow_env / "a.py"
+        target.write_text("x = 1\ny = 1\n")
+        ScriptedChatClient.plan = MIXED_PLAN
+        ScriptedChatClient.edits = {
+            "1": [{"file_path": str(target), "old_string": "x = 1", "new_string": "x = 2"}],
+            "2": [{"file_path": str(target), "old_string": "y = 1", "new_string": "y = 2"}],
+        }
+
+        agent = PlanActFlow(str(flow_env), max_step_concurrency=3)
+        events = [event async for event in agent.process("Update x and y in a.py", "planact-session")]
+
+        reports = [event for event in events if isinstance(event, ReportEvent)]
+        assert [report.message for report in reports] == ["all done"]
+        # Only the two read-only steps overlap
+        assert ScriptedChatClient.max_in_flight == 2
+        assert target.read_text() == "x = 2\ny = 2\n"
+
+    @pytest.mark.asyncio
+    async def test_read_only_step_cannot_edit(self, flow_env):
+        from agents.planact_flow import PlanActFlow
+
+        target = flow_env / "a.py"
+        target.write_text("x = 1\n")
+        ScriptedChatClient.plan = READ_ONLY_PLAN
+        ScriptedChatClient.edits = {"1": [{"file_path": str(target), "old_string": "x = 1", "new_string": "x = 2"}]}
+
+        agent = PlanActFlow(str(flow_env), max_step_concurrency=3)
+        events = [event async for event in agent.process("Find the parser", "planact-session")]
+
+        assert target.read_text() == "x = 1\n"
+        assert any("cannot modify the workspace" in event.message for event in events if isinstance(event, MessageEvent))
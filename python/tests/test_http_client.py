@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test suite for the shared HTTP client and its on-disk cache, against a local aiohttp server.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.fetch_url_tool import FetchUrlTool
+from tools.http_client import HttpCache, HttpClient
+
+PAGE = "<html><body><nav>menu</nav><h1>Docs</h1><p>Hello from the docs.</p><script>x()</script></body></html>"
+
+
+@pytest_asyncio.fixture
+async def server():
+    hits = {"page": 0, "not_modified": 0}
+
+    async def page(request):
+        hits["page"] += 1
+        if request.headers.get("If-None-Match") == '"v1"':
+            hits["not_modified"] += 1
+            return web.Response(status=304)
+        return web.Response(text=PAGE, content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def big(request):
+        return web.Response(body=b"x" * 500_000, content_type="text/plain")
+
+    async def private(request):
+        return web.Response(text=PAGE, content_type="text/html", headers={"Cache-Control": "no-store"})
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/page", page)
+    app.router.add_get("/big", big)
+    app.router.add_get("/private", private)
+    app.router.add_get("/missing", missing)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    test_server.hits = hits
+    yield test_server
+    await test_server.close()
+
+
+@pytest_asyncio.fixture
+async def client(tmp_path):
+    http_client = HttpClient(cache=HttpCache(tmp_path / "cache", ttl=60), max_bytes=100_000)
+    yield http_client
+    await http_client.close()
+
+
+class TestHttpClient:
+    """Pooled fetches through the HTTP cache."""
+
+    @pytest.mark.asyncio
+    async def test_fresh_entry_is_served_without_request(self, server, client):
+        url = str(server.make_url("/page"))
+        first = await client.fetch(url)
+        second = await client.fetch(url)
+        assert first.cache is None and second.cache == "fresh"
+        assert second.text() == PAGE
+        assert server.hits["page"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_revalidated_with_etag(self, server, client):
+        client.cache.ttl = 0
+        url = str(server.make_url("/page"))
+        await client.fetch(url)
+        second = await client.fetch(url)
+        assert second.cache == "revalidated"
+        assert second.text() == PAGE
+        assert server.hits["not_modified"] == 1
+
+    @pytest.mark.asyncio
+    async def test_body_is_capped_while_streaming(self, server, client):
+        response = await client.fetch(str(server.make_url("/big")))
+        assert response.truncated
+        assert len(response.body) == 100_000
+
+    @pytest.mark.asyncio
+    async def test_no_store_and_errors_are_not_cached(self, server, client):
+        await client.fetch(str(server.make_url("/private")))
+        missing = await client.fetch(str(server.make_url("/missing")))
+        assert missing.status == 404
+        assert list(client.cache.directory.glob("*.json")) == []
+
+    @pytest.mark.asyncio
+    async def test_fetch_url_tool_extracts_text(self, server, client):
+        tool = FetchUrlTool(client=client)
+        result = await tool.execute(url=str(server.make_url("/page")))
+        assert "Hello from the docs." in result["content"]
+        assert "menu" not in result["content"] and "x()" not in result["content"]
+        result = await tool.execute(url=str(server.make_url("/missing")))
+        assert result["error"] == "HTTP 404"
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test suite for the line-index hunk locator used by apply_patch.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.apply_patch_tool import ApplyPatchTool
+from tools.hunk_locator import LineIndex, locate_hunk
+
+
+def make_file(count):
+    """Lines that look like code, with many repeated lines (blank, braces, returns)."""
+    lines = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            lines.append(f"def function_{i}(value):")
+        elif kind == 1:
+            lines.append(f"    result = value * {i}")
+        elif kind == 2:
+            lines.append("    return result")
+        else:
+            lines.append("")
+    return lines
+
+
+class TestLocateHunk:
+    """Match tiers and tie-breaking."""
+
+    def test_exact_match_prefers_first_occurrence(self):
+        lines = ["a", "b", "c", "a", "b", "c"]
+        match = locate_hunk(LineIndex(lines), ["a", "b"])
+        assert (match.start, match.tier) == (0, "exact")
+
+    def test_hint_picks_nearest_occurrence(self):
+        lines = ["a", "b", "c", "a", "b", "c"]
+        assert locate_hunk(LineIndex(lines), ["a", "b"], hint=4).start == 3
+
+    def test_whitespace_tier(self):
+        lines = ["x = 1", "def f():", "\treturn  1", "y = 2"]
+        match = locate_hunk(LineIndex(lines), ["def f():", "    return 1"])
+        assert (match.start, match.tier) == (1, "whitespace")
+
+    def test_fuzzy_tier_scores_partial_match(self):
+        lines = make_file(200)
+        hunk = lines[50:70]
+        hunk[5] = "    changed = True"
+        match = locate_hunk(LineIndex(lines), hunk)
+        assert match.tier == "fuzzy"
+        assert match.start == 50
+        assert match.score == pytest.approx(19 / 20)
+
+    def test_no_match(self):
+        match = locate_hunk(LineIndex(["a", "b"]), ["x", "y"])
+        assert match.start == -1
+        assert match.score == 0
+
+    def test_large_file_is_fast(self):
+        lines = make_file(10000)
+        index = LineIndex(lines)
+        hunk = lines[7000:7100]
+        fuzzy_hunk = list(hunk)
+        fuzzy_hunk[40] = "    changed = True"
+
+        started = time.perf_counter()
+        for _ in range(10):
+            assert locate_hunk(index, hunk).start == 7000
+            assert locate_hunk(index, fuzzy_hunk).start == 7000
+        assert time.perf_counter() - started < 1.0
+
+
+class TestApplyPatchLocation:
+    """apply_patch uses the locator."""
+
+    @pytest.mark.asyncio
+    async def test_patch_applies_in_large_file(self, tmp_path):
+        lines = make_file(10000)
+        target = tmp_path / "big.py"
+        target.write_text("\n".join(lines) + "\n")
+        patch = "\n".join(
+            ["--- a/big.py", "+++ b/big.py", "@@ -8001,3 +8001,3 @@"]
+            + [f" {lines[8000]}", f"-{lines[8001]}", "+    result = value * -1", f" {lines[8002]}"]
+        )
+
+        started = time.perf_counter()
+        result = await ApplyPatchTool().execute(patch_content=patch, target_file_path=str(target))
+        assert result["success"] is True, result
+        assert time.perf_counter() - started < 1.0
+        assert target.read_text().splitlines()[8001] == "    result = value * -1"
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test suite for the in-process lint engine used by lint_code.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools import lint_engine
+from tools.lint_engine import LintEngine
+
+requires_pyflakes = pytest.mark.skipif(lint_engine.PyflakesChecker is None, reason="requires pyflakes")
+
+
+class TestLintEngine:
+    """Syntax checks, in-process pyflakes and the content-hash cache."""
+
+    def test_syntax_error(self):
+        issues = LintEngine().lint_sync("def broken(:\n    pass\n", "broken.py")
+        assert len(issues) == 1
+        assert issues[0]["type"] == "syntax_error"
+        assert issues[0]["line"] == 1
+        assert issues[0]["file"] == "broken.py"
+
+    @requires_pyflakes
+    def test_pyflakes_runs_in_process(self, monkeypatch):
+        def no_external(*args, **kwargs):
+            raise AssertionError("external linter should not run")
+        monkeypatch.setattr(lint_engine.subprocess, "run", no_external)
+        monkeypatch.setattr(lint_engine, "_installed", lambda program: False)
+
+        issues = LintEngine().lint_sync("import os\n\nprint(undefined_name)\n", "mod.py")
+        assert [issue["code"] for issue in issues] == ["UnusedImport", "UndefinedName"]
+        assert issues[0]["line"] == 1
+        assert issues[1]["message"] == "undefined name 'undefined_name'"
+
+    @requires_pyflakes
+    @pytest.mark.asyncio
+    async def test_pylint_errors_are_added_off_the_event_loop(self, monkeypatch):
+        threads = []
+
+        def fake_pylint(code, file_path=None):
+            threads.append(threading.current_thread())
+            return [{"type": "style_issue", "severity": "error", "message": "Instance has no 'nope' member",
+                     "line": 3, "column": 0, "code": "E1101", "symbol": "no-member", "file": "tmp.py"}]
+
+        monkeypatch.setattr(lint_engine, "ERROR_LINTERS", [("pylint", fake_pylint)])
+        monkeypatch.setattr(lint_engine, "_installed", lambda program: True)
+        engine = LintEngine()
+        code = "import os\n\nos.nope()\n"
+        issues = await engine.lint(code, "mod.py")
+        assert [issue["code"] for issue in issues] == ["E1101"]
+        assert issues[0]["file"] == "mod.py" and issues[0]["severity"] == "error"
+        assert threads and threading.current_thread() not in threads
+        # Cached by content: the external linter does not run again
+        await engine.lint(code, "other.py")
+        assert len(threads) == 1
+
+    @requires_pyflakes
+    def test_clean_code_has_no_issues(self):
+        assert LintEngine().lint_sync("import os\n\nprint(os.sep)\n") == []
+
+    def test_cache_is_keyed_by_content(self):
+        engine = LintEngine()
+        code = "import os\n"
+        first = engine.lint_sync(code, "a.py")
+        second = engine.lint_sync(code, "b.py")
+        assert engine.misses == 1
+        assert engine.hits == 1
+        assert [issue["file"] for issue in second] == ["b.py"] * len(first)
+
+        # Cached issues are copies
+        second.clear()
+        assert len(engine.lint_sync(code, "a.py")) == len(first)
+
+        engine.lint_sync(code, "a.py", check_style=False)
+        assert engine.misses == 2
+
+    def test_cache_is_bounded(self):
+        engine = LintEngine(cache_size=2)
+        for i in range(5):
+            engine.lint_sync(f"x = {i}\n")
+        assert len(engine._cache) == 2
+
+    @pytest.mark.asyncio
+    async def test_async_lint_large_code(self, monkeypatch):
+        monkeypatch.setattr(lint_engine, "INLINE_LINT_BYTES", 10)
+        engine = LintEngine()
+        issues = await engine.lint("def broken(:\n", "big.py", check_style=False)
+        assert issues[0]["type"] == "syntax_error"
+        assert engine.misses == 1
+
+
+class TestBatchLint:
+    """lint_many and lint_code with file_paths."""
+
+    @pytest.mark.asyncio
+    async def test_lint_many_uses_process_pool(self):
+        engine = LintEngine(processes=2)
+        sources = [(f"import os\nx{i} = 1\n", f"f{i}.py") for i in range(5)] + [("def broken(:\n", "bad.py")]
+        try:
+            results = await engine.lint_many(sources)
+            assert engine._process_pool is not None
+            assert [issue["file"] for issue in results[0]] == ["f0.py"] * len(results[0])
+            assert results[-1][0]["type"] == "syntax_error"
+
+            # A second run is answered from the cache
+            assert await engine.lint_many(sources) == results
+            assert engine.hits == len(sources)
+        finally:
+            engine.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_batch_report(self, tmp_path):
+        from tools.lint_tool import LintTool
+
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "clean.py").write_text("x = 1\n")
+        (tmp_path / "pkg" / "broken.py").write_text("def broken(:\n")
+        (tmp_path / "pkg" / "unused.py").write_text("import os\n")
+        (tmp_path / "node_modules").mkdir()
+        (tmp_path / "node_modules" / "skipped.py").write_text("def broken(:\n")
+
+        tool = LintTool()
+        tool.set_workspace_dir(str(tmp_path))
+        result = await tool.execute(file_paths=["**/*.py", "pkg/broken.py", "missing.py"])
+
+        assert result["success"] is True
+        assert result["files_checked"] == 3
+        assert result["unmatched"] == ["missing.py"]
+        assert result["error_count"] == 1
+        assert result["issues"][0]["file"] == str(tmp_path / "pkg" / "broken.py")
+        assert result["files"][0]["file"] == str(tmp_path / "pkg" / "broken.py")
+
+        compact = await tool.execute(file_paths=["pkg/*.py"], compact=True)
+        assert compact["clean_files"] >= 1
+        assert all(isinstance(issue, str) for issue in compact["issues"])
+        assert compact["issues"][0].startswith(f"{tmp_path / 'pkg' / 'broken.py'}:1:")
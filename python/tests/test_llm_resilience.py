@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test suite for LLM retries, client-side rate limiting and request hedging.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llm.chat_llm import AsyncChatClientWrapper, get_shared_client
+from llm.resilience import HedgePolicy, RateLimiter, RetryPolicy, is_retryable, retry_after
+from utils.metrics import get_metrics
+
+
+def status_error(status, headers=None):
+    response = httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "http://llm.test/v1"))
+    error_class = openai.RateLimitError if status == 429 else openai.InternalServerError
+    return error_class(f"status {status}", response=response, body=None)
+
+
+def completion(content="ok", total_tokens=30):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content, tool_calls=None, function_call=None))],
+        usage=SimpleNamespace(prompt_tokens=total_tokens - 5, completion_tokens=5, total_tokens=total_tokens),
+    )
+
+
+class FakeClient:
+    """Stands in for AsyncOpenAI: replays a script of errors, delays and completions."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        step = self.script.pop(0)
+        if isinstance(step, BaseException):
+            raise step
+        if isinstance(step, (int, float)):
+            await asyncio.sleep(step)
+            return completion(f"after {step}")
+        return step
+
+
+@pytest.fixture
+def make_wrapper(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL", "test-model")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://llm.test/v1")
+    get_metrics().reset()
+
+    def make(script, hedge=None, limiter=None):
+        wrapper = AsyncChatClientWrapper(client=FakeClient(script))
+        wrapper.retry_policy = RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.05)
+        wrapper.hedge_policy = hedge or HedgePolicy()
+        wrapper.limiter = limiter or RateLimiter()
+        return wrapper
+
+    yield make
+    get_metrics().reset()
+
+
+class TestPolicies:
+    """Retry classification, backoff and the token buckets."""
+
+    def test_retryable_errors_and_retry_after(self):
+        assert is_retryable(status_error(429)) and is_retryable(status_error(503))
+        assert is_retryable(openai.APITimeoutError(request=httpx.Request("POST", "http://llm.test")))
+        assert not is_retryable(ValueError("bad request"))
+        assert retry_after(status_error(429, {"retry-after": "7"})) == 7
+        assert retry_after(status_error(429, {"retry-after-ms": "250"})) == 0.25
+        assert retry_after(status_error(429)) is None
+
+    def test_backoff_is_jittered_capped_and_honors_retry_after(self):
+        policy = RetryPolicy(base_delay=1, max_delay=10)
+        assert all(0 <= policy.delay(attempt) <= min(10, 2 ** (attempt - 1)) for attempt in range(1, 8))
+        assert policy.delay(1, status_error(429, {"retry-after": "3"})) == 3
+        assert policy.delay(1, status_error(429, {"retry-after": "300"})) == 10
+
+    @pytest.mark.asyncio
+    async def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(requests_per_minute=600)  # one request per 0.1s once the burst is used
+        limiter.requests.level = 1
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        assert time.monotonic() - started >= 0.18
+
+    @pytest.mark.asyncio
+    async def test_token_usage_is_settled(self):
+        limiter = RateLimiter(tokens_per_minute=6000)
+        assert await limiter.acquire(1000) == 0
+        limiter.settle(1000, 6500)
+        assert limiter.tokens.wait_time(100) > 0
+        limiter.pause(0.05)
+        assert await limiter.acquire() >= 0.04
+
+
+class TestAskWithRetries:
+    """AsyncChatClientWrapper.ask retries, hedges and records metrics."""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self, make_wrapper):
+        wrapper = make_wrapper([status_error(429, {"retry-after-ms": "10"}), status_error(502), completion("done")])
+        result = await wrapper.ask([{"role": "user", "content": "hi"}])
+        assert result["answer"] == "done"
+        assert wrapper.client.calls == 3
+        stats = get_metrics().llm_stats("test-model")
+        assert (stats.calls, stats.attempts, stats.retries, stats.rate_limited, stats.errors) == (1, 3, 2, 1, 0)
+        assert stats.prompt_tokens == 25
+
+    @pytest.mark.asyncio
+    async def test_non_retryable_errors_and_exhausted_retries_are_raised(self, make_wrapper):
+        wrapper = make_wrapper([ValueError("bad request")])
+        with pytest.raises(ValueError):
+            await wrapper.ask([{"role": "user", "content": "hi"}])
+        assert wrapper.client.calls == 1
+
+        wrapper = make_wrapper([status_error(500)] * 4)
+        with pytest.raises(openai.InternalServerError):
+            await wrapper.ask([{"role": "user", "content": "hi"}])
+        assert wrapper.client.calls == 4
+        assert get_metrics().llm_stats("test-model").errors == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_requests_are_hedged(self, make_wrapper):
+        wrapper = make_wrapper([1.0, 0.01], hedge=HedgePolicy(after=0.05))
+        started = time.monotonic()
+        result = await wrapper.ask([{"role": "user", "content": "hi"}])
+        assert time.monotonic() - started < 0.5
+        assert result["answer"] == "after 0.01"
+        stats = get_metrics().llm_stats("test-model")
+        assert (stats.hedges, stats.hedge_wins) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_shared_client_per_endpoint(self):
+        client = get_shared_client("key", "http://llm.test/v1")
+        assert get_shared_client("key", "http://llm.test/v1") is client
+        assert get_shared_client("key", "http://other.test/v1") is not client
+        assert client.max_retries == 0
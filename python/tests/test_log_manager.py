@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test suite for indexed, streaming log archiving and removal.
+"""
+
+import gzip
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.log_manager import (
+    LogIndex,
+    archive_logs_by_date_range,
+    find_earliest_log_timestamp,
+    remove_logs_by_date_range,
+)
+
+START = datetime(2025, 3, 1, 10, 0, 0)
+
+
+def make_log(path, minutes=120, lines_per_minute=5):
+    """Log with one record per 12 seconds; every third record has a continuation line."""
+    lines = []
+    for minute in range(minutes):
+        for i in range(lines_per_minute):
+            ts = START + timedelta(minutes=minute, seconds=i * 12)
+            lines.append(f"{ts:%Y-%m-%d %H:%M:%S} [INFO] chat_llm: record {minute}/{i}\n")
+            if i % 3 == 0:
+                lines.append(f"    continuation of {minute}/{i}\n")
+    path.write_text("".join(lines))
+    return lines
+
+
+def in_range(lines, start, end):
+    """Reference selection: records in [start, end) with their continuation lines."""
+    selected, inside = [], False
+    for line in lines:
+        if line[:4].isdigit():
+            ts = datetime.strptime(line[:19], "%Y-%m-%d %H:%M:%S")
+            inside = start <= ts < end
+        if inside:
+            selected.append(line)
+    return selected
+
+
+@pytest.fixture
+def logs_dir(tmp_path):
+    directory = tmp_path / "logs"
+    directory.mkdir()
+    return directory
+
+
+class TestLogIndex:
+    """Sparse index lookups and incremental refresh."""
+
+    def test_offsets_match_a_full_scan(self, logs_dir):
+        log_file = logs_dir / "chat_llm.log"
+        lines = make_log(log_file)
+        index = LogIndex.load(log_file, stride=1024)
+        assert 1 < len(index.entries) < len(lines) / 10
+        for minutes in (0, 7, 59, 119):
+            target = START + timedelta(minutes=minutes, seconds=5)
+            expected = next(i for i, line in enumerate(lines) if line[:4].isdigit() and line[:19] >= f"{target:%Y-%m-%d %H:%M:%S}")
+            assert index.offset_of(f"{target:%Y-%m-%d %H:%M:%S}".encode()) == len("".join(lines[:expected]).encode())
+        assert index.offset_of(b"2030-01-01 00:00:00") == log_file.stat().st_size
+
+    def test_refresh_indexes_appended_lines_and_rebuilds_after_rotation(self, logs_dir):
+        log_file = logs_dir / "chat_llm.log"
+        make_log(log_file, minutes=10)
+        index = LogIndex.load(log_file, stride=512)
+        index.save()
+        entries = list(index.entries)
+
+        with open(log_file, "a") as f:
+            f.write("".join(f"2025-03-02 00:00:{s:02d} [INFO] x: appended\n" for s in range(60)))
+        index = LogIndex.load(log_file, stride=512)
+        assert index.entries[:len(entries)] == entries
+        assert index.entries[-1][1].startswith(b"2025-03-02")
+
+        log_file.write_text("2025-04-01 00:00:00 [INFO] x: rotated\n")
+        index = LogIndex.load(log_file, stride=512)
+        assert index.entries == [(0, b"2025-04-01 00:00:00")]
+
+
+class TestArchive:
+    """Archiving and removal by date range."""
+
+    def test_archive_is_compressed_and_matches_the_range(self, logs_dir):
+        lines = make_log(logs_dir / "chat_llm.log")
+        start, end = START + timedelta(minutes=30), START + timedelta(minutes=45, seconds=30)
+        archive_dir = Path(archive_logs_by_date_range(
+            f"{start:%Y-%m-%d}", f"{start:%H:%M:%S}", f"{end:%Y-%m-%d}", f"{end:%H:%M:%S}",
+            logs_dir=str(logs_dir), comment="unit test",
+        ))
+        assert archive_dir.name.endswith("_unit_test")
+        with gzip.open(archive_dir / "chat_llm.log.gz", "rt") as f:
+            assert f.read() == "".join(in_range(lines, start, end))
+        assert (logs_dir / "chat_llm.log").read_text() == "".join(lines)
+
+    def test_archive_and_remove_keeps_the_rest_in_place(self, logs_dir):
+        log_file = logs_dir / "chat_llm.log"
+        lines = make_log(log_file)
+        inode = log_file.stat().st_ino
+        start, end = START + timedelta(minutes=10), START + timedelta(minutes=20)
+        archive_dir = Path(archive_logs_by_date_range(
+            f"{start:%Y-%m-%d}", f"{start:%H:%M:%S}", f"{end:%Y-%m-%d}", f"{end:%H:%M:%S}",
+            logs_dir=str(logs_dir), remove_records=True, compression="none", index_stride=2048,
+        ))
+        archived = in_range(lines, start, end)
+        assert (archive_dir / "chat_llm.log").read_text() == "".join(archived)
+        assert log_file.read_text() == "".join(line for line in lines if line not in archived)
+        assert log_file.stat().st_ino == inode
+
+        # The saved index was updated for the shortened file
+        index = LogIndex.load(log_file, stride=2048)
+        assert index.offset_of(f"{end:%Y-%m-%d %H:%M:%S}".encode()) == len("".join(in_range(lines, START, start)).encode())
+
+    def test_remove_only_and_earliest_timestamp(self, logs_dir):
+        lines = make_log(logs_dir / "chat_llm.log", minutes=30)
+        make_log(logs_dir / "flow.log", minutes=5)
+        assert find_earliest_log_timestamp(str(logs_dir)) == START
+
+        end = START + timedelta(minutes=10)
+        remove_logs_by_date_range("2025-03-01", "00:00:00", f"{end:%Y-%m-%d}", f"{end:%H:%M:%S}", logs_dir=str(logs_dir))
+        assert (logs_dir / "chat_llm.log").read_text() == "".join(in_range(lines, end, START + timedelta(days=1)))
+        assert (logs_dir / "flow.log").read_text() == ""
+        assert find_earliest_log_timestamp(str(logs_dir)) == end
+
+    def test_invalid_range(self, logs_dir):
+        with pytest.raises(ValueError):
+            remove_logs_by_date_range("2025-03-02", "00:00:00", "2025-03-01", "00:00:00", logs_dir=str(logs_dir))
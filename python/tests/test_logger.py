@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test suite for the queue-based Logger: off-thread formatting, env levels and payload caps.
+"""
+
+import logging
+import sys
+import threading
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.logger import Logger, flush_logs
+
+
+class Recorder:
+    """Object whose str() records the thread it was formatted on."""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "recorded"
+
+
+def make_logger(tmp_path, name, **kwargs):
+    return Logger(name, log_file_path=str(tmp_path / f"{name}.log"), **kwargs)
+
+
+class TestQueueLogging:
+    """Records go through the shared queue to the listener thread."""
+
+    def test_args_are_rendered_at_call_time(self, tmp_path):
+        logger = make_logger(tmp_path, "test_logger_thread")
+        logger.get_logger().propagate = False
+        value = Recorder()
+        plan = {"step": 1}
+        logger.info("value=%s plan=%s", value, plan)
+        plan["step"] = 2
+        flush_logs()
+        assert value.threads == [threading.current_thread()]
+        assert "value=recorded plan={'step': 1}" in (tmp_path / "test_logger_thread.log").read_text()
+
+    def test_exceptions_are_written_by_the_listener(self, tmp_path):
+        logger = make_logger(tmp_path, "test_logger_exc")
+        logger.get_logger().propagate = False
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.error("failed", exc_info=True)
+        flush_logs()
+        text = (tmp_path / "test_logger_exc.log").read_text()
+        assert "failed" in text and "ValueError: boom" in text
+
+    def test_disabled_level_is_never_formatted(self, tmp_path):
+        logger = make_logger(tmp_path, "test_logger_disabled", log_level=logging.WARNING)
+        value = Recorder()
+        logger.info("value=%s", value)
+        flush_logs()
+        assert value.threads == []
+
+    def test_env_levels_per_module(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("LOG_LEVELS", "test_logger_quiet=ERROR, other=DEBUG")
+        monkeypatch.setenv("LOG_LEVEL", "WARNING")
+        assert make_logger(tmp_path, "test_logger_quiet").log_level == logging.ERROR
+        assert make_logger(tmp_path, "test_logger_default").log_level == logging.WARNING
+
+    def test_sync_mode(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("LOG_ASYNC", "false")
+        logger = make_logger(tmp_path, "test_logger_sync")
+        logger.warning("written at once")
+        assert "written at once" in (tmp_path / "test_logger_sync.log").read_text()
+
+
+class TestPayloadLogging:
+    """Sampling and size caps of Logger.payload."""
+
+    def test_payload_is_capped_keeping_head_and_tail(self, tmp_path):
+        logger = make_logger(tmp_path, "test_logger_payload")
+        logger.payload("Prompt", "a" * 500 + "b" * 5000 + "c" * 500, max_chars=1000)
+        flush_logs()
+        text = (tmp_path / "test_logger_payload.log").read_text()
+        assert "Prompt (length: 6000):" in text
+        assert "a" * 500 in text and "c" * 500 in text and "b" * 100 not in text
+        assert "[truncated]" in text
+
+    def test_unsampled_payload_is_not_built(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("LOG_PAYLOAD_SAMPLE_RATE", "0")
+        logger = make_logger(tmp_path, "test_logger_sampled")
+        built = []
+        logger.payload("Tool Args", lambda: built.append(1) or "{}")
+        flush_logs()
+        assert built == []
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test suite for the on-disk LLM response cache and its record/replay modes.
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from openai.types.chat import ChatCompletion
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llm.chat_llm import AsyncChatClientWrapper
+from llm.response_cache import ResponseCache, ResponseCacheMiss
+from utils.metrics import get_metrics
+
+MESSAGES = [{"role": "system", "content": "You describe files."}, {"role": "user", "content": "Describe main.py"}]
+
+
+def chat_completion(content):
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "test-model",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15},
+    })
+
+
+class CountingClient:
+    """Answers every request with a numbered completion."""
+
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        return chat_completion(f"answer {self.calls}")
+
+
+@pytest.fixture
+def make_wrapper(monkeypatch, tmp_path):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_MODEL", "test-model")
+    monkeypatch.setenv("OPENAI_BASE_URL", "http://llm.test/v1")
+    get_metrics().reset()
+
+    def make(mode):
+        wrapper = AsyncChatClientWrapper(client=CountingClient())
+        wrapper.response_cache = ResponseCache(directory=tmp_path / "cache", mode=mode)
+        return wrapper
+
+    yield make
+    get_metrics().reset()
+
+
+def test_key_is_canonical():
+    first = {"model": "m", "temperature": 0, "messages": [{"role": "user", "content": "x"}]}
+    second = {"messages": [{"content": "x", "role": "user"}], "temperature": 0, "model": "m"}
+    assert ResponseCache.make_key(first) == ResponseCache.make_key(second)
+    assert ResponseCache.make_key(first) != ResponseCache.make_key({**first, "temperature": 0.5})
+    with pytest.raises(ValueError):
+        ResponseCache(mode="sometimes")
+
+
+@pytest.mark.asyncio
+async def test_cache_mode_serves_deterministic_requests(make_wrapper):
+    wrapper = make_wrapper("cache")
+    first = await wrapper.ask(MESSAGES)
+    second = await wrapper.ask(MESSAGES)
+    assert first["answer"] == second["answer"] == "answer 1"
+    assert second["usage"]["total_tokens"] == 15
+    assert wrapper.client.calls == 1
+    assert get_metrics().llm_stats("test-model").cache_hits == 1
+
+    await wrapper.ask(MESSAGES, temperature=0.7)
+    await wrapper.ask(MESSAGES, temperature=0.7)
+    assert wrapper.client.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_offline(make_wrapper):
+    recorder = make_wrapper("record")
+    recorded = await recorder.ask(MESSAGES)
+    await recorder.ask(MESSAGES)
+    assert recorder.client.calls == 2
+
+    replayer = make_wrapper("replay")
+    replayed = await replayer.ask(MESSAGES)
+    assert replayer.client.calls == 0
+    assert replayed["answer"] == "answer 2" and replayed["type"] == recorded["type"] == "answer"
+
+    with pytest.raises(ResponseCacheMiss):
+        await replayer.ask(MESSAGES + [{"role": "user", "content": "And utils.py?"}])
+    assert replayer.client.calls == 0
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test suite for the cached, single-flight search service and its backends.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.http_client import get_http_client
+from tools.search_backend import HttpSearchBackend, SearchBackend, SearchService
+from tools.web_search_tool import WebSearchTool
+
+
+class FakeBackend(SearchBackend):
+    """Backend that answers after a short delay and counts its calls."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    async def search(self, query, max_results, region):
+        self.calls.append((query, max_results, region))
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise ConnectionError("search engine unavailable")
+        return [
+            {"title": f"{query} {i}", "url": f"https://github.com/r/{i}", "snippet": "", "rank": i + 1}
+            for i in range(max_results)
+        ]
+
+
+@pytest_asyncio.fixture
+async def search_server():
+    async def search(request):
+        count = int(request.query["max_results"])
+        return web.json_response({"results": [
+            {"title": f"{request.query['q']} ({request.query['region']})", "url": f"https://example.com/{i}"}
+            for i in range(count + 5)
+        ]})
+
+    app = web.Application()
+    app.router.add_get("/search", search)
+    server = TestServer(app)
+    await server.start_server()
+    yield server
+    await server.close()
+
+
+class TestSearchService:
+    """Caching and deduplication in SearchService."""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_searches_run_once(self):
+        backend = FakeBackend()
+        service = SearchService(backend)
+        results = await asyncio.gather(*(service.search("python asyncio", 3) for _ in range(5)))
+        assert len(backend.calls) == 1
+        assert service.coalesced == 4
+        assert all(len(r) == 3 for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cache_key_normalizes_query_but_not_region_or_count(self):
+        backend = FakeBackend()
+        service = SearchService(backend)
+        await service.search("Python  Docs", 3)
+        await service.search(" python docs ", 3)
+        assert len(backend.calls) == 1 and service.hits == 1
+        await service.search("python docs", 3, region="de-de")
+        await service.search("python docs", 5)
+        assert len(backend.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_expired_and_failed_searches_are_not_reused(self):
+        backend = FakeBackend(fail=True)
+        service = SearchService(backend, ttl=60)
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await service.search("q", 3)
+        assert len(backend.calls) == 2
+
+        backend = FakeBackend()
+        service = SearchService(backend, ttl=0)
+        await service.search("q", 3)
+        await service.search("q", 3)
+        assert len(backend.calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_results_are_copies(self):
+        service = SearchService(FakeBackend())
+        first = await service.search("q", 2)
+        first[0]["title"] = "changed"
+        assert (await service.search("q", 2))[0]["title"] == "q 0"
+
+    @pytest.mark.asyncio
+    async def test_http_backend(self, search_server):
+        backend = HttpSearchBackend(str(search_server.make_url("/search")))
+        results = await backend.search("fastapi", 2, "uk-en")
+        await get_http_client().close()
+        assert [r["title"] for r in results] == ["fastapi (uk-en)"] * 2
+        assert [r["rank"] for r in results] == [1, 2]
+
+
+class TestWebSearchToolService:
+    """WebSearchTool on top of an injected service."""
+
+    @pytest.mark.asyncio
+    async def test_tool_filters_after_shared_search(self):
+        backend = FakeBackend()
+        tool = WebSearchTool(service=SearchService(backend))
+        result = await tool.execute(query="httpx", search_type="github", max_results=4)
+        assert result["status"] == "success" and result["total_results"] == 4
+        assert backend.calls == [("httpx site:github.com", 4, "us-en")]
+
+    @pytest.mark.asyncio
+    async def test_tool_reports_backend_errors(self):
+        tool = WebSearchTool(service=SearchService(FakeBackend(fail=True)))
+        result = await tool.execute(query="httpx")
+        assert result["total_results"] == 0
+        assert "unavailable" in result["warning"]
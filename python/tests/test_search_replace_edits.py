@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Test suite for multi-edit search_replace calls and atomic multi-file writes.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools import ToolContext
+from tools import edit_coordinator
+from tools.edit_coordinator import write_files
+from agents.planact_flow import PlanActFlow
+from tools.search_replace_tool import SearchReplaceTool
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\ny = 2\nz = 3\n")
+    (tmp_path / "b.py").write_text("name = 'old'\nprint(name)\n")
+    return tmp_path
+
+
+class TestMultiEdit:
+    """edits mode of search_replace."""
+
+    @pytest.mark.asyncio
+    async def test_edits_in_one_file_match_original_content(self, workspace):
+        context = ToolContext(workspace_dir=str(workspace))
+        result = await SearchReplaceTool().execute(
+            file_path="a.py",
+            edits=[
+                {"old_string": "z = 3", "new_string": "z = 30"},
+                {"old_string": "x = 1", "new_string": "y = 2"},
+                # Matched against the original file, so this does not see the edit above
+                {"old_string": "y = 2", "new_string": "y = 20"},
+            ],
+            context=context,
+        )
+        assert result["success"] is True, result
+        assert result["replacements_count"] == 3
+        assert (workspace / "a.py").read_text() == "y = 2\ny = 20\nz = 30\n"
+        assert "--- a/a.py" in result["diff"]
+        assert "+z = 30" in result["diff"]
+
+    @pytest.mark.asyncio
+    async def test_edits_across_files(self, workspace):
+        context = ToolContext(workspace_dir=str(workspace))
+        result = await SearchReplaceTool().execute(
+            edits=[
+                {"file_path": "a.py", "old_string": "x", "new_string": "w"},
+                {"file_path": "b.py", "old_string": "name", "new_string": "label", "replace_all": True},
+            ],
+            context=context,
+        )
+        assert result["success"] is True, result
+        assert [summary["replacements_count"] for summary in result["files"]] == [1, 2]
+        assert (workspace / "b.py").read_text() == "label = 'old'\nprint(label)\n"
+        assert "+++ b/b.py" in result["diff"]
+
+    @pytest.mark.asyncio
+    async def test_failed_edit_writes_nothing(self, workspace):
+        context = ToolContext(workspace_dir=str(workspace))
+        before = {name: (workspace / name).read_text() for name in ("a.py", "b.py")}
+        result = await SearchReplaceTool().execute(
+            edits=[
+                {"file_path": "a.py", "old_string": "x = 1", "new_string": "x = 10"},
+                {"file_path": "b.py", "old_string": "missing", "new_string": "found"},
+            ],
+            context=context,
+        )
+        assert result["success"] is False
+        assert result["edit_index"] == 1
+        assert {name: (workspace / name).read_text() for name in before} == before
+
+    @pytest.mark.asyncio
+    async def test_overlapping_edits_are_rejected(self, workspace):
+        context = ToolContext(workspace_dir=str(workspace))
+        result = await SearchReplaceTool().execute(
+            file_path="a.py",
+            edits=[
+                {"old_string": "x = 1\ny", "new_string": "x = 1\nv"},
+                {"old_string": "y = 2", "new_string": "y = 20"},
+            ],
+            context=context,
+        )
+        assert result["success"] is False
+        assert "overlaps" in result["error"]
+        assert (workspace / "a.py").read_text() == "x = 1\ny = 2\nz = 3\n"
+
+
+class TestEditsSchemaAndLint:
+    """Tool definition and the files linted after an edits call."""
+
+    def test_file_path_is_required(self):
+        parameters = SearchReplaceTool().get_tool_definition()["function"]["parameters"]
+        assert parameters["required"] == ["file_path"]
+
+    def test_auto_lint_covers_every_edited_file(self):
+        args = {"file_path": "a.py", "edits": [
+            {"old_string": "x", "new_string": "y"},
+            {"file_path": "pkg/b.py", "old_string": "old", "new_string": "new"},
+            {"file_path": "a.py", "old_string": "z", "new_string": "w"},
+        ]}
+        call = {"function": {"name": "search_replace", "arguments": json.dumps(args)}}
+        memory = SimpleNamespace(get_messages=lambda: [{"role": "assistant", "tool_calls": [call]}])
+        agent = object.__new__(PlanActFlow)
+        assert agent._get_last_search_replace_file_paths(memory) == ["a.py", "pkg/b.py"]
+
+
+class TestWriteFiles:
+    """All-or-nothing writes on disk."""
+
+    def test_failure_leaves_files_untouched(self, tmp_path, monkeypatch):
+        first = tmp_path / "first.txt"
+        second = tmp_path / "second.txt"
+        first.write_text("one")
+        second.write_text("two")
+        os.chmod(first, 0o755)
+
+        real_stage = edit_coordinator._stage_disk
+
+        def failing_stage(path, content):
+            if path == str(second):
+                raise OSError("disk full")
+            return real_stage(path, content)
+
+        monkeypatch.setattr(edit_coordinator, "_stage_disk", failing_stage)
+        with pytest.raises(OSError):
+            write_files({str(first): "ONE", str(second): "TWO"})
+        assert first.read_text() == "one"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["first.txt", "second.txt"]
+
+        monkeypatch.setattr(edit_coordinator, "_stage_disk", real_stage)
+        write_files({str(first): "ONE", str(second): "TWO"})
+        assert (first.read_text(), second.read_text()) == ("ONE", "TWO")
+        assert os.stat(first).st_mode & 0o777 == 0o755
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test suite for persistent shell sessions used by execute_command.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools import ToolContext
+from tools.command_tool import CommandTool
+from tools.shell_session import ShellSession, ShellSessionPool
+
+pytestmark = pytest.mark.skipif(not ShellSessionPool.available(), reason="requires bash")
+
+
+class TestShellSession:
+    """Command framing and shell state across commands."""
+
+    @pytest.mark.asyncio
+    async def test_state_carries_over(self, tmp_path):
+        (tmp_path / "sub").mkdir()
+        session = ShellSession(str(tmp_path))
+        try:
+            await session.run("cd sub && export GREETING=hello", timeout=5)
+            result = await session.run("pwd; echo $GREETING", timeout=5)
+            assert result.returncode == 0
+            assert result.stdout.text() == f"{tmp_path / 'sub'}\nhello\n"
+        finally:
+            await session.close()
+
+    @pytest.mark.asyncio
+    async def test_exit_status_and_stderr(self, tmp_path):
+        session = ShellSession(str(tmp_path))
+        try:
+            result = await session.run("printf 'no newline'; echo oops >&2; false", timeout=5)
+            assert result.returncode == 1
+            assert result.stdout.text() == "no newline"
+            assert result.stderr.text() == "oops\n"
+        finally:
+            await session.close()
+
+    @pytest.mark.asyncio
+    async def test_exit_and_timeout_restart_the_shell(self, tmp_path):
+        session = ShellSession(str(tmp_path))
+        try:
+            result = await session.run("exit 3", timeout=5)
+            assert result.returncode == 3
+            assert not session.alive
+
+            await session.run("true", timeout=5)
+            killed = session.process
+            result = await session.run("sleep 10", timeout=0.2)
+            assert result.timed_out
+            # The killed shell is reaped, not left as a zombie
+            assert killed.returncode is not None and session.process is None
+            assert (await session.run("echo back", timeout=5)).stdout.text() == "back\n"
+        finally:
+            await session.close()
+
+    @pytest.mark.asyncio
+    async def test_commands_do_not_read_session_input(self, tmp_path):
+        session = ShellSession(str(tmp_path))
+        try:
+            result = await session.run("cat", timeout=5)
+            assert result.returncode == 0
+            assert (await session.run("echo ok", timeout=5)).stdout.text() == "ok\n"
+        finally:
+            await session.close()
+
+
+class TestCommandToolSessions:
+    """execute_command with COMMAND_SHELL_SESSIONS enabled."""
+
+    @pytest.mark.asyncio
+    async def test_sessions_per_agent_and_reset(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("COMMAND_SHELL_SESSIONS", "true")
+        tool = CommandTool()
+        first = ToolContext(workspace_dir=str(tmp_path), session_id="first")
+        second = ToolContext(workspace_dir=str(tmp_path), session_id="second")
+        try:
+            await tool.execute("export NAME=first", context=first)
+            assert (await tool.execute("echo $NAME", context=first))["stdout"] == "first\n"
+            assert (await tool.execute("echo $NAME", context=second))["stdout"] == "\n"
+
+            result = await tool.execute("echo $NAME", reset_session=True, context=first)
+            assert result["stdout"] == "\n"
+        finally:
+            await tool.close()
+        assert len(tool.session_pool) == 0
+
+    @pytest.mark.asyncio
+    async def test_pool_evicts_idle_sessions(self, tmp_path):
+        pool = ShellSessionPool(max_sessions=2)
+        try:
+            sessions = [await pool.get(name, str(tmp_path)) for name in ("a", "b", "c")]
+            for session in sessions:
+                await session.run("true", timeout=5)
+            assert len(pool) == 2
+            assert await pool.get("c", str(tmp_path)) is sessions[2]
+            assert pool.was_evicted("a", str(tmp_path))
+            assert not pool.was_evicted("a", str(tmp_path))
+            assert not pool.was_evicted("b", str(tmp_path))
+        finally:
+            await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_evicted_agent_is_told_its_shell_was_reset(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("COMMAND_SHELL_SESSIONS", "true")
+        monkeypatch.setenv("COMMAND_SHELL_POOL_SIZE", "1")
+        tool = CommandTool()
+        first = ToolContext(workspace_dir=str(tmp_path), session_id="first")
+        second = ToolContext(workspace_dir=str(tmp_path), session_id="second")
+        try:
+            await tool.execute("export FOO=1", context=first)
+            assert "session_reset" not in await tool.execute("true", context=second)
+
+            result = await tool.execute("echo $FOO", context=first)
+            assert result["stdout"] == "\n"
+            assert result["session_reset"] is True and "session_note" in result
+            assert "session_reset" not in await tool.execute("true", context=first)
+        finally:
+            await tool.close()
+
+    def test_pool_covers_parallel_agents(self, monkeypatch):
+        monkeypatch.delenv("COMMAND_SHELL_POOL_SIZE", raising=False)
+        monkeypatch.setenv("PARALLEL_MAX_CONCURRENCY", "8")
+        assert CommandTool().session_pool.max_sessions == 9
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Test suite for SubtaskScheduler and the scheduling behaviour of ParallelTaskExecutorTool.
+Sub-agents are replaced by a fake flow, so no LLM endpoint is required.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import MessageEvent, ReportEvent
+from tools.parallel_task_executor import ParallelTaskExecutorTool
+from tools.subtask_scheduler import (
+    SubtaskBudget,
+    SubtaskBudgetExceeded,
+    SubtaskScheduler,
+    TokenBudgetClient,
+)
+
+
+class FakeFlow:
+    """Stand-in for ReActFlow: 'fail' tasks raise, 'slow' tasks take long, others report."""
+
+    running = 0
+    max_running = 0
+    started = []
+
+    def __init__(self, workspace_dir, is_parent=True):
+        self.llm_client = None
+        self.MAX_ITERATION = 30
+
+    async def process(self, message, session_id, parent_information=None):
+        FakeFlow.running += 1
+        FakeFlow.max_running = max(FakeFlow.max_running, FakeFlow.running)
+        FakeFlow.started.append(message)
+        try:
+            yield MessageEvent(message=f"working on {message}")
+            if message.startswith("fail"):
+                raise RuntimeError(f"{message} broke")
+            for _ in range(20 if message.startswith("slow") else 1):
+                await asyncio.sleep(0.02)
+                yield MessageEvent(message=f"progress {message}")
+            yield ReportEvent(message=f"{message} done")
+        finally:
+            FakeFlow.running -= 1
+
+
+@pytest.fixture
+def fake_flow(monkeypatch):
+    monkeypatch.setattr("agents.react_flow.ReActFlow", FakeFlow)
+    FakeFlow.running = 0
+    FakeFlow.max_running = 0
+    FakeFlow.started = []
+    return FakeFlow
+
+
+class TestSubtaskScheduler:
+    """Concurrency limits and queue ordering."""
+
+    @pytest.mark.asyncio
+    async def test_global_limit(self):
+        scheduler = SubtaskScheduler(max_concurrency=2)
+        running = 0
+        max_running = 0
+
+        async def job():
+            nonlocal running, max_running
+            await scheduler.acquire("p")
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            scheduler.release("p")
+
+        await asyncio.gather(*(job() for _ in range(6)))
+        assert max_running == 2
+        assert scheduler.running == 0
+
+    @pytest.mark.asyncio
+    async def test_provider_limit_does_not_block_other_providers(self):
+        scheduler = SubtaskScheduler(max_concurrency=3, provider_limits={"slow": 1})
+        await scheduler.acquire("slow")
+        assert not scheduler.has_capacity("slow")
+
+        blocked = asyncio.create_task(scheduler.acquire("slow"))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 1
+
+        # Another provider is admitted even though a "slow" waiter is queued
+        await asyncio.wait_for(scheduler.acquire("fast"), timeout=1)
+        assert not blocked.done()
+
+        scheduler.release("slow")
+        await asyncio.wait_for(blocked, timeout=1)
+        assert scheduler.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        scheduler = SubtaskScheduler(max_concurrency=1, policy="priority")
+        await scheduler.acquire("p")
+        order = []
+
+        async def job(name, priority):
+            await scheduler.acquire("p", priority)
+            order.append(name)
+            scheduler.release("p")
+
+        jobs = [asyncio.create_task(job("low", 0)), asyncio.create_task(job("high", 5)), asyncio.create_task(job("mid", 1))]
+        await asyncio.sleep(0)
+        scheduler.release("p")
+        await asyncio.gather(*jobs)
+        assert order == ["high", "mid", "low"]
+
+    @pytest.mark.asyncio
+    async def test_fifo_ignores_priority(self):
+        scheduler = SubtaskScheduler(max_concurrency=1, policy="fifo")
+        await scheduler.acquire("p")
+        order = []
+
+        async def job(name, priority):
+            await scheduler.acquire("p", priority)
+            order.append(name)
+            scheduler.release("p")
+
+        jobs = [asyncio.create_task(job("first", 0)), asyncio.create_task(job("second", 9))]
+        await asyncio.sleep(0)
+        scheduler.release("p")
+        await asyncio.gather(*jobs)
+        assert order == ["first", "second"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        scheduler = SubtaskScheduler(max_concurrency=1)
+        await scheduler.acquire("p")
+        waiter = asyncio.create_task(scheduler.acquire("p"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queue_depth == 0
+        scheduler.release("p")
+        assert scheduler.running == 0
+
+    @pytest.mark.asyncio
+    async def test_token_budget(self):
+        class Client:
+            async def ask(self, **kwargs):
+                return {"type": "answer", "usage": {"total_tokens": 60}}
+
+        client = TokenBudgetClient(Client(), max_tokens=100)
+        await client.ask(messages=[])
+        with pytest.raises(SubtaskBudgetExceeded):
+            await client.ask(messages=[])
+
+
+class TestParallelTaskScheduling:
+    """ParallelTaskExecutorTool with limits, budgets and fail-fast cancellation."""
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_and_queue_events(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=2)
+        tool.budget = SubtaskBudget()
+
+        events = [event async for event in tool.execute_streaming(tasks=["a", "b", "c", "d"])]
+
+        assert fake_flow.max_running == 2
+        messages = [event.message for event in events]
+        assert any("⏳ Queued" in message for message in messages)
+        assert any("▶️ Started after waiting" in message for message in messages)
+        assert "Parallel Execution Results" in messages[-1]
+
+    @pytest.mark.asyncio
+    async def test_priorities(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=1)
+        tool.budget = SubtaskBudget()
+
+        result = await tool.execute(tasks=["a", "b", "c"], priorities=[0, 1, 2])
+        assert result["success"] is True
+        assert fake_flow.started == ["c", "b", "a"]
+
+    @pytest.mark.asyncio
+    async def test_priorities_apply_to_the_first_slots(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=2)
+        tool.budget = SubtaskBudget()
+
+        tasks = ["t0", "t1", "t2", "t3", "t4", "t5"]
+        result = await tool.execute(tasks=tasks, priorities=[0, 0, 0, 0, 10, 9])
+        assert [task["task"] for task in result["tasks"]] == tasks
+        assert fake_flow.started[:2] == ["t4", "t5"]
+
+    @pytest.mark.asyncio
+    async def test_fifo_policy_ignores_priorities(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=1, policy="fifo")
+        tool.budget = SubtaskBudget()
+
+        await tool.execute(tasks=["a", "b", "c"], priorities=[0, 1, 2])
+        assert fake_flow.started == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_fail_fast_cancels_siblings(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=2)
+        tool.budget = SubtaskBudget()
+
+        result = await tool.execute(tasks=["fail-1", "slow-2", "slow-3"], fail_fast=True)
+        statuses = [task["status"] for task in result["tasks"]]
+        assert statuses == ["failed", "cancelled", "cancelled"]
+        assert "slow-3" not in fake_flow.started
+
+    @pytest.mark.asyncio
+    async def test_time_budget(self, fake_flow):
+        tool = ParallelTaskExecutorTool()
+        tool.scheduler = SubtaskScheduler(max_concurrency=2)
+        tool.budget = SubtaskBudget(timeout=0.1)
+
+        result = await tool.execute(tasks=["slow-1", "fast-2"])
+        assert result["tasks"][0]["status"] == "failed"
+        assert "time budget" in result["tasks"][0]["result"]
+        assert result["tasks"][1]["status"] == "completed"
+        assert fake_flow.running == 0
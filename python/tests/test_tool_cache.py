@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test suite for the tool result cache and its invalidation by write tools.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ToolCallEvent, ToolResultEvent
+from tools import ToolContext, execute_tool
+from tools.command_tool import is_read_only_command
+from tools.result_cache import ToolResultCache, get_result_cache
+
+
+async def run_tool(tool_name, tool_args, context=None):
+    async for event in execute_tool(ToolCallEvent(tool_name=tool_name, tool_args=tool_args), context):
+        if isinstance(event, ToolResultEvent):
+            return event
+    return None
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    cache = get_result_cache()
+    cache.clear()
+    cache.enabled = True
+    yield cache
+    cache.clear()
+
+
+class TestToolResultCache:
+    """LRU, TTL and generation handling."""
+
+    def test_lru_eviction(self):
+        cache = ToolResultCache(max_entries=2)
+        for name in ("a", "b", "c"):
+            cache.put(name, {"value": name})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"value": "c"}
+
+    def test_ttl_expiry(self, monkeypatch):
+        cache = ToolResultCache()
+        now = [100.0]
+        monkeypatch.setattr("tools.result_cache.time.monotonic", lambda: now[0])
+        cache.put("key", {"value": 1}, ttl=10)
+        assert cache.get("key") == {"value": 1}
+        now[0] += 11
+        assert cache.get("key") is None
+
+    def test_result_from_before_a_write_is_dropped(self):
+        cache = ToolResultCache()
+        generation = cache.generation
+        cache.invalidate("write")
+        cache.put("key", {"value": 1}, generation=generation)
+        assert cache.get("key") is None
+
+    def test_hits_are_copies(self):
+        cache = ToolResultCache()
+        cache.put("key", {"items": [1]})
+        cache.get("key")["items"].append(2)
+        assert cache.get("key") == {"items": [1]}
+
+
+class TestReadOnlyCommands:
+    """Classification of shell commands."""
+
+    @pytest.mark.parametrize("command", ["ls -la", "cat a.py | grep foo", "git status && git diff", "find . -name '*.py'"])
+    def test_read_only(self, command):
+        assert is_read_only_command(command)
+
+    @pytest.mark.parametrize("command", [
+        "rm a.py", "cat a > b", "ls; touch x", "find . -delete", "git commit -m x", "echo $(rm x)",
+        "uniq in.txt out.txt", "find . -fprint0 out", "find . -fprintf out '%p'", "find . -fls out",
+        "find . -execdir rm {} +", "git diff --output=patch.diff", "git log --output out.txt",
+        "rg --pre ./run.sh foo", "rg --pre=./run.sh foo",
+    ])
+    def test_mutating(self, command):
+        assert not is_read_only_command(command)
+
+
+class TestExecuteToolCache:
+    """Cache hits in execute_tool and invalidation by write tools."""
+
+    @pytest.mark.asyncio
+    async def test_workspace_structure_invalidated_by_write(self, tmp_path):
+        context = ToolContext(workspace_dir=str(tmp_path))
+        (tmp_path / "module.py").write_text("value = 1\n")
+
+        first = await run_tool("get_workspace_structure", {}, context)
+        second = await run_tool("get_workspace_structure", {}, context)
+        assert not first.cached
+        assert second.cached is True
+        assert second.message.endswith("(cached)")
+        assert second.result == first.result
+
+        await run_tool("execute_command", {"command": "touch created.py"}, context)
+        third = await run_tool("get_workspace_structure", {}, context)
+        assert not third.cached
+        assert "created.py" in third.result["structure"]
+
+    @pytest.mark.asyncio
+    async def test_lint_keyed_by_file_content(self, tmp_path):
+        context = ToolContext(workspace_dir=str(tmp_path))
+        target = tmp_path / "module.py"
+        target.write_text("value = 1\n")
+        args = {"file_path": str(target), "check_style": False}
+
+        assert not (await run_tool("lint_code", args, context)).cached
+        assert (await run_tool("lint_code", args, context)).cached
+
+        await run_tool(
+            "search_replace",
+            {"file_path": str(target), "old_string": "value = 1", "new_string": "value = (1"},
+            context,
+        )
+        result = await run_tool("lint_code", args, context)
+        assert not result.cached
+        assert result.result["error_count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self, tmp_path):
+        args = {"file_path": str(tmp_path / "missing.py")}
+        await run_tool("lint_code", args)
+        assert not (await run_tool("lint_code", args)).cached
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache(self, tmp_path, fresh_cache):
+        fresh_cache.enabled = False
+        context = ToolContext(workspace_dir=str(tmp_path))
+        await run_tool("execute_command", {"command": "ls"}, context)
+        assert not (await run_tool("execute_command", {"command": "ls"}, context)).cached
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-agent ToolContext and the read-only tool registry.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ToolCallEvent, ToolResultEvent
+from tools import ToolContext, execute_tool, get_tool, get_tool_class
+from tools.tool_factory import _tool_registry
+
+
+async def run_tool(tool_name, tool_args, context):
+    async for event in execute_tool(ToolCallEvent(tool_name=tool_name, tool_args=tool_args), context):
+        if isinstance(event, ToolResultEvent):
+            return event.result
+    return None
+
+
+class TestToolRegistry:
+    """Registered classes and shared instances."""
+
+    def test_registry_is_read_only(self):
+        with pytest.raises(TypeError):
+            _tool_registry["fake"] = object()
+
+    def test_class_registry_matches_instances(self):
+        assert isinstance(get_tool("execute_command"), get_tool_class("execute_command"))
+
+
+class TestToolContext:
+    """Concurrent calls for different workspaces on shared tool instances."""
+
+    @pytest.mark.asyncio
+    async def test_workspaces_do_not_leak_between_contexts(self, tmp_path):
+        first = tmp_path / "first"
+        second = tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        (first / "only_in_first.txt").write_text("1")
+        (second / "only_in_second.txt").write_text("2")
+
+        results = await asyncio.gather(
+            run_tool("execute_command", {"command": "ls"}, ToolContext(workspace_dir=str(first))),
+            run_tool("execute_command", {"command": "ls"}, ToolContext(workspace_dir=str(second))),
+        )
+
+        assert "only_in_first.txt" in results[0]["stdout"]
+        assert "only_in_second.txt" not in results[0]["stdout"]
+        assert "only_in_second.txt" in results[1]["stdout"]
+
+    @pytest.mark.asyncio
+    async def test_relative_paths_resolve_against_context_workspace(self, tmp_path):
+        (tmp_path / "module.py").write_text("value = 1\n")
+
+        result = await run_tool(
+            "search_replace",
+            {"file_path": "module.py", "old_string": "value = 1", "new_string": "value = 2"},
+            ToolContext(workspace_dir=str(tmp_path)),
+        )
+
+        assert result["success"] is True
+        assert (tmp_path / "module.py").read_text() == "value = 2\n"
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test suite for per-tool timeouts, concurrency limits and tool metrics.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ToolCallEvent, ToolResultEvent
+from tools import ToolContext, execute_tool, tool_factory
+from tools.base_tool import MCPTool
+from utils.metrics import MetricsRegistry, get_metrics
+
+
+class SleepTool(MCPTool):
+    """Sleeps for `seconds` and tracks how many calls run at once."""
+
+    def __init__(self, timeout: Optional[float] = 1.0, concurrency: Optional[int] = None):
+        self._timeout = timeout
+        self._concurrency = concurrency
+        self.running = 0
+        self.peak = 0
+
+    @property
+    def name(self) -> str:
+        return "sleep_tool"
+
+    @property
+    def default_timeout(self) -> Optional[float]:
+        return self._timeout
+
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return self._concurrency
+
+    def get_tool_definition(self) -> Dict[str, Any]:
+        return {"type": "function", "function": {"name": self.name, "parameters": {}}}
+
+    async def execute(self, seconds: float = 0.0, fail: bool = False, updates: int = 0,
+                      context=None) -> Dict[str, Any]:
+        for index in range(updates):
+            context.report_progress({"message": f"step {index}"})
+            await asyncio.sleep(0)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.running -= 1
+        if fail:
+            return {"success": False, "error": "failed"}
+        return {"success": True, "output": "x" * 100}
+
+
+async def run_tool(tool_args):
+    async for event in execute_tool(ToolCallEvent(tool_name="sleep_tool", tool_args=tool_args)):
+        if isinstance(event, ToolResultEvent):
+            return event
+    return None
+
+
+@pytest.fixture
+def install_tool(monkeypatch):
+    def install(tool):
+        monkeypatch.setitem(tool_factory._tool_instances, "sleep_tool", tool)
+        return tool
+    get_metrics().reset()
+    yield install
+    get_metrics().reset()
+
+
+class TestToolLimits:
+    """Deadlines and concurrency limits enforced by execute_tool."""
+
+    @pytest.mark.asyncio
+    async def test_timeout(self, install_tool):
+        install_tool(SleepTool(timeout=0.05))
+        event = await run_tool({"seconds": 5})
+        assert event.result["timed_out"] is True
+        assert "timed out" in event.message
+        assert get_metrics().tool_stats("sleep_tool").timeouts == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_env_override(self, install_tool, monkeypatch):
+        install_tool(SleepTool(timeout=0.01))
+        monkeypatch.setenv("TOOL_TIMEOUT_SLEEP_TOOL", "0")
+        event = await run_tool({"seconds": 0.05})
+        assert event.result["success"] is True
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, install_tool):
+        tool = install_tool(SleepTool(concurrency=2))
+        await asyncio.gather(*(run_tool({"seconds": 0.02}) for _ in range(6)))
+        assert tool.peak == 2
+
+    @pytest.mark.asyncio
+    async def test_metrics_record_errors_and_payloads(self, install_tool):
+        install_tool(SleepTool())
+        await run_tool({})
+        await run_tool({"fail": True})
+
+        stats = get_metrics().tool_stats("sleep_tool")
+        assert stats.calls == 2
+        assert stats.errors == 1
+        assert stats.result_bytes > 100
+        assert stats.to_dict()["error_rate"] == 0.5
+
+
+class TestProgressEvents:
+    """Intermediate results reported through the tool context."""
+
+    @pytest.mark.asyncio
+    async def test_progress_events_precede_result(self, install_tool):
+        install_tool(SleepTool())
+        events = []
+        async for event in execute_tool(
+            ToolCallEvent(tool_name="sleep_tool", tool_args={"updates": 2}), ToolContext()
+        ):
+            if isinstance(event, ToolResultEvent):
+                events.append(event)
+
+        assert [event.message for event in events[:2]] == ["step 0", "step 1"]
+        assert all(event.progress for event in events[:2])
+        assert not events[-1].progress
+        assert events[-1].result["success"] is True
+
+
+class TestMetricsRegistry:
+    """Histogram and dumps."""
+
+    def test_quantiles_use_bucket_bounds(self):
+        registry = MetricsRegistry()
+        for seconds in (0.001, 0.002, 0.003, 0.2):
+            registry.record_tool_call("tool", seconds)
+        stats = registry.tool_stats("tool")
+        assert stats.quantile(0.5) == 0.01
+        assert stats.quantile(0.95) == 0.25
+
+    def test_dump_appends_jsonl(self, tmp_path):
+        registry = MetricsRegistry()
+        registry.record_tool_call("tool", 0.5, error=True)
+        path = tmp_path / "metrics.jsonl"
+        registry.dump(str(path))
+        registry.dump(str(path))
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["tools"]["tool"]["errors"] == 1
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test suite for the static tool manifest and lazy tool loading.
+Includes an import-time budget for the tools package.
+"""
+
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import build_tool_manifest
+import tools
+from tools import tool_factory
+from tools.base_tool import MCPTool
+
+PYTHON_DIR = Path(__file__).parent.parent
+
+# Cold import of the tools package, in seconds
+IMPORT_BUDGET = float(os.getenv("TOOLS_IMPORT_BUDGET", "1.0"))
+HEAVY_MODULES = ("aiohttp", "bs4", "ddgs", "duckduckgo_search", "llama_index", "openai", "rag.rag_service")
+
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import tools
+definitions = tools.get_tool_definitions()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed": elapsed,
+    "definitions": len(definitions),
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_cold_start():
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT],
+        cwd=PYTHON_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestToolManifest:
+    """Manifest contents and lazy loading."""
+
+    def test_manifest_is_up_to_date(self):
+        with open(tool_factory.MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        try:
+            assert manifest == tool_factory.build_manifest(), (
+                "tools/tool_manifest.json is stale, run: python build_tool_manifest.py"
+            )
+        finally:
+            tool_factory.load_manifest()
+
+    def test_manifest_lists_every_tool_class(self):
+        with open(tool_factory.MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            listed = {(entry["module"], entry["class_name"]) for entry in json.load(f)}
+        classes = set()
+        for module_info in pkgutil.iter_modules(tools.__path__, "tools."):
+            module = importlib.import_module(module_info.name)
+            classes.update(
+                (module.__name__, name) for name, obj in inspect.getmembers(module, inspect.isclass)
+                if issubclass(obj, MCPTool) and obj is not MCPTool and obj.__module__ == module.__name__
+            )
+        assert classes and classes == listed
+
+    def test_import_failure_fails_the_build(self, monkeypatch, capsys):
+        import_module = importlib.import_module
+
+        def failing_import(name, *args, **kwargs):
+            if name == "tools.lint_tool":
+                raise ImportError("missing dependency")
+            return import_module(name, *args, **kwargs)
+
+        monkeypatch.setattr(tool_factory.importlib, "import_module", failing_import)
+        monkeypatch.setattr(build_tool_manifest, "MANIFEST_PATH", Path("/nonexistent/tool_manifest.json"))
+        try:
+            with pytest.raises(RuntimeError, match="tools.lint_tool: missing dependency"):
+                tool_factory.build_manifest()
+            assert build_tool_manifest.main() == 1
+            assert "tools.lint_tool" in capsys.readouterr().err
+        finally:
+            monkeypatch.undo()
+            tool_factory.load_manifest()
+
+    def test_tools_load_on_first_use(self):
+        assert tool_factory.load_manifest()
+        assert "lint_code" not in tool_factory._tool_registry
+
+        tool = tool_factory.get_tool("lint_code")
+        assert tool is not None
+        assert tool_factory.get_tool("lint_code") is tool
+        assert tool_factory.get_tool("no_such_tool") is None
+
+    def test_invalid_manifest_is_rejected(self, tmp_path):
+        bad = tmp_path / "manifest.json"
+        bad.write_text("[{\"name\": \"x\"}]")
+        assert tool_factory.load_manifest(bad) is False
+
+
+class TestColdStart:
+    """Import-time budget for `import tools`."""
+
+    def test_no_heavy_imports(self):
+        result = run_cold_start()
+        assert result["definitions"] > 0
+        assert result["loaded"] == []
+
+    def test_import_budget(self):
+        # Best of three to smooth out noisy machines
+        elapsed = min(run_cold_start()["elapsed"] for _ in range(3))
+        assert elapsed < IMPORT_BUDGET, f"import tools took {elapsed:.3f}s (budget {IMPORT_BUDGET}s)"
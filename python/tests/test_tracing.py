@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test suite for JSONL tracing spans and the trace report CLI.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import ToolCallEvent
+from tools import ToolContext, execute_tool
+from utils import trace_report
+from utils.tracing import NOOP_SPAN, Tracer, span
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSpans:
+    """Nesting, attributes and output of spans."""
+
+    @pytest.mark.asyncio
+    async def test_spans_nest_across_tasks_and_generators(self, tmp_path):
+        tracer = Tracer(directory=tmp_path)
+
+        async def subtask(index):
+            with span("subtask", index=index):
+                with span("llm_call") as llm_span:
+                    await asyncio.sleep(0.01)
+                    llm_span.set(prompt_tokens=10, completion_tokens=2)
+
+        async def tool_events():
+            with span("tool_call", tool="execute_parallel_tasks"):
+                await asyncio.gather(subtask(0), subtask(1))
+                yield "done"
+
+        with tracer.start_trace("request", "session/1"):
+            with span("iteration", iteration=1):
+                async for _ in tool_events():
+                    pass
+            # Spans are buffered until the root span ends
+            assert not (tmp_path / "session_1.jsonl").exists()
+        tracer.flush()
+
+        spans = read_spans(tmp_path / "session_1.jsonl")
+        by_id = {record["span_id"]: record for record in spans}
+        assert len({record["trace_id"] for record in spans}) == 1
+        for record in spans:
+            if record["name"] == "llm_call":
+                subtask_span = by_id[record["parent_id"]]
+                assert subtask_span["name"] == "subtask"
+                assert by_id[subtask_span["parent_id"]]["name"] == "tool_call"
+                assert record["attrs"]["prompt_tokens"] == 10
+        assert sorted(record["name"] for record in spans) == [
+            "iteration", "llm_call", "llm_call", "request", "subtask", "subtask", "tool_call"
+        ]
+        root = spans[-1]
+        assert root["name"] == "request" and root["parent_id"] is None
+        assert root["attrs"]["session_id"] == "session/1"
+
+    def test_spans_outside_a_trace_are_noops(self, tmp_path):
+        assert span("llm_call") is NOOP_SPAN
+        with Tracer(directory=tmp_path, enabled=False).start_trace("request", "s"):
+            with span("iteration") as iteration_span:
+                iteration_span.set(iteration=1)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_errors_are_recorded(self, tmp_path):
+        tracer = Tracer(directory=tmp_path)
+        with pytest.raises(RuntimeError):
+            with tracer.start_trace("request", "s"):
+                raise RuntimeError("boom")
+        tracer.flush()
+        record = read_spans(tmp_path / "s.jsonl")[0]
+        assert record["status"] == "error" and record["error"] == "RuntimeError: boom"
+
+    @pytest.mark.asyncio
+    async def test_tool_call_span_records_payload_sizes(self, tmp_path):
+        tracer = Tracer(directory=tmp_path / "traces")
+        with tracer.start_trace("request", "tools"):
+            async for _ in execute_tool(
+                ToolCallEvent(tool_name="execute_command", tool_args={"command": "echo traced"}),
+                ToolContext(workspace_dir=str(tmp_path)),
+            ):
+                pass
+        tracer.flush()
+        tool_span = read_spans(tmp_path / "traces" / "tools.jsonl")[0]
+        assert tool_span["name"] == "tool_call"
+        assert tool_span["attrs"]["tool"] == "execute_command"
+        assert tool_span["attrs"]["error"] is False
+        assert tool_span["attrs"]["args_bytes"] > 0 and tool_span["attrs"]["result_bytes"] > 0
+
+
+class TestTraceReport:
+    """Waterfall and statistics rendered from a trace file."""
+
+    def write_run(self, tracer, session_id):
+        with tracer.start_trace("request", session_id):
+            for iteration in (1, 2):
+                with span("iteration", iteration=iteration):
+                    with span("llm_call") as llm_span:
+                        llm_span.set(prompt_tokens=100, completion_tokens=5)
+                    with span("tool_call", tool="lint_code") as tool_span:
+                        tool_span.set(result_bytes=2048, error=iteration == 2)
+        tracer.flush()
+
+    def test_waterfall_and_stats(self, tmp_path):
+        tracer = Tracer(directory=tmp_path)
+        self.write_run(tracer, "s")
+        spans = next(iter(trace_report.load_traces(str(tmp_path / "s.jsonl")).values()))
+        lines = trace_report.render_waterfall(spans).splitlines()
+        assert lines[1].startswith("request")
+        assert lines[2].startswith("  iteration iteration=1")
+        assert lines[3].startswith("    llm_call")
+        assert lines[4].startswith("    tool_call tool=lint_code")
+
+        stats = trace_report.aggregate(spans)
+        assert stats["llm_call"]["count"] == 2 and stats["llm_call"]["prompt_tokens"] == 200
+        assert stats["tool_call:lint_code"]["errors"] == 1
+        assert stats["tool_call:lint_code"]["result_bytes"] == 4096
+
+    def test_cli_lists_runs_and_renders_the_last_one(self, tmp_path, capsys):
+        tracer = Tracer(directory=tmp_path)
+        self.write_run(tracer, "s")
+        self.write_run(tracer, "s")
+        path = str(tmp_path / "s.jsonl")
+
+        assert trace_report.main([path, "--list"]) == 0
+        runs = capsys.readouterr().out.splitlines()
+        assert len(runs) == 2
+
+        assert trace_report.main([path]) == 0
+        assert f"Trace {runs[1].split()[0]}" in capsys.readouterr().out
+        assert trace_report.main([path, "--trace", "missing"]) == 1
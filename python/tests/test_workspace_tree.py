@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test suite for the cached workspace tree: ignore rules, incremental refresh and token budget.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tools.workspace_structure_tool import WorkspaceStructureTool
+from tools.workspace_tree import IgnoreRules, WorkspaceTree
+
+
+def age(root):
+    """Move the mtimes of all directories into the past, out of the racy window."""
+    past = time.time() - 60
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (past, past))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "src" / "pkg" / "core.py").write_text("")
+    (tmp_path / "src" / "main.py").write_text("")
+    (tmp_path / "README.md").write_text("")
+    (tmp_path / "src" / "__pycache__").mkdir()
+    (tmp_path / "src" / "__pycache__" / "main.cpython-311.pyc").write_text("")
+    age(tmp_path)
+    return tmp_path
+
+
+class TestIgnoreRules:
+    """gitignore semantics of the compiled rules."""
+
+    def test_patterns(self):
+        rules = IgnoreRules.from_patterns(["*.log", "!keep.log", "build/", "/docs/_site", "a/**/z", "# comment", ""])
+        assert rules.is_ignored("x/debug.log", False)
+        assert not rules.is_ignored("x/keep.log", False)
+        assert rules.is_ignored("pkg/build", True) and not rules.is_ignored("pkg/build", False)
+        assert rules.is_ignored("docs/_site", True) and not rules.is_ignored("x/docs/_site", True)
+        assert rules.is_ignored("a/b/c/z", False) and rules.is_ignored("a/z", False)
+        assert not rules.is_ignored("environment.py", False)
+
+    def test_nested_gitignore_is_relative_to_its_directory(self):
+        rules = IgnoreRules.from_patterns(["*.tmp"]).extended(["/out", "!important.tmp"], "web")
+        assert rules.is_ignored("web/out", True) and not rules.is_ignored("out", True)
+        assert not rules.is_ignored("web/important.tmp", False)
+        assert rules.is_ignored("important.tmp", False)
+
+
+class TestWorkspaceTree:
+    """Rendering and refreshing the cached model."""
+
+    def test_render_matches_tree_format(self, workspace):
+        rendered = WorkspaceTree(workspace, WorkspaceStructureTool.DEFAULT_IGNORE_PATTERNS).render()
+        assert rendered.lines == [
+            f"└── {workspace}",
+            "    ├── src",
+            "    │   ├── pkg",
+            "    │   │   └── core.py",
+            "    │   └── main.py",
+            "    └── README.md",
+        ]
+        assert (rendered.file_count, rendered.dir_count) == (3, 3)
+
+    def test_unchanged_directories_are_not_rescanned(self, workspace):
+        tree = WorkspaceTree(workspace, WorkspaceStructureTool.DEFAULT_IGNORE_PATTERNS)
+        tree.render()
+        assert tree.scans == 3
+        tree.render()
+        assert tree.scans == 3
+
+        (workspace / "src" / "pkg" / "util.py").write_text("")
+        rendered = tree.render()
+        assert tree.scans == 4
+        assert "    │   │   └── util.py" in rendered.lines
+
+    def test_gitignore_changes_are_picked_up(self, workspace):
+        tree = WorkspaceTree(workspace)
+        assert any("main.py" in line for line in tree.render().lines)
+        (workspace / ".gitignore").write_text("main.py\n__pycache__/\n")
+        lines = tree.render().lines
+        assert not any("main.py" in line or "__pycache__" in line for line in lines)
+        assert any("core.py" in line for line in lines)
+
+    def test_large_trees_are_collapsed_to_the_budget(self, tmp_path):
+        for i in range(30):
+            directory = tmp_path / f"module_{i:02d}"
+            directory.mkdir()
+            for j in range(40):
+                (directory / f"file_{j:02d}.py").write_text("")
+        tree = WorkspaceTree(tmp_path)
+        full = tree.render()
+        assert full.collapsed == 0 and full.file_count == 1200
+
+        rendered = tree.render(max_tokens=400)
+        assert len("\n".join(rendered.lines)) <= 400 * 4
+        assert rendered.collapsed == 30
+        assert rendered.lines[1] == "    ├── module_00 [40 entries collapsed]"
+
+        rendered = tree.render(max_tokens=100)
+        assert len("\n".join(rendered.lines)) <= 100 * 4
+        assert rendered.lines[-1].endswith("more entries")
+
+
+class TestWorkspaceStructureTool:
+    """The tool renders from the cached model."""
+
+    @pytest.mark.asyncio
+    async def test_tool_result(self, workspace):
+        tool = WorkspaceStructureTool()
+        tool.set_workspace_dir(str(workspace))
+        result = await tool.execute(max_depth=2)
+        assert result["success"] is True
+        assert "src" in result["structure"] and "core.py" not in result["structure"]
+        assert "__pycache__" not in result["structure"]
@@ -3,15 +3,21 @@
 from tools.tool_factory import (
     register_tools,
     get_tool,
+    get_tool_class,
     get_tool_definitions,
     execute_tool,
+    close_tools,
 )
+from tools.tool_context import ToolContext
 
 # Auto-register all tools on import
 __all__ = [
     'register_tools',
     'get_tool',
+    'get_tool_class',
     'get_tool_definitions',
     'execute_tool',
+    'close_tools',
+    'ToolContext',
 ]
 
@@ -3,13 +3,17 @@
 Apply Patch Tool - Apply unified diff patches to files
 """
 
+import io
 import os
-import re
 from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from datetime import datetime
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.edit_coordinator import file_exists, read_file, write_files
+from tools.hunk_locator import LineIndex, locate_hunk
+from utils.patch_parser import PatchHunk, extract_patch_info, parse_hunks
 
 logger = Logger('apply_patch_tool', log_to_file=False)
 
@@ -96,10 +100,12 @@ def _preprocess_patch_content(patch_content: str) -> str:
     return result
 
 # Configuration for patch saving
-ENABLE_PATCH_SAVE = True  # Set to False to disable patch saving
+# Set APPLY_PATCH_SAVE=false to disable patch saving
+ENABLE_PATCH_SAVE = os.getenv("APPLY_PATCH_SAVE", "true").lower() in ("true", "1", "yes", "on")
 # Get project root directory (parent of python/ directory)
 _project_root = Path(__file__).parent.parent.parent
-PATCH_SAVE_DIR = _project_root / "logs" / "patches"
+# Set APPLY_PATCH_SAVE_DIR to save patches elsewhere (default: logs/patches)
+PATCH_SAVE_DIR = Path(os.getenv("APPLY_PATCH_SAVE_DIR", str(_project_root / "logs" / "patches")))
 
 # Configuration for patch checking
 FUZZY_MATCH_THERSHOLD = 0.9
@@ -140,13 +146,13 @@ class ApplyPatchTool(MCPTool):
             "type": "function",
             "function": {
                 "name": "apply_patch",
-                "description": "Apply unified diff patches to files. Use this tool when you need to apply code changes to files. The target_file_path can be either absolute (e.g., /home/user/file.py) or relative to workspace (e.g., main.py).",
+                "description": "Apply unified diff patches to files. Use this tool when you need to apply code changes to files. A multi-file diff is applied to the files named in its '---'/'+++' headers, all or nothing: if any hunk fails, no file is changed. The target_file_path can be either absolute (e.g., /home/user/file.py) or relative to workspace (e.g., main.py).",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "target_file_path": {
                             "type": "string",
-                            "description": "Target file path. Can be absolute (e.g., /home/user/project/file.py) or relative to workspace directory (e.g., src/main.py or main.py). Relative paths will be automatically resolved using the workspace directory."
+                            "description": "Target file path for a single-file patch. Can be absolute (e.g., /home/user/project/file.py) or relative to workspace directory (e.g., src/main.py or main.py). Relative paths will be automatically resolved using the workspace directory. Optional when the patch has file headers."
                         },
                         "patch_content": {
                             "type": "string",
@@ -158,7 +164,7 @@ class ApplyPatchTool(MCPTool):
                             "default": False
                         }
                     },
-                    "required": ["patch_content", "target_file_path"]
+                    "required": ["patch_content"]
                 }
             }
         }
@@ -174,13 +180,16 @@ class ApplyPatchTool(MCPTool):
             Custom notification message string
         """
         patch_content = tool_args.get("patch_content", "")
-        target_file_path = tool_args.get("target_file_path", "")
+        target_file_path = tool_args.get("target_file_path") or "files in patch"
         dry_run = tool_args.get("dry_run", False)
         # Truncate long patch content for display
         display_content = patch_content[:50] + "..." if len(patch_content) > 50 else patch_content
         mode = "Validating" if dry_run else "Applying"
         return f"{mode} patch to {target_file_path}: {display_content}"
     
+    def invalidates_cache(self, tool_args: Dict[str, Any]) -> bool:
+        return not tool_args.get("dry_run", False)
+    
     def get_result_notification(self, tool_result: Dict[str, Any]) -> Optional[str]:
         """
         Get custom notification for apply patch tool result.
@@ -208,13 +217,19 @@ class ApplyPatchTool(MCPTool):
             # Check if there are detailed results
             results = tool_result.get("results", [])
             if results:
-                result = results[0]
+                # Report the first file that failed
+                result = next((r for r in results if not r.get("success")), results[0])
                 
                 # Add file path if available
                 file_path = result.get("file_path")
                 if file_path:
                     error_parts.append(f"📁 File path: {file_path}")
                 
+                # Add failing hunk if available
+                hunk = result.get("hunk")
+                if hunk is not None:
+                    error_parts.append(f"🧩 Hunk: {hunk}")
+                
                 # Add match score if available (for fuzzy match failures)
                 best_match_score = result.get("best_match_score")
                 if best_match_score is not None:
@@ -244,183 +259,43 @@ class ApplyPatchTool(MCPTool):
             
             return "\n".join(error_parts)
     
-    def _parse_patch(self, patch_content: str) -> List[Tuple[str, List[str], List[str]]]:
+    def _parse_file_patches(self, patch_content: str) -> List[Tuple[str, List[PatchHunk]]]:
         """
-        Parse unified diff patch content.
+        Split patch content into per-file hunks.
         Supports both standard unified diff format and simplified format:
-        - Standard: --- file_path\n+++ file_path\n@@ ... @@\n...
+        - Standard: --- file_path\n+++ file_path\n@@ ... @@\n... (any number of files)
         - Simplified: *** Begin Patch\n*** Update File: file_path\n+line\n-line\n*** End Patch
         
         Args:
             patch_content: Patch content string
         
         Returns:
-            List of tuples: (file_path, old_lines, new_lines)
+            List of tuples: (file_path, hunks), one per file in patch order.
+            The file path is empty for hunks without a ---/+++ header.
         """
-        patches = []
-        lines = patch_content.split('\n')
-        
         # Try to detect simplified format first
         if '*** Begin Patch' in patch_content or '*** Update File:' in patch_content:
-            return self._parse_simplified_patch(patch_content)
-        
-        i = 0
-        
-        while i < len(lines):
-            # Look for patch header: --- file_path
-            if lines[i].startswith('---'):
-                old_file = lines[i][4:].strip()
-                # Remove timestamp if present (format: --- a/file.txt\t2024-01-01 12:00:00)
-                old_file = old_file.split('\t')[0].strip()
-                # Remove 'a/' or 'b/' prefix if present
-                # Note: If original path was absolute like /home/..., git diff shows it as a/home/...
-                # After removing a/, we need to restore the leading /
-                if old_file.startswith('a/') or old_file.startswith('b/'):
-                    old_file = old_file[2:]
-                    # If the path doesn't start with / after removing a/ or b/,
-                    # it means the original path was absolute, so add / back
-                    if not old_file.startswith('/'):
-                        old_file = '/' + old_file
-                
-                i += 1
-                if i < len(lines) and lines[i].startswith('+++'):
-                    new_file = lines[i][4:].strip()
-                    new_file = new_file.split('\t')[0].strip()
-                    if new_file.startswith('a/') or new_file.startswith('b/'):
-                        new_file = new_file[2:]
-                        # Restore leading / for absolute paths
-                        if not new_file.startswith('/'):
-                            new_file = '/' + new_file
-                    
-                    # Use new_file as target, or old_file if new_file is /dev/null
-                    target_file = new_file if new_file != '/dev/null' else old_file
-                    if target_file == '/dev/null':
-                        target_file = old_file
-                    
-                    i += 1
-                    
-                    # Parse all hunks for this file
-                    # Collect all changes across multiple hunks
-                    all_old_lines = []
-                    all_new_lines = []
-                    in_hunk = False
-                    hunk_old_lines = []
-                    hunk_new_lines = []
-                    
-                    while i < len(lines):
-                        line = lines[i]
-                        
-                        # Check for next patch header (new file)
-                        if line.startswith('---') and not in_hunk:
-                            break
-                        
-                        # Hunk header: @@ -start,count +start,count @@
-                        # Must match pattern: @@ -number,number +number,number @@
-                        # This prevents code lines starting with @@ from being misidentified
-                        # Pattern allows optional spaces but requires -digit and +digit patterns
-                        # More flexible: allows @@-1,5+1,5@@ or @@ -1,5 +1,5 @@ formats
-                        # Must have both - and + signs (though spaces are optional)
-                        is_hunk_header = False
-                        if line.startswith('@@'):
-                            # Try strict pattern first
-                            hunk_header_pattern = r'^@@\s*-\d+(?:,\d+)?\s*\+\d+(?:,\d+)?\s*@@'
-                            is_hunk_header = bool(re.match(hunk_header_pattern, line))
-                            
-                            # Fallback: if line starts with @@ and contains both -digit and +digit patterns,
-                            # treat it as hunk header even if format is slightly off
-                            if not is_hunk_header:
-                                # Check if it has digit patterns after - and + (allowing for no spaces)
-                                if re.search(r'-\d+', line) and re.search(r'\+\d+', line):
-                                    is_hunk_header = True
-                                    logger.debug(f"Using fallback hunk header detection for: {line[:50]}")
-                            
-                            # Additional fallback: if it looks like a hunk header (starts with @@ and ends with @@)
-                            # and has some numeric content, treat it as hunk header
-                            if not is_hunk_header and line.strip().endswith('@@') and re.search(r'\d+', line):
-                                # Very permissive: if it starts with @@, ends with @@, and has numbers
-                                # This handles edge cases where format is non-standard
-                                is_hunk_header = True
-                                logger.debug(f"Using very permissive hunk header detection for: {line[:50]}")
-                        
-                        if is_hunk_header:
-                            # If we were in a hunk, save it before starting new one
-                            if in_hunk:
-                                all_old_lines.extend(hunk_old_lines)
-                                all_new_lines.extend(hunk_new_lines)
-                                hunk_old_lines = []
-                                hunk_new_lines = []
-                            
-                            in_hunk = True
-                            i += 1
-                            continue
-                        
-                        # If line starts with @@ but is not a valid hunk header
-                        if line.startswith('@@') and not is_hunk_header:
-                            if in_hunk:
-                                # If we're in a hunk and this line starts with @@ but is not a valid header,
-                                # it might be a new hunk header with non-standard format, or malformed content
-                                # End the current hunk and skip this line (treat as malformed)
-                                logger.warning(f"Found @@ line in hunk that is not a valid header, ending hunk: {line[:50]}")
-                                all_old_lines.extend(hunk_old_lines)
-                                all_new_lines.extend(hunk_new_lines)
-                                hunk_old_lines = []
-                                hunk_new_lines = []
-                                in_hunk = False
-                            # Skip this line whether in hunk or not
-                            i += 1
-                            continue
-                        
-                        # If we encounter patch content lines (space, -, +) but not in a hunk,
-                        # it might be a patch without hunk header (non-standard but possible)
-                        # Start processing anyway
-                        if not in_hunk and (line.startswith(' ') or line.startswith('-') or line.startswith('+')):
-                            logger.warning(f"Found patch content line without hunk header, starting hunk anyway: {line[:50]}")
-                            in_hunk = True
-                            # Don't increment i, process this line below
-                        
-                        if in_hunk:
-                            if line.startswith(' '):
-                                # Context line (unchanged) - add to both
-                                hunk_old_lines.append(line[1:])
-                                hunk_new_lines.append(line[1:])
-                            elif line.startswith('-'):
-                                # Removed line - only in old
-                                hunk_old_lines.append(line[1:])
-                            elif line.startswith('+'):
-                                # Added line - only in new
-                                hunk_new_lines.append(line[1:])
-                            elif line.strip() == '':
-                                # Empty line in hunk - preserve as context
-                                hunk_old_lines.append('')
-                                hunk_new_lines.append('')
-                            elif line.startswith('\\'):
-                                # No newline at end of file marker
-                                pass
-                            else:
-                                # End of hunk - save current hunk
-                                all_old_lines.extend(hunk_old_lines)
-                                all_new_lines.extend(hunk_new_lines)
-                                hunk_old_lines = []
-                                hunk_new_lines = []
-                                in_hunk = False
-                                # Continue to see if there's another hunk
-                        
-                        i += 1
-                    
-                    # Save last hunk if any
-                    if in_hunk:
-                        all_old_lines.extend(hunk_old_lines)
-                        all_new_lines.extend(hunk_new_lines)
-                    
-                    # Only add patch if we have content
-                    if all_old_lines or all_new_lines:
-                        logger.debug(f"Parsed patch for file: {target_file} ({len(all_old_lines)} old lines, {len(all_new_lines)} new lines)")
-                        patches.append((target_file, all_old_lines, all_new_lines))
-                    continue
-            
-            i += 1
-        
-        return patches
+            file_patches = [
+                (file_path, [PatchHunk(None, old_lines, new_lines)])
+                for file_path, old_lines, new_lines in self._parse_simplified_patch(patch_content)
+            ]
+        else:
+            file_patches = [
+                (file_path, parse_hunks(file_patch))
+                for file_path, file_patch in extract_patch_info(patch_content) or []
+            ]
+            if not file_patches:
+                # Bare hunks without a file header apply to target_file_path
+                file_patches = [("", parse_hunks(patch_content))]
+        
+        # Merge patches of the same file so all its hunks are applied in one pass
+        merged: Dict[str, List[PatchHunk]] = {}
+        for file_path, hunks in file_patches:
+            if hunks:
+                merged.setdefault(file_path, []).extend(hunks)
+        for file_path, hunks in merged.items():
+            logger.debug(f"Parsed patch for file: {file_path or '<target>'} ({len(hunks)} hunk(s))")
+        return list(merged.items())
     
     def _parse_simplified_patch(self, patch_content: str) -> List[Tuple[str, List[str], List[str]]]:
         """
@@ -510,284 +385,255 @@ class ApplyPatchTool(MCPTool):
         
         return patches
     
-    def _apply_patch_to_file(self, file_path: str, old_lines: List[str], new_lines: List[str], dry_run: bool = False) -> Dict[str, Any]:
+    def _resolve_patch_path(self, file_path: str, workspace_dir: Optional[str]) -> Path:
         """
-        Apply patch to a single file.
+        Resolve a file path taken from a patch header.
         
-        Args:
-            file_path: Path to the file to patch (should be absolute path from LLM)
-            old_lines: Expected old lines (for validation)
-            new_lines: New lines to apply
-            dry_run: If True, only validate without applying
-        
-        Returns:
-            Dictionary with result information
+        Header paths are made absolute by the parser ("a/src/main.py" -> "/src/main.py"),
+        so a path that does not exist is looked up in the workspace directory as well.
         """
-        logger.info(f"Applying patch to file: {file_path}")
-        logger.debug(f"  - Old lines count: {len(old_lines)}")
-        logger.debug(f"  - New lines count: {len(new_lines)}")
-        logger.debug(f"  - Dry run: {dry_run}")
+        path = Path(file_path)
+        if not path.is_absolute() and workspace_dir:
+            return (Path(workspace_dir) / path).resolve()
+        if workspace_dir and not file_exists(path):
+            candidate = Path(workspace_dir) / file_path.lstrip('/')
+            if file_exists(candidate):
+                return candidate.resolve()
+        return path.resolve()
+    
+    def _missing_file_result(self, resolved_path: Path, workspace_dir: Optional[str]) -> Dict[str, Any]:
+        """Build the failure result for a patch whose target file does not exist."""
+        logger.error(f"File does not exist: {resolved_path}")
         
-        # Use file_path directly as it should be an absolute path from LLM
-        # No need to concatenate with workspace_dir
-        resolved_path = Path(file_path).resolve()
+        # Provide helpful suggestions
+        parent_dir = resolved_path.parent
+        suggestions = []
         
-        logger.info(f"Resolved file path: {resolved_path}")
+        # Check if parent directory exists
+        if not parent_dir.exists():
+            suggestions.append(f"Parent directory does not exist: {parent_dir}")
+        else:
+            # List files in parent directory for suggestions
+            try:
+                similar_files = [f.name for f in parent_dir.iterdir() if f.is_file()]
+                if similar_files:
+                    suggestions.append(f"Files in parent directory: {', '.join(similar_files[:5])}")
+                    if len(similar_files) > 5:
+                        suggestions.append(f"... and {len(similar_files) - 5} more files")
+            except Exception:
+                pass
+        
+        # Check if workspace_dir is set
+        if workspace_dir:
+            suggestions.append(f"Workspace directory: {workspace_dir}")
+            # Try to find similar files in workspace
+            try:
+                workspace_path = Path(workspace_dir)
+                if workspace_path.exists():
+                    filename = resolved_path.name
+                    matching_files = list(workspace_path.rglob(filename))
+                    if matching_files:
+                        suggestions.append(f"Found files with same name in workspace: {', '.join(str(f) for f in matching_files[:3])}")
+            except Exception:
+                pass
+        
+        error_msg = f"File does not exist: {resolved_path}"
+        if suggestions:
+            error_msg += "\n💡 Hints:\n  - " + "\n  - ".join(suggestions)
         
-        # Check if file exists
-        if not resolved_path.exists():
-            logger.error(f"File does not exist: {resolved_path}")
-            
-            # Provide helpful suggestions
-            parent_dir = resolved_path.parent
-            suggestions = []
-            
-            # Check if parent directory exists
-            if not parent_dir.exists():
-                suggestions.append(f"Parent directory does not exist: {parent_dir}")
-            else:
-                # List files in parent directory for suggestions
-                try:
-                    similar_files = [f.name for f in parent_dir.iterdir() if f.is_file()]
-                    if similar_files:
-                        suggestions.append(f"Files in parent directory: {', '.join(similar_files[:5])}")
-                        if len(similar_files) > 5:
-                            suggestions.append(f"... and {len(similar_files) - 5} more files")
-                except Exception:
-                    pass
-            
-            # Check if workspace_dir is set
-            if self.workspace_dir:
-                suggestions.append(f"Workspace directory: {self.workspace_dir}")
-                # Try to find similar files in workspace
-                try:
-                    workspace_path = Path(self.workspace_dir)
-                    if workspace_path.exists():
-                        filename = resolved_path.name
-                        matching_files = list(workspace_path.rglob(filename))
-                        if matching_files:
-                            suggestions.append(f"Found files with same name in workspace: {', '.join(str(f) for f in matching_files[:3])}")
-                except Exception:
-                    pass
-            
-            error_msg = f"File does not exist: {resolved_path}"
-            if suggestions:
-                error_msg += "\n💡 Hints:\n  - " + "\n  - ".join(suggestions)
-            
-            return {
-                "success": False,
-                "error": error_msg,
-                "file_path": str(resolved_path),
-                "parent_directory": str(parent_dir),
-                "parent_exists": parent_dir.exists(),
-                "workspace_dir": self.workspace_dir,
-                "suggestion": "Please check if the file path is correct. If using relative paths, ensure the workspace directory is properly set."
-            }
+        return {
+            "success": False,
+            "error": error_msg,
+            "file_path": str(resolved_path),
+            "parent_directory": str(parent_dir),
+            "parent_exists": parent_dir.exists(),
+            "workspace_dir": workspace_dir,
+            "suggestion": "Please check if the file path is correct. If using relative paths, ensure the workspace directory is properly set."
+        }
+    
+    def _apply_hunks(self, current_lines: List[str], hunks: List[PatchHunk]) -> Dict[str, Any]:
+        """
+        Apply all hunks of one file in memory, in a single pass.
         
-        logger.info(f"File exists, proceeding with patch application")
+        Every hunk is located in the original lines through one shared line index.
+        The offset between a hunk's @@ header and where it was found is carried
+        over as the expected position of the next hunk. The replacements are then
+        spliced together, so no hunk sees the result of another.
         
-        try:
-            # Read current file content
-            logger.debug(f"Reading file content from: {resolved_path}")
-            with open(resolved_path, 'r', encoding='utf-8') as f:
-                current_lines = f.readlines()
+        Args:
+            current_lines: Current file lines, without line endings
+            hunks: Hunks of the file in patch order
+        
+        Returns:
+            Dictionary with "lines" (patched file lines) and "hunks" (per-hunk placement),
+            or a failure result
+        """
+        index = LineIndex(current_lines)
+        placements: List[Tuple[int, int, List[str], Dict[str, Any]]] = []
+        delta = 0
+        previous_end = 0
+        
+        for number, hunk in enumerate(hunks, 1):
+            old_lines = [line.rstrip('\n\r') for line in hunk.old_lines]
+            new_lines = hunk.new_lines
             
-            logger.debug(f"File has {len(current_lines)} lines")
+            # Handle pure addition case (old_lines is empty)
+            if not old_lines:
+                if hunk.old_start is None:
+                    logger.info(f"Hunk {number}: pure addition, appending new lines to end of file")
+                    patch_start = len(current_lines)
+                else:
+                    # "@@ -N,0" inserts after line N
+                    patch_start = min(len(current_lines), max(0, hunk.old_start + delta))
+                placements.append((patch_start, patch_start, new_lines, {
+                    "hunk": number, "patch_location": patch_start, "match": "insert",
+                }))
+                continue
             
-            # Remove trailing newlines for comparison
-            current_lines = [line.rstrip('\n\r') for line in current_lines]
-            old_lines = [line.rstrip('\n\r') for line in old_lines]
+            # Normalize old_lines: remove leading/trailing empty lines for better matching
+            # But keep track of the original for actual replacement
+            leading_empty = 0
+            for line in old_lines:
+                if line.strip() == '':
+                    leading_empty += 1
+                else:
+                    break
+            trailing_empty = 0
+            for line in reversed(old_lines):
+                if line.strip() == '':
+                    trailing_empty += 1
+                else:
+                    break
+            normalized_old_lines = old_lines
+            # If all lines are empty, keep as is
+            if leading_empty < len(old_lines):
+                normalized_old_lines = old_lines[leading_empty:len(old_lines) - trailing_empty]
             
-            # Handle pure addition case (old_lines is empty)
-            if not old_lines and new_lines:
-                logger.info("Pure addition patch: appending new lines to end of file")
-                patch_start = len(current_lines)
+            if hunk.old_start is not None:
+                hint = hunk.old_start - 1 + delta
             else:
-                # Normalize old_lines: remove leading/trailing empty lines for better matching
-                # But keep track of the original for actual replacement
-                normalized_old_lines = old_lines
-                leading_empty = 0
-                trailing_empty = 0
-                
-                # Count leading empty lines
-                for line in old_lines:
-                    if line.strip() == '':
-                        leading_empty += 1
-                    else:
-                        break
-                
-                # Count trailing empty lines
-                for line in reversed(old_lines):
-                    if line.strip() == '':
-                        trailing_empty += 1
-                    else:
-                        break
-                
-                # If all lines are empty, keep as is
-                if leading_empty < len(old_lines):
-                    # Remove leading/trailing empty lines for matching
-                    normalized_old_lines = old_lines[leading_empty:len(old_lines)-trailing_empty] if trailing_empty > 0 else old_lines[leading_empty:]
-                    logger.debug(f"Normalized old_lines: removed {leading_empty} leading and {trailing_empty} trailing empty lines")
-                
-                # Try to find the location to apply the patch
-                # First try exact match with normalized lines
-                logger.debug(f"Searching for patch location (looking for {len(normalized_old_lines)} normalized lines, {len(old_lines)} total)")
-                patch_start = -1
-                
-                # Search from beginning
-                for i in range(len(current_lines) - len(normalized_old_lines) + 1):
-                    if current_lines[i:i+len(normalized_old_lines)] == normalized_old_lines:
-                        # Found match, adjust for leading empty lines
-                        patch_start = max(0, i - leading_empty)
-                        logger.info(f"Found exact match at line {patch_start + 1} (normalized match at {i + 1})")
-                        break
-                
-                # If not found, try searching from the end (for cases where content is at file end)
-                if patch_start == -1:
-                    logger.debug("Exact match not found from beginning, trying from end")
-                    for i in range(len(current_lines) - len(normalized_old_lines), -1, -1):
-                        if i >= 0 and current_lines[i:i+len(normalized_old_lines)] == normalized_old_lines:
-                            patch_start = max(0, i - leading_empty)
-                            logger.info(f"Found exact match at line {patch_start + 1} (searched from end, normalized match at {i + 1})")
-                            break
-                
-                # If still not found, try with original old_lines (in case normalization removed important context)
-                if patch_start == -1:
-                    logger.debug("Trying exact match with original old_lines")
-                    for i in range(len(current_lines) - len(old_lines) + 1):
-                        if current_lines[i:i+len(old_lines)] == old_lines:
-                            patch_start = i
-                            logger.info(f"Found exact match at line {patch_start + 1} (using original old_lines)")
-                            break
-                
-                if patch_start == -1:
-                    logger.warning("Exact match not found, trying fuzzy matching")
-                    # Try fuzzy matching - find at least 50% match
-                    best_match = -1
-                    best_score = 0
-                    
-                    # Try with normalized lines first
-                    for i in range(len(current_lines) - len(normalized_old_lines) + 1):
-                        match_count = sum(1 for j, old_line in enumerate(normalized_old_lines) 
-                                        if i + j < len(current_lines) and current_lines[i + j] == old_line)
-                        score = match_count / len(normalized_old_lines) if normalized_old_lines else 0
-                        if score > best_score:
-                            best_score = score
-                            best_match = max(0, i - leading_empty)
-                    
-                    # Also try from the end
-                    for i in range(len(current_lines) - len(normalized_old_lines), -1, -1):
-                        if i >= 0:
-                            match_count = sum(1 for j, old_line in enumerate(normalized_old_lines) 
-                                            if i + j < len(current_lines) and current_lines[i + j] == old_line)
-                            score = match_count / len(normalized_old_lines) if normalized_old_lines else 0
-                            if score > best_score:
-                                best_score = score
-                                best_match = max(0, i - leading_empty)
-                    
-                    # Fallback to original old_lines if normalized didn't work well
-                    if best_score < FUZZY_MATCH_THERSHOLD:
-                        logger.debug("Trying fuzzy match with original old_lines")
-                        for i in range(len(current_lines) - len(old_lines) + 1):
-                            match_count = sum(1 for j, old_line in enumerate(old_lines) 
-                                            if i + j < len(current_lines) and current_lines[i + j] == old_line)
-                            score = match_count / len(old_lines) if old_lines else 0
-                            if score > best_score:
-                                best_score = score
-                                best_match = i
-                    
-                    if best_score < FUZZY_MATCH_THERSHOLD:
-                        logger.error(f"Could not find patch location. Best match score: {best_score:.2f}")
-                        logger.debug(f"Expected context ({len(old_lines)} lines, showing first 10):")
-                        for i, line in enumerate(old_lines[:10], 1):
-                            logger.debug(f"  Expected {i}: {repr(line)}")
-                        logger.debug(f"Actual file content (showing first 20 lines):")
-                        for i, line in enumerate(current_lines[:20], 1):
-                            logger.debug(f"  Actual {i}: {repr(line)}")
-                        logger.debug(f"Actual file content (showing last 20 lines):")
-                        for i, line in enumerate(current_lines[-20:], len(current_lines) - 19):
-                            logger.debug(f"  Actual {i}: {repr(line)}")
-                        
-                        # Try to find partial matches for debugging
-                        if best_match >= 0:
-                            logger.debug(f"Best match location: line {best_match + 1}")
-                            logger.debug(f"Best match context:")
-                            for i in range(min(5, len(old_lines))):
-                                if best_match + i < len(current_lines):
-                                    match_indicator = "✓" if i < len(old_lines) and best_match + i < len(current_lines) and current_lines[best_match + i] == old_lines[i] else "✗"
-                                    logger.debug(f"  {match_indicator} Expected: {repr(old_lines[i]) if i < len(old_lines) else 'N/A'}")
-                                    logger.debug(f"    Actual:   {repr(current_lines[best_match + i]) if best_match + i < len(current_lines) else 'N/A'}")
-                        
-                        return {
-                            "success": False,
-                            "error": f"Could not find patch location in file. Expected context not found.",
-                            "file_path": str(resolved_path),
-                            "expected_context": old_lines[:10] if len(old_lines) > 10 else old_lines,
-                            "actual_file_preview": current_lines[:20] if len(current_lines) > 20 else current_lines,
-                            "actual_file_end": current_lines[-20:] if len(current_lines) > 20 else current_lines,
-                            "best_match_score": best_score,
-                            "best_match_location": best_match + 1 if best_match >= 0 else None,
-                            "expected_lines_count": len(old_lines),
-                            "actual_lines_count": len(current_lines),
-                            "suggestion": "The file content may have changed since the patch was generated, or there may be whitespace/formatting differences. Please verify the patch matches the current file state."
-                        }
-                    else:
-                        patch_start = best_match
-                        logger.warning(f"Using fuzzy match (score: {best_score:.2f}) at line {patch_start + 1} for patch application")
+                hint = previous_end
+            match = locate_hunk(index, normalized_old_lines, hint + leading_empty)
+            patch_start = max(0, match.start - leading_empty) if match.start >= 0 else -1
             
-            if dry_run:
-                logger.info(f"Dry run: Patch would be applied at line {patch_start + 1}")
+            if match.tier == "fuzzy" and match.score >= FUZZY_MATCH_THERSHOLD:
+                logger.warning(f"Hunk {number}: using fuzzy match (score: {match.score:.2f}) at line {patch_start + 1}")
+            elif match.tier not in ("exact", "whitespace"):
+                logger.error(f"Hunk {number}: could not find patch location. Best match score: {match.score:.2f}")
                 return {
-                    "success": True,
-                    "dry_run": True,
-                    "file_path": str(resolved_path),
-                    "patch_location": patch_start,
-                    "lines_to_replace": len(old_lines),
-                    "lines_to_add": len(new_lines),
-                    "message": "Patch validated successfully (dry run)"
+                    "success": False,
+                    "error": f"Could not find patch location in file for hunk {number} of {len(hunks)}. Expected context not found.",
+                    "hunk": number,
+                    "expected_context": old_lines[:10],
+                    "actual_file_preview": current_lines[:20],
+                    "actual_file_end": current_lines[-20:],
+                    "best_match_score": match.score,
+                    "best_match_location": patch_start + 1 if patch_start >= 0 else None,
+                    "expected_lines_count": len(old_lines),
+                    "actual_lines_count": len(current_lines),
+                    "suggestion": "The file content may have changed since the patch was generated, or there may be whitespace/formatting differences. Please verify the patch matches the current file state."
                 }
+            else:
+                logger.info(f"Hunk {number}: found {match.tier} match at line {patch_start + 1}")
             
-            # Apply the patch
-            logger.info(f"Applying patch at line {patch_start + 1}: replacing {len(old_lines)} lines with {len(new_lines)} lines")
-            new_file_lines = (
-                current_lines[:patch_start] +
-                new_lines +
-                current_lines[patch_start + len(old_lines):]
-            )
-            
-            logger.debug(f"New file will have {len(new_file_lines)} lines (was {len(current_lines)})")
-            
-            # Write back to file
-            logger.info(f"Writing patched content to: {resolved_path}")
-            with open(resolved_path, 'w', encoding='utf-8') as f:
-                for line in new_file_lines:
-                    f.write(line + '\n')
-            
-            logger.info(f"Patch applied successfully to {resolved_path}")
-            return {
-                "success": True,
-                "file_path": str(resolved_path),
-                "patch_location": patch_start,
-                "lines_replaced": len(old_lines),
-                "lines_added": len(new_lines),
-                "message": "Patch applied successfully"
-            }
-            
+            patch_end = min(len(current_lines), patch_start + len(old_lines))
+            if hunk.old_start is not None:
+                delta = patch_start - (hunk.old_start - 1)
+            previous_end = patch_end
+            placements.append((patch_start, patch_end, new_lines, {
+                "hunk": number, "patch_location": patch_start, "match": match.tier, "score": match.score,
+            }))
+        
+        # Splice all replacements into the original lines
+        placements.sort(key=lambda placement: (placement[0], placement[1]))
+        patched: List[str] = []
+        position = 0
+        for i, (start, end, new_lines, info) in enumerate(placements):
+            if start < position:
+                other = placements[i - 1][3]["hunk"]
+                logger.error(f"Hunks {other} and {info['hunk']} overlap at line {start + 1}")
+                return {
+                    "success": False,
+                    "error": f"Hunks {other} and {info['hunk']} change overlapping lines (at line {start + 1}).",
+                    "hunk": info["hunk"],
+                    "suggestion": "Merge the overlapping hunks into one, or regenerate the patch against the current file."
+                }
+            patched.extend(current_lines[position:start])
+            patched.extend(new_lines)
+            position = end
+            info["lines_replaced"] = end - start
+            info["lines_added"] = len(new_lines)
+        patched.extend(current_lines[position:])
+        
+        return {
+            "success": True,
+            "lines": patched,
+            "hunks": [info for _, _, _, info in sorted(placements, key=lambda placement: placement[3]["hunk"])],
+        }
+    
+    def _patch_file(self, resolved_path: Path, hunks: List[PatchHunk], dry_run: bool,
+                    workspace_dir: Optional[str]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Apply the hunks of one file in memory.
+        
+        Args:
+            resolved_path: Absolute path of the file to patch
+            hunks: Hunks to apply
+            dry_run: If True, describe the change as a validation
+            workspace_dir: Workspace used for hints
+        
+        Returns:
+            (result, patched content); the content is None if the patch does not apply
+        """
+        logger.info(f"Applying {len(hunks)} hunk(s) to file: {resolved_path}")
+        
+        # Check if file exists
+        if not file_exists(resolved_path):
+            return self._missing_file_result(resolved_path, workspace_dir), None
+        
+        try:
+            current_lines = [line.rstrip('\n\r') for line in io.StringIO(read_file(resolved_path)).readlines()]
+            logger.debug(f"File has {len(current_lines)} lines")
+            applied = self._apply_hunks(current_lines, hunks)
         except Exception as e:
             logger.error(f"Error applying patch to {resolved_path}: {e}", exc_info=True)
-            return {
-                "success": False,
-                "error": str(e),
-                "file_path": str(resolved_path)
-            }
+            return {"success": False, "error": str(e), "file_path": str(resolved_path)}, None
+        
+        if not applied["success"]:
+            applied["file_path"] = str(resolved_path)
+            return applied, None
+        
+        placements = applied["hunks"]
+        lines_replaced = sum(placement["lines_replaced"] for placement in placements)
+        lines_added = sum(placement["lines_added"] for placement in placements)
+        result = {
+            "success": True,
+            "file_path": str(resolved_path),
+            "patch_location": min(placement["patch_location"] for placement in placements),
+            "hunks": placements,
+        }
+        if dry_run:
+            result.update({
+                "dry_run": True,
+                "lines_to_replace": lines_replaced,
+                "lines_to_add": lines_added,
+                "message": "Patch validated successfully (dry run)"
+            })
+        else:
+            result.update({
+                "lines_replaced": lines_replaced,
+                "lines_added": lines_added,
+                "message": "Patch applied successfully"
+            })
+        return result, "".join(line + '\n' for line in applied["lines"])
     
-    def _save_patch_to_file(self, patch_content: str, target_file_path: str, success: bool) -> Optional[str]:
+    def _save_patch_to_file(self, patch_content: str, target_file_paths: List[str], success: bool) -> Optional[str]:
         """
         Save patch content to a file for record keeping.
         
         Args:
             patch_content: The patch content to save
-            target_file_path: The target file path that was patched
+            target_file_paths: The target file paths that were patched
             success: Whether the patch was successfully applied
         
         Returns:
@@ -800,14 +646,17 @@ class ApplyPatchTool(MCPTool):
             # Generate filename with timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
             # Extract filename from target path for better organization
-            target_filename = Path(target_file_path).name
+            target_filename = Path(target_file_paths[0]).name if target_file_paths else "patch"
+            if len(target_file_paths) > 1:
+                target_filename += f"_and_{len(target_file_paths) - 1}_more"
             status = "success" if success else "failed"
             patch_filename = f"{timestamp}_{target_filename}_{status}.patch"
             patch_file_path = PATCH_SAVE_DIR / patch_filename
             
             # Write patch content to file
             with open(patch_file_path, 'w', encoding='utf-8') as f:
-                f.write(f"# Patch for: {target_file_path}\n")
+                for target_file_path in target_file_paths:
+                    f.write(f"# Patch for: {target_file_path}\n")
                 f.write(f"# Timestamp: {datetime.now().isoformat()}\n")
                 f.write(f"# Status: {status}\n")
                 f.write(f"# {'=' * 76}\n\n")
@@ -819,14 +668,19 @@ class ApplyPatchTool(MCPTool):
             logger.error(f"Failed to save patch to file: {e}", exc_info=True)
             return None
     
-    async def execute(self, patch_content: str, target_file_path: str, dry_run: bool = False) -> Dict[str, Any]:
+    async def execute(self, patch_content: str, target_file_path: Optional[str] = None, dry_run: bool = False,
+                      context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
-        Apply a patch to a file.
+        Apply a patch to one or more files.
+        
+        All files are patched in memory first; they are written only if every
+        file patch applies, so a failing hunk leaves the workspace unchanged.
         
         Args:
             patch_content: Patch content in unified diff format, or path to patch file
-            target_file_path: Target file absolute path (required)
+            target_file_path: Target file path for a single-file patch (defaults to the path in the patch header)
             dry_run: If True, only validate without applying
+            context: Tool context of the calling agent
         
         Returns:
             Dictionary with execution results
@@ -837,13 +691,14 @@ class ApplyPatchTool(MCPTool):
         logger.info(f"Patch content length: {len(patch_content)} characters")
         
         # Auto-fix relative paths by prepending workspace_dir
-        if not os.path.isabs(target_file_path):
-            if self.workspace_dir:
+        workspace_dir = self.resolve_workspace(context)
+        if target_file_path and not os.path.isabs(target_file_path):
+            if workspace_dir:
                 # Convert relative path to absolute using workspace_dir
                 original_path = target_file_path
-                target_file_path = os.path.join(self.workspace_dir, target_file_path)
+                target_file_path = os.path.join(workspace_dir, target_file_path)
                 logger.warning(f"Auto-fixed relative path: '{original_path}' -> '{target_file_path}'")
-                logger.info(f"Using workspace directory: {self.workspace_dir}")
+                logger.info(f"Using workspace directory: {workspace_dir}")
             else:
                 logger.error(f"target_file_path must be an absolute path, got: {target_file_path} (no workspace_dir set)")
                 error_msg = f"❌ Path error: Must provide absolute path\n"
@@ -883,8 +738,8 @@ class ApplyPatchTool(MCPTool):
         # Parse the patch
         logger.info("Parsing patch content...")
         try:
-            patches = self._parse_patch(patch_text)
-            logger.info(f"Parsed {len(patches)} patch(es) from content")
+            file_patches = self._parse_file_patches(patch_text)
+            logger.info(f"Parsed patches for {len(file_patches)} file(s) from content")
         except Exception as e:
             logger.error(f"Error parsing patch: {e}", exc_info=True)
             error_msg = f"❌ Patch parsing failed\n"
@@ -900,7 +755,7 @@ class ApplyPatchTool(MCPTool):
                 "patch_preview": patch_text[:500] if len(patch_text) > 500 else patch_text
             }
         
-        if not patches:
+        if not file_patches:
             logger.error("No valid patches found in patch content")
             error_msg = f"❌ No valid patch content found\n"
             error_msg += f"📊 Patch content length: {len(patch_text)} characters\n"
@@ -921,52 +776,80 @@ class ApplyPatchTool(MCPTool):
                 "suggestion": "Please ensure patch format is correct, starting with '---' and '+++', and including '@@ ... @@' line number markers"
             }
         
-        # Log parsed patches
-        for i, (file_path, old_lines, new_lines) in enumerate(patches, 1):
-            logger.info(f"Patch {i}: old_lines={len(old_lines)}, new_lines={len(new_lines)}")
-        
-        # Apply patch to target_file_path (use first patch's content, ignore file path from patch)
-        if len(patches) > 1:
-            logger.warning(f"Multiple patches found ({len(patches)}), but only one target_file_path provided. Using first patch content.")
-        
-        # Use the first patch's content
-        _, old_lines, new_lines = patches[0]
-        
-        logger.info(f"Applying patch to: {target_file_path}")
-        result = self._apply_patch_to_file(target_file_path, old_lines, new_lines, dry_run)
-        
-        if result.get("success"):
-            logger.info("Patch applied successfully")
+        # A single-file patch goes to target_file_path; multi-file patches use their header paths
+        if target_file_path and len(file_patches) == 1:
+            targets = [(Path(target_file_path).resolve(), file_patches[0][1])]
+        elif any(not file_path for file_path, _ in file_patches):
+            logger.error("Patch has no file header and no target_file_path was given")
+            return {
+                "success": False,
+                "error": "❌ Patch has no '--- file' / '+++ file' header, so target_file_path is required",
+                "suggestion": "Pass target_file_path, or start the patch with '--- a/path' and '+++ b/path' lines"
+            }
+        else:
+            if target_file_path:
+                logger.warning(f"Patch changes {len(file_patches)} files; ignoring target_file_path and using the paths in the patch")
+            targets = [(self._resolve_patch_path(file_path, workspace_dir), hunks) for file_path, hunks in file_patches]
+        
+        # Stage every file in memory; nothing is written unless all of them apply
+        results: List[Dict[str, Any]] = []
+        staged: Dict[str, str] = {}
+        for resolved_path, hunks in targets:
+            result, content = self._patch_file(resolved_path, hunks, dry_run, workspace_dir)
+            results.append(result)
+            if content is not None:
+                staged[str(resolved_path)] = content
+        
+        failed = [result for result in results if not result.get("success")]
+        if not failed and not dry_run:
+            try:
+                logger.info(f"Writing patched content to {len(staged)} file(s)")
+                write_files(staged)
+            except Exception as e:
+                logger.error(f"Error writing patched files: {e}", exc_info=True)
+                failed = [{"success": False, "error": f"Failed to write patched files: {e}"}]
+        if failed and len(results) > 1:
+            for result in results:
+                if result.get("success"):
+                    result["message"] = "Patch validated, but not applied because another file failed"
+        
+        if failed:
+            logger.error(f"Patch failed: {failed[0].get('error', 'unknown error')}")
         else:
-            logger.error(f"Patch failed: {result.get('error', 'unknown error')}")
+            logger.info("Patch applied successfully")
         
         # Save patch to file for record keeping (only if not dry_run)
         saved_patch_path = None
         
         if not dry_run and ENABLE_PATCH_SAVE:
             saved_patch_path = self._save_patch_to_file(
-                patch_text, 
-                target_file_path,
-                result.get("success", False)
+                patch_text,
+                [str(resolved_path) for resolved_path, _ in targets],
+                not failed
             )
         
-        logger.info(f"Patch application complete: {'success' if result.get('success') else 'failed'}")
+        logger.info(f"Patch application complete: {'success' if not failed else 'failed'}")
         logger.info("=" * 80)
         
         return_dict = {
-            "success": result.get("success", False),
-            "patches_applied": 1 if result.get("success") else 0,
-            "patches_total": 1,
-            "results": [result]
+            "success": not failed,
+            "patches_applied": 0 if failed else len(results),
+            "patches_total": len(results),
+            "results": results
         }
         
         # Include error message at top level for easier access
-        if not result.get("success", False):
-            return_dict["error"] = result.get("error", "Unknown error")
+        if failed:
+            result = failed[0]
+            error = result.get("error", "Unknown error")
+            if len(results) > 1:
+                error += f"\n(No file was changed: {len(failed)} of {len(results)} file patches failed)"
+            return_dict["error"] = error
             
             # Include detailed error information for better debugging
             error_details = {
                 "file_path": result.get("file_path"),
+                "hunk": result.get("hunk"),
                 "best_match_score": result.get("best_match_score"),
                 "best_match_location": result.get("best_match_location"),
                 "expected_lines_count": result.get("expected_lines_count"),
@@ -978,8 +861,8 @@ class ApplyPatchTool(MCPTool):
             if error_details:
                 return_dict["error_details"] = error_details
         
-        # Include dry_run flag if result has it
-        if dry_run or result.get("dry_run", False):
+        # Include dry_run flag
+        if dry_run:
             return_dict["dry_run"] = True
         
         # Include saved patch path if available
@@ -987,4 +870,3 @@ class ApplyPatchTool(MCPTool):
             return_dict["saved_patch_path"] = saved_patch_path
         
         return return_dict
-
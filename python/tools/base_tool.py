@@ -7,6 +7,8 @@ All tools should inherit from this base class to conform to MCP (Model Context P
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
+from tools.tool_context import ToolContext
+
 
 class MCPTool(ABC):
     """
@@ -54,11 +56,13 @@ class MCPTool(ABC):
         pass
     
     @abstractmethod
-    async def execute(self, **kwargs) -> Dict[str, Any]:
+    async def execute(self, context: Optional[ToolContext] = None, **kwargs) -> Dict[str, Any]:
         """
         Execute the tool with given arguments.
         
         Args:
+            context: State of the calling agent (workspace, session, handles).
+                     None when the tool is called directly.
             **kwargs: Tool-specific arguments
         
         Returns:
@@ -66,6 +70,83 @@ class MCPTool(ABC):
         """
         pass
 
+    def resolve_workspace(self, context: Optional[ToolContext] = None) -> Optional[str]:
+        """
+        Workspace of the calling agent, falling back to the one set with set_workspace_dir.
+        
+        Args:
+            context: Tool context of the calling agent
+        
+        Returns:
+            Workspace directory or None
+        """
+        if context is not None and context.workspace_dir:
+            return context.workspace_dir
+        return getattr(self, "workspace_dir", None)
+
+    @property
+    def default_timeout(self) -> Optional[float]:
+        """
+        Deadline in seconds enforced by execute_tool, None for no deadline.
+        Can be overridden with TOOL_TIMEOUT_<TOOL_NAME>.
+
+        Returns:
+            Timeout in seconds (default: 120)
+        """
+        return 120.0
+
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        """
+        Maximum number of concurrent calls across all agents, None for no limit.
+        Can be overridden with TOOL_CONCURRENCY_<TOOL_NAME>.
+
+        Returns:
+            Concurrency limit (default: None)
+        """
+        return None
+
+    def get_timeout(self, tool_args: Dict[str, Any]) -> Optional[float]:
+        """Deadline of one call; tools with a timeout argument extend it."""
+        return self.default_timeout
+
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        """
+        Key of a read-only call whose result may be reused by execute_tool.
+        It must cover everything the result depends on: the arguments plus a
+        fingerprint of the files read (content hash, or the cache generation
+        for results that depend on the whole workspace).
+
+        Args:
+            tool_args: Tool arguments
+            context: Tool context of the calling agent
+
+        Returns:
+            JSON-serializable key, or None if the call must run (default)
+        """
+        return None
+
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        """Seconds a cached result stays valid, None for no expiry (default: None)."""
+        return None
+
+    def invalidates_cache(self, tool_args: Dict[str, Any]) -> bool:
+        """
+        Whether this call may modify the workspace, which drops all cached results.
+
+        Args:
+            tool_args: Tool arguments
+
+        Returns:
+            True for write calls (default: False)
+        """
+        return False
+
+    async def close(self) -> None:
+        """Release processes or connections held by the tool at shutdown (default: nothing)."""
+        return None
+
     def get_call_notification(self, tool_args: Dict[str, Any]) -> Optional[str]:
         return None
 
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Command Runner - Run shell commands with streamed, size-capped output
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from utils.logger import Logger
+
+logger = Logger('command_runner', log_to_file=False)
+
+DEFAULT_MAX_OUTPUT_BYTES = 32 * 1024
+DEFAULT_PROGRESS_INTERVAL = 2.0
+READ_CHUNK_SIZE = 64 * 1024
+PROGRESS_TAIL_BYTES = 2048
+# Spilled outputs are kept in one directory, oldest files are removed first
+SPILL_DIR = Path(tempfile.gettempdir()) / "branchcoder_command_output"
+SPILL_KEEP_FILES = 50
+KILL_GRACE_SECONDS = 5.0
+
+_POSIX = sys.platform != "win32"
+
+
+class OutputCapture:
+    """
+    Bounded capture of one output stream.
+
+    Everything is kept in memory up to `max_bytes`. Past that, the first half
+    and a rolling tail are kept, and the complete stream goes to a spill file.
+    """
+
+    def __init__(self, name: str, max_bytes: int = DEFAULT_MAX_OUTPUT_BYTES):
+        self.name = name
+        self.max_bytes = max(2, max_bytes)
+        self.total_bytes = 0
+        self.spill_path: Optional[str] = None
+        self._buffer = bytearray()
+        self._head = b""
+        self._tail = bytearray()
+        self._spill = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.spill_path is not None
+
+    def write(self, chunk: bytes) -> None:
+        self.total_bytes += len(chunk)
+        if self._spill is None:
+            self._buffer += chunk
+            if len(self._buffer) > self.max_bytes:
+                self._start_spill()
+            return
+        self._spill.write(chunk)
+        self._tail += chunk
+        tail_bytes = self.max_bytes - len(self._head)
+        if len(self._tail) > tail_bytes:
+            del self._tail[:len(self._tail) - tail_bytes]
+
+    def _start_spill(self) -> None:
+        head_bytes = self.max_bytes // 2
+        self._head = bytes(self._buffer[:head_bytes])
+        self._tail = bytearray(self._buffer[-(self.max_bytes - head_bytes):])
+        try:
+            SPILL_DIR.mkdir(parents=True, exist_ok=True)
+            _prune_spill_dir()
+            self._spill = tempfile.NamedTemporaryFile(
+                mode='wb', prefix=f"{self.name}_", suffix=".log", dir=SPILL_DIR, delete=False
+            )
+            self._spill.write(self._buffer)
+            self.spill_path = self._spill.name
+        except OSError as e:
+            # Keep head and tail even if the full output cannot be saved
+            logger.warning(f"Failed to spill command output: {e}")
+            self._spill = open(os.devnull, 'wb')
+            self.spill_path = ""
+        self._buffer = bytearray()
+
+    def recent(self, max_bytes: int = PROGRESS_TAIL_BYTES) -> str:
+        data = self._tail if self._spill is not None else self._buffer
+        return bytes(data[-max_bytes:]).decode('utf-8', errors='replace')
+
+    def text(self) -> str:
+        """Captured output, with a marker in place of the omitted middle part."""
+        if self._spill is None:
+            return self._buffer.decode('utf-8', errors='replace')
+        omitted = self.total_bytes - len(self._head) - len(self._tail)
+        where = f"full output in {self.spill_path}" if self.spill_path else "full output was not saved"
+        marker = f"\n... [{omitted} bytes omitted, {where}] ...\n"
+        return self._head.decode('utf-8', errors='replace') + marker + self._tail.decode('utf-8', errors='replace')
+
+    def close(self) -> None:
+        if self._spill is not None and not self._spill.closed:
+            self._spill.close()
+
+
+@dataclass
+class CommandResult:
+    returncode: Optional[int]
+    stdout: OutputCapture
+    stderr: OutputCapture
+    timed_out: bool
+    elapsed: float
+
+
+def _prune_spill_dir() -> None:
+    try:
+        files = sorted(SPILL_DIR.glob("*.log"), key=lambda path: path.stat().st_mtime)
+    except OSError:
+        return
+    for path in files[:max(0, len(files) - SPILL_KEEP_FILES + 1)]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def is_spill_path(path: Path) -> bool:
+    """Whether a path is a spilled output file, which agents may read to page through it."""
+    try:
+        path.resolve().relative_to(SPILL_DIR.resolve())
+        return True
+    except ValueError:
+        return False
+
+
+def retrieve_exception(future: "asyncio.Future") -> None:
+    """Done callback that marks the error of an abandoned future as handled."""
+    if not future.cancelled():
+        future.exception()
+
+
+def kill_process_group(process: asyncio.subprocess.Process) -> None:
+    """Kill the shell and every process it started."""
+    try:
+        if _POSIX:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _pump(stream: Optional[asyncio.StreamReader], capture: OutputCapture) -> None:
+    if stream is None:
+        return
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        capture.write(chunk)
+
+
+async def wait_with_progress(
+    done: "asyncio.Future",
+    stdout: OutputCapture,
+    stderr: OutputCapture,
+    timeout: float,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+) -> bool:
+    """
+    Wait for a command to finish, reporting progress while new output arrives.
+
+    Args:
+        done: Future that completes when the command and its output streams are done
+        stdout: Capture of the command's stdout
+        stderr: Capture of the command's stderr
+        timeout: Seconds to wait
+        on_progress: Called every `progress_interval` seconds while new output arrives
+        progress_interval: Seconds between progress reports
+
+    Returns:
+        True if the timeout expired first
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    reported_bytes = 0
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return True
+        wait = min(progress_interval, remaining) if on_progress else remaining
+        finished, _ = await asyncio.wait({done}, timeout=wait)
+        if finished:
+            done.result()
+            return False
+        received = stdout.total_bytes + stderr.total_bytes
+        if on_progress and received > reported_bytes:
+            reported_bytes = received
+            on_progress({
+                "elapsed": round(loop.time() - started, 1),
+                "stdout_bytes": stdout.total_bytes,
+                "stderr_bytes": stderr.total_bytes,
+                "recent_output": stdout.recent() or stderr.recent(),
+            })
+
+
+async def run_command(
+    command: str,
+    cwd: Optional[str],
+    timeout: float,
+    max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+) -> CommandResult:
+    """
+    Run a shell command, reading its output as it is produced.
+
+    The command runs in its own process group, which is killed on timeout or
+    cancellation so background children do not outlive the call. A shell that
+    exited in time while a background child kept its output open is not
+    reported as timed out.
+
+    Args:
+        command: Shell command
+        cwd: Working directory
+        timeout: Seconds before the command is killed
+        max_output_bytes: Bytes of each stream kept in memory (see OutputCapture)
+        on_progress: Called every `progress_interval` seconds while new output arrives
+        progress_interval: Seconds between progress reports
+
+    Returns:
+        CommandResult; returncode is None if the shell was killed
+    """
+    started = time.perf_counter()
+    process = await asyncio.create_subprocess_shell(
+        command,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=_POSIX,
+    )
+    stdout = OutputCapture("stdout", max_output_bytes)
+    stderr = OutputCapture("stderr", max_output_bytes)
+    done = asyncio.ensure_future(asyncio.gather(
+        _pump(process.stdout, stdout),
+        _pump(process.stderr, stderr),
+        process.wait(),
+    ))
+    done.add_done_callback(retrieve_exception)
+    timed_out = False
+    shell_exited = False
+    try:
+        timed_out = await wait_with_progress(done, stdout, stderr, timeout, on_progress, progress_interval)
+    finally:
+        if not done.done():
+            # The shell may have exited already while a background child holds
+            # its output open; the group is killed either way
+            shell_exited = process.returncode is not None
+            kill_process_group(process)
+            try:
+                await asyncio.wait_for(asyncio.shield(done), KILL_GRACE_SECONDS)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                done.cancel()
+        stdout.close()
+        stderr.close()
+
+    timed_out = timed_out and not shell_exited
+    return CommandResult(
+        returncode=None if timed_out else process.returncode,
+        stdout=stdout,
+        stderr=stderr,
+        timed_out=timed_out,
+        elapsed=time.perf_counter() - started,
+    )
@@ -3,16 +3,72 @@
 Command Tool - Execute shell commands in the workspace
 """
 
-import asyncio
 import re
 import os
+import shlex
 from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.result_cache import workspace_generation
+from tools.command_runner import DEFAULT_MAX_OUTPUT_BYTES, is_spill_path, run_command
+from tools.shell_session import DEFAULT_POOL_SIZE, ShellSessionPool
+from tools.subtask_scheduler import DEFAULT_MAX_CONCURRENCY
 
 logger = Logger('command_tool', log_to_file=False)
 
+# Commands that only read the workspace; their output may be cached until the next write
+READ_ONLY_COMMANDS = frozenset({
+    "cat", "ls", "grep", "egrep", "fgrep", "rg", "head", "tail", "wc", "find", "pwd",
+    "stat", "file", "du", "diff", "cut", "basename", "dirname",
+})
+READ_ONLY_GIT_SUBCOMMANDS = frozenset({"status", "log", "diff", "show", "ls-files", "rev-parse", "blame"})
+# Redirections and substitutions can write or run anything
+_UNSAFE_SHELL_SYNTAX = re.compile(r'[>`]|\$\(|<\(')
+_COMMAND_SEPARATORS = re.compile(r'\|\||&&|[|;&\n]')
+# Matched by prefix: -exec/-execdir, -ok/-okdir, -fprint/-fprint0/-fprintf
+_WRITING_FIND_ACTIONS = ("-exec", "-ok", "-delete", "-fprint", "-fls")
+# `git diff/log --output=FILE` writes a file, `rg --pre CMD` runs a command
+_WRITING_OPTIONS = ("--output", "--pre")
+
+
+def _is_writing_option(word: str) -> bool:
+    return any(word == option or word.startswith(option + "=") for option in _WRITING_OPTIONS)
+
+
+def is_read_only_command(command: str) -> bool:
+    """
+    Whether a shell command only reads files (e.g. `ls`, `cat a | grep b`).
+    Anything not recognized is treated as a write.
+    
+    Args:
+        command: Shell command
+    
+    Returns:
+        True if every command of the pipeline is known to be read-only
+    """
+    if not command.strip() or _UNSAFE_SHELL_SYNTAX.search(command):
+        return False
+    for segment in _COMMAND_SEPARATORS.split(command):
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            return False
+        if not words:
+            continue
+        program = os.path.basename(words[0])
+        if program == "git":
+            if len(words) < 2 or words[1] not in READ_ONLY_GIT_SUBCOMMANDS:
+                return False
+        elif program not in READ_ONLY_COMMANDS:
+            return False
+        if program == "find" and any(word.startswith(_WRITING_FIND_ACTIONS) for word in words):
+            return False
+        if any(_is_writing_option(word) for word in words[1:]):
+            return False
+    return True
+
 
 class CommandTool(MCPTool):
     """Tool for executing shell commands."""
@@ -20,6 +76,31 @@ class CommandTool(MCPTool):
     def __init__(self):
         """Initialize command tool."""
         self.workspace_dir: Optional[str] = None
+        # Bytes of stdout/stderr kept in the result; the rest is spilled to a file
+        try:
+            self.max_output_bytes = int(os.getenv("COMMAND_MAX_OUTPUT_BYTES", str(DEFAULT_MAX_OUTPUT_BYTES)))
+        except ValueError:
+            self.max_output_bytes = DEFAULT_MAX_OUTPUT_BYTES
+        # Optional persistent shell per agent, so cd/export/venv activation carry over between calls
+        self.use_sessions = (
+            os.getenv("COMMAND_SHELL_SESSIONS", "false").lower() in ("true", "1", "yes", "on")
+            and ShellSessionPool.available()
+        )
+        # By default one session per parallel sub-agent plus the parent, so running agents keep theirs
+        try:
+            parallel = int(os.getenv("PARALLEL_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY)))
+        except ValueError:
+            parallel = DEFAULT_MAX_CONCURRENCY
+        default_pool_size = max(DEFAULT_POOL_SIZE, parallel + 1)
+        try:
+            pool_size = int(os.getenv("COMMAND_SHELL_POOL_SIZE", str(default_pool_size)))
+        except ValueError:
+            pool_size = default_pool_size
+        self.session_pool = ShellSessionPool(pool_size)
+    
+    async def close(self) -> None:
+        """Kill and reap the persistent shell sessions."""
+        await self.session_pool.close_all()
     
     def set_workspace_dir(self, workspace_dir: str):
         """
@@ -34,22 +115,24 @@ class CommandTool(MCPTool):
         self.workspace_dir = workspace_dir
         logger.info(f"Setting workspace directory for command tool: {workspace_dir}")
     
-    def _validate_path_safety(self, command: str) -> Tuple[bool, Optional[str]]:
+    def _validate_path_safety(self, command: str, workspace_dir: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
         Validate that command doesn't attempt to escape workspace directory.
         
         Args:
             command: The command to validate
+            workspace_dir: Workspace boundary (defaults to the tool's workspace directory)
         
         Returns:
             Tuple of (is_safe, error_message)
         """
-        if not self.workspace_dir:
+        workspace_dir = workspace_dir or self.workspace_dir
+        if not workspace_dir:
             return False, "Workspace directory not set. Cannot execute commands without workspace boundary."
         
-        workspace_path = Path(self.workspace_dir).resolve()
+        workspace_path = Path(workspace_dir).resolve()
         if not workspace_path.exists() or not workspace_path.is_dir():
-            return False, f"Workspace directory does not exist or is not a directory: {self.workspace_dir}"
+            return False, f"Workspace directory does not exist or is not a directory: {workspace_dir}"
         
         # Patterns that indicate path traversal attempts
         # More specific patterns to avoid false positives
@@ -98,6 +181,9 @@ class CommandTool(MCPTool):
                 if os.path.isabs(path_str):
                     # Absolute path - check if it's within workspace
                     abs_path = Path(path_str).resolve()
+                    if is_spill_path(abs_path):
+                        # Spilled output of an earlier command
+                        continue
                     try:
                         abs_path.relative_to(workspace_path)
                     except ValueError:
@@ -120,6 +206,14 @@ class CommandTool(MCPTool):
         """Tool name."""
         return "execute_command"
     
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return 8
+    
+    def get_timeout(self, tool_args: Dict[str, Any]) -> Optional[float]:
+        # The command enforces its own timeout; leave it time to report it
+        return float(tool_args.get("timeout", 30)) + 10.0
+    
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get the tool definition for LLM function calling."""
         return {
@@ -138,6 +232,11 @@ class CommandTool(MCPTool):
                             "type": "integer",
                             "description": "Timeout in seconds (default: 30)",
                             "default": 30
+                        },
+                        "reset_session": {
+                            "type": "boolean",
+                            "description": "Start a fresh shell before running the command, discarding the working directory and environment left by earlier commands (default: false). Only relevant when persistent shell sessions are enabled.",
+                            "default": False
                         }
                     },
                     "required": ["command"]
@@ -171,7 +270,6 @@ class CommandTool(MCPTool):
             Custom notification message string
         """
         success = tool_result.get("success", False)
-        command = tool_result.get("command", "")
         returncode = tool_result.get("returncode", -1)
         
         if success:
@@ -180,21 +278,53 @@ class CommandTool(MCPTool):
             error = tool_result.get("error", "Unknown error")
             return f"Command execution failed: {error}"
     
-    async def execute(self, command: str, timeout: int = 30) -> Dict[str, Any]:
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        """Only read-only commands are cached, until the next write in the workspace."""
+        command = tool_args.get("command", "")
+        if not is_read_only_command(command):
+            return None
+        if tool_args.get("reset_session"):
+            return None
+        return {
+            "workspace_dir": self.resolve_workspace(context),
+            # With persistent sessions the output depends on the agent's shell state
+            "session": self._session_key(context) if self.use_sessions else None,
+            "generation": workspace_generation(),
+            "command": command,
+            "timeout": tool_args.get("timeout", 30),
+        }
+    
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        # Bounds staleness from edits made outside the agent (editor, git)
+        return 30.0
+    
+    def invalidates_cache(self, tool_args: Dict[str, Any]) -> bool:
+        return not is_read_only_command(tool_args.get("command", ""))
+    
+    @staticmethod
+    def _session_key(context: Optional[ToolContext]) -> str:
+        return (context.session_id if context is not None else None) or "default"
+    
+    async def execute(self, command: str, timeout: int = 30, reset_session: bool = False,
+                      context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Execute a shell command.
         
         Args:
             command: The command to execute
             timeout: Timeout in seconds
+            reset_session: Start a fresh persistent shell first (see COMMAND_SHELL_SESSIONS)
+            context: Tool context of the calling agent
         
         Returns:
             Dictionary with stdout, stderr, returncode, and success status
         """
         logger.info(f"Executing command: {command}")
+        workspace_dir = self.resolve_workspace(context)
         
         # Validate path safety - ensure command stays within workspace
-        is_safe, error_msg = self._validate_path_safety(command)
+        is_safe, error_msg = self._validate_path_safety(command, workspace_dir)
         if not is_safe:
             logger.warning(f"Command blocked by path fence: {error_msg}")
             return {
@@ -205,16 +335,16 @@ class CommandTool(MCPTool):
         
         # Determine working directory
         cwd = None
-        if self.workspace_dir:
-            workspace_path = Path(self.workspace_dir)
+        if workspace_dir:
+            workspace_path = Path(workspace_dir)
             if workspace_path.exists() and workspace_path.is_dir():
                 cwd = str(workspace_path.resolve())
                 logger.debug(f"Using workspace directory as cwd: {cwd}")
             else:
-                logger.warning(f"Workspace directory does not exist or is not a directory: {self.workspace_dir}")
+                logger.warning(f"Workspace directory does not exist or is not a directory: {workspace_dir}")
                 return {
                     "success": False,
-                    "error": f"Workspace directory does not exist or is not a directory: {self.workspace_dir}",
+                    "error": f"Workspace directory does not exist or is not a directory: {workspace_dir}",
                     "command": command
                 }
         else:
@@ -226,44 +356,69 @@ class CommandTool(MCPTool):
                 "command": command
             }
         
+        def on_progress(update: Dict[str, Any]) -> None:
+            output_bytes = update["stdout_bytes"] + update["stderr_bytes"]
+            update["message"] = f"Command running ({update['elapsed']}s, {output_bytes} bytes of output)"
+            update["command"] = command
+            context.report_progress(update)
+        
         try:
-            # Run command asynchronously
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                shell=True,
-                cwd=cwd  # Set working directory to workspace_dir if available
-            )
-            
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
+            if self.use_sessions:
+                session_key = self._session_key(context)
+                if reset_session:
+                    await self.session_pool.reset(session_key, cwd)
+                evicted = self.session_pool.was_evicted(session_key, cwd)
+                session = await self.session_pool.get(session_key, cwd)
+                result = await session.run(
+                    command,
+                    timeout=timeout,
+                    max_output_bytes=self.max_output_bytes,
+                    on_progress=on_progress if context is not None else None,
                 )
-                
-                stdout_str = stdout.decode('utf-8', errors='replace')
-                stderr_str = stderr.decode('utf-8', errors='replace')
-                returncode = process.returncode
-                
-                logger.info(f"Command completed with return code: {returncode}")
-                
-                return {
-                    "success": returncode == 0,
-                    "stdout": stdout_str,
-                    "stderr": stderr_str,
-                    "returncode": returncode,
-                    "command": command
-                }
-            except asyncio.TimeoutError:
-                process.kill()
-                await process.wait()
+            else:
+                result = await run_command(
+                    command,
+                    cwd=cwd,
+                    timeout=timeout,
+                    max_output_bytes=self.max_output_bytes,
+                    on_progress=on_progress if context is not None else None,
+                )
+            output = {
+                "stdout": result.stdout.text(),
+                "stderr": result.stderr.text(),
+                "command": command,
+            }
+            for capture in (result.stdout, result.stderr):
+                if capture.truncated:
+                    output[f"{capture.name}_truncated"] = True
+                    output[f"{capture.name}_bytes"] = capture.total_bytes
+                    if capture.spill_path:
+                        output[f"{capture.name}_file"] = capture.spill_path
+            if any(capture.spill_path for capture in (result.stdout, result.stderr)):
+                output["note"] = "Output was truncated. Page through the full output with: sed -n 'START,ENDp' <file>"
+            if self.use_sessions and not session.alive:
+                output["session_reset"] = True
+            elif self.use_sessions and evicted:
+                output["session_reset"] = True
+                output["session_note"] = (
+                    "Your shell session was closed while idle; this command ran in a new shell in the workspace "
+                    "root. Re-run cd, export and venv activation if you need them."
+                )
+            
+            if result.timed_out:
                 logger.warning(f"Command timed out after {timeout} seconds")
                 return {
                     "success": False,
                     "error": f"Command timed out after {timeout} seconds",
-                    "command": command
+                    **output
                 }
+            
+            logger.info(f"Command completed with return code: {result.returncode}")
+            return {
+                "success": result.returncode == 0,
+                "returncode": result.returncode,
+                **output
+            }
         except Exception as e:
             logger.error(f"Error executing command: {e}", exc_info=True)
             return {
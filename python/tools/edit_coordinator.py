@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Edit Coordinator - Copy-on-write workspace overlays and three-way merge for parallel sub-agents
+"""
+
+import difflib
+import os
+import shutil
+import tempfile
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from utils.logger import Logger
+
+logger = Logger('edit_coordinator', log_to_file=False)
+
+_current_overlay: ContextVar[Optional["WorkspaceOverlay"]] = ContextVar("workspace_overlay", default=None)
+
+
+def _key(path) -> str:
+    return str(Path(path).resolve())
+
+
+def _read_disk(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_disk(path: str, content: str) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = f"{path}.merge.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+def current_overlay() -> Optional["WorkspaceOverlay"]:
+    """Overlay of the sub-agent running in the current task, if any."""
+    return _current_overlay.get()
+
+
+def file_exists(path) -> bool:
+    overlay = current_overlay()
+    if overlay is not None and overlay.has(path):
+        return True
+    return Path(path).exists()
+
+
+def read_file(path) -> str:
+    """Read a text file through the current overlay (plain disk read outside sub-agents)."""
+    overlay = current_overlay()
+    if overlay is not None:
+        return overlay.read(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def write_file(path, content: str) -> None:
+    """Write a text file through the current overlay (plain disk write outside sub-agents)."""
+    overlay = current_overlay()
+    if overlay is not None:
+        overlay.write(path, content)
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def _stage_disk(path: str, content: str) -> str:
+    """Write content to a temporary file next to `path`, with the mode of `path` if it exists."""
+    directory, name = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory or ".")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, temp_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path
+
+
+def write_files(contents: Dict[str, str]) -> None:
+    """
+    Write several text files through the current overlay, all or nothing.
+
+    On disk every file is first written to a temporary file in its directory;
+    the temporary files replace the originals only once all of them are written.
+    """
+    overlay = current_overlay()
+    if overlay is not None:
+        for path, content in contents.items():
+            overlay.write(path, content)
+        return
+    staged: List[Tuple[str, str]] = []
+    try:
+        for path, content in contents.items():
+            staged.append((_stage_disk(str(path), content), str(path)))
+    except BaseException:
+        for temp_path, _ in staged:
+            os.unlink(temp_path)
+        raise
+    for temp_path, path in staged:
+        os.replace(temp_path, path)
+
+
+class Hunk(NamedTuple):
+    """Replacement of base lines [start, end) by `lines`, made by `side`."""
+    start: int
+    end: int
+    lines: Tuple[str, ...]
+    side: str
+
+
+def _hunks(base: List[str], other: List[str], side: str) -> List[Hunk]:
+    matcher = difflib.SequenceMatcher(None, base, other, autojunk=False)
+    return [
+        Hunk(i1, i2, tuple(other[j1:j2]), side)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def merge3(base: str, ours: str, theirs: str) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Line-based three-way merge.
+
+    Changes from both sides are combined when they touch disjoint base lines.
+    Identical changes made by both sides are applied once.
+
+    Args:
+        base: Common ancestor
+        ours: Current content
+        theirs: Content to merge in
+
+    Returns:
+        (merged content, conflicting base line ranges as 1-based (first, last)).
+        On conflict the merged content is `ours`.
+    """
+    if ours == theirs or theirs == base:
+        return ours, []
+    if ours == base:
+        return theirs, []
+
+    base_lines = base.splitlines(keepends=True)
+    hunks = sorted(
+        _hunks(base_lines, ours.splitlines(keepends=True), "ours")
+        + _hunks(base_lines, theirs.splitlines(keepends=True), "theirs"),
+        key=lambda hunk: (hunk.start, hunk.end),
+    )
+
+    merged: List[Hunk] = []
+    conflicts: List[Tuple[int, int]] = []
+    for hunk in hunks:
+        previous = merged[-1] if merged else None
+        if previous is not None and previous.side != hunk.side:
+            if previous[:3] == hunk[:3]:
+                continue
+            overlaps = hunk.start < previous.end
+            # Two insertions (or an insertion and a replacement) at the same line have no defined order
+            same_anchor = hunk.start == previous.start and (hunk.start == hunk.end or previous.start == previous.end)
+            if overlaps or same_anchor:
+                conflicts.append((previous.start + 1, max(previous.end, hunk.end)))
+                continue
+        merged.append(hunk)
+
+    if conflicts:
+        return ours, conflicts
+
+    result: List[str] = []
+    position = 0
+    for hunk in merged:
+        result.extend(base_lines[position:hunk.start])
+        result.extend(hunk.lines)
+        position = hunk.end
+    result.extend(base_lines[position:])
+    return "".join(result), []
+
+
+class WorkspaceOverlay:
+    """Private copy-on-write view of the workspace for one sub-agent."""
+
+    def __init__(self, coordinator: "EditCoordinator", owner: int):
+        self.coordinator = coordinator
+        self.owner = owner
+        self.files: Dict[str, str] = {}
+
+    def has(self, path) -> bool:
+        return _key(path) in self.files
+
+    def read(self, path) -> str:
+        key = _key(path)
+        if key in self.files:
+            return self.files[key]
+        content = self.coordinator.base(key)
+        if content is None:
+            raise FileNotFoundError(f"No such file: {path}")
+        return content
+
+    def write(self, path, content: str) -> None:
+        key = _key(path)
+        self.coordinator.base(key)
+        self.files[key] = content
+        self.coordinator.note_write(self.owner, key)
+
+
+class EditCoordinator:
+    """
+    Gives every sub-agent of a parallel run its own WorkspaceOverlay and merges
+    the overlays into the workspace when the sub-agents have finished.
+
+    Base snapshots are taken the first time any sub-agent touches a file, so all
+    overlays of a file share the same ancestor for the three-way merge.
+    """
+
+    def __init__(self):
+        self.overlays: Dict[int, WorkspaceOverlay] = {}
+        self._bases: Dict[str, Optional[str]] = {}
+        self._writers: Dict[str, List[int]] = {}
+
+    def overlay(self, owner: int) -> WorkspaceOverlay:
+        if owner not in self.overlays:
+            self.overlays[owner] = WorkspaceOverlay(self, owner)
+        return self.overlays[owner]
+
+    def activate(self, owner: int) -> None:
+        """Route file tools of the current task (and tasks it spawns) through `owner`'s overlay."""
+        _current_overlay.set(self.overlay(owner))
+
+    def base(self, key: str) -> Optional[str]:
+        if key not in self._bases:
+            self._bases[key] = _read_disk(key)
+        return self._bases[key]
+
+    def note_write(self, owner: int, key: str) -> None:
+        writers = self._writers.setdefault(key, [])
+        if owner not in writers:
+            writers.append(owner)
+            if len(writers) > 1:
+                logger.info(f"Sub-agents {[w + 1 for w in writers]} are editing {key} concurrently")
+
+    def merge(self, order: List[int]) -> Dict[int, Dict[str, List[Tuple[int, int]]]]:
+        """
+        Merge overlays into the workspace in `order`.
+
+        An overlay is applied all-or-nothing: if any of its files conflicts with
+        edits already merged, none of its edits are written. A file that existed
+        when the sub-agents first read it but is gone from disk is a delete/modify
+        conflict covering the whole file; it is not recreated.
+
+        Args:
+            order: Overlay owners in merge order
+
+        Returns:
+            Mapping owner -> {file path: conflicting line ranges} for rejected overlays
+        """
+        # Start from the current disk state so edits made outside the overlays are kept
+        merged: Dict[str, Optional[str]] = {}
+        rejected: Dict[int, Dict[str, List[Tuple[int, int]]]] = {}
+
+        for owner in order:
+            overlay = self.overlays.get(owner)
+            if overlay is None or not overlay.files:
+                continue
+
+            staged: Dict[str, str] = {}
+            conflicts: Dict[str, List[Tuple[int, int]]] = {}
+            for key, content in overlay.files.items():
+                if key not in merged:
+                    merged[key] = _read_disk(key)
+                base = self._bases.get(key)
+                if merged[key] is None and base is not None:
+                    conflicts[key] = [(1, max(1, len(base.splitlines())))]
+                    logger.warning(f"{key} was deleted while sub-agent {owner + 1} modified it")
+                    continue
+                result, ranges = merge3(base or "", merged[key] or "", content)
+                if ranges:
+                    conflicts[key] = ranges
+                else:
+                    staged[key] = result
+
+            if conflicts:
+                logger.warning(f"Edits of sub-agent {owner + 1} conflict in {list(conflicts)}, not merged")
+                rejected[owner] = conflicts
+            else:
+                merged.update(staged)
+
+        for key, content in merged.items():
+            if content is not None and content != _read_disk(key):
+                _write_disk(key, content)
+                logger.info(f"Merged parallel edits into {key}")
+        return rejected
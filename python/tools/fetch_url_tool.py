@@ -3,13 +3,18 @@
 Fetch URL Tool - Fetch and extract text content from a webpage
 """
 
+import importlib.util
 import re
 from typing import Dict, Any, Optional
 
-import aiohttp
 from bs4 import BeautifulSoup
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.http_client import HttpClient, get_http_client
+from tools.tool_context import ToolContext
+
+# lxml parses much faster when it is installed
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
 
 logger = Logger('fetch_url_tool', log_to_file=False)
 
@@ -22,9 +27,26 @@ class FetchUrlTool(MCPTool):
         """Tool name."""
         return "fetch_url"
     
-    def __init__(self):
-        """Initialize fetch URL tool."""
-        pass
+    @property
+    def default_timeout(self) -> Optional[float]:
+        return 30.0
+    
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return 8
+    
+    def __init__(self, client: Optional[HttpClient] = None):
+        """
+        Initialize fetch URL tool.
+        
+        Args:
+            client: HTTP client to use (defaults to the process-wide one)
+        """
+        self._client = client
+    
+    @property
+    def client(self) -> HttpClient:
+        return self._client or get_http_client()
     
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get the tool definition for LLM function calling."""
@@ -86,7 +108,14 @@ class FetchUrlTool(MCPTool):
         else:
             return "Webpage content fetch completed, but content is empty"
     
-    async def execute(self, url: str, max_chars: int = 8000) -> Dict[str, Any]:
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        return {"url": tool_args.get("url"), "max_chars": tool_args.get("max_chars", 8000)}
+    
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        return 300.0
+    
+    async def execute(self, url: str, max_chars: int = 8000, context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Fetch and extract text content from a webpage.
         
@@ -99,30 +128,24 @@ class FetchUrlTool(MCPTool):
         """
         logger.info(f"Fetching URL: {url}")
         
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/123.0.0.0 Safari/537.36"
-            )
-        }
-        
         try:
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as session:
-                async with session.get(url, allow_redirects=True) as resp:
-                    if resp.status != 200:
-                        logger.warning(f"HTTP {resp.status} for URL: {url}")
-                        return {"url": url, "error": f"HTTP {resp.status}"}
-                    
-                    html = await resp.text(errors="ignore")
-        
+            response = await self.client.fetch(url, timeout=15)
         except Exception as e:
             logger.error(f"Request failed for URL {url}: {e}", exc_info=True)
             return {"url": url, "error": f"Request failed: {e}"}
         
+        if response.status != 200:
+            logger.warning(f"HTTP {response.status} for URL: {url}")
+            return {"url": url, "error": f"HTTP {response.status}"}
+        if response.cache:
+            logger.info(f"Served from HTTP cache ({response.cache}): {url}")
+        if response.truncated:
+            logger.info(f"Body truncated at {len(response.body)} bytes: {url}")
+        html = response.text()
+        
         # Parse HTML and extract text content
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            soup = BeautifulSoup(html, HTML_PARSER)
             
             # Remove script, style, and navigation elements
             for tag in soup(["script", "style", "noscript", "header", "footer", "nav", "aside"]):
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+HTTP Client - Shared aiohttp session and on-disk HTTP cache for the web tools
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional
+
+import aiohttp
+
+from utils.logger import Logger
+
+logger = Logger('http_client', log_to_file=False)
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/123.0.0.0 Safari/537.36"
+)
+# Connection pool limits (total and per host)
+DEFAULT_POOL_LIMIT = 32
+DEFAULT_POOL_LIMIT_PER_HOST = 6
+# Bodies are truncated at this many bytes while they are streamed
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_CACHE_TTL = 600.0
+DEFAULT_CACHE_ENTRIES = 512
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_project_root = Path(__file__).parent.parent.parent
+DEFAULT_CACHE_DIR = _project_root / "logs" / "http_cache"
+
+
+@dataclass
+class FetchedResponse:
+    """
+    Response body and the headers needed to revalidate it.
+
+    `cache` is None for a network response, "fresh" for a cache hit within its TTL
+    and "revalidated" when the server answered 304 Not Modified.
+    """
+    url: str
+    status: int
+    body: bytes = b""
+    charset: Optional[str] = None
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    max_age: Optional[float] = None
+    truncated: bool = False
+    stored_at: float = 0.0
+    cache: Optional[str] = None
+
+    def text(self) -> str:
+        return self.body.decode(self.charset or "utf-8", errors="ignore")
+
+
+def _max_age(cache_control: str) -> Optional[float]:
+    """Freshness lifetime from a Cache-Control header: 0 for no-cache, None if not given."""
+    if "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return float(match.group(1)) if match else None
+
+
+class HttpCache:
+    """
+    On-disk store of response bodies, one metadata/body file pair per URL.
+
+    Entries are used without a request while younger than their TTL (the
+    server's max-age if it sent one, else `ttl`). Older entries are
+    revalidated with If-None-Match / If-Modified-Since.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_CACHE_TTL,
+                 max_entries: int = DEFAULT_CACHE_ENTRIES):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+
+    def _paths(self, url: str):
+        name = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{name}.json", self.directory / f"{name}.body"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def get(self, url: str) -> Optional[FetchedResponse]:
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url:
+            return None
+        meta.pop("body", None)
+        return FetchedResponse(body=body, **meta)
+
+    def is_fresh(self, response: FetchedResponse) -> bool:
+        ttl = self.ttl if response.max_age is None else min(self.ttl, response.max_age)
+        return time.time() - response.stored_at < ttl
+
+    def put(self, response: FetchedResponse, with_body: bool = True) -> None:
+        """
+        Store a response, with its stored_at set to now.
+
+        Args:
+            response: Response to store
+            with_body: False to only refresh the metadata of a revalidated entry
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path, body_path = self._paths(response.url)
+        meta = asdict(replace(response, body=b"", stored_at=time.time(), cache=None))
+        meta.pop("body")
+        # Body first: a metadata file always has its body
+        if with_body:
+            self._write(body_path, response.body)
+        self._write(meta_path, json.dumps(meta).encode("utf-8"))
+        self._evict()
+
+    def _evict(self) -> None:
+        try:
+            entries = sorted(self.directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        except OSError:
+            return
+        for meta_path in entries[:max(0, len(entries) - self.max_entries)]:
+            for path in (meta_path, meta_path.with_suffix(".body")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def clear(self) -> None:
+        for pattern in ("*.json", "*.body"):
+            for path in self.directory.glob(pattern):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+class HttpClient:
+    """
+    Process-wide aiohttp session with a keep-alive connection pool and an HTTP cache.
+
+    The session belongs to the event loop it was created on; a client used
+    from another loop opens a new session.
+    """
+
+    def __init__(self, pool_limit: int = DEFAULT_POOL_LIMIT, pool_limit_per_host: int = DEFAULT_POOL_LIMIT_PER_HOST,
+                 max_bytes: int = DEFAULT_MAX_BYTES, cache: Optional[HttpCache] = None,
+                 user_agent: str = DEFAULT_USER_AGENT):
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.max_bytes = max_bytes
+        self.cache = cache
+        self.user_agent = user_agent
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        def env_number(name: str, default, cast=int):
+            try:
+                return cast(os.getenv(name, str(default)))
+            except ValueError:
+                return default
+
+        cache = None
+        if os.getenv("FETCH_CACHE", "true").lower() in ("true", "1", "yes", "on"):
+            cache = HttpCache(
+                directory=Path(os.getenv("FETCH_CACHE_DIR", str(DEFAULT_CACHE_DIR))),
+                ttl=env_number("FETCH_CACHE_TTL", DEFAULT_CACHE_TTL, float),
+                max_entries=env_number("FETCH_CACHE_ENTRIES", DEFAULT_CACHE_ENTRIES),
+            )
+        return cls(
+            pool_limit=env_number("FETCH_POOL_LIMIT", DEFAULT_POOL_LIMIT),
+            pool_limit_per_host=env_number("FETCH_POOL_LIMIT_PER_HOST", DEFAULT_POOL_LIMIT_PER_HOST),
+            max_bytes=env_number("FETCH_MAX_BYTES", DEFAULT_MAX_BYTES),
+            cache=cache,
+        )
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": self.user_agent})
+            self._loop = loop
+        return self._session
+
+    async def _read_capped(self, resp: aiohttp.ClientResponse, max_bytes: int):
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= max_bytes:
+                # Stop downloading; the rest of the body is never read
+                return b"".join(chunks)[:max_bytes], size > max_bytes or not resp.content.at_eof()
+        return b"".join(chunks), False
+
+    async def fetch(self, url: str, timeout: float = 15.0, max_bytes: Optional[int] = None) -> FetchedResponse:
+        """
+        GET a URL through the cache.
+
+        Args:
+            url: URL to fetch
+            timeout: Total request timeout in seconds
+            max_bytes: Body size cap (defaults to the client's max_bytes)
+
+        Returns:
+            FetchedResponse; non-200 responses are returned, not raised
+        """
+        max_bytes = max_bytes or self.max_bytes
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        if cached is not None and self.cache.is_fresh(cached):
+            logger.debug(f"HTTP cache hit: {url}")
+            return replace(cached, cache="fresh")
+
+        headers: Dict[str, str] = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        async with self.session.get(url, headers=headers, allow_redirects=True,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            if resp.status == 304 and cached is not None:
+                logger.debug(f"HTTP cache revalidated: {url}")
+                await asyncio.to_thread(self.cache.put, cached, False)
+                return replace(cached, cache="revalidated")
+            if resp.status != 200:
+                return FetchedResponse(url=url, status=resp.status)
+            body, truncated = await self._read_capped(resp, max_bytes)
+            cache_control = resp.headers.get("Cache-Control", "")
+            response = FetchedResponse(
+                url=url,
+                status=resp.status,
+                body=body,
+                charset=resp.charset,
+                content_type=resp.content_type,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+                max_age=_max_age(cache_control),
+                truncated=truncated,
+            )
+
+        if self.cache is not None and "no-store" not in cache_control:
+            try:
+                await asyncio.to_thread(self.cache.put, response)
+            except OSError as e:
+                logger.warning(f"Failed to cache response for {url}: {e}")
+        return response
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: Optional[HttpClient] = None
+
+
+def get_http_client() -> HttpClient:
+    """Process-wide HTTP client shared by all web tool calls."""
+    global _client
+    if _client is None:
+        _client = HttpClient.from_env()
+    return _client
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Hunk Locator - Find where a patch hunk applies in a file using a line index
+"""
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# A hunk line occurring at most this often in the file is used as an anchor
+RARE_LINE_MAX = 4
+# Anchors used when the hunk has no rare line
+MIN_ANCHORS = 3
+# Fuzzy candidates (with the most anchor votes) that are scored line by line
+MAX_FUZZY_CANDIDATES = 32
+
+
+def _loose(line: str) -> str:
+    """Line key that ignores differences in whitespace."""
+    return " ".join(line.split())
+
+
+@dataclass
+class HunkMatch:
+    """Best location of a hunk: `start` is the 0-based first line, -1 if nothing matched."""
+    start: int
+    score: float
+    tier: Optional[str]
+
+
+class LineIndex:
+    """
+    Positions of every line of a file, built once and reused for all hunks.
+
+    The whitespace-insensitive index is only built when a hunk needs it.
+    """
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self._exact = self._build(lines)
+        self._loose_lines: Optional[List[str]] = None
+        self._loose: Optional[Dict[str, List[int]]] = None
+
+    @staticmethod
+    def _build(lines: List[str]) -> Dict[str, List[int]]:
+        index: Dict[str, List[int]] = defaultdict(list)
+        for position, line in enumerate(lines):
+            index[line].append(position)
+        return index
+
+    @property
+    def loose_lines(self) -> List[str]:
+        if self._loose_lines is None:
+            self._loose_lines = [_loose(line) for line in self.lines]
+            self._loose = self._build(self._loose_lines)
+        return self._loose_lines
+
+    def positions(self, line: str, loose: bool = False) -> List[int]:
+        if loose:
+            self.loose_lines
+            return self._loose.get(line, [])
+        return self._exact.get(line, [])
+
+
+def _anchors(index: LineIndex, hunk: List[str], loose: bool) -> List[int]:
+    """Offsets of the hunk lines to anchor on: the rare ones, or else the rarest few."""
+    counts = [(len(index.positions(line, loose)), offset) for offset, line in enumerate(hunk)]
+    present = sorted((count, offset) for count, offset in counts if count)
+    rare = [offset for count, offset in present if count <= RARE_LINE_MAX]
+    return rare or [offset for _, offset in present[:MIN_ANCHORS]]
+
+
+def _find_exact(index: LineIndex, hunk: List[str], loose: bool, hint: Optional[int]) -> int:
+    lines = index.loose_lines if loose else index.lines
+    anchors = _anchors(index, hunk, loose)
+    if not anchors:
+        return -1
+    # Every occurrence of the hunk contains its rarest line, so its positions are all candidates
+    offset = min(anchors, key=lambda anchor: len(index.positions(hunk[anchor], loose)))
+    candidates = [
+        position - offset for position in index.positions(hunk[offset], loose)
+        if 0 <= position - offset <= len(lines) - len(hunk)
+    ]
+    found = [start for start in candidates if lines[start:start + len(hunk)] == hunk]
+    if not found:
+        return -1
+    if hint is None:
+        return found[0]
+    return min(found, key=lambda start: (abs(start - hint), start))
+
+
+def _find_fuzzy(index: LineIndex, hunk: List[str], hint: Optional[int]) -> HunkMatch:
+    """Score the starts most anchors agree on by the share of matching (whitespace-insensitive) lines."""
+    lines = index.loose_lines
+    votes: Counter = Counter()
+    for offset in _anchors(index, hunk, loose=True):
+        for position in index.positions(hunk[offset], loose=True):
+            start = position - offset
+            if 0 <= start <= max(0, len(lines) - len(hunk)):
+                votes[start] += 1
+    best = HunkMatch(-1, 0.0, None)
+    for start, _ in votes.most_common(MAX_FUZZY_CANDIDATES):
+        matched = sum(1 for offset, line in enumerate(hunk) if start + offset < len(lines) and lines[start + offset] == line)
+        score = matched / len(hunk)
+        closer = hint is not None and best.start >= 0 and abs(start - hint) < abs(best.start - hint)
+        if score > best.score or (score == best.score and (closer or (hint is None and start < best.start))):
+            best = HunkMatch(start, score, "fuzzy")
+    return best
+
+
+def locate_hunk(index: LineIndex, hunk: List[str], hint: Optional[int] = None) -> HunkMatch:
+    """
+    Find where the old lines of a hunk are in a file.
+
+    Tries, in order: an exact match, a match ignoring whitespace differences,
+    and the best partial match. Candidates come from the positions of the
+    hunk's rare lines, so only a few locations are compared line by line.
+
+    Args:
+        index: Index of the file lines
+        hunk: Old lines of the hunk (context and removed lines)
+        hint: Expected 0-based start (e.g. from the hunk header); breaks ties between matches
+
+    Returns:
+        HunkMatch; score is 1.0 for exact and whitespace matches
+    """
+    if not hunk:
+        return HunkMatch(-1, 0.0, None)
+    start = _find_exact(index, hunk, loose=False, hint=hint)
+    if start >= 0:
+        return HunkMatch(start, 1.0, "exact")
+    loose_hunk = [_loose(line) for line in hunk]
+    start = _find_exact(index, loose_hunk, loose=True, hint=hint)
+    if start >= 0:
+        return HunkMatch(start, 1.0, "whitespace")
+    return _find_fuzzy(index, loose_hunk, hint)
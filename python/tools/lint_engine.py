@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Lint Engine - In-process Python linting with a content-hash result cache
+"""
+
+import ast
+import asyncio
+import copy
+import functools
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import Logger
+from tools.result_cache import content_fingerprint
+
+try:
+    from pyflakes.checker import Checker as PyflakesChecker
+except ImportError:  # pragma: no cover - pyflakes is optional
+    PyflakesChecker = None
+
+logger = Logger('lint_engine', log_to_file=False)
+
+DEFAULT_CACHE_SIZE = 512
+DEFAULT_WORKERS = 2
+DEFAULT_PROCESSES = min(4, os.cpu_count() or 1)
+# Code larger than this is linted off the event loop
+INLINE_LINT_BYTES = 64 * 1024
+# Batches with fewer uncached files are not worth sending to the process pool
+PROCESS_POOL_MIN_FILES = 4
+
+_POSIX = sys.platform != "win32"
+
+Issue = Dict[str, Any]
+CacheKey = Tuple[str, bool, bool]
+
+
+def check_syntax(code: str, file_path: Optional[str] = None) -> Tuple[Optional[ast.Module], List[Issue]]:
+    """
+    Parse code once; the tree is reused by pyflakes.
+
+    Returns:
+        (tree or None, syntax error issues)
+    """
+    try:
+        return ast.parse(code, filename=file_path or "<string>"), []
+    except SyntaxError as e:
+        return None, [{
+            "type": "syntax_error",
+            "severity": "error",
+            "message": e.msg,
+            "line": e.lineno,
+            "column": e.offset,
+            "text": e.text,
+            "file": file_path or "<string>"
+        }]
+    except Exception as e:
+        return None, [{
+            "type": "syntax_error",
+            "severity": "error",
+            "message": f"Unexpected error during syntax check: {str(e)}",
+            "file": file_path or "<string>"
+        }]
+
+
+def run_pyflakes(tree: ast.Module, file_path: Optional[str] = None) -> List[Issue]:
+    """Run pyflakes as a library on an already parsed tree."""
+    checker = PyflakesChecker(tree, filename=file_path or "<string>")
+    messages = sorted(checker.messages, key=lambda message: (message.lineno, message.col))
+    return [{
+        "type": "style_issue",
+        "severity": "warning",
+        "message": message.message % message.message_args,
+        "line": message.lineno,
+        "column": message.col + 1,
+        "code": type(message).__name__,
+        "file": file_path or "<string>"
+    } for message in messages]
+
+
+def _run_external(args: List[str], code: str, timeout: int) -> Optional[str]:
+    """Run an external linter on a temporary copy of the code, returning its stdout."""
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
+        f.write(code)
+        temp_path = f.name
+    try:
+        result = subprocess.run(args + [temp_path], capture_output=True, text=True, timeout=timeout)
+        return result.stdout
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
+        return None
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def run_flake8(code: str, file_path: Optional[str] = None) -> List[Issue]:
+    output = _run_external(['flake8', '--format=default'], code, timeout=10)
+    issues = []
+    for line in (output or "").split('\n'):
+        if not line.strip():
+            continue
+        # Format: file:line:col: code message
+        parts = line.split(':', 3)
+        if len(parts) >= 4:
+            issues.append({
+                "type": "style_issue",
+                "severity": "warning",
+                "message": parts[3].strip(),
+                "line": int(parts[1]) if parts[1].isdigit() else None,
+                "column": int(parts[2]) if parts[2].isdigit() else None,
+                "code": parts[3].split()[0] if parts[3].split() else None,
+                "file": file_path or parts[0]
+            })
+    return issues
+
+
+def run_pylint(code: str, file_path: Optional[str] = None, errors_only: bool = False) -> List[Issue]:
+    args = ['pylint', '--output-format=text', '--msg-template={path}:{line}:{column}: {msg_id} ({symbol}): {msg}']
+    if errors_only:
+        # The code is checked as a temporary file outside its package, so imports cannot be resolved
+        args += ['--errors-only', '--disable=import-error,no-name-in-module,relative-beyond-top-level']
+    output = _run_external(args, code, timeout=30)
+    issues = []
+    for line in (output or "").split('\n'):
+        if not line.strip() or line.startswith('---'):
+            continue
+        # Format: file:line:col: code (symbol): message
+        parts = line.split(':', 3)
+        if len(parts) < 4:
+            continue
+        msg_part = parts[3].strip()
+        if '(' in msg_part and ')' in msg_part:
+            code_part = msg_part.split('(')[0].strip()
+            symbol = msg_part.split('(')[1].split(')')[0]
+            message = msg_part.split('):', 1)[1].strip() if '):' in msg_part else msg_part
+        else:
+            code_part = None
+            symbol = None
+            message = msg_part
+        severity = {
+            'E': "error", 'W': "warning", 'C': "convention", 'R': "refactor"
+        }.get(code_part[:1], "info") if code_part else "info"
+        issues.append({
+            "type": "style_issue",
+            "severity": severity,
+            "message": message,
+            "line": int(parts[1]) if parts[1].isdigit() else None,
+            "column": int(parts[2]) if parts[2].isdigit() else None,
+            "code": code_part,
+            "symbol": symbol,
+            "file": file_path or parts[0]
+        })
+    return issues
+
+
+def run_pylint_errors(code: str, file_path: Optional[str] = None) -> List[Issue]:
+    return run_pylint(code, file_path, errors_only=True)
+
+
+Linter = Tuple[str, Callable[[str, Optional[str]], List[Issue]]]
+
+# External linters tried in order when pyflakes is not installed as a library
+EXTERNAL_LINTERS: List[Linter] = [
+    ("flake8", run_flake8),
+    ("pylint", run_pylint),
+]
+# Run next to pyflakes, which has no error class (e.g. pylint's no-member, not-callable)
+ERROR_LINTERS: List[Linter] = [
+    ("pylint", run_pylint_errors),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _installed(program: str) -> bool:
+    return shutil.which(program) is not None
+
+
+def external_linters() -> List[Linter]:
+    """External linters that lint_sync runs for style checks (none when not installed)."""
+    linters = ERROR_LINTERS if PyflakesChecker is not None else EXTERNAL_LINTERS
+    return [(name, linter) for name, linter in linters if _installed(name)]
+
+
+def _lint_in_worker(code: str, check_syntax_errors: bool, check_style: bool) -> List[Issue]:
+    """Process pool entry point; the parent keeps the cache."""
+    return LintEngine(cache_size=1).lint_sync(code, None, check_syntax_errors, check_style)
+
+
+class LintEngine:
+    """
+    Lints Python code without blocking the event loop.
+
+    Syntax and pyflakes checks run in-process on a single parse. Installed
+    external linters add error-class findings (pylint --errors-only), or all
+    style findings when pyflakes is not installed; they run in a worker thread
+    pool. Results are cached by content hash, so re-checking an unchanged file
+    (or an unchanged copy of it) costs one hash. Batches of files are spread
+    over a process pool (see lint_many).
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE, workers: int = DEFAULT_WORKERS,
+                 processes: int = DEFAULT_PROCESSES):
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[CacheKey, List[Issue]]" = OrderedDict()
+        # lint_sync runs on the event loop and in worker threads
+        self._lock = threading.Lock()
+        self._workers = max(1, workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # With fewer than 2 processes batches are linted in this process
+        self._processes = max(0, processes)
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "LintEngine":
+        def env_int(name: str, default: int) -> int:
+            try:
+                return int(os.getenv(name, str(default)))
+            except ValueError:
+                return default
+        return cls(
+            cache_size=env_int("LINT_CACHE_SIZE", DEFAULT_CACHE_SIZE),
+            workers=env_int("LINT_WORKERS", DEFAULT_WORKERS),
+            processes=env_int("LINT_PROCESSES", DEFAULT_PROCESSES),
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="lint")
+        return self._executor
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # Forking a process that runs an event loop and thread pools is not safe
+            context = multiprocessing.get_context("forkserver" if _POSIX else "spawn")
+            self._process_pool = ProcessPoolExecutor(max_workers=self._processes, mp_context=context)
+        return self._process_pool
+
+    def _lookup(self, key: CacheKey) -> Optional[List[Issue]]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        return cached
+
+    def _store(self, key: CacheKey, issues: List[Issue]) -> None:
+        with self._lock:
+            self._cache[key] = issues
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def lint_sync(self, code: str, file_path: Optional[str] = None,
+                  check_syntax_errors: bool = True, check_style: bool = True) -> List[Issue]:
+        """
+        Lint code in the calling thread.
+
+        Args:
+            code: Python source
+            file_path: Path used in issues
+            check_syntax_errors: Report syntax errors
+            check_style: Report pyflakes (or external linter) issues
+
+        Returns:
+            Issues, syntax errors first
+        """
+        key = (content_fingerprint(code), check_syntax_errors, check_style)
+        cached = self._lookup(key)
+        if cached is not None:
+            return self._with_file(cached, file_path)
+
+        tree, syntax_issues = check_syntax(code)
+        issues = list(syntax_issues) if check_syntax_errors else []
+        if check_style:
+            issues.extend(self._style_issues(code, tree))
+
+        self._store(key, issues)
+        return self._with_file(issues, file_path)
+
+    async def lint(self, code: str, file_path: Optional[str] = None,
+                   check_syntax_errors: bool = True, check_style: bool = True) -> List[Issue]:
+        """Lint code; large inputs and external linters run in the worker pool."""
+        key = (content_fingerprint(code), check_syntax_errors, check_style)
+        in_process = not check_style or not external_linters()
+        if key in self._cache or (in_process and len(code) <= INLINE_LINT_BYTES):
+            return self.lint_sync(code, file_path, check_syntax_errors, check_style)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, self.lint_sync, code, file_path, check_syntax_errors, check_style
+        )
+
+    async def lint_many(self, sources: List[Tuple[str, Optional[str]]],
+                        check_syntax_errors: bool = True, check_style: bool = True) -> List[List[Issue]]:
+        """
+        Lint several files at once.
+
+        Cached files are answered from the cache. When at least
+        PROCESS_POOL_MIN_FILES are left and more than one process is
+        configured, they are linted in the process pool, otherwise as in lint().
+
+        Args:
+            sources: (code, file_path) pairs
+            check_syntax_errors: Report syntax errors
+            check_style: Report pyflakes (or external linter) issues
+
+        Returns:
+            Issues of each source, in order
+        """
+        results: List[Optional[List[Issue]]] = [None] * len(sources)
+        keys = [(content_fingerprint(code), check_syntax_errors, check_style) for code, _ in sources]
+        pending = []
+        for index, (key, (_, file_path)) in enumerate(zip(keys, sources)):
+            cached = self._lookup(key)
+            if cached is not None:
+                results[index] = self._with_file(cached, file_path)
+            else:
+                pending.append(index)
+
+        if self._processes > 1 and len(pending) >= PROCESS_POOL_MIN_FILES:
+            loop = asyncio.get_running_loop()
+            try:
+                linted = await asyncio.gather(*(
+                    loop.run_in_executor(
+                        self.process_pool, _lint_in_worker, sources[index][0], check_syntax_errors, check_style
+                    )
+                    for index in pending
+                ), return_exceptions=True)
+                for issues in linted:
+                    if isinstance(issues, BaseException):
+                        raise issues
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"Lint process pool failed, linting in threads: {e}")
+                self.shutdown()
+            else:
+                for index, issues in zip(pending, linted):
+                    self._store(keys[index], issues)
+                    results[index] = self._with_file(issues, sources[index][1])
+                pending = []
+
+        if pending:
+            linted = await asyncio.gather(*(
+                self.lint(sources[index][0], sources[index][1], check_syntax_errors, check_style)
+                for index in pending
+            ))
+            for index, issues in zip(pending, linted):
+                results[index] = issues
+        return results
+
+    def _style_issues(self, code: str, tree: Optional[ast.Module]) -> List[Issue]:
+        if PyflakesChecker is not None:
+            # pyflakes needs a valid tree; syntax errors are reported separately
+            if tree is None:
+                return []
+            issues = run_pyflakes(tree)
+            for name, linter in external_linters():
+                try:
+                    issues.extend(linter(code, None))
+                except Exception as e:
+                    logger.debug(f"{name} failed: {e}")
+            return issues
+        for name, linter in external_linters():
+            try:
+                issues = linter(code, None)
+            except Exception as e:
+                logger.debug(f"{name} not available or failed: {e}")
+                continue
+            if issues:
+                return issues
+        return []
+
+    @staticmethod
+    def _with_file(issues: List[Issue], file_path: Optional[str]) -> List[Issue]:
+        result = copy.deepcopy(issues)
+        for issue in result:
+            issue["file"] = file_path or "<string>"
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def shutdown(self) -> None:
+        """Stop the worker pools; they are recreated on next use."""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_engine: Optional[LintEngine] = None
+
+
+def get_lint_engine() -> LintEngine:
+    """Process-wide lint engine shared by all LintTool calls."""
+    global _engine
+    if _engine is None:
+        _engine = LintEngine.from_env()
+    return _engine
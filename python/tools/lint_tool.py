@@ -3,33 +3,85 @@
 Lint Tool - Check code for syntax errors and linting issues
 """
 
-import ast
-import subprocess
-import tempfile
+import glob
 import os
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.edit_coordinator import file_exists, read_file
+from tools.result_cache import content_fingerprint
+from tools.lint_engine import get_lint_engine
 
 logger = Logger('lint_tool', log_to_file=False)
 
+# Files checked by one batch call
+MAX_BATCH_FILES = 200
+# Issues listed in a compact report; the rest are only counted
+COMPACT_MAX_ISSUES = 50
+SEVERITY_ORDER = {"error": 0, "warning": 1, "convention": 2, "refactor": 3, "info": 4}
+
+
+def _count_severities(issues: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {
+        "error_count": sum(1 for issue in issues if issue.get("severity") == "error"),
+        "warning_count": sum(1 for issue in issues if issue.get("severity") == "warning"),
+        "info_count": sum(1 for issue in issues if issue.get("severity") in ["info", "convention", "refactor"]),
+    }
+
+
+def _format_issue(issue: Dict[str, Any]) -> str:
+    """One-line form of an issue: file:line:column: severity [code] message"""
+    location = ":".join(str(part) for part in (issue.get("file"), issue.get("line"), issue.get("column")) if part)
+    code = f" [{issue['code']}]" if issue.get("code") else ""
+    return f"{location}: {issue.get('severity', 'info')}{code} {issue.get('message', '')}"
+
 
 class LintTool(MCPTool):
     """Tool for checking code syntax and linting issues."""
     
+    # Directories skipped when expanding globs
+    SKIP_DIRS = {'.git', '__pycache__', 'node_modules', '.venv', 'venv', 'env', '.tox', '.mypy_cache', '.pytest_cache'}
+    
+    def __init__(self):
+        """Initialize lint tool."""
+        self.workspace_dir: Optional[str] = None
+    
+    def set_workspace_dir(self, workspace_dir: str):
+        """
+        Set the workspace directory. Relative paths of batch checks are resolved against it.
+        
+        Args:
+            workspace_dir: Path to workspace directory
+        """
+        if self.workspace_dir == workspace_dir:
+            return
+        
+        self.workspace_dir = workspace_dir
+        logger.info(f"Setting workspace directory for lint tool: {workspace_dir}")
+    
     @property
     def name(self) -> str:
         """Tool name."""
         return "lint_code"
     
+    @property
+    def default_timeout(self) -> Optional[float]:
+        return 90.0
+    
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        # Bounds the external linter fallback, which spawns processes
+        return 4
+    
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get the tool definition for LLM function calling."""
         return {
             "type": "function",
             "function": {
                 "name": "lint_code",
-                "description": "Check Python code for syntax errors and linting issues. This tool is specifically designed for Python code checking. Can check code from file path or direct code content. Returns syntax errors, linting warnings, and suggestions for improvement. Uses Python's built-in AST parser for syntax checking and optionally uses external linters (pyflakes, flake8, or pylint) if available for style checking.",
+                "description": "Check Python code for syntax errors and linting issues. This tool is specifically designed for Python code checking. Can check code from file path or direct code content. Returns syntax errors, linting warnings, and suggestions for improvement. Uses Python's built-in AST parser for syntax checking and pyflakes (or flake8/pylint if pyflakes is not installed) for style checking.",
                 "parameters": {
                     "type": "object",
                     "properties": {
@@ -41,6 +93,16 @@ class LintTool(MCPTool):
                             "type": "string",
                             "description": "Path to the Python file to check (required if code is not provided). Can be absolute or relative path."
                         },
+                        "file_paths": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Check several Python files in one call instead of code/file_path. Entries are paths or glob patterns (e.g. 'src/**/*.py'), relative to the workspace. Returns one report with per-file summaries and all issues sorted by severity."
+                        },
+                        "compact": {
+                            "type": "boolean",
+                            "description": "With file_paths: list issues as one-line strings, only list files that have issues, and cap the number of issues listed (default: false)",
+                            "default": False
+                        },
                         "check_syntax": {
                             "type": "boolean",
                             "description": "Check for syntax errors (default: true)",
@@ -67,6 +129,9 @@ class LintTool(MCPTool):
         Returns:
             Custom notification message string
         """
+        file_paths = tool_args.get("file_paths")
+        if file_paths:
+            return f"Checking code: {', '.join(file_paths[:3])}{' ...' if len(file_paths) > 3 else ''}"
         file_path = tool_args.get("file_path")
         if file_path:
             return f"Checking code: {file_path}"
@@ -94,6 +159,9 @@ class LintTool(MCPTool):
         error_count = tool_result.get("error_count", 0)
         warning_count = tool_result.get("warning_count", 0)
         
+        files_checked = tool_result.get("files_checked")
+        if files_checked is not None and total_issues == 0:
+            return f"Code check completed, no issues found in {files_checked} file(s)"
         if total_issues == 0:
             return "Code check completed, no issues found"
         else:
@@ -106,239 +174,27 @@ class LintTool(MCPTool):
             summary = ", ".join(issue_summary) if issue_summary else f"{total_issues} issue(s)"
             return f"Code check completed, found {summary}"
     
-    def _check_python_syntax(self, code: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """
-        Check Python code for syntax errors using AST parser.
-        
-        Args:
-            code: Python code to check
-            file_path: Optional file path for better error messages
-        
-        Returns:
-            List of syntax error dictionaries
-        """
-        errors = []
-        
-        try:
-            ast.parse(code, filename=file_path or "<string>")
-        except SyntaxError as e:
-            errors.append({
-                "type": "syntax_error",
-                "severity": "error",
-                "message": e.msg,
-                "line": e.lineno,
-                "column": e.offset,
-                "text": e.text,
-                "file": file_path or "<string>"
-            })
-        except Exception as e:
-            errors.append({
-                "type": "syntax_error",
-                "severity": "error",
-                "message": f"Unexpected error during syntax check: {str(e)}",
-                "file": file_path or "<string>"
-            })
-        
-        return errors
-    
-    def _check_python_style(self, code: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """
-        Check Python code style using external linters if available.
-        Tries pyflakes, flake8, or pylint in order of preference.
-        
-        Args:
-            code: Python code to check
-            file_path: Optional file path
-        
-        Returns:
-            List of style issue dictionaries
-        """
-        issues = []
-        
-        # Try pyflakes first (lightweight, fast)
-        try:
-            result = self._run_pyflakes(code, file_path)
-            if result:
-                issues.extend(result)
-                return issues
-        except Exception as e:
-            logger.debug(f"pyflakes not available or failed: {e}")
-        
-        # Try flake8
-        try:
-            result = self._run_flake8(code, file_path)
-            if result:
-                issues.extend(result)
-                return issues
-        except Exception as e:
-            logger.debug(f"flake8 not available or failed: {e}")
-        
-        # Try pylint as last resort (slower but comprehensive)
-        try:
-            result = self._run_pylint(code, file_path)
-            if result:
-                issues.extend(result)
-        except Exception as e:
-            logger.debug(f"pylint not available or failed: {e}")
-        
-        return issues
-    
-    def _run_pyflakes(self, code: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Run pyflakes on code using subprocess."""
-        issues = []
-        
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(code)
-                temp_path = f.name
-            
-            try:
-                # Run pyflakes
-                result = subprocess.run(
-                    ['pyflakes', temp_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                # Parse output
-                for line in result.stdout.split('\n'):
-                    if not line.strip():
-                        continue
-                    
-                    # Format: file:line: message
-                    parts = line.split(':', 2)
-                    if len(parts) >= 3:
-                        issues.append({
-                            "type": "style_issue",
-                            "severity": "warning",
-                            "message": parts[2].strip(),
-                            "line": int(parts[1]) if parts[1].isdigit() else None,
-                            "file": file_path or parts[0]
-                        })
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            
-            return issues
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError, ImportError):
-            return []
-    
-    def _run_flake8(self, code: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Run flake8 on code using subprocess."""
-        issues = []
-        
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(code)
-                temp_path = f.name
-            
-            try:
-                # Run flake8
-                result = subprocess.run(
-                    ['flake8', '--format=default', temp_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                # Parse output
-                for line in result.stdout.split('\n'):
-                    if not line.strip():
-                        continue
-                    
-                    # Format: file:line:col: code message
-                    parts = line.split(':', 3)
-                    if len(parts) >= 4:
-                        issues.append({
-                            "type": "style_issue",
-                            "severity": "warning",
-                            "message": parts[3].strip(),
-                            "line": int(parts[1]) if parts[1].isdigit() else None,
-                            "column": int(parts[2]) if parts[2].isdigit() else None,
-                            "code": parts[2].split()[0] if len(parts) > 2 else None,
-                            "file": file_path or parts[0]
-                        })
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            
-            return issues
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            return []
-    
-    def _run_pylint(self, code: str, file_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Run pylint on code using subprocess."""
-        issues = []
-        
-        try:
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.py', delete=False) as f:
-                f.write(code)
-                temp_path = f.name
-            
-            try:
-                # Run pylint with minimal output
-                result = subprocess.run(
-                    ['pylint', '--output-format=text', '--msg-template={path}:{line}:{column}: {msg_id} ({symbol}): {msg}', temp_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                # Parse output
-                for line in result.stdout.split('\n'):
-                    if not line.strip() or line.startswith('---'):
-                        continue
-                    
-                    # Format: file:line:col: code (symbol): message
-                    parts = line.split(':', 3)
-                    if len(parts) >= 4:
-                        msg_part = parts[3].strip()
-                        # Extract code and message
-                        if '(' in msg_part and ')' in msg_part:
-                            code_part = msg_part.split('(')[0].strip()
-                            symbol = msg_part.split('(')[1].split(')')[0]
-                            message = msg_part.split('):', 1)[1].strip() if '):' in msg_part else msg_part
-                        else:
-                            code_part = None
-                            symbol = None
-                            message = msg_part
-                        
-                        # Determine severity from code
-                        severity = "info"
-                        if code_part:
-                            if code_part.startswith('E'):
-                                severity = "error"
-                            elif code_part.startswith('W'):
-                                severity = "warning"
-                            elif code_part.startswith('C'):
-                                severity = "convention"
-                            elif code_part.startswith('R'):
-                                severity = "refactor"
-                        
-                        issues.append({
-                            "type": "style_issue",
-                            "severity": severity,
-                            "message": message,
-                            "line": int(parts[1]) if parts[1].isdigit() else None,
-                            "column": int(parts[2]) if parts[2].isdigit() else None,
-                            "code": code_part,
-                            "symbol": symbol,
-                            "file": file_path or parts[0]
-                        })
-            finally:
-                # Clean up temp file
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
-            
-            return issues
-        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
-            return []
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        """Lint results depend only on the checked content, so key them by its hash."""
+        if tool_args.get("file_paths"):
+            # The lint engine caches each file of a batch
+            return None
+        code = tool_args.get("code")
+        file_path = tool_args.get("file_path")
+        if file_path and not code:
+            file_path_obj = Path(file_path).resolve()
+            if not file_exists(file_path_obj):
+                return None
+            code = read_file(file_path_obj)
+            file_path = str(file_path_obj)
+        if not code:
+            return None
+        return {
+            "content": content_fingerprint(code),
+            "file_path": file_path,
+            "check_syntax": tool_args.get("check_syntax", True),
+            "check_style": tool_args.get("check_style", True),
+        }
     
     async def execute(
         self,
@@ -346,6 +202,9 @@ class LintTool(MCPTool):
         file_path: Optional[str] = None,
         check_syntax: bool = True,
         check_style: bool = True,
+        file_paths: Optional[List[str]] = None,
+        compact: bool = False,
+        context: Optional[ToolContext] = None,
     ) -> Dict[str, Any]:
         """
         Check Python code for syntax errors and linting issues.
@@ -355,6 +214,8 @@ class LintTool(MCPTool):
             file_path: Path to Python file to check
             check_syntax: Whether to check syntax (default: True)
             check_style: Whether to check style (default: True)
+            file_paths: Paths or glob patterns of several files to check in one report
+            compact: Shorten the batch report (default: False)
         
         Returns:
             Dictionary with lint results
@@ -362,6 +223,9 @@ class LintTool(MCPTool):
         language = "python"  # Fixed to Python only
         logger.info(f"Linting Python code (syntax: {check_syntax}, style: {check_style})")
         
+        if file_paths:
+            return await self._lint_batch(file_paths, check_syntax, check_style, compact, context)
+        
         # Validate inputs
         if not code and not file_path:
             return {
@@ -378,14 +242,14 @@ class LintTool(MCPTool):
                     # Try to resolve relative path
                     file_path_obj = file_path_obj.resolve()
                 
-                if not file_path_obj.exists():
+                if not file_exists(file_path_obj):
                     return {
                         "success": False,
                         "error": f"File not found: {file_path}",
                         "issues": []
                     }
                 
-                code = file_path_obj.read_text(encoding='utf-8')
+                code = read_file(file_path_obj)
                 file_path = str(file_path_obj)
             except Exception as e:
                 logger.error(f"Error reading file: {e}", exc_info=True)
@@ -403,31 +267,115 @@ class LintTool(MCPTool):
             }
         
         # This tool only supports Python
-        all_issues = []
-        
-        # Check syntax
-        if check_syntax:
-            syntax_errors = self._check_python_syntax(code, file_path)
-            all_issues.extend(syntax_errors)
-        
-        # Check style
-        if check_style:
-            style_issues = self._check_python_style(code, file_path)
-            all_issues.extend(style_issues)
-        
-        # Count issues by severity
-        error_count = sum(1 for issue in all_issues if issue.get("severity") == "error")
-        warning_count = sum(1 for issue in all_issues if issue.get("severity") == "warning")
-        info_count = sum(1 for issue in all_issues if issue.get("severity") in ["info", "convention", "refactor"])
+        all_issues = await get_lint_engine().lint(code, file_path, check_syntax, check_style)
         
         return {
             "success": True,
             "file": file_path or "<string>",
             "language": language,
             "total_issues": len(all_issues),
-            "error_count": error_count,
-            "warning_count": warning_count,
-            "info_count": info_count,
+            **_count_severities(all_issues),
             "issues": all_issues
         }
+    
+    def _expand_file_paths(self, file_paths: List[str], base_dir: Path) -> Tuple[List[Path], List[str]]:
+        """
+        Resolve paths and glob patterns to a de-duplicated list of files.
+        
+        Returns:
+            (files, entries that matched nothing)
+        """
+        files: Dict[Path, None] = {}
+        unmatched = []
+        for entry in file_paths:
+            path = Path(entry)
+            if not path.is_absolute():
+                path = base_dir / path
+            if glob.has_magic(entry):
+                matches = [
+                    Path(match) for match in sorted(glob.glob(str(path), recursive=True))
+                    if match.endswith(".py") and os.path.isfile(match)
+                    and not self.SKIP_DIRS.intersection(Path(match).parts)
+                ]
+            else:
+                matches = [path] if file_exists(path.resolve()) else []
+            if not matches:
+                unmatched.append(entry)
+            for match in matches:
+                files[match.resolve()] = None
+        return list(files), unmatched
+    
+    async def _lint_batch(
+        self,
+        file_paths: List[str],
+        check_syntax: bool,
+        check_style: bool,
+        compact: bool,
+        context: Optional[ToolContext],
+    ) -> Dict[str, Any]:
+        """Check several files and merge the results into one report."""
+        workspace = self.resolve_workspace(context)
+        base_dir = Path(workspace) if workspace else Path.cwd()
+        files, unmatched = self._expand_file_paths(file_paths, base_dir)
+        if not files:
+            return {
+                "success": False,
+                "error": f"No Python files found for: {', '.join(file_paths)}",
+                "issues": []
+            }
+        skipped_files = max(0, len(files) - MAX_BATCH_FILES)
+        files = files[:MAX_BATCH_FILES]
+        
+        sources = []
+        summaries = []
+        for path in files:
+            try:
+                sources.append((read_file(path), str(path)))
+            except Exception as e:
+                summaries.append({"file": str(path), "error": f"Failed to read file: {str(e)}"})
+        
+        results = await get_lint_engine().lint_many(sources, check_syntax, check_style)
+        
+        # Identical issues (e.g. a file matched twice through a symlink) are reported once
+        seen = set()
+        all_issues = []
+        for (_, path), issues in zip(sources, results):
+            file_issues = []
+            for issue in issues:
+                key = (issue.get("file"), issue.get("line"), issue.get("column"), issue.get("code"), issue.get("message"))
+                if key not in seen:
+                    seen.add(key)
+                    file_issues.append(issue)
+            all_issues.extend(file_issues)
+            summaries.append({"file": path, "total_issues": len(file_issues), **_count_severities(file_issues)})
+        
+        all_issues.sort(key=lambda issue: (
+            SEVERITY_ORDER.get(issue.get("severity"), len(SEVERITY_ORDER)),
+            issue.get("file") or "",
+            issue.get("line") or 0,
+            issue.get("column") or 0,
+        ))
+        summaries.sort(key=lambda summary: (-summary.get("error_count", 0), -summary.get("total_issues", 0), summary["file"]))
+        
+        report: Dict[str, Any] = {
+            "success": True,
+            "language": "python",
+            "files_checked": len(sources),
+            "total_issues": len(all_issues),
+            **_count_severities(all_issues),
+        }
+        if compact:
+            report["files"] = [summary for summary in summaries if summary.get("total_issues", 1)]
+            report["clean_files"] = len(summaries) - len(report["files"])
+            report["issues"] = [_format_issue(issue) for issue in all_issues[:COMPACT_MAX_ISSUES]]
+            if len(all_issues) > COMPACT_MAX_ISSUES:
+                report["omitted_issues"] = len(all_issues) - COMPACT_MAX_ISSUES
+        else:
+            report["files"] = summaries
+            report["issues"] = all_issues
+        if unmatched:
+            report["unmatched"] = unmatched
+        if skipped_files:
+            report["note"] = f"Only the first {MAX_BATCH_FILES} files were checked, {skipped_files} more matched"
+        return report
 
@@ -6,6 +6,7 @@ Message Tool - Send intermediate messages to the user
 from typing import Dict, Any, Optional
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
 
 logger = Logger('message_tool', log_to_file=False)
 
@@ -69,7 +70,7 @@ class MessageTool(MCPTool):
         # Don't show separate notification, the message itself was already shown
         return None
     
-    async def execute(self, message: str) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Send a message to the user.
         
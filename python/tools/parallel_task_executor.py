@@ -4,11 +4,22 @@ Parallel Task Executor Tool
 """
 
 import asyncio
-import copy
+import os
 from typing import Any, Dict, List, Optional, AsyncGenerator
 
 from utils.logger import Logger
+from utils.tracing import span
 from tools.base_tool import MCPTool
+from tools.edit_coordinator import EditCoordinator
+from tools.tool_context import ToolContext
+from tools.subtask_scheduler import (
+    SubtaskBudget,
+    SubtaskBudgetExceeded,
+    SubtaskScheduler,
+    TokenBudgetClient,
+    current_provider,
+)
+from utils.event_channel import FanInChannel, DEFAULT_CHANNEL_SIZE
 from models import MessageEvent, ReportEvent, ToolCallEvent, ToolResultEvent, BaseEvent
 
 logger = Logger('parallel_task_executor', log_to_file=False)
@@ -19,11 +30,27 @@ class ParallelTaskExecutorTool(MCPTool):
 
     def __init__(self):
         self.workspace_dir: Optional[str] = None
+        # Shared by all parallel executions of this process so limits hold globally
+        self.scheduler = SubtaskScheduler.from_env()
+        self.budget = SubtaskBudget.from_env()
+        try:
+            self.event_queue_size = int(os.getenv("PARALLEL_EVENT_QUEUE_SIZE", str(DEFAULT_CHANNEL_SIZE)))
+        except ValueError:
+            self.event_queue_size = DEFAULT_CHANNEL_SIZE
+        # Sub-agents edit private copy-on-write overlays that are merged when all have finished.
+        # Off by default: only the file tools use the overlays, while shell commands, the
+        # workspace structure and RAG still see the real workspace.
+        self.edit_isolation = os.getenv("PARALLEL_EDIT_ISOLATION", "false").lower() in ("true", "1", "yes", "on")
 
     @property
     def name(self) -> str:
         return "execute_parallel_tasks"
 
+    @property
+    def default_timeout(self) -> Optional[float]:
+        # Subtasks have their own budgets (see SubtaskBudget)
+        return None
+
     def set_workspace_dir(self, workspace_dir: str) -> None:
         if self.workspace_dir == workspace_dir:
             return
@@ -57,6 +84,21 @@ class ParallelTaskExecutorTool(MCPTool):
                             },
                             "minItems": 2
                         },
+                        "priorities": {
+                            "type": "array",
+                            "description": (
+                                "Optional priority for each task (same order as tasks). Higher values start first "
+                                "when the number of concurrently running sub-agents is limited. Default: task order."
+                            ),
+                            "items": {
+                                "type": "integer"
+                            }
+                        },
+                        "fail_fast": {
+                            "type": "boolean",
+                            "description": "Cancel the remaining subtasks as soon as one subtask fails (default: false)",
+                            "default": False
+                        },
                         "parent_information": {
                             "type": "string",
                             "description": (
@@ -79,150 +121,274 @@ class ParallelTaskExecutorTool(MCPTool):
     def get_result_notification(self, tool_result: Dict[str, Any]) -> Optional[str]:
         return tool_result.get("summary")
 
-    async def execute_streaming(
+    def invalidates_cache(self, tool_args: Dict[str, Any]) -> bool:
+        # Sub-agent edits are merged into the workspace when the subtasks join
+        return True
+
+    def _create_agent(self, parent_flow_type: Optional[str], workspace_dir: Optional[str]):
+        # Determine child flow type based on parent flow type
+        if parent_flow_type == "planact" or parent_flow_type == "PlanActFlow":
+            from agents.planact_flow import PlanActFlow
+            agent = PlanActFlow(workspace_dir or "", is_parent=False)
+        else:
+            # Default to ReActFlow (for "react", "ReActFlow", or None)
+            from agents.react_flow import ReActFlow
+            agent = ReActFlow(workspace_dir or "", is_parent=False)
+
+        if self.budget.max_iterations:
+            agent.MAX_ITERATION = self.budget.max_iterations
+        if self.budget.max_tokens:
+            agent.llm_client = TokenBudgetClient(agent.llm_client, self.budget.max_tokens)
+        return agent
+
+    @staticmethod
+    def _format_summary(results: List[Dict[str, Any]]) -> str:
+        summary_lines = ["Parallel Execution Results:"]
+        for res in results:
+            summary_lines.append(f"--- Task {res['task_id'] + 1} ---")
+            summary_lines.append(f"Description: {res['task']}")
+            summary_lines.append(f"Result: {res['result']}")
+            if res.get("conflicts"):
+                action = "re-run on the merged workspace" if res.get("rescheduled") else "edits not applied"
+                summary_lines.append(f"Edit conflicts ({action}): {', '.join(res['conflicts'])}")
+            summary_lines.append("")
+        return "\n".join(summary_lines).strip()
+
+    async def _run_subtasks(
         self,
         tasks: List[str],
+        results: List[Dict[str, Any]],
         parent_session_id: Optional[str] = None,
-        context_messages: Optional[List[Dict[str, Any]]] = None,
         parent_flow_type: Optional[str] = None,
-        parent_information: Optional[str] = None
+        parent_information: Optional[str] = None,
+        priorities: Optional[List[int]] = None,
+        fail_fast: bool = False,
+        context: Optional[ToolContext] = None,
     ) -> AsyncGenerator[BaseEvent, None]:
         """
-        Execute tasks in parallel and yield all events from subtasks.
-        This is used when we want to stream events to the UI.
+        Run all subtasks through the scheduler and yield their events.
+        Fills `results` (in task order) once every subtask has finished.
+
+        With edit isolation, file edits of each subtask go to its own overlay.
+        Overlays are merged in task order afterwards; a completed subtask whose
+        edits conflict with an earlier one is re-run alone on the merged workspace.
         """
-        if not tasks:
-            yield MessageEvent(message="No tasks provided for parallel execution")
-            return
+        provider = current_provider()
+        workspace_dir = self.resolve_workspace(context)
+        if context is not None:
+            parent_session_id = parent_session_id or context.session_id
+            parent_flow_type = parent_flow_type or context.flow_type
+        cancel_event = asyncio.Event()
 
-        logger.info(f"Executing {len(tasks)} parallel tasks with streaming")
+        # One bounded channel for all subtasks; a full channel pauses the producers
+        channel = FanInChannel(self.event_queue_size)
 
-        # Create queues for each subtask to collect events
-        event_queues: List[asyncio.Queue] = [asyncio.Queue() for _ in tasks]
-        
-        async def run_subtask(index: int, task_description: str, event_queue: asyncio.Queue) -> Dict[str, Any]:
+        async def run_subtask(
+            index: int,
+            task_description: str,
+            coordinator: Optional[EditCoordinator] = None,
+            retry_reason: Optional[str] = None,
+        ) -> None:
             sub_session_id = f"{parent_session_id}_sub_{index}" if parent_session_id else f"parallel_sub_{index}"
+            priority = priorities[index] if priorities and index < len(priorities) else 0
             final_message = ""
+            status = "completed"
+            wait_time = 0.0
+            acquired = False
 
-            try:
-                # Determine child flow type based on parent flow type
-                if parent_flow_type == "planact" or parent_flow_type == "PlanActFlow":
-                    from agents.planact_flow import PlanActFlow
-                    agent = PlanActFlow(self.workspace_dir or "", is_parent=False)
-                else:
-                    # Default to ReActFlow (for "react", "ReActFlow", or None)
-                    from agents.react_flow import ReActFlow
-                    agent = ReActFlow(self.workspace_dir or "", is_parent=False)
-                async for event in agent.process(
-                    task_description,
-                    sub_session_id,
-                    parent_information=parent_information,
-                ):
-                    # Put all events into the queue
-                    await event_queue.put((index, event))
-                    
-                    # Track final message
-                    if isinstance(event, MessageEvent):
-                        if event.message and not event.message.startswith("Thinking"):
-                            final_message = event.message
-                    elif isinstance(event, ReportEvent):
-                        final_message = event.message
-            except Exception as exc:  # pragma: no cover - best-effort handling
-                logger.error(f"Subtask {index} failed: {exc}", exc_info=True)
-                final_message = f"Error: {exc}"
-                await event_queue.put((index, MessageEvent(message=f"Subtask {index + 1} failed: {exc}")))
-            finally:
-                # Signal completion
-                await event_queue.put((index, None))
+            with span("subtask", index=index, session_id=sub_session_id, retry=retry_reason is not None) as subtask_span:
+                try:
+                    if not self.scheduler.has_capacity(provider) or self.scheduler.queue_depth:
+                        await channel.send(index, MessageEvent(
+                            message=f"⏳ Queued (queue depth: {self.scheduler.queue_depth + 1}, running: {self.scheduler.running})"
+                        ))
+                    wait_time = await self.scheduler.acquire(provider, priority)
+                    acquired = True
+                    if wait_time > 0:
+                        await channel.send(index, MessageEvent(
+                            message=f"▶️ Started after waiting {wait_time:.1f}s (queue depth: {self.scheduler.queue_depth})"
+                        ))
 
-            return {
-                "task_id": index,
-                "task": task_description,
-                "result": final_message or "No response from sub-agent",
-            }
+                    if cancel_event.is_set():
+                        status = "cancelled"
+                        final_message = "Cancelled: another subtask failed"
+                        return
 
-        # Start all subtasks
-        subtask_coroutines = [
-            run_subtask(i, task, event_queues[i]) 
-            for i, task in enumerate(tasks)
-        ]
-        subtask_tasks = [asyncio.create_task(coro) for coro in subtask_coroutines]
-        
-        # Track which subtasks are still running
-        active_tasks = set(range(len(tasks)))
-        
-        # Yield events as they come from any subtask
-        while active_tasks:
-            # Create tasks to wait for events from all active queues
-            queue_tasks = {
-                i: asyncio.create_task(event_queues[i].get())
-                for i in active_tasks
-            }
-            
-            # Wait for the first event from any queue
-            done, pending = await asyncio.wait(
-                queue_tasks.values(),
-                return_when=asyncio.FIRST_COMPLETED
-            )
-            
-            # Process completed queue tasks
-            for task in done:
-                # Find which queue this task belongs to
-                queue_index = None
-                for i, qt in queue_tasks.items():
-                    if qt == task:
-                        queue_index = i
-                        break
-                
-                if queue_index is None:
+                    if coordinator is not None:
+                        coordinator.activate(index)
+                    agent = self._create_agent(parent_flow_type, workspace_dir)
+                    message = f"{retry_reason}\n\n{task_description}" if retry_reason else task_description
+
+                    async def consume() -> None:
+                        nonlocal final_message, status
+                        events = agent.process(
+                            message,
+                            sub_session_id,
+                            parent_information=parent_information,
+                        )
+                        try:
+                            async for event in events:
+                                await channel.send(index, event)
+
+                                # Track final message
+                                if isinstance(event, MessageEvent):
+                                    if event.message and not event.message.startswith("Thinking"):
+                                        final_message = event.message
+                                elif isinstance(event, ReportEvent):
+                                    final_message = event.message
+
+                                # Cooperative cancellation: stop at the next event boundary
+                                if cancel_event.is_set():
+                                    status = "cancelled"
+                                    final_message = f"Cancelled: another subtask failed. Last progress: {final_message}"
+                                    break
+                        finally:
+                            await events.aclose()
+
+                    if self.budget.timeout:
+                        await asyncio.wait_for(consume(), timeout=self.budget.timeout)
+                    else:
+                        await consume()
+                except asyncio.TimeoutError:
+                    status = "failed"
+                    final_message = f"Error: subtask exceeded its time budget of {self.budget.timeout}s"
+                    logger.warning(f"Subtask {index} timed out after {self.budget.timeout}s")
+                    await channel.send(index, MessageEvent(message=f"Subtask {index + 1} failed: {final_message}"))
+                except SubtaskBudgetExceeded as exc:
+                    status = "failed"
+                    final_message = f"Error: {exc}"
+                    logger.warning(f"Subtask {index} stopped: {exc}")
+                    await channel.send(index, MessageEvent(message=f"Subtask {index + 1} failed: {exc}"))
+                except Exception as exc:  # pragma: no cover - best-effort handling
+                    status = "failed"
+                    logger.error(f"Subtask {index} failed: {exc}", exc_info=True)
+                    final_message = f"Error: {exc}"
+                    await channel.send(index, MessageEvent(message=f"Subtask {index + 1} failed: {exc}"))
+                finally:
+                    subtask_span.set(status=status, wait_time=round(wait_time, 3))
+                    if acquired:
+                        self.scheduler.release(provider)
+                    if status == "failed" and fail_fast and not cancel_event.is_set():
+                        logger.info(f"Subtask {index} failed with fail_fast enabled, cancelling remaining subtasks")
+                        cancel_event.set()
+                    results[index] = {
+                        "task_id": index,
+                        "task": task_description,
+                        "result": final_message or "No response from sub-agent",
+                        "status": status,
+                        "wait_time": round(wait_time, 3),
+                    }
+                    await channel.close(index)
+
+        results[:] = [None] * len(tasks)
+        coordinator = EditCoordinator() if self.edit_isolation else None
+        subtask_tasks = []
+
+        def start(index: int, **kwargs) -> None:
+            channel.register()
+            subtask_tasks.append(asyncio.create_task(run_subtask(index, tasks[index], **kwargs)))
+
+        async def drain() -> AsyncGenerator[BaseEvent, None]:
+            # Yield events as they come from any subtask
+            async for batch in channel.batches():
+                for message in batch:
+                    if message.closed:
+                        logger.debug(f"Subtask {message.source} completed")
+                        continue
+                    event = self._tag_event(message.source, message.item)
+                    if event is not None:
+                        yield event
+
+        try:
+            # Start all subtasks; the scheduler decides when each one may run. Free slots
+            # are granted on arrival, so with the priority policy the highest priorities
+            # must arrive first (stable sort: index order among equal priorities).
+            order = list(range(len(tasks)))
+            if self.scheduler.policy == "priority" and priorities:
+                order.sort(key=lambda i: -(priorities[i] if i < len(priorities) else 0))
+            for i in order:
+                start(i, coordinator=coordinator)
+            async for event in drain():
+                yield event
+            await asyncio.gather(*subtask_tasks)
+
+            if coordinator is None:
+                return
+            rejected = coordinator.merge(list(range(len(tasks))))
+            for index, conflicts in rejected.items():
+                files = list(conflicts)
+                results[index]["conflicts"] = files
+                if results[index]["status"] != "completed" or cancel_event.is_set():
                     continue
-                
-                index, event = task.result()
-                
-                if event is None:
-                    # Subtask completed
-                    active_tasks.remove(index)
-                    logger.debug(f"Subtask {index} completed")
-                else:
-                    # Filter out "Thinking" messages to avoid UI spam
-                    if isinstance(event, MessageEvent) and event.message.startswith("Thinking"):
-                        continue  # Skip this event entirely
-                    
-                    # Add task identifier to event message for clarity
-                    if isinstance(event, (ToolCallEvent, ToolResultEvent)):
-                        # Prefix tool events with subtask number
-                        original_message = event.message or ""
-                        event.message = f"[Subtask {index + 1}] {original_message}"
-                    elif isinstance(event, MessageEvent):
-                        original_message = event.message or ""
-                        event.message = f"[Subtask {index + 1}] {original_message}"
-                    
-                    # Set agent information for child agents
-                    # Use index % 8 to cycle through 8 colors for child agents
-                    event.is_parent = False
-                    event.agent_index = index % 8
-                    
+
+                # Re-run one at a time directly on the workspace, which now holds the merged edits
+                yield self._tag_event(index, MessageEvent(
+                    message=f"⚠️ Edits conflict with another subtask in {', '.join(files)}, re-running on the merged workspace"
+                ))
+                start(index, retry_reason=(
+                    f"NOTE: Your previous edits to {', '.join(files)} were discarded because they conflicted "
+                    "with edits made by another agent working in parallel. Re-read the files before editing."
+                ))
+                async for event in drain():
                     yield event
-            
-            # Cancel pending tasks
-            for task in pending:
+                results[index]["conflicts"] = files
+                results[index]["rescheduled"] = True
+        finally:
+            # Consumer stopped early: do not leave producers blocked on a full channel
+            for task in subtask_tasks:
                 task.cancel()
-        
-        # Wait for all subtasks to complete and collect results
-        results = await asyncio.gather(*subtask_tasks)
-        
-        # Generate summary
-        summary_lines = ["Parallel Execution Results:"]
-        for res in results:
-            summary_lines.append(f"--- Task {res['task_id'] + 1} ---")
-            summary_lines.append(f"Description: {res['task']}")
-            summary_lines.append(f"Result: {res['result']}")
-            summary_lines.append("")
+            await asyncio.gather(*subtask_tasks, return_exceptions=True)
+
+    @staticmethod
+    def _tag_event(index: int, event: BaseEvent) -> Optional[BaseEvent]:
+        """Attribute a subtask event to its child agent. Returns None for events to drop."""
+        # Filter out "Thinking" messages to avoid UI spam
+        if isinstance(event, MessageEvent) and event.message.startswith("Thinking"):
+            return None
+
+        # Add task identifier to event message for clarity
+        if isinstance(event, (ToolCallEvent, ToolResultEvent, MessageEvent)):
+            event.message = f"[Subtask {index + 1}] {event.message or ''}"
+
+        # Set agent information for child agents
+        # Use index % 8 to cycle through 8 colors for child agents
+        event.is_parent = False
+        event.agent_index = index % 8
+        return event
+
+    async def execute_streaming(
+        self,
+        tasks: List[str],
+        parent_session_id: Optional[str] = None,
+        context_messages: Optional[List[Dict[str, Any]]] = None,
+        parent_flow_type: Optional[str] = None,
+        parent_information: Optional[str] = None,
+        priorities: Optional[List[int]] = None,
+        fail_fast: bool = False,
+        context: Optional[ToolContext] = None,
+    ) -> AsyncGenerator[BaseEvent, None]:
+        """
+        Execute tasks in parallel and yield all events from subtasks.
+        This is used when we want to stream events to the UI.
+        """
+        if not tasks:
+            yield MessageEvent(message="No tasks provided for parallel execution")
+            return
+
+        logger.info(
+            f"Executing {len(tasks)} parallel tasks with streaming "
+            f"(max concurrency: {self.scheduler.max_concurrency}, policy: {self.scheduler.policy})"
+        )
+
+        results: List[Dict[str, Any]] = []
+        async for event in self._run_subtasks(
+            tasks, results, parent_session_id, parent_flow_type,
+            parent_information, priorities, fail_fast, context,
+        ):
+            yield event
 
-        summary = "\n".join(summary_lines).strip()
-        
         # Yield final summary as a message
-        yield MessageEvent(message=summary)
+        yield MessageEvent(message=self._format_summary(results))
 
     async def execute(
         self,
@@ -230,7 +396,10 @@ class ParallelTaskExecutorTool(MCPTool):
         parent_session_id: Optional[str] = None,
         context_messages: Optional[List[Dict[str, Any]]] = None,
         parent_flow_type: Optional[str] = None,
-        parent_information: Optional[str] = None
+        parent_information: Optional[str] = None,
+        priorities: Optional[List[int]] = None,
+        fail_fast: bool = False,
+        context: Optional[ToolContext] = None,
     ) -> Dict[str, Any]:
         if not tasks:
             return {
@@ -240,54 +409,15 @@ class ParallelTaskExecutorTool(MCPTool):
 
         logger.info(f"Executing {len(tasks)} parallel tasks")
 
-        async def run_subtask(index: int, task_description: str) -> Dict[str, Any]:
-            sub_session_id = f"{parent_session_id}_sub_{index}" if parent_session_id else f"parallel_sub_{index}"
-            final_message = ""
-
-            try:
-                # Determine child flow type based on parent flow type
-                if parent_flow_type == "planact" or parent_flow_type == "PlanActFlow":
-                    from agents.planact_flow import PlanActFlow
-                    agent = PlanActFlow(self.workspace_dir or "", is_parent=False)
-                else:
-                    # Default to ReActFlow (for "react", "ReActFlow", or None)
-                    from agents.react_flow import ReActFlow
-                    agent = ReActFlow(self.workspace_dir or "", is_parent=False)
-                async for event in agent.process(
-                    task_description,
-                    sub_session_id,
-                    parent_information=parent_information,
-                ):
-                    if isinstance(event, MessageEvent):
-                        if event.message and not event.message.startswith("Thinking"):
-                            final_message = event.message
-                    elif isinstance(event, ReportEvent):
-                        final_message = event.message
-            except Exception as exc:  # pragma: no cover - best-effort handling
-                logger.error(f"Subtask {index} failed: {exc}", exc_info=True)
-                final_message = f"Error: {exc}"
-
-            return {
-                "task_id": index,
-                "task": task_description,
-                "result": final_message or "No response from sub-agent",
-            }
-
-        coroutines = [run_subtask(i, task) for i, task in enumerate(tasks)]
-        results = await asyncio.gather(*coroutines)
-
-        summary_lines = ["Parallel Execution Results:"]
-        for res in results:
-            summary_lines.append(f"--- Task {res['task_id'] + 1} ---")
-            summary_lines.append(f"Description: {res['task']}")
-            summary_lines.append(f"Result: {res['result']}")
-            summary_lines.append("")
-
-        summary = "\n".join(summary_lines).strip()
+        results: List[Dict[str, Any]] = []
+        async for _ in self._run_subtasks(
+            tasks, results, parent_session_id, parent_flow_type,
+            parent_information, priorities, fail_fast, context,
+        ):
+            pass
 
         return {
             "success": True,
-            "summary": summary,
+            "summary": self._format_summary(results),
             "tasks": results,
         }
-
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Result Cache - Cache of read-only tool results with workspace-based invalidation
+"""
+
+import copy
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.logger import Logger
+
+logger = Logger('result_cache', log_to_file=False)
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def content_fingerprint(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8', errors='replace')).hexdigest()
+
+
+class ToolResultCache:
+    """
+    LRU cache of tool results.
+
+    Keys come from MCPTool.cache_key. Tools whose result depends on the whole
+    workspace put the generation (see workspace_generation) into their key:
+    every write tool bumps it, which makes those entries unreachable until they
+    are evicted. Content-addressed entries (e.g. lint keyed by a file hash)
+    stay valid across writes. Results produced while a write was running are
+    not stored.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, enabled: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Dict[str, Any]]]" = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> "ToolResultCache":
+        enabled = os.getenv("TOOL_RESULT_CACHE", "true").lower() in ("true", "1", "yes", "on")
+        try:
+            max_entries = int(os.getenv("TOOL_RESULT_CACHE_SIZE", str(DEFAULT_MAX_ENTRIES)))
+        except ValueError:
+            max_entries = DEFAULT_MAX_ENTRIES
+        return cls(max_entries=max_entries, enabled=enabled)
+
+    @staticmethod
+    def make_key(tool_name: str, key: Any) -> str:
+        return json.dumps([tool_name, key], sort_keys=True, default=str)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, result = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key: str, result: Dict[str, Any], ttl: Optional[float] = None, generation: Optional[int] = None) -> None:
+        """
+        Store a result.
+
+        Args:
+            key: Key from make_key
+            result: Tool result
+            ttl: Seconds until the entry expires (None: until evicted)
+            generation: Generation observed before the tool ran; the result is
+                        dropped if a write happened in the meantime
+        """
+        if generation is not None and generation != self.generation:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (expires_at, copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, reason: str = "") -> None:
+        """Start a new workspace generation (called after every write)."""
+        self.generation += 1
+        logger.debug(f"Tool result cache invalidated (generation {self.generation}){': ' + reason if reason else ''}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_result_cache: Optional[ToolResultCache] = None
+
+
+def get_result_cache() -> ToolResultCache:
+    """Process-wide cache used by execute_tool."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ToolResultCache.from_env()
+    return _result_cache
+
+
+def workspace_generation() -> int:
+    """Counter bumped by every write tool, for keys of whole-workspace results."""
+    return get_result_cache().generation
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Search Backend - Pluggable web search backends behind a cached, single-flight search service
+"""
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+try:
+    from ddgs import DDGS
+    HAS_DDGS = True
+except ImportError:
+    # Fallback to old package name for backward compatibility
+    try:
+        from duckduckgo_search import DDGS
+        HAS_DDGS = True
+    except ImportError:
+        HAS_DDGS = False
+        DDGS = None
+
+from utils.logger import Logger
+from tools.http_client import get_http_client
+
+logger = Logger('search_backend', log_to_file=False)
+
+DEFAULT_REGION = "us-en"
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE_TTL = 900.0
+DEFAULT_CACHE_SIZE = 256
+# Pause after every DDGS request; the search engines rate-limit bursts
+DDGS_PAUSE = 0.5
+
+SearchKey = Tuple[str, str, int]
+
+
+def normalize_query(query: str) -> str:
+    """Cache key form of a query: lower case with collapsed whitespace."""
+    return " ".join(query.lower().split())
+
+
+class SearchBackend(ABC):
+    """A web search engine. Results are dicts with title, url, snippet and rank."""
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @abstractmethod
+    async def search(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        """
+        Run one search.
+
+        Raises:
+            Exception: If the search failed (failures are not cached)
+        """
+        pass
+
+
+class DDGSBackend(SearchBackend):
+    """DDGS (Dux Distributed Global Search), run in a bounded thread pool since its client is blocking."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, pause: float = DDGS_PAUSE):
+        self.pause = pause
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ddgs")
+
+    @property
+    def name(self) -> str:
+        return "ddgs"
+
+    def _search_sync(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        if not HAS_DDGS or DDGS is None:
+            raise RuntimeError("DDGS library not available")
+
+        ddgs = DDGS()
+        try:
+            # New ddgs package API (uses 'query' parameter)
+            search_results = ddgs.text(query=query, region=region, max_results=max_results)
+        except TypeError:
+            # Old duckduckgo_search API (uses 'keywords' parameter)
+            search_results = ddgs.text(
+                keywords=query,
+                max_results=max_results,
+                backend="auto",
+                region=region,
+                safesearch="moderate",
+            )
+        # Convert to list if it's a generator
+        search_results = list(search_results) if search_results is not None else []
+        if not search_results:
+            logger.warning(f"Search returned no results for query: {query}")
+
+        return [
+            {
+                "title": result.get("title", ""),
+                "url": result.get("href", ""),
+                "snippet": result.get("body", ""),
+                "rank": i + 1,
+            }
+            for i, result in enumerate(search_results)
+        ]
+
+    async def search(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._search_sync, query, max_results, region)
+        finally:
+            await asyncio.sleep(self.pause)
+
+
+class HttpSearchBackend(SearchBackend):
+    """
+    JSON search endpoint, e.g. a local fake search server for tests and offline benchmarks.
+
+    GET <url>?q=<query>&max_results=<n>&region=<region> must answer
+    {"results": [{"title": ..., "url": ..., "snippet": ...}, ...]}.
+    """
+
+    def __init__(self, url: str, timeout: float = 15.0):
+        self.url = url
+        self.timeout = timeout
+
+    @property
+    def name(self) -> str:
+        return "http"
+
+    async def search(self, query: str, max_results: int, region: str) -> List[Dict[str, Any]]:
+        params = {"q": query, "max_results": str(max_results), "region": region}
+        async with get_http_client().session.get(
+            self.url, params=params, timeout=aiohttp.ClientTimeout(total=self.timeout)
+        ) as resp:
+            resp.raise_for_status()
+            data = await resp.json(content_type=None)
+        return [
+            {
+                "title": result.get("title", ""),
+                "url": result.get("url", ""),
+                "snippet": result.get("snippet", ""),
+                "rank": i + 1,
+            }
+            for i, result in enumerate(data.get("results", [])[:max_results])
+        ]
+
+
+class SearchService:
+    """
+    Cached, deduplicated access to a SearchBackend.
+
+    Results are kept for `ttl` seconds, keyed by normalized query, region and
+    max_results. Identical searches issued while one is running wait for it
+    instead of reaching the backend (single-flight).
+    """
+
+    def __init__(self, backend: SearchBackend, ttl: float = DEFAULT_CACHE_TTL, max_entries: int = DEFAULT_CACHE_SIZE):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._cache: "OrderedDict[SearchKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[SearchKey, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls) -> "SearchService":
+        def env_number(name: str, default, cast=int):
+            try:
+                return cast(os.getenv(name, str(default)))
+            except ValueError:
+                return default
+
+        url = os.getenv("WEB_SEARCH_URL")
+        if url:
+            backend: SearchBackend = HttpSearchBackend(url)
+        else:
+            backend = DDGSBackend(workers=env_number("WEB_SEARCH_WORKERS", DEFAULT_WORKERS))
+        return cls(
+            backend,
+            ttl=env_number("WEB_SEARCH_CACHE_TTL", DEFAULT_CACHE_TTL, float),
+            max_entries=env_number("WEB_SEARCH_CACHE_SIZE", DEFAULT_CACHE_SIZE),
+        )
+
+    def _lookup(self, key: SearchKey) -> Optional[List[Dict[str, Any]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if time.monotonic() >= expires_at:
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return results
+
+    def _store(self, key: SearchKey, results: List[Dict[str, Any]]) -> None:
+        if self.ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.ttl, results)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def search(self, query: str, max_results: int = 10, region: str = DEFAULT_REGION) -> List[Dict[str, Any]]:
+        """
+        Search through the cache.
+
+        Args:
+            query: Search query string
+            max_results: Maximum number of results
+            region: Search region, e.g. "us-en"
+
+        Returns:
+            Search results (a copy; callers may modify them)
+        """
+        key = (normalize_query(query), region, max_results)
+        cached = self._lookup(key)
+        if cached is not None:
+            self.hits += 1
+            logger.debug(f"Search cache hit: {query}")
+            return [dict(result) for result in cached]
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            logger.debug(f"Joining in-flight search: {query}")
+        else:
+            self.misses += 1
+            inflight = asyncio.ensure_future(self.backend.search(query, max_results, region))
+            self._inflight[key] = inflight
+
+            def done(future: asyncio.Future) -> None:
+                self._inflight.pop(key, None)
+                if not future.cancelled() and future.exception() is None:
+                    self._store(key, future.result())
+
+            inflight.add_done_callback(done)
+        # Shielded so a caller that is cancelled does not cancel the search for the others
+        results = await asyncio.shield(inflight)
+        return [dict(result) for result in results]
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+
+_service: Optional[SearchService] = None
+
+
+def get_search_service() -> SearchService:
+    """Process-wide search service shared by all WebSearchTool calls."""
+    global _service
+    if _service is None:
+        _service = SearchService.from_env()
+    return _service
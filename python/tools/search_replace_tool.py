@@ -5,14 +5,21 @@ Search Replace Tool - Performs exact string replacements in files
 
 import os
 import asyncio
+import contextlib
+import difflib
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.edit_coordinator import file_exists, read_file, write_files
 
 # Verbose logging flag: if True, log full file content on matching errors
 VERBOSE = True
 
+# Combined diff returned by a multi-edit call is cut after this many characters
+MAX_DIFF_CHARS = 20000
+
 logger = Logger('search_replace_tool', log_to_file=False)
 
 
@@ -56,13 +63,13 @@ class SearchReplaceTool(MCPTool):
             "type": "function",
             "function": {
                 "name": "search_replace",
-                "description": "Performs exact string replacements in files.\n\nUsage:\n- When editing text, ensure you preserve the exact indentation (tabs/spaces) as it appears before.\n- ALWAYS prefer editing existing files in the codebase. NEVER write new files unless explicitly required.\n- Only use emojis if the user explicitly requests it. Avoid adding emojis to files unless asked.\n- The edit will FAIL if old_string is not unique in the file. Either provide a larger string with more surrounding context to make it unique or use replace_all to change every instance of old_string.\n- Use replace_all for replacing and renaming strings across the file. This parameter is useful if you want to rename a variable for instance.\n- To create or overwrite a file, you should prefer the write tool.",
+                "description": "Performs exact string replacements in files.\n\nUsage:\n- When editing text, ensure you preserve the exact indentation (tabs/spaces) as it appears before.\n- ALWAYS prefer editing existing files in the codebase. NEVER write new files unless explicitly required.\n- Only use emojis if the user explicitly requests it. Avoid adding emojis to files unless asked.\n- The edit will FAIL if old_string is not unique in the file. Either provide a larger string with more surrounding context to make it unique or use replace_all to change every instance of old_string.\n- Use replace_all for replacing and renaming strings across the file. This parameter is useful if you want to rename a variable for instance.\n- To create or overwrite a file, you should prefer the write tool.\n- To make several edits at once (in one file or several files), pass them as `edits` instead of old_string/new_string. Every old_string is matched against the files as they were before the call, edits must not overlap, and either all edits are applied or none.",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "file_path": {
                             "type": "string",
-                            "description": "The path to the file to modify. Always specify the target file as the first argument. You can use either a relative path in the workspace or an absolute path."
+                            "description": "The path to the file to modify. Always specify the target file as the first argument. You can use either a relative path in the workspace or an absolute path. With edits, the default file of edits that do not set their own."
                         },
                         "old_string": {
                             "type": "string",
@@ -75,9 +82,23 @@ class SearchReplaceTool(MCPTool):
                         "replace_all": {
                             "type": "boolean",
                             "description": "Replace all occurences of old_string (default false)"
+                        },
+                        "edits": {
+                            "type": "array",
+                            "description": "Several replacements applied in one atomic step, instead of old_string/new_string. Each edit uses the top-level file_path unless it sets its own.",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "file_path": {"type": "string"},
+                                    "old_string": {"type": "string"},
+                                    "new_string": {"type": "string"},
+                                    "replace_all": {"type": "boolean"}
+                                },
+                                "required": ["old_string", "new_string"]
+                            }
                         }
                     },
-                    "required": ["file_path", "old_string", "new_string"]
+                    "required": ["file_path"]
                 }
             }
         }
@@ -85,18 +106,28 @@ class SearchReplaceTool(MCPTool):
     def get_call_notification(self, tool_args: Dict[str, Any]) -> Optional[str]:
         """Get custom notification for search_replace tool call."""
         file_path = tool_args.get("file_path", "")
+        edits = tool_args.get("edits")
+        if edits:
+            files = {edit.get("file_path") or file_path for edit in edits if isinstance(edit, dict)}
+            return f"Applying {len(edits)} edit(s) to {', '.join(sorted(files))}"
         old_preview = tool_args.get("old_string", "")[:50]
         new_preview = tool_args.get("new_string", "")[:50]
         replace_all = tool_args.get("replace_all", False)
         mode = "all occurrences" if replace_all else "first occurrence"
         return f"Replacing string in {file_path} ({mode})\nOld: {old_preview}...\nNew: {new_preview}..."
     
+    def invalidates_cache(self, tool_args: Dict[str, Any]) -> bool:
+        return True
+    
     def get_result_notification(self, tool_result: Dict[str, Any]) -> Optional[str]:
         """Get custom notification for search_replace tool result."""
         success = tool_result.get("success", False)
         
         if success:
             replacements_count = tool_result.get("replacements_count", 0)
+            files = tool_result.get("files")
+            if files is not None:
+                return f"✅ Replacement successful ({replacements_count} occurrence(s) replaced in {len(files)} file(s))"
             return f"✅ Replacement successful ({replacements_count} occurrence(s) replaced)"
         else:
             error = tool_result.get("error", "Unknown error")
@@ -116,6 +147,14 @@ class SearchReplaceTool(MCPTool):
         # Replace \r\n with \n first, then replace remaining \r with \n
         return text.replace('\r\n', '\n').replace('\r', '\n')
     
+    def _detect_line_ending(self, text: str) -> str:
+        """Line ending style of a file, used to write it back unchanged."""
+        if '\r\n' in text:
+            return '\r\n'
+        if '\r' in text and '\n' not in text:
+            return '\r'
+        return '\n'
+    
     def _format_string_for_log(self, text: str, max_length: int = 500) -> str:
         """
         Format a string for logging purposes.
@@ -185,12 +224,198 @@ class SearchReplaceTool(MCPTool):
                 self._file_locks[file_path] = asyncio.Lock()
             return self._file_locks[file_path]
     
+    def _resolve_path(self, file_path: str, context: Optional[ToolContext]) -> Tuple[Optional[Path], Optional[Dict[str, Any]]]:
+        """
+        Resolve a file path against the caller's workspace.
+        
+        Returns:
+            (resolved path, None) or (None, error result)
+        """
+        workspace_dir = self.resolve_workspace(context)
+        if not os.path.isabs(file_path):
+            if not workspace_dir:
+                logger.error("file_path must be absolute or workspace_dir must be set")
+                return None, {
+                    "success": False,
+                    "error": f"Path error: Must provide absolute path or set workspace directory\nReceived path: {file_path}",
+                    "suggestion": "Please use absolute path or ensure workspace directory is set"
+                }
+            file_path = os.path.join(workspace_dir, file_path)
+        return Path(file_path).resolve(), None
+    
+    def _edit_error(self, index: int, error: str, file_path: Optional[Path] = None, **extra: Any) -> Dict[str, Any]:
+        logger.error(f"edits[{index}]: {error}")
+        result: Dict[str, Any] = {"success": False, "error": f"edits[{index}]: {error}", "edit_index": index}
+        if file_path is not None:
+            result["file_path"] = str(file_path)
+        result.update(extra)
+        return result
+    
+    async def _execute_edits(
+        self,
+        edits: List[Dict[str, Any]],
+        default_file_path: Optional[str],
+        context: Optional[ToolContext],
+    ) -> Dict[str, Any]:
+        """
+        Apply several edits in one step.
+        
+        Every old_string is matched against the original file content and all
+        replacements of a file are applied in a single pass. Nothing is written
+        unless every edit matches; the files are then replaced atomically.
+        
+        Args:
+            edits: Edits with old_string, new_string and optional file_path/replace_all
+            default_file_path: File of edits that do not set file_path
+            context: Tool context of the calling agent
+        
+        Returns:
+            Dictionary with execution results and a combined unified diff
+        """
+        logger.info("=" * 80)
+        logger.info(f"Execute search_replace tool with {len(edits)} edit(s)")
+        
+        # Validate all edits and group them by file, keeping their request order
+        edits_by_file: Dict[Path, List[Tuple[int, Dict[str, Any]]]] = {}
+        for index, edit in enumerate(edits):
+            if not isinstance(edit, dict):
+                return self._edit_error(index, "each edit must be an object with old_string and new_string")
+            old_string = edit.get("old_string")
+            new_string = edit.get("new_string")
+            if not isinstance(old_string, str) or not isinstance(new_string, str):
+                return self._edit_error(index, "old_string and new_string are required")
+            if not old_string:
+                return self._edit_error(index, "old_string must not be empty")
+            if old_string == new_string:
+                return self._edit_error(index, "old_string and new_string must be different")
+            file_path = edit.get("file_path") or default_file_path
+            if not file_path:
+                return self._edit_error(index, "no file_path given for this edit or for the call")
+            resolved_path, error = self._resolve_path(file_path, context)
+            if error is not None:
+                error["edit_index"] = index
+                return error
+            if not file_exists(resolved_path):
+                return self._edit_error(index, f"File does not exist: {resolved_path}", resolved_path)
+            edits_by_file.setdefault(resolved_path, []).append((index, edit))
+        
+        # Locks are taken in path order so concurrent multi-file calls cannot deadlock
+        paths = sorted(edits_by_file, key=str)
+        file_locks = [await self._get_file_lock(str(path)) for path in paths]
+        
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for file_lock in file_locks:
+                    await stack.enter_async_context(file_lock)
+                
+                new_contents: Dict[str, str] = {}
+                summaries = []
+                diffs = []
+                for path in paths:
+                    content = read_file(path)
+                    normalized_content = self._normalize_line_endings(content)
+                    
+                    # (start, end, replacement, edit index) of every replaced span
+                    spans: List[Tuple[int, int, str, int]] = []
+                    for index, edit in edits_by_file[path]:
+                        matches = self._find_all_matches(normalized_content, edit["old_string"])
+                        if not matches:
+                            return self._edit_error(
+                                index, "old_string not found in file", path,
+                                suggestion="Every old_string is matched against the file before any edit of this call is applied"
+                            )
+                        if not edit.get("replace_all") and len(matches) > 1:
+                            return self._edit_error(
+                                index,
+                                f"Found {len(matches)} occurrences of old_string. Either provide a larger string with more surrounding context to make it unique, or set replace_all=True for this edit.",
+                                path,
+                                matches_found=len(matches)
+                            )
+                        new_string = self._normalize_line_endings(edit["new_string"])
+                        end = 0
+                        for start_pos, end_pos in matches:
+                            # Like str.replace, a replace_all edit does not replace overlapping occurrences
+                            if start_pos >= end:
+                                spans.append((start_pos, end_pos, new_string, index))
+                                end = end_pos
+                    
+                    spans.sort()
+                    for previous, span in zip(spans, spans[1:]):
+                        if span[0] < previous[1]:
+                            return self._edit_error(
+                                span[3], f"overlaps edits[{previous[3]}]; merge them into one edit", path
+                            )
+                    
+                    pieces = []
+                    position = 0
+                    for start_pos, end_pos, new_string, _ in spans:
+                        pieces.append(normalized_content[position:start_pos])
+                        pieces.append(new_string)
+                        position = end_pos
+                    pieces.append(normalized_content[position:])
+                    result_content = "".join(pieces)
+                    
+                    display_path = self._display_path(path, context)
+                    diffs.extend(difflib.unified_diff(
+                        normalized_content.splitlines(keepends=True),
+                        result_content.splitlines(keepends=True),
+                        fromfile=f"a/{display_path}",
+                        tofile=f"b/{display_path}",
+                    ))
+                    
+                    line_ending = self._detect_line_ending(content)
+                    if line_ending != '\n':
+                        result_content = result_content.replace('\n', line_ending)
+                    new_contents[str(path)] = result_content
+                    summaries.append({
+                        "file_path": str(path),
+                        "edits": len(edits_by_file[path]),
+                        "replacements_count": len(spans),
+                    })
+                
+                logger.info(f"Writing {len(new_contents)} file(s)")
+                write_files(new_contents)
+        except Exception as e:
+            logger.error(f"Error in search_replace: {e}", exc_info=True)
+            return {
+                "success": False,
+                "error": str(e),
+                "file_path": str(paths[0]) if len(paths) == 1 else None
+            }
+        
+        diff = "".join(line if line.endswith("\n") else line + "\n\\ No newline at end of file\n" for line in diffs)
+        result: Dict[str, Any] = {
+            "success": True,
+            "files": summaries,
+            "replacements_count": sum(summary["replacements_count"] for summary in summaries),
+            "diff": diff[:MAX_DIFF_CHARS],
+            "message": f"Successfully applied {len(edits)} edit(s) to {len(summaries)} file(s)"
+        }
+        if len(summaries) == 1:
+            result["file_path"] = summaries[0]["file_path"]
+        if len(diff) > MAX_DIFF_CHARS:
+            result["diff_truncated"] = True
+        logger.info("Search_replace completed successfully")
+        logger.info("=" * 80)
+        return result
+    
+    def _display_path(self, path: Path, context: Optional[ToolContext]) -> str:
+        workspace_dir = self.resolve_workspace(context)
+        if workspace_dir:
+            try:
+                return path.relative_to(Path(workspace_dir).resolve()).as_posix()
+            except ValueError:
+                pass
+        return str(path)
+    
     async def execute(
         self, 
-        file_path: str, 
-        old_string: str,
-        new_string: str,
-        replace_all: bool = False
+        file_path: Optional[str] = None, 
+        old_string: Optional[str] = None,
+        new_string: Optional[str] = None,
+        replace_all: bool = False,
+        edits: Optional[List[Dict[str, Any]]] = None,
+        context: Optional[ToolContext] = None,
     ) -> Dict[str, Any]:
         """
         Perform exact string replacements in files.
@@ -200,12 +425,23 @@ class SearchReplaceTool(MCPTool):
             old_string: The text to replace (must match exactly including whitespace)
             new_string: The text to replace it with (must be different from old_string)
             replace_all: If True, replace all occurrences; if False, only replace first occurrence
+            edits: Several edits applied all-or-nothing instead of old_string/new_string
+            context: Tool context of the calling agent
         
         Returns:
             Dictionary with execution results
         """
+        if edits:
+            return await self._execute_edits(edits, file_path, context)
+        if file_path is None or old_string is None or new_string is None:
+            return {
+                "success": False,
+                "error": "file_path, old_string and new_string are required (or pass edits)",
+                "file_path": file_path
+            }
+        
         logger.info("=" * 80)
-        logger.info(f"Execute search_replace tool")
+        logger.info("Execute search_replace tool")
         logger.info(f"File path: {file_path}")
         logger.info(f"Old string length: {len(old_string)}")
         logger.info(f"Old string content: {self._format_string_for_log(old_string)}")
@@ -223,24 +459,13 @@ class SearchReplaceTool(MCPTool):
             }
         
         # Resolve file path
-        if not os.path.isabs(file_path):
-            if self.workspace_dir:
-                original_path = file_path
-                file_path = os.path.join(self.workspace_dir, file_path)
-                logger.info(f"Resolved relative path: '{original_path}' -> '{file_path}'")
-            else:
-                logger.error(f"file_path must be absolute or workspace_dir must be set")
-                return {
-                    "success": False,
-                    "error": f"Path error: Must provide absolute path or set workspace directory\nReceived path: {file_path}",
-                    "suggestion": "Please use absolute path or ensure workspace directory is set"
-                }
-        
-        resolved_path = Path(file_path).resolve()
+        resolved_path, error = self._resolve_path(file_path, context)
+        if error is not None:
+            return error
         logger.info(f"Resolved file path: {resolved_path}")
         
         # Check if file exists
-        if not resolved_path.exists():
+        if not file_exists(resolved_path):
             logger.error(f"File does not exist: {resolved_path}")
             return {
                 "success": False,
@@ -259,8 +484,7 @@ class SearchReplaceTool(MCPTool):
                 
                 # Read file content
                 logger.debug(f"Reading file content from: {resolved_path}")
-                with open(resolved_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+                content = read_file(resolved_path)
                 
                 logger.debug(f"File has {len(content)} characters")
                 
@@ -272,7 +496,7 @@ class SearchReplaceTool(MCPTool):
                 matches = self._find_all_matches(normalized_content, normalized_old_string)
                 
                 if not matches:
-                    logger.error(f"old_string not found in file")
+                    logger.error("old_string not found in file")
                     # Log full file content for debugging if VERBOSE is enabled
                     if VERBOSE:
                         logger.error(f"File content at time of error (full content, {len(content)} characters):")
@@ -285,7 +509,7 @@ class SearchReplaceTool(MCPTool):
                         logger.error("=" * 80)
                     return {
                         "success": False,
-                        "error": f"old_string not found in file",
+                        "error": "old_string not found in file",
                         "file_path": str(resolved_path),
                         "suggestion": "Please check if old_string is correct and ensure it matches exactly (including whitespace, indentation, etc.)"
                     }
@@ -325,23 +549,14 @@ class SearchReplaceTool(MCPTool):
                     logger.info(f"Replaced first occurrence at position {start_pos}-{end_pos}")
                 
                 # Write back to file (preserve original line ending style)
-                # Detect original line ending style
-                if '\r\n' in content:
-                    line_ending = '\r\n'
-                elif '\r' in content and '\n' not in content:
-                    line_ending = '\r'
-                else:
-                    line_ending = '\n'
-                
-                # Convert normalized result back to original line ending style
+                line_ending = self._detect_line_ending(content)
                 if line_ending != '\n':
                     result_content = result_content.replace('\n', line_ending)
                 
                 logger.info(f"Writing modified content to: {resolved_path}")
-                with open(resolved_path, 'w', encoding='utf-8') as f:
-                    f.write(result_content)
+                write_files({str(resolved_path): result_content})
                 
-                logger.info(f"Search_replace completed successfully")
+                logger.info("Search_replace completed successfully")
                 logger.info(f"Releasing lock for file: {resolved_path}")
                 logger.info("=" * 80)
                 
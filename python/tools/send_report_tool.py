@@ -6,6 +6,7 @@ Send Report Tool - Send final report to user
 from typing import Dict, Any, Optional
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
 from models import ToolCallEvent, ToolResultEvent
 
 logger = Logger('send_report_tool', log_to_file=False)
@@ -70,7 +71,7 @@ class SendReportTool(MCPTool):
         # Don't show notification for message result, it's the final response
         return None
     
-    async def execute(self, message: str) -> Dict[str, Any]:
+    async def execute(self, message: str, context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Send a message to the user.
         
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Shell Session - Persistent bash sessions for execute_command
+"""
+
+import asyncio
+import shutil
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from utils.logger import Logger
+from tools.command_runner import (
+    DEFAULT_MAX_OUTPUT_BYTES,
+    DEFAULT_PROGRESS_INTERVAL,
+    KILL_GRACE_SECONDS,
+    READ_CHUNK_SIZE,
+    CommandResult,
+    OutputCapture,
+    kill_process_group,
+    retrieve_exception,
+    wait_with_progress,
+)
+
+logger = Logger('shell_session', log_to_file=False)
+
+DEFAULT_POOL_SIZE = 4
+
+_POSIX = sys.platform != "win32"
+
+
+class SessionClosed(Exception):
+    """Raised when the shell exits while a command is running (e.g. `exit`)."""
+
+
+async def _read_until_marker(stream: asyncio.StreamReader, marker: bytes, capture: OutputCapture) -> bytes:
+    """
+    Copy a stream into a capture up to the marker.
+
+    Returns:
+        The rest of the marker line (the exit status on stdout)
+    """
+    pending = bytearray()
+    keep = len(marker) - 1
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            capture.write(bytes(pending))
+            raise SessionClosed()
+        pending += chunk
+        index = pending.find(marker)
+        if index >= 0:
+            capture.write(bytes(pending[:index]))
+            rest = pending[index + len(marker):]
+            while b"\n" not in rest:
+                more = await stream.read(READ_CHUNK_SIZE)
+                if not more:
+                    raise SessionClosed()
+                rest += more
+            return bytes(rest.split(b"\n", 1)[0])
+        # Hold back bytes that may be the start of a marker split across reads
+        if len(pending) > keep:
+            capture.write(bytes(pending[:-keep] if keep else pending))
+            del pending[:len(pending) - keep]
+
+
+class ShellSession:
+    """
+    One long-lived bash process.
+
+    Commands are sent on stdin, framed by a random marker that is echoed on
+    stdout (with the exit status) and stderr when the command is done. The
+    command runs in the shell itself, so `cd`, `export` and `source venv/bin/activate`
+    carry over to the next command. Its stdin is /dev/null.
+    """
+
+    def __init__(self, cwd: str):
+        self.cwd = cwd
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.lock = asyncio.Lock()
+        self.commands_run = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        self.process = await asyncio.create_subprocess_exec(
+            "bash", "--noprofile", "--norc",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            start_new_session=_POSIX,
+        )
+        logger.debug(f"Started shell session (pid {self.process.pid}) in {self.cwd}")
+
+    def kill(self) -> None:
+        """Kill the shell and everything it started without waiting (e.g. when its loop is gone)."""
+        if self.alive:
+            kill_process_group(self.process)
+        self.process = None
+
+    async def close(self) -> None:
+        """Kill the shell and everything it started, and reap it."""
+        process, self.process = self.process, None
+        if process is None:
+            return
+        if process.returncode is None:
+            kill_process_group(process)
+        if process.stdin is not None:
+            process.stdin.close()
+        try:
+            await asyncio.wait_for(process.wait(), KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shell session (pid {process.pid}) did not exit after kill")
+
+    async def run(
+        self,
+        command: str,
+        timeout: float,
+        max_output_bytes: int = DEFAULT_MAX_OUTPUT_BYTES,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+    ) -> CommandResult:
+        """
+        Run a command in the session, after the commands already queued on it.
+
+        On timeout or cancellation the shell is killed and the next command
+        starts a fresh one. Same arguments as command_runner.run_command.
+
+        Returns:
+            CommandResult; returncode is None if the command was killed
+        """
+        async with self.lock:
+            return await self._run(command, timeout, max_output_bytes, on_progress, progress_interval)
+
+    async def _run(
+        self,
+        command: str,
+        timeout: float,
+        max_output_bytes: int,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]],
+        progress_interval: float,
+    ) -> CommandResult:
+        if not self.alive:
+            await self.start()
+        started = time.perf_counter()
+        self.last_used = time.monotonic()
+        token = uuid.uuid4().hex
+        marker = f"\x1e__BC_{token}__\x1e".encode()
+        script = (
+            f"IFS= read -r -d '' __bc_command <<'__BC_EOF_{token}'\n"
+            f"{command}\n"
+            f"__BC_EOF_{token}\n"
+            f"eval \"$__bc_command\" </dev/null\n"
+            f"printf '\\036__BC_{token}__\\036%d\\n' \"$?\"\n"
+            f"printf '\\036__BC_{token}__\\036\\n' >&2\n"
+        )
+        stdout = OutputCapture("stdout", max_output_bytes)
+        stderr = OutputCapture("stderr", max_output_bytes)
+        done = asyncio.ensure_future(asyncio.gather(
+            _read_until_marker(self.process.stdout, marker, stdout),
+            _read_until_marker(self.process.stderr, marker, stderr),
+        ))
+        done.add_done_callback(retrieve_exception)
+        timed_out = False
+        returncode: Optional[int] = None
+        completed = False
+        try:
+            self.process.stdin.write(script.encode())
+            await self.process.stdin.drain()
+            timed_out = await wait_with_progress(done, stdout, stderr, timeout, on_progress, progress_interval)
+            if not timed_out:
+                status = done.result()[0]
+                returncode = int(status) if status.strip().isdigit() else None
+            completed = not timed_out
+        except (SessionClosed, BrokenPipeError, ConnectionResetError):
+            # The command ended the shell (exit, exec, set -e); its status is the shell's
+            try:
+                returncode = await asyncio.wait_for(self.process.wait(), KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                returncode = None
+            completed = True
+            logger.info("Shell session ended by command")
+        finally:
+            if not done.done():
+                done.cancel()
+            if not completed or not self.alive:
+                await self.close()
+            stdout.close()
+            stderr.close()
+        self.commands_run += 1
+        return CommandResult(
+            returncode=returncode,
+            stdout=stdout,
+            stderr=stderr,
+            timed_out=timed_out,
+            elapsed=time.perf_counter() - started,
+        )
+
+
+class ShellSessionPool:
+    """
+    Sessions keyed by agent and workspace, at most `max_sessions` at once.
+    The least recently used idle session is closed to make room; its agent
+    can find out with `was_evicted` before its next command.
+    """
+
+    def __init__(self, max_sessions: int = DEFAULT_POOL_SIZE):
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[Tuple[str, str], ShellSession]" = OrderedDict()
+        self._evicted: Set[Tuple[str, str]] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @staticmethod
+    def available() -> bool:
+        return _POSIX and shutil.which("bash") is not None
+
+    async def get(self, key: str, cwd: str) -> ShellSession:
+        """Session of an agent in a workspace, created on first use."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Subprocess transports belong to the loop that created them; they cannot be awaited here
+            for session in self._sessions.values():
+                session.kill()
+            self._sessions.clear()
+            self._loop = loop
+        pool_key = (key, cwd)
+        session = self._sessions.get(pool_key)
+        if session is None:
+            session = ShellSession(cwd)
+            self._sessions[pool_key] = session
+            await self._evict(keep=pool_key)
+        self._sessions.move_to_end(pool_key)
+        return session
+
+    def was_evicted(self, key: str, cwd: str) -> bool:
+        """True once after the agent's session was closed to make room for others."""
+        if (key, cwd) in self._evicted:
+            self._evicted.discard((key, cwd))
+            return True
+        return False
+
+    async def reset(self, key: str, cwd: str) -> None:
+        """Close an agent's session; its next command starts a fresh shell."""
+        self._evicted.discard((key, cwd))
+        session = self._sessions.pop((key, cwd), None)
+        if session is not None:
+            await session.close()
+
+    async def close_all(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        self._evicted.clear()
+        await asyncio.gather(*(session.close() for session in sessions))
+
+    async def _evict(self, keep: Tuple[str, str]) -> None:
+        for pool_key in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                return
+            session = self._sessions[pool_key]
+            if pool_key != keep and not session.lock.locked():
+                del self._sessions[pool_key]
+                self._evicted.add(pool_key)
+                logger.info(f"Closed the idle shell session of {pool_key[0]} to stay within {self.max_sessions} sessions")
+                await session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Subtask Scheduler - Admission control and budgets for parallel sub-agents
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+from utils.logger import Logger
+
+logger = Logger('subtask_scheduler', log_to_file=False)
+
+DEFAULT_MAX_CONCURRENCY = 4
+QUEUE_POLICIES = ("fifo", "priority")
+
+
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid integer for {name}: {value}")
+        return default
+
+
+def _env_float(name: str, default: Optional[float] = None) -> Optional[float]:
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid number for {name}: {value}")
+        return default
+
+
+def current_provider() -> str:
+    """Provider key of the LLM endpoint sub-agents talk to (host of OPENAI_BASE_URL)."""
+    base_url = os.getenv("OPENAI_BASE_URL") or ""
+    return urlparse(base_url).netloc or base_url or "default"
+
+
+class SubtaskBudgetExceeded(Exception):
+    """Raised when a subtask exceeds its token budget."""
+
+
+@dataclass
+class SubtaskBudget:
+    """Per-subtask limits. None means unlimited."""
+    max_iterations: Optional[int] = None
+    timeout: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "SubtaskBudget":
+        return cls(
+            max_iterations=_env_int("PARALLEL_SUBTASK_MAX_ITERATIONS"),
+            timeout=_env_float("PARALLEL_SUBTASK_TIMEOUT"),
+            max_tokens=_env_int("PARALLEL_SUBTASK_MAX_TOKENS"),
+        )
+
+
+class TokenBudgetClient:
+    """Chat client proxy that counts tokens and enforces a token budget."""
+
+    def __init__(self, client: Any, max_tokens: int):
+        self._client = client
+        self.max_tokens = max_tokens
+        self.tokens_used = 0
+
+    async def ask(self, *args, **kwargs):
+        result = await self._client.ask(*args, **kwargs)
+        usage = result.get("usage") or {}
+        self.tokens_used += usage.get("total_tokens", 0) or 0
+        if self.tokens_used > self.max_tokens:
+            raise SubtaskBudgetExceeded(
+                f"Subtask exceeded its token budget ({self.tokens_used}/{self.max_tokens} tokens)"
+            )
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+@dataclass(order=True)
+class _Waiter:
+    sort_key: tuple
+    provider: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class SubtaskScheduler:
+    """
+    Admits subtasks under a global and a per-provider concurrency limit.
+
+    Waiting subtasks are granted slots in FIFO order or, with the "priority"
+    policy, highest priority first (FIFO among equal priorities). A waiter whose
+    provider is saturated does not block waiters for other providers.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        provider_limits: Optional[Dict[str, int]] = None,
+        default_provider_limit: Optional[int] = None,
+        policy: str = "priority",
+    ):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy: {policy} (expected one of {QUEUE_POLICIES})")
+        self.max_concurrency = max(1, max_concurrency)
+        self.provider_limits = dict(provider_limits or {})
+        self.default_provider_limit = default_provider_limit or self.max_concurrency
+        self.policy = policy
+        self._running = 0
+        self._running_by_provider: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "SubtaskScheduler":
+        """
+        Build a scheduler from PARALLEL_MAX_CONCURRENCY, PARALLEL_PROVIDER_CONCURRENCY
+        and PARALLEL_QUEUE_POLICY.
+
+        PARALLEL_PROVIDER_CONCURRENCY is either a single limit for every provider or a
+        comma-separated list of host=limit pairs (e.g. "api.openai.com=4,localhost:8000=16").
+        """
+        max_concurrency = _env_int("PARALLEL_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+        provider_limits: Dict[str, int] = {}
+        default_provider_limit = None
+        raw_limits = os.getenv("PARALLEL_PROVIDER_CONCURRENCY", "").strip()
+        if raw_limits:
+            if "=" not in raw_limits:
+                default_provider_limit = _env_int("PARALLEL_PROVIDER_CONCURRENCY")
+            else:
+                for item in raw_limits.split(","):
+                    host, _, limit = item.partition("=")
+                    if host.strip() and limit.strip().isdigit():
+                        provider_limits[host.strip()] = int(limit)
+        policy = os.getenv("PARALLEL_QUEUE_POLICY", "priority").strip().lower()
+        if policy not in QUEUE_POLICIES:
+            logger.warning(f"Unknown PARALLEL_QUEUE_POLICY '{policy}', using 'priority'")
+            policy = "priority"
+        return cls(max_concurrency, provider_limits, default_provider_limit, policy)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.future.done())
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def provider_limit(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_provider_limit)
+
+    def has_capacity(self, provider: str) -> bool:
+        return (
+            self._running < self.max_concurrency
+            and self._running_by_provider.get(provider, 0) < self.provider_limit(provider)
+        )
+
+    def _take(self, provider: str) -> None:
+        self._running += 1
+        self._running_by_provider[provider] = self._running_by_provider.get(provider, 0) + 1
+
+    async def acquire(self, provider: str, priority: int = 0) -> float:
+        """
+        Wait for a slot for `provider`.
+
+        Args:
+            provider: Provider key (see current_provider)
+            priority: Higher runs first with the "priority" policy
+
+        Returns:
+            Seconds spent waiting in the queue
+        """
+        if not self._waiters and self.has_capacity(provider):
+            self._take(provider)
+            return 0.0
+
+        start = time.monotonic()
+        sequence = next(self._sequence)
+        sort_key = (-priority, sequence) if self.policy == "priority" else (sequence,)
+        waiter = _Waiter(sort_key, provider, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._wake()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted right before cancellation: hand it back
+                self.release(provider)
+            else:
+                waiter.future.cancel()
+                self._wake()
+            raise
+        return time.monotonic() - start
+
+    def release(self, provider: str) -> None:
+        self._running = max(0, self._running - 1)
+        self._running_by_provider[provider] = max(0, self._running_by_provider.get(provider, 0) - 1)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Grant free slots to waiters in queue order."""
+        skipped = []
+        while self._waiters and self._running < self.max_concurrency:
+            waiter = heapq.heappop(self._waiters)
+            if waiter.future.done():
+                continue
+            if self.has_capacity(waiter.provider):
+                self._take(waiter.provider)
+                waiter.future.set_result(None)
+            else:
+                skipped.append(waiter)
+        for waiter in skipped:
+            heapq.heappush(self._waiters, waiter)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Tool Context - Per-agent state passed to tool executions
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class ToolContext:
+    """
+    State of the agent calling a tool.
+
+    Tool instances are shared by every agent of the process, so anything that
+    depends on the caller (workspace, session, handles and caches) travels in
+    the context instead of living on the tool.
+    """
+    workspace_dir: Optional[str] = None
+    session_id: Optional[str] = None
+    is_parent: bool = True
+    flow_type: Optional[str] = None
+    # Per-agent handles and caches, keyed by the tool that owns them (e.g. "rag_service")
+    resources: Dict[str, Any] = field(default_factory=dict)
+    # Set by execute_tool for the duration of a call; receives intermediate results
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+
+    def report_progress(self, update: Dict[str, Any]) -> None:
+        """Publish an intermediate result of the running tool (no-op outside execute_tool)."""
+        if self.progress is not None:
+            self.progress(update)
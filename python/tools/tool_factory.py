@@ -1,20 +1,61 @@
+import asyncio
+import contextlib
 import importlib
 import inspect
+import json
+import os
 import pkgutil
+import time
+from dataclasses import asdict, dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Any, AsyncGenerator
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, AsyncGenerator, Tuple, Type
 from utils.logger import Logger
+from utils.metrics import get_metrics, payload_size
+from utils.tracing import span
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.result_cache import ToolResultCache, get_result_cache
 from models import ToolCallEvent, ToolResultEvent, ReportEvent, BaseEvent
 
 logger = Logger('tool_factory', log_to_file=False)
 
-# Global tool registry
-_tool_registry: Dict[str, MCPTool] = {}
+# Static description of every tool, generated by build_tool_manifest.py
+MANIFEST_PATH = Path(__file__).parent / "tool_manifest.json"
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Everything needed to advertise a tool without importing its module."""
+    name: str
+    module: str
+    class_name: str
+    agent_tool: bool
+    definition: Dict[str, Any]
+
+
+# Read-only spec registry, replaced as a whole by register_tools() / load_manifest().
+# Tool modules are imported and instantiated on first use; instances are shared by
+# all agents and per-agent state is passed in a ToolContext.
+_tool_specs: Mapping[str, ToolSpec] = MappingProxyType({})
+_tool_classes: Dict[str, Type[MCPTool]] = {}
 _tool_instances: Dict[str, MCPTool] = {}
+_tool_registry: Mapping[str, MCPTool] = MappingProxyType(_tool_instances)
+_default_workspace_dir: Optional[str] = None
+# Per-tool concurrency limits, bound to the event loop that created them
+_tool_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+
 
+def _set_registry(specs: Dict[str, ToolSpec], classes: Dict[str, Type[MCPTool]], instances: Dict[str, MCPTool]) -> None:
+    global _tool_specs
+    _tool_specs = MappingProxyType(specs)
+    _tool_classes.clear()
+    _tool_classes.update(classes)
+    _tool_instances.clear()
+    _tool_instances.update(instances)
 
-def register_tools(tools_directory: Optional[str] = None) -> Dict[str, MCPTool]:
+
+def register_tools(tools_directory: Optional[str] = None, strict: bool = False) -> Dict[str, MCPTool]:
     """
     Automatically discover and register all MCP tools in the tools directory.
     
@@ -24,18 +65,24 @@ def register_tools(tools_directory: Optional[str] = None) -> Dict[str, MCPTool]:
     3. Finds all classes that inherit from MCPTool
     4. Instantiates and registers them
     
+    This imports every tool module; at startup the registry is loaded from the
+    manifest instead (see load_manifest).
+    
     Args:
         tools_directory: Optional path to tools directory. If None, uses the directory
                         containing this register.py file.
+        strict: Raise instead of skipping modules or tools that fail to load
     
     Returns:
         Dictionary mapping tool names to tool instances
-    """
-    global _tool_registry, _tool_instances
     
-    # Clear existing registry
-    _tool_registry.clear()
-    _tool_instances.clear()
+    Raises:
+        RuntimeError: In strict mode, if any tool module or tool fails to load
+    """
+    tool_specs: Dict[str, ToolSpec] = {}
+    tool_classes: Dict[str, Type[MCPTool]] = {}
+    tool_instances: Dict[str, MCPTool] = {}
+    failures: List[str] = []
     
     # Determine tools directory
     if tools_directory is None:
@@ -90,32 +137,138 @@ def register_tools(tools_directory: Optional[str] = None) -> Dict[str, MCPTool]:
                         tool_name = tool_instance.name
                         
                         # Check for name conflicts
-                        if tool_name in _tool_registry:
+                        if tool_name in tool_instances:
                             logger.warning(
                                 f"Tool name conflict: {tool_name} already registered. "
                                 f"Overwriting with {obj.__name__} from {modname}"
                             )
                         
                         # Register the tool
-                        _tool_registry[tool_name] = tool_instance
-                        _tool_instances[tool_name] = tool_instance
+                        tool_specs[tool_name] = ToolSpec(
+                            name=tool_name,
+                            module=modname,
+                            class_name=obj.__name__,
+                            agent_tool=tool_instance.agent_tool,
+                            definition=tool_instance.get_tool_definition(),
+                        )
+                        tool_classes[tool_name] = obj
+                        tool_instances[tool_name] = tool_instance
                         
                         logger.info(f"Registered tool: {tool_name} ({obj.__name__})")
                         
                     except Exception as e:
                         logger.error(f"Failed to instantiate tool {obj.__name__} from {modname}: {e}", exc_info=True)
+                        failures.append(f"{modname}.{obj.__name__}: {e}")
                         continue
         
         except Exception as e:
             logger.error(f"Failed to process module {modname}: {e}", exc_info=True)
+            failures.append(f"{modname}: {e}")
             continue
     
+    if strict and failures:
+        raise RuntimeError("Failed to load tools:\n  " + "\n  ".join(failures))
+    
+    _set_registry(tool_specs, tool_classes, tool_instances)
+    if _default_workspace_dir:
+        set_workspace_dir(_default_workspace_dir)
     logger.info(f"Registered {len(_tool_registry)} tools: {list(_tool_registry.keys())}")
-    return _tool_registry.copy()
+    return dict(_tool_registry)
+
+
+def load_manifest(manifest_path: Path = MANIFEST_PATH) -> bool:
+    """
+    Register tools from the static manifest without importing any tool module.
+    
+    Args:
+        manifest_path: Path to the manifest JSON file
+    
+    Returns:
+        True if the manifest was loaded, False if it is missing or invalid
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        specs = {entry["name"]: ToolSpec(**entry) for entry in entries}
+    except FileNotFoundError:
+        logger.warning(f"Tool manifest not found: {manifest_path}")
+        return False
+    except (ValueError, TypeError, KeyError) as e:
+        logger.error(f"Invalid tool manifest {manifest_path}: {e}")
+        return False
+    
+    _set_registry(specs, {}, {})
+    logger.info(f"Loaded {len(specs)} tools from manifest: {list(specs.keys())}")
+    return True
+
+
+def build_manifest() -> List[Dict[str, Any]]:
+    """
+    Discover all tools and return their manifest entries, in registration order.
+    
+    Raises:
+        RuntimeError: If a tool module cannot be imported (the manifest would miss its tools)
+    """
+    register_tools(strict=True)
+    return [asdict(spec) for spec in _tool_specs.values()]
+
+
+def write_manifest(manifest_path: Path = MANIFEST_PATH) -> List[Dict[str, Any]]:
+    entries = build_manifest()
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    logger.info(f"Wrote {len(entries)} tools to {manifest_path}")
+    return entries
+
+
+def get_tool_class(tool_name: str) -> Optional[Type[MCPTool]]:
+    """Get the class of a tool, importing its module on first use."""
+    tool_class = _tool_classes.get(tool_name)
+    if tool_class is not None:
+        return tool_class
+    
+    spec = _tool_specs.get(tool_name)
+    if spec is None:
+        return None
+    try:
+        module = importlib.import_module(spec.module)
+        tool_class = getattr(module, spec.class_name)
+    except (ImportError, AttributeError) as e:
+        logger.error(f"Failed to load tool {tool_name} from {spec.module}: {e}", exc_info=True)
+        return None
+    _tool_classes[tool_name] = tool_class
+    return tool_class
 
 
 def get_tool(tool_name: str) -> Optional[MCPTool]:
-    return _tool_registry.get(tool_name)
+    """Get the shared instance of a tool, creating it on first use."""
+    tool = _tool_instances.get(tool_name)
+    if tool is not None:
+        return tool
+    
+    tool_class = get_tool_class(tool_name)
+    if tool_class is None:
+        return None
+    try:
+        tool = tool_class()
+    except Exception as e:
+        logger.error(f"Failed to instantiate tool {tool_name}: {e}", exc_info=True)
+        return None
+    if _default_workspace_dir and hasattr(tool, 'set_workspace_dir'):
+        tool.set_workspace_dir(_default_workspace_dir)
+    _tool_instances[tool_name] = tool
+    logger.debug(f"Loaded tool on first use: {tool_name}")
+    return tool
+
+
+async def close_tools() -> None:
+    """Close every loaded tool (e.g. persistent shells) before the event loop shuts down."""
+    for tool_name, tool in list(_tool_instances.items()):
+        try:
+            await tool.close()
+        except Exception as e:
+            logger.error(f"Failed to close tool {tool_name}: {e}", exc_info=True)
 
 
 def get_tool_definitions(is_parent: bool = True) -> List[Dict[str, Any]]:
@@ -130,26 +283,33 @@ def get_tool_definitions(is_parent: bool = True) -> List[Dict[str, Any]]:
         List of tool definitions
     """
     tools = []
-    for tool in _tool_registry.values():
-        if not tool.agent_tool:
+    for spec in _tool_specs.values():
+        if not spec.agent_tool:
             continue
         
         # Exclude parallel task executor for child agents
-        if not is_parent and tool.name == "execute_parallel_tasks":
+        if not is_parent and spec.name == "execute_parallel_tasks":
             logger.debug("Excluding execute_parallel_tasks tool for child agent")
             continue
         
-        tools.append(tool.get_tool_definition())
+        tools.append(spec.definition)
     
     return tools
 
 
 def set_workspace_dir(workspace_dir: str) -> None:
+    """
+    Set the default workspace of every tool, used for calls without a ToolContext.
+    Agents pass their workspace in the ToolContext instead of calling this.
+    Tools loaded later pick up the default when they are created.
+    """
+    global _default_workspace_dir
     if not workspace_dir:
         logger.warning("set_workspace_dir called with empty workspace_dir")
         return
     
     logger.info(f"Setting workspace directory for all tools: {workspace_dir}")
+    _default_workspace_dir = workspace_dir
     
     for tool_name, tool in _tool_registry.items():
         if hasattr(tool, 'set_workspace_dir'):
@@ -160,7 +320,116 @@ def set_workspace_dir(workspace_dir: str) -> None:
                 logger.error(f"Failed to set workspace directory for tool {tool_name}: {e}", exc_info=True)
 
 
-async def execute_tool(tool_call_event: ToolCallEvent) -> AsyncGenerator[BaseEvent, None]:
+def _result_cache_key(tool: MCPTool, tool_name: str, tool_args: Dict[str, Any],
+                      context: Optional[ToolContext]) -> Optional[str]:
+    """Cache key of a read-only call, or None if the call must run."""
+    try:
+        key = tool.cache_key(tool_args, context)
+    except Exception as e:
+        logger.debug(f"Could not compute cache key for {tool_name}: {e}")
+        return None
+    if key is None:
+        return None
+    return ToolResultCache.make_key(tool_name, key)
+
+
+def _is_successful_result(result: Any) -> bool:
+    """Whether a tool result reports success; only successful results are cached."""
+    if not isinstance(result, dict) or result.get("error"):
+        return False
+    return result.get("success", True) is not False and result.get("status") != "error"
+
+
+def _env_limit(prefix: str, tool_name: str, default: Optional[float]) -> Optional[float]:
+    """Per-tool override from <prefix>_<TOOL_NAME>; 0 disables the limit."""
+    env_name = f"{prefix}_{tool_name.upper()}"
+    value = os.getenv(env_name)
+    if not value:
+        return default
+    try:
+        limit = float(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid number for {env_name}: {value}")
+        return default
+    return limit if limit > 0 else None
+
+
+def get_tool_timeout(tool: MCPTool, tool_name: str, tool_args: Dict[str, Any]) -> Optional[float]:
+    return _env_limit("TOOL_TIMEOUT", tool_name, tool.get_timeout(tool_args))
+
+
+def get_tool_concurrency(tool: MCPTool, tool_name: str) -> Optional[int]:
+    limit = _env_limit("TOOL_CONCURRENCY", tool_name, tool.max_concurrency)
+    return int(limit) if limit else None
+
+
+def _tool_semaphore(tool: MCPTool, tool_name: str) -> Optional[asyncio.Semaphore]:
+    """Semaphore shared by all calls of a tool in the running event loop."""
+    limit = get_tool_concurrency(tool, tool_name)
+    if not limit:
+        return None
+    loop = asyncio.get_running_loop()
+    entry = _tool_semaphores.get(tool_name)
+    if entry is None or entry[0] is not loop:
+        entry = _tool_semaphores[tool_name] = (loop, asyncio.Semaphore(limit))
+    return entry[1]
+
+
+async def _run_tool(tool: MCPTool, tool_name: str, tool_args: Dict[str, Any],
+                    context: Optional[ToolContext]) -> AsyncGenerator[Tuple[str, Any], None]:
+    """
+    Run a tool within its concurrency limit and deadline (waiting for a slot is not timed).
+    
+    Yields:
+        ("progress", update) for every update the tool reports through its
+        context, then ("result", result)
+    """
+    updates: asyncio.Queue = asyncio.Queue()
+    if context is not None:
+        context = replace(context, progress=updates.put_nowait)
+    semaphore = _tool_semaphore(tool, tool_name)
+    timeout = get_tool_timeout(tool, tool_name, tool_args)
+
+    async def run() -> Dict[str, Any]:
+        async with semaphore if semaphore is not None else contextlib.nullcontext():
+            return await asyncio.wait_for(tool.execute(**tool_args, context=context), timeout)
+
+    task = asyncio.ensure_future(run())
+    try:
+        while not task.done():
+            next_update = asyncio.ensure_future(updates.get())
+            await asyncio.wait({task, next_update}, return_when=asyncio.FIRST_COMPLETED)
+            if next_update.done():
+                yield "progress", next_update.result()
+            else:
+                next_update.cancel()
+        yield "result", task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def execute_tool(
+    tool_call_event: ToolCallEvent,
+    context: Optional[ToolContext] = None,
+) -> AsyncGenerator[BaseEvent, None]:
+    """
+    Execute a tool call and yield its events.
+    
+    Args:
+        tool_call_event: Tool call to execute
+        context: Tool context of the calling agent (workspace, session, handles)
+    
+    Yields:
+        ToolCallEvent, then the tool's result events
+    
+    Results of read-only tools (see MCPTool.cache_key) are served from the
+    tool result cache when possible, and write tools invalidate it. Calls are
+    limited by the tool's timeout and concurrency limit, and recorded in the
+    metrics registry (see utils.metrics). Updates a tool reports through
+    ToolContext.report_progress are yielded as ToolResultEvents with
+    progress=True before the final result.
+    """
     tool_name = tool_call_event.tool_name
     tool_args = tool_call_event.tool_args or {}
 
@@ -180,57 +449,114 @@ async def execute_tool(tool_call_event: ToolCallEvent) -> AsyncGenerator[BaseEve
         tool_call_event.message = call_notification
     yield tool_call_event
 
-    try:
-        logger.info(f"Executing tool: {tool_name} with args: {tool_args}")
+    cache = get_result_cache()
+    metrics = get_metrics()
+    invalidates_cache = tool.invalidates_cache(tool_args)
+    args_bytes = payload_size(tool_args)
+    started = time.perf_counter()
+    with span("tool_call", tool=tool_name, args_bytes=args_bytes) as tool_span:
+        try:
+            logger.info(f"Executing tool: {tool_name} with args: {tool_args}")
+        
+            # Special handling for parallel task executor - use streaming mode
+            if tool_name == "execute_parallel_tasks" and hasattr(tool, 'execute_streaming'):
+                logger.info("Using streaming mode for parallel task execution")
+                try:
+                    async for event in tool.execute_streaming(**tool_args, context=context):
+                        yield event
+                finally:
+                    if invalidates_cache:
+                        cache.invalidate(tool_name)
+                metrics.record_tool_call(tool_name, time.perf_counter() - started, args_bytes=args_bytes)
+                # No need to yield a separate ToolResultEvent, the streaming already provides all events
+                return
         
-        # Special handling for parallel task executor - use streaming mode
-        if tool_name == "execute_parallel_tasks" and hasattr(tool, 'execute_streaming'):
-            logger.info("Using streaming mode for parallel task execution")
-            async for event in tool.execute_streaming(**tool_args):
-                yield event
-            # No need to yield a separate ToolResultEvent, the streaming already provides all events
-            return
+            cache_key = None
+            if cache.enabled and not invalidates_cache:
+                cache_key = _result_cache_key(tool, tool_name, tool_args, context)
+            result = cache.get(cache_key) if cache_key else None
+            cached = result is not None
+            if cached:
+                logger.info(f"Tool result cache hit: {tool_name}")
+            else:
+                generation = cache.generation
+                try:
+                    async for kind, value in _run_tool(tool, tool_name, tool_args, context):
+                        if kind == "progress":
+                            yield ToolResultEvent(
+                                message=value.get("message") or f"{tool_name} running",
+                                tool_name=tool_name,
+                                result=value,
+                                progress=True
+                            )
+                        else:
+                            result = value
+                finally:
+                    if invalidates_cache:
+                        cache.invalidate(tool_name)
+                if cache_key and _is_successful_result(result):
+                    cache.put(cache_key, result, ttl=tool.cache_ttl, generation=generation)
+            error = not _is_successful_result(result)
+            result_bytes = payload_size(result)
+            metrics.record_tool_call(
+                tool_name,
+                time.perf_counter() - started,
+                error=error,
+                cached=cached,
+                args_bytes=args_bytes,
+                result_bytes=result_bytes,
+            )
+            tool_span.set(error=error, cached=cached, result_bytes=result_bytes)
         
-        result = await tool.execute(**tool_args)
+            if tool_name == "send_report":
+                message = result.get("message", "")
+                yield ReportEvent(message=message)
+                return
         
-        if tool_name == "send_report":
-            message = result.get("message", "")
-            yield ReportEvent(message=message)
-            return
+            if tool_name == "send_message":
+                from models import MessageEvent
+                message = result.get("message", "")
+                yield MessageEvent(message=message)
+                # Also yield tool result for memory tracking
+                yield ToolResultEvent(
+                    message='Message sent',
+                    tool_name=tool_name,
+                    result=result
+                )
+                return
         
-        if tool_name == "send_message":
-            from models import MessageEvent
-            message = result.get("message", "")
-            yield MessageEvent(message=message)
-            # Also yield tool result for memory tracking
+            result_notification = tool.get_result_notification(result) or f'{tool_name} completed successfully'
+            if cached:
+                result_notification += " (cached)"
             yield ToolResultEvent(
-                message=f'Message sent',
+                message=result_notification,
                 tool_name=tool_name,
-                result=result
+                result=result,
+                cached=cached
             )
-            return
-        
-        result_notification = tool.get_result_notification(result)
-        if result_notification:
+        except asyncio.TimeoutError:
+            elapsed = time.perf_counter() - started
+            error_msg = f"Tool {tool_name} timed out after {elapsed:.1f} seconds"
+            logger.error(error_msg)
+            metrics.record_tool_call(tool_name, elapsed, error=True, timed_out=True, args_bytes=args_bytes)
+            tool_span.set(error=True, timed_out=True)
             yield ToolResultEvent(
-                message=result_notification,
+                message=error_msg,
                 tool_name=tool_name,
-                result=result
+                result={"error": error_msg, "timed_out": True}
             )
-        else:
+        except Exception as e:
+            error_msg = f"Error executing tool {tool_name}: {str(e)}"
+            logger.error(error_msg, exc_info=True)
+            metrics.record_tool_call(tool_name, time.perf_counter() - started, error=True, args_bytes=args_bytes)
+            tool_span.set(error=True)
             yield ToolResultEvent(
-                message=f'{tool_name} completed successfully',
+                message=error_msg,
                 tool_name=tool_name,
-                result=result
+                result={"error": error_msg}
             )
-    except Exception as e:
-        error_msg = f"Error executing tool {tool_name}: {str(e)}"
-        logger.error(error_msg, exc_info=True)
-        yield ToolResultEvent(
-            message=error_msg,
-            tool_name=tool_name,
-            result={"error": error_msg}
-        )
 
-# Auto-register tools when module is imported
-register_tools()
+# Register tools when module is imported: from the manifest if possible,
+# otherwise by importing every tool module
+if not load_manifest():
+    register_tools()
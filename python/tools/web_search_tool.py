@@ -6,23 +6,12 @@ This module provides web search capabilities using the ddgs library,
 which supports multiple search engines including DuckDuckGo, Google, Bing, etc.
 """
 
-import asyncio
-from typing import Dict, Any, List, Optional
-
-try:
-    from ddgs import DDGS
-    HAS_DDGS = True
-except ImportError:
-    # Fallback to old package name for backward compatibility
-    try:
-        from duckduckgo_search import DDGS
-        HAS_DDGS = True
-    except ImportError:
-        HAS_DDGS = False
-        DDGS = None
+from typing import Dict, Any, Optional
 
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.search_backend import DEFAULT_REGION, SearchService, get_search_service
+from tools.tool_context import ToolContext
 
 logger = Logger('web_search_tool', log_to_file=False)
 
@@ -33,6 +22,8 @@ class WebSearchTool(MCPTool):
     
     This tool performs web searches using the DDGS library which supports
     multiple search engines including Google, Bing, Brave, Yahoo, DuckDuckGo, etc.
+    Searches go through a SearchService, which caches results and runs identical
+    concurrent searches once; WEB_SEARCH_URL switches it to a JSON search endpoint.
     """
     
     @property
@@ -40,9 +31,27 @@ class WebSearchTool(MCPTool):
         """Tool name."""
         return "web_search"
     
-    def __init__(self):
-        """Initialize web search tool."""
-        pass
+    @property
+    def default_timeout(self) -> Optional[float]:
+        return 30.0
+    
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        # Search backends rate-limit bursts
+        return 2
+    
+    def __init__(self, service: Optional[SearchService] = None):
+        """
+        Initialize web search tool.
+        
+        Args:
+            service: Search service to use (defaults to the process-wide one)
+        """
+        self._service = service
+    
+    @property
+    def service(self) -> SearchService:
+        return self._service or get_search_service()
     
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get the tool definition for LLM function calling."""
@@ -68,6 +77,11 @@ class WebSearchTool(MCPTool):
                             "description": "Type of search: 'general', 'api_documentation', 'python_packages', 'github' (default: 'general')",
                             "enum": ["general", "api_documentation", "python_packages", "github"],
                             "default": "general"
+                        },
+                        "region": {
+                            "type": "string",
+                            "description": "Search region, e.g. 'us-en', 'uk-en', 'de-de' (default: 'us-en')",
+                            "default": DEFAULT_REGION
                         }
                     },
                     "required": ["query"]
@@ -112,85 +126,25 @@ class WebSearchTool(MCPTool):
         else:
             return f"Search completed, found {total_results} result(s)"
     
-    def _search_with_ddgs(
-        self,
-        query: str,
-        max_results: int = 10,
-    ) -> List[Dict[str, Any]]:
-        """
-        Perform a web search using DDGS library and return formatted results.
-        
-        Args:
-            query: Search query string
-            max_results: Maximum number of results to return
-        
-        Returns:
-            List of search results with title, url, and snippet
-        """
-        if not HAS_DDGS or DDGS is None:
-            logger.error("DDGS library not available")
-            return []
-        
-        try:
-            # Create DDGS instance
-            ddgs = DDGS()
-            
-            # Try new ddgs package API first (uses 'query' parameter)
-            try:
-                search_results = ddgs.text(
-                    query=query,
-                    max_results=max_results,
-                )
-                # Convert to list if it's a generator
-                if search_results is not None:
-                    search_results = list(search_results)
-                else:
-                    search_results = []
-            except TypeError:
-                # Fallback to old duckduckgo_search API (uses 'keywords' parameter)
-                try:
-                    search_results = ddgs.text(
-                        keywords=query,
-                        max_results=max_results,
-                        backend="auto",
-                        region="us-en",
-                        safesearch="moderate",
-                    )
-                    if search_results is None:
-                        search_results = []
-                    else:
-                        search_results = list(search_results)
-                except Exception as e:
-                    logger.error(f"Error with old API: {e}")
-                    search_results = []
-            
-            # Handle empty results
-            if not search_results:
-                logger.warning(f"Search returned no results for query: {query}")
-                return []
-            
-            # Convert DDGS results to our expected format
-            results = []
-            for i, result in enumerate(search_results):
-                results.append(
-                    {
-                        "title": result.get("title", ""),
-                        "url": result.get("href", ""),
-                        "snippet": result.get("body", ""),
-                        "rank": i + 1,
-                    }
-                )
-            
-            return results
-        except Exception as e:
-            logger.error(f"Error in DDGS search: {e}", exc_info=True)
-            return []
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        return {
+            "query": tool_args.get("query"),
+            "max_results": tool_args.get("max_results", 10),
+            "search_type": tool_args.get("search_type", "general"),
+            "region": tool_args.get("region", DEFAULT_REGION),
+        }
+    
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        return 300.0
     
     async def execute(
         self,
         query: str,
         max_results: int = 10,
         search_type: str = "general",
+        region: str = DEFAULT_REGION,
+        context: Optional[ToolContext] = None,
     ) -> Dict[str, Any]:
         """
         Execute web search using DDGS.
@@ -199,6 +153,7 @@ class WebSearchTool(MCPTool):
             query: Search query string
             max_results: Maximum number of results (default: 10)
             search_type: Type of search (default: 'general')
+            region: Search region (default: 'us-en')
         
         Returns:
             Dictionary containing search results
@@ -226,14 +181,15 @@ class WebSearchTool(MCPTool):
             elif search_type == "github":
                 query = f"{query} site:github.com"
             
-            # Run DDGS search in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(
-                None,
-                self._search_with_ddgs,
-                query,
-                max_results,
-            )
+            # Cached and deduplicated; the blocking DDGS client runs in a bounded executor
+            warning = None
+            try:
+                results = await self.service.search(query, max_results, region)
+            except Exception as e:
+                # Reported as an empty result, as before; failed searches are not cached
+                logger.error(f"Search backend {self.service.backend.name} failed: {e}")
+                results = []
+                warning = f"Search backend failed: {e}"
             
             # Filter results based on search type for better relevance
             if search_type == "python_packages":
@@ -250,16 +206,16 @@ class WebSearchTool(MCPTool):
                     r for r in results if "github.com" in r.get("url", "")
                 ]
             
-            # Add rate limiting to be respectful
-            await asyncio.sleep(0.5)
-            
-            return {
+            result = {
                 "status": "success",
                 "query": query,
                 "search_type": search_type,
                 "total_results": len(results),
                 "results": results,
             }
+            if warning:
+                result["warning"] = warning
+            return result
         except Exception as e:
             logger.error(f"Error in web search: {e}", exc_info=True)
             return {
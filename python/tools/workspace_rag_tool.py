@@ -3,11 +3,13 @@
 Workspace RAG Tool - Retrieve code from workspace using RAG
 """
 
+import asyncio
 from typing import Dict, Any, Optional
 from utils.logger import Logger
 from llm.chat_llm import AsyncChatClientWrapper
 from rag.rag_service import RagService
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
 
 logger = Logger('workspace_rag_tool', log_to_file=False)
 
@@ -20,15 +22,22 @@ class WorkspaceRAGTool(MCPTool):
         """Tool name."""
         return "workspace_rag_retrieve"
     
+    @property
+    def max_concurrency(self) -> Optional[int]:
+        return 4
+    
     def __init__(self):
         """Initialize workspace RAG tool."""
-        self.rag_service: Optional[RagService] = None
+        # Default workspace for direct calls; agents pass theirs in the ToolContext
         self.workspace_dir: Optional[str] = None
         self._llm_client: Optional[AsyncChatClientWrapper] = None
+        # One RAG service per workspace, shared by all agents working on it
+        self._services: Dict[str, RagService] = {}
+        self._service_locks: Dict[str, asyncio.Lock] = {}
     
     def set_workspace_dir(self, workspace_dir: str):
         """
-        Set the workspace directory. RAG service will be initialized lazily on first use.
+        Set the default workspace directory. RAG service will be initialized lazily on first use.
         
         Args:
             workspace_dir: Path to workspace directory
@@ -38,59 +47,52 @@ class WorkspaceRAGTool(MCPTool):
         
         self.workspace_dir = workspace_dir
         logger.info(f"Setting workspace directory: {workspace_dir}")
-        # Note: rag_service instance is reused, but indexing_service will be re-initialized
-        # when reload() is called with the new workspace_dir
     
-    async def _ensure_rag_service_initialized(self, workspace_dir: str) -> bool:
+    async def _get_rag_service(self, workspace_dir: str, context: Optional[ToolContext] = None) -> Optional[RagService]:
         """
-        Ensure RAG service is initialized for the given workspace.
-        Reuses RagService instance and LLM client to avoid unnecessary re-initialization.
+        Get the RAG service for the given workspace, loading its indices on first use.
+        Reuses the LLM client and the per-workspace RagService across agents.
         
         Args:
             workspace_dir: Path to workspace directory
+            context: Tool context of the calling agent; caches the service handle
         
         Returns:
-            True if initialized successfully, False otherwise
+            RagService instance, or None if initialization failed
         """
-        # If already initialized for this workspace, return
-        if self.rag_service is not None and self.workspace_dir == workspace_dir:
-            # Check if indexing_service is initialized for this workspace
-            if self.rag_service.indexing_service is not None:
-                return True
-        
-        # Initialize LLM client if not already done (reuse if exists)
-        if self._llm_client is None:
-            try:
-                self._llm_client = AsyncChatClientWrapper()
-                logger.info("LLM client initialized for RAG tool")
-            except Exception as e:
-                logger.error(f"Failed to initialize LLM client: {e}", exc_info=True)
-                return False
-        
-        # Initialize RAG service instance if not exists (reuse if exists)
-        if self.rag_service is None:
-            try:
-                self.rag_service = RagService(
-                    llm=self._llm_client,
-                    enable_rerank=True,
-                    rerank_top_n=10,
-                    initial_candidates=30,
-                )
-                logger.info("RAG service instance created")
-            except Exception as e:
-                logger.error(f"Failed to initialize RAG service: {e}", exc_info=True)
-                return False
-        
-        # Reload RAG service for this workspace (re-initializes indexing_service)
-        # This is safe even if already loaded for a different workspace
-        try:
-            await self.rag_service.reload(workspace_dir)
-            self.workspace_dir = workspace_dir
-            logger.info(f"RAG service reloaded for workspace: {workspace_dir}")
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to reload RAG service: {e}")
-            return False
+        if context is not None and context.resources.get("rag_service") is not None:
+            return context.resources["rag_service"]
+        
+        lock = self._service_locks.setdefault(workspace_dir, asyncio.Lock())
+        async with lock:
+            rag_service = self._services.get(workspace_dir)
+            if rag_service is None:
+                # Initialize LLM client if not already done (reuse if exists)
+                if self._llm_client is None:
+                    try:
+                        self._llm_client = AsyncChatClientWrapper()
+                        logger.info("LLM client initialized for RAG tool")
+                    except Exception as e:
+                        logger.error(f"Failed to initialize LLM client: {e}", exc_info=True)
+                        return None
+                
+                try:
+                    rag_service = RagService(
+                        llm=self._llm_client,
+                        enable_rerank=True,
+                        rerank_top_n=10,
+                        initial_candidates=30,
+                    )
+                    await rag_service.reload(workspace_dir)
+                    logger.info(f"RAG service loaded for workspace: {workspace_dir}")
+                except Exception as e:
+                    logger.warning(f"Failed to initialize RAG service: {e}")
+                    return None
+                self._services[workspace_dir] = rag_service
+        
+        if context is not None:
+            context.resources["rag_service"] = rag_service
+        return rag_service
     
     def get_tool_definition(self) -> Dict[str, Any]:
         """Get the tool definition for LLM function calling."""
@@ -159,20 +161,21 @@ class WorkspaceRAGTool(MCPTool):
         summary = ", ".join(type_summary) if type_summary else f"{count} result(s)"
         return f"Code retrieval completed, found {summary}"
     
-    async def execute(self, query: str) -> Dict[str, Any]:
+    async def execute(self, query: str, context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Retrieve code from workspace using RAG.
         
         Args:
             query: The search query
+            context: Tool context of the calling agent
         
         Returns:
             Dictionary with retrieved code results
         """
         logger.info(f"RAG retrieval: {query}")
         
-        # Use workspace directory set during initialization
-        if not self.workspace_dir:
+        workspace_dir = self.resolve_workspace(context)
+        if not workspace_dir:
             return {
                 "success": False,
                 "error": "Workspace directory not set. Please set workspace directory during initialization.",
@@ -180,7 +183,8 @@ class WorkspaceRAGTool(MCPTool):
             }
         
         # Ensure RAG service is initialized
-        if not await self._ensure_rag_service_initialized(self.workspace_dir):
+        rag_service = await self._get_rag_service(workspace_dir, context)
+        if rag_service is None:
             return {
                 "success": False,
                 "error": "Failed to initialize RAG service. Please ensure workspace directory is set and RAG indices exist.",
@@ -189,7 +193,7 @@ class WorkspaceRAGTool(MCPTool):
         
         try:
             # Perform retrieval - returns dict with "file", "function", "class" keys
-            results = await self.rag_service.retrieve(query)
+            results = await rag_service.retrieve(query)
             
             # Format results - flatten all types into a single list
             formatted_results = []
@@ -2,13 +2,20 @@
 """
 Workspace Structure Tool - Get file structure of the workspace
 """
-from typing import Dict, Any, Optional, List
+import os
+from typing import Dict, Any, Optional
 from pathlib import Path
 from utils.logger import Logger
 from tools.base_tool import MCPTool
+from tools.tool_context import ToolContext
+from tools.result_cache import workspace_generation
+from tools.workspace_tree import get_workspace_tree
 
 logger = Logger('workspace_structure_tool', log_to_file=False)
 
+# Default token budget of the rendered structure (it is part of every system prompt)
+DEFAULT_MAX_TOKENS = 4000
+
 
 class WorkspaceStructureTool(MCPTool):
     """Tool for getting the file structure of the workspace."""
@@ -42,6 +49,10 @@ class WorkspaceStructureTool(MCPTool):
     def __init__(self):
         """Initialize workspace structure tool."""
         self.workspace_dir: Optional[str] = None
+        try:
+            self.max_tokens = int(os.getenv("WORKSPACE_TREE_MAX_TOKENS", str(DEFAULT_MAX_TOKENS)))
+        except ValueError:
+            self.max_tokens = DEFAULT_MAX_TOKENS
     
     def set_workspace_dir(self, workspace_dir: str):
         """
@@ -85,6 +96,10 @@ class WorkspaceStructureTool(MCPTool):
                             "type": "boolean",
                             "description": "Whether to include hidden files/directories (default: False)",
                             "default": False
+                        },
+                        "max_tokens": {
+                            "type": "integer",
+                            "description": "Approximate token budget of the structure; directories that do not fit are collapsed (0 means unlimited)"
                         }
                     },
                     "required": []
@@ -124,111 +139,25 @@ class WorkspaceStructureTool(MCPTool):
         
         return "Workspace structure retrieved successfully"
     
-    def _should_ignore(self, path: Path, ignore_patterns: List[str], include_hidden: bool) -> bool:
-        """
-        Check if a path should be ignored.
-        
-        Args:
-            path: Path to check
-            ignore_patterns: List of patterns to ignore
-            include_hidden: Whether to include hidden files
-        
-        Returns:
-            True if path should be ignored
-        """
-        path_str = str(path)
-        name = path.name
-        
-        # Check hidden files
-        if not include_hidden and name.startswith('.'):
-            return True
-        
-        # Check ignore patterns
-        for pattern in ignore_patterns:
-            if pattern in path_str or name == pattern or name.endswith(pattern.lstrip('*')):
-                return True
-        
-        return False
+    def cache_key(self, tool_args: Dict[str, Any], context: Optional[ToolContext] = None) -> Optional[Any]:
+        """The tree changes with any write, so key it by the workspace generation."""
+        return {
+            "workspace_dir": self.resolve_workspace(context),
+            "generation": workspace_generation(),
+            "max_depth": tool_args.get("max_depth", 5),
+            "include_files": tool_args.get("include_files", True),
+            "include_hidden": tool_args.get("include_hidden", False),
+            "max_tokens": tool_args.get("max_tokens"),
+        }
     
-    def _build_tree(self, root: Path, prefix: str = "", is_last: bool = True, 
-                    max_depth: int = 5, current_depth: int = 0,
-                    include_files: bool = True, include_hidden: bool = False,
-                    ignore_patterns: List[str] = None) -> List[str]:
-        """
-        Build a tree representation of the directory structure.
-        
-        Args:
-            root: Root directory path
-            prefix: Prefix for current line
-            is_last: Whether this is the last item in parent
-            max_depth: Maximum depth to traverse
-            current_depth: Current depth level
-            include_files: Whether to include files
-            include_hidden: Whether to include hidden files
-            ignore_patterns: List of patterns to ignore
-        
-        Returns:
-            List of tree lines
-        """
-        if ignore_patterns is None:
-            ignore_patterns = self.DEFAULT_IGNORE_PATTERNS
-        
-        lines = []
-        
-        # Check if we should ignore this path
-        if self._should_ignore(root, ignore_patterns, include_hidden):
-            return lines
-        
-        # Check depth limit
-        if max_depth > 0 and current_depth >= max_depth:
-            return lines
-        
-        # Get the display name
-        if current_depth == 0:
-            display_name = str(root)
-        else:
-            display_name = root.name
-        
-        # Add current item
-        connector = "└── " if is_last else "├── "
-        lines.append(prefix + connector + display_name)
-        
-        # Update prefix for children
-        extension = "    " if is_last else "│   "
-        new_prefix = prefix + extension
-        
-        # Get children
-        try:
-            if root.is_dir():
-                children = sorted([p for p in root.iterdir()], 
-                                key=lambda p: (p.is_file(), p.name.lower()))
-                
-                # Filter children
-                filtered_children = []
-                for child in children:
-                    if not self._should_ignore(child, ignore_patterns, include_hidden):
-                        if child.is_dir() or include_files:
-                            filtered_children.append(child)
-                
-                # Recursively add children
-                for i, child in enumerate(filtered_children):
-                    is_last_child = (i == len(filtered_children) - 1)
-                    child_lines = self._build_tree(
-                        child, new_prefix, is_last_child,
-                        max_depth, current_depth + 1,
-                        include_files, include_hidden, ignore_patterns
-                    )
-                    lines.extend(child_lines)
-        except PermissionError:
-            lines.append(new_prefix + "    [Permission Denied]")
-        except Exception as e:
-            logger.warning(f"Error accessing {root}: {e}")
-            lines.append(new_prefix + f"    [Error: {str(e)}]")
-        
-        return lines
+    @property
+    def cache_ttl(self) -> Optional[float]:
+        # Bounds staleness from edits made outside the agent (editor, git)
+        return 30.0
     
     async def execute(self, max_depth: int = 5, include_files: bool = True, 
-                     include_hidden: bool = False) -> Dict[str, Any]:
+                     include_hidden: bool = False, max_tokens: Optional[int] = None,
+                     context: Optional[ToolContext] = None) -> Dict[str, Any]:
         """
         Get the workspace file structure.
         
@@ -236,19 +165,23 @@ class WorkspaceStructureTool(MCPTool):
             max_depth: Maximum depth to traverse (0 means unlimited)
             include_files: Whether to include files in the structure
             include_hidden: Whether to include hidden files/directories
+            max_tokens: Token budget of the structure; larger trees are collapsed
+                (default: WORKSPACE_TREE_MAX_TOKENS, 0 means unlimited)
+            context: Tool context of the calling agent
         
         Returns:
             Dictionary with structure tree and metadata
         """
+        workspace_dir = self.resolve_workspace(context)
         # Determine workspace directory
         workspace_path = None
-        if self.workspace_dir:
-            workspace_path = Path(self.workspace_dir)
+        if workspace_dir:
+            workspace_path = Path(workspace_dir)
             if not workspace_path.exists() or not workspace_path.is_dir():
-                logger.warning(f"Workspace directory does not exist or is not a directory: {self.workspace_dir}")
+                logger.warning(f"Workspace directory does not exist or is not a directory: {workspace_dir}")
                 return {
-                    "error": f"Workspace directory does not exist or is not a directory: {self.workspace_dir}",
-                    "workspace_dir": self.workspace_dir
+                    "error": f"Workspace directory does not exist or is not a directory: {workspace_dir}",
+                    "workspace_dir": workspace_dir
                 }
         else:
             # Use current working directory
@@ -259,53 +192,25 @@ class WorkspaceStructureTool(MCPTool):
             workspace_path = workspace_path.resolve()
             logger.info(f"Getting workspace structure for: {workspace_path}")
             
-            # Build tree structure
-            tree_lines = self._build_tree(
-                workspace_path,
+            # Render from the cached tree model; only changed directories are re-read
+            tree = get_workspace_tree(workspace_path, self.DEFAULT_IGNORE_PATTERNS)
+            rendered = tree.render(
                 max_depth=max_depth,
-                current_depth=0,
                 include_files=include_files,
-                include_hidden=include_hidden
+                include_hidden=include_hidden,
+                max_tokens=self.max_tokens if max_tokens is None else max_tokens,
             )
             
             # Combine into a single string
-            tree_str = "\n".join(tree_lines) if tree_lines else "[Empty directory]"
-            
-            # Count files and directories
-            file_count = 0
-            dir_count = 0
-            
-            def count_items(path: Path, depth: int = 0):
-                nonlocal file_count, dir_count
-                
-                if max_depth > 0 and depth >= max_depth:
-                    return
-                
-                if self._should_ignore(path, self.DEFAULT_IGNORE_PATTERNS, include_hidden):
-                    return
-                
-                try:
-                    if path.is_dir():
-                        dir_count += 1
-                        for child in path.iterdir():
-                            if not self._should_ignore(child, self.DEFAULT_IGNORE_PATTERNS, include_hidden):
-                                if child.is_dir():
-                                    count_items(child, depth + 1)
-                                elif include_files:
-                                    file_count += 1
-                    elif include_files:
-                        file_count += 1
-                except (PermissionError, OSError):
-                    pass
-            
-            count_items(workspace_path)
+            tree_str = "\n".join(rendered.lines) if rendered.lines else "[Empty directory]"
             
             return {
                 "success": True,
                 "workspace_dir": str(workspace_path),
                 "structure": tree_str,
-                "file_count": file_count,
-                "directory_count": dir_count,
+                "file_count": rendered.file_count,
+                "directory_count": rendered.dir_count,
+                "collapsed": rendered.collapsed,
                 "max_depth": max_depth,
                 "include_files": include_files,
                 "include_hidden": include_hidden
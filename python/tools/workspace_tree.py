@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Workspace Tree - Cached directory tree model of a workspace, kept up to date by stat checks
+"""
+
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import Logger
+
+logger = Logger('workspace_tree', log_to_file=False)
+
+GITIGNORE = ".gitignore"
+# Rough size of a token in characters, for the render budget
+CHARS_PER_TOKEN = 4
+# A directory modified this recently may still change within the same mtime tick
+RACY_WINDOW_NS = 2_000_000_000
+MAX_CACHED_TREES = 8
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore glob (without anchoring) to a regex over '/'-separated paths."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif char == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif char == "?":
+            parts.append("[^/]")
+            i += 1
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                parts.append(re.escape(char))
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end + 1
+        elif char == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(char))
+            i += 1
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    """One compiled gitignore pattern, relative to the directory of its .gitignore."""
+    base: str
+    regex: "re.Pattern"
+    negate: bool
+    dir_only: bool
+
+    @classmethod
+    def parse(cls, line: str, base: str = "") -> Optional["IgnoreRule"]:
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        # Patterns with a slash are relative to the .gitignore; others match a name at any depth
+        anchored = "/" in line
+        body = _glob_to_regex(line.lstrip("/"))
+        regex = re.compile(body if anchored else f"(?:.*/)?{body}")
+        return cls(base=base, regex=regex, negate=negate, dir_only=dir_only)
+
+    def matches(self, rel_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return False
+            rel_path = rel_path[len(self.base) + 1:]
+        return self.regex.fullmatch(rel_path) is not None
+
+
+class IgnoreRules:
+    """Ordered ignore rules; the last matching rule decides, as in git."""
+
+    def __init__(self, rules: Iterable[IgnoreRule] = ()):
+        self.rules: Tuple[IgnoreRule, ...] = tuple(rules)
+
+    @classmethod
+    def from_patterns(cls, patterns: Iterable[str]) -> "IgnoreRules":
+        return cls(rule for rule in (IgnoreRule.parse(p) for p in patterns) if rule is not None)
+
+    def extended(self, lines: Iterable[str], base: str) -> "IgnoreRules":
+        """Rules with those of a nested .gitignore appended (they take precedence)."""
+        added = [rule for rule in (IgnoreRule.parse(line, base) for line in lines) if rule is not None]
+        return IgnoreRules(self.rules + tuple(added)) if added else self
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        for rule in reversed(self.rules):
+            if rule.matches(rel_path, is_dir):
+                return not rule.negate
+        return False
+
+
+@dataclass
+class TreeNode:
+    """A file or directory of the tree. Directories load their children on demand."""
+    name: str
+    rel_path: str
+    is_dir: bool
+    children: Optional[List["TreeNode"]] = None
+    rules: Optional[IgnoreRules] = None
+    mtime_ns: int = 0
+    gitignore_mtime_ns: int = 0
+    stable: bool = False
+    error: Optional[str] = None
+
+    @property
+    def hidden(self) -> bool:
+        return self.name.startswith(".")
+
+
+@dataclass
+class RenderResult:
+    """Rendered tree with the counts of the entries within the depth limit."""
+    lines: List[str] = field(default_factory=list)
+    file_count: int = 0
+    dir_count: int = 0
+    collapsed: int = 0
+
+
+class WorkspaceTree:
+    """
+    In-memory directory tree of a workspace.
+
+    Directories are read with one os.scandir each, and only when first needed
+    for a render. Later renders re-read a directory only if its mtime (or the
+    mtime of its .gitignore) changed, so an unchanged workspace costs one stat
+    per directory. Ignore patterns and .gitignore files are compiled once per
+    directory.
+    """
+
+    def __init__(self, root: Path, ignore_patterns: Iterable[str] = (), use_gitignore: bool = True):
+        self.root = Path(root)
+        self.use_gitignore = use_gitignore
+        self.base_rules = IgnoreRules.from_patterns(ignore_patterns)
+        self.root_node = TreeNode(name=str(self.root), rel_path="", is_dir=True)
+        self.scans = 0
+
+    def _path(self, node: TreeNode) -> str:
+        return os.path.join(self.root, node.rel_path) if node.rel_path else str(self.root)
+
+    def _gitignore_mtime(self, directory: str) -> int:
+        if not self.use_gitignore:
+            return 0
+        try:
+            return os.stat(os.path.join(directory, GITIGNORE)).st_mtime_ns
+        except OSError:
+            return 0
+
+    def _scan(self, node: TreeNode, parent_rules: IgnoreRules) -> None:
+        """Read the entries of a directory, keeping the subtrees of entries that still exist."""
+        path = self._path(node)
+        self.scans += 1
+        started_ns = time.time_ns()
+        try:
+            node.mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            node.children, node.error = [], str(e)
+            return
+
+        gitignore_mtime = self._gitignore_mtime(path)
+        if gitignore_mtime != node.gitignore_mtime_ns or node.rules is None:
+            rules = parent_rules
+            if gitignore_mtime:
+                try:
+                    with open(os.path.join(path, GITIGNORE), 'r', encoding='utf-8', errors='replace') as f:
+                        rules = parent_rules.extended(f.readlines(), node.rel_path)
+                except OSError:
+                    pass
+            if node.rules is not None and rules is not node.rules:
+                # Changed rules apply to the whole subtree: reload it
+                node.children = None
+            node.rules = rules
+            node.gitignore_mtime_ns = gitignore_mtime
+
+        previous = {child.name: child for child in node.children or []}
+        children = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    rel_path = f"{node.rel_path}/{entry.name}" if node.rel_path else entry.name
+                    if node.rules.is_ignored(rel_path, is_dir):
+                        continue
+                    child = previous.get(entry.name)
+                    if child is None or child.is_dir != is_dir:
+                        child = TreeNode(name=entry.name, rel_path=rel_path, is_dir=is_dir)
+                    children.append(child)
+            node.error = None
+        except PermissionError:
+            node.error = "Permission Denied"
+        except OSError as e:
+            logger.warning(f"Error accessing {path}: {e}")
+            node.error = f"Error: {e}"
+        children.sort(key=lambda child: (not child.is_dir, child.name.lower()))
+        node.children = children
+        node.stable = started_ns - node.mtime_ns > RACY_WINDOW_NS
+
+    def _ensure_loaded(self, node: TreeNode, parent_rules: IgnoreRules) -> None:
+        """Load a directory, or re-read it if it changed since it was loaded."""
+        if node.children is None or not node.stable:
+            self._scan(node, parent_rules)
+            return
+        path = self._path(node)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime_ns = -1
+        if mtime_ns != node.mtime_ns or self._gitignore_mtime(path) != node.gitignore_mtime_ns:
+            self._scan(node, parent_rules)
+
+    def render(self, max_depth: int = 5, include_files: bool = True, include_hidden: bool = False,
+               max_tokens: int = 0) -> RenderResult:
+        """
+        Render the tree as "├── name" lines.
+
+        Args:
+            max_depth: Maximum depth to show, the root being depth 0 (0 means unlimited)
+            include_files: Whether to include files
+            include_hidden: Whether to include hidden files/directories
+            max_tokens: Budget of the rendered tree (0 means unlimited). Directories
+                are expanded breadth first while the budget lasts; the others are
+                shown with the number of entries they hold.
+
+        Returns:
+            RenderResult with the lines and file/directory counts
+        """
+        result = RenderResult()
+
+        # Refresh and collect the visible entries, breadth first
+        visible: Dict[int, List[TreeNode]] = {}
+        order: List[Tuple[TreeNode, int]] = []
+        queue = [(self.root_node, 0, self.base_rules)]
+        result.dir_count = 1
+        while queue:
+            next_queue = []
+            for node, depth, parent_rules in queue:
+                if max_depth > 0 and depth + 1 >= max_depth:
+                    continue
+                self._ensure_loaded(node, parent_rules)
+                children = [
+                    child for child in node.children
+                    if (include_hidden or not child.hidden) and (child.is_dir or include_files)
+                ]
+                visible[id(node)] = children
+                order.append((node, depth))
+                for child in children:
+                    if child.is_dir:
+                        result.dir_count += 1
+                        next_queue.append((child, depth + 1, node.rules))
+                    else:
+                        result.file_count += 1
+            queue = next_queue
+
+        # Pick the directories to expand within the budget, breadth first. A directory
+        # is expanded only if all its entries fit; the root may list a part of them.
+        def collapsed_label(node: TreeNode) -> str:
+            children = visible.get(id(node))
+            return f" [{len(children)} entries collapsed]" if children else ""
+
+        def line_cost(child: TreeNode, depth: int) -> int:
+            return 4 * depth + 5 + len(child.name) + len(collapsed_label(child))
+
+        expanded: Dict[int, int] = {}
+        budget = max_tokens * CHARS_PER_TOKEN if max_tokens > 0 else None
+        if budget is not None:
+            budget -= line_cost(self.root_node, 0)
+        shown_dirs = {id(self.root_node)}
+        for node, depth in order:
+            if id(node) not in shown_dirs:
+                continue
+            children = visible[id(node)]
+            shown = len(children)
+            if budget is not None:
+                costs = [line_cost(child, depth + 1) for child in children]
+                # The label of an expanded directory is replaced by its entries
+                available = budget + len(collapsed_label(node))
+                if sum(costs) <= available:
+                    budget = available - sum(costs)
+                elif node is self.root_node:
+                    available -= 4 * (depth + 1) + 30  # "... N more entries"
+                    shown = 0
+                    while shown < len(children) and costs[shown] <= available:
+                        available -= costs[shown]
+                        shown += 1
+                    budget = available
+                else:
+                    shown = 0
+            expanded[id(node)] = shown
+            shown_dirs.update(id(child) for child in children[:shown] if child.is_dir)
+
+        def emit(node: TreeNode, prefix: str, is_last: bool) -> None:
+            children = visible.get(id(node))
+            shown = expanded.get(id(node), 0) if children is not None else 0
+            label = node.name
+            if children and shown == 0:
+                label += f" [{len(children)} entries collapsed]"
+                result.collapsed += 1
+            result.lines.append(prefix + ("└── " if is_last else "├── ") + label)
+            child_prefix = prefix + ("    " if is_last else "│   ")
+            if node.error:
+                result.lines.append(child_prefix + f"    [{node.error}]")
+            if not children or shown == 0:
+                return
+            hidden_count = len(children) - shown
+            for i, child in enumerate(children[:shown]):
+                emit(child, child_prefix, i == shown - 1 and hidden_count == 0)
+            if hidden_count:
+                result.lines.append(child_prefix + f"└── ... {hidden_count} more entries")
+                result.collapsed += 1
+
+        emit(self.root_node, "", True)
+        return result
+
+
+_trees: "OrderedDict[Tuple[str, Tuple[str, ...], bool], WorkspaceTree]" = OrderedDict()
+
+
+def get_workspace_tree(root: Path, ignore_patterns: Iterable[str] = (), use_gitignore: bool = True) -> WorkspaceTree:
+    """Cached tree of a workspace (the most recently used trees are kept)."""
+    key = (str(root), tuple(ignore_patterns), use_gitignore)
+    tree = _trees.get(key)
+    if tree is None:
+        tree = _trees[key] = WorkspaceTree(root, key[1], use_gitignore)
+        while len(_trees) > MAX_CACHED_TREES:
+            _trees.popitem(last=False)
+    _trees.move_to_end(key)
+    return tree
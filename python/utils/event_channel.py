@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Event Channel - Bounded fan-in channel merging several async event streams
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, List, Optional
+
+DEFAULT_CHANNEL_SIZE = 64
+DEFAULT_BATCH_SIZE = 32
+
+
+@dataclass
+class ChannelMessage:
+    """One item of the channel. `closed` marks the end of a producer's stream."""
+    source: Any
+    item: Any = None
+    closed: bool = False
+    error: Optional[BaseException] = None
+
+
+class FanInChannel:
+    """
+    Single bounded queue shared by many producers and one consumer.
+
+    Producers tag every item with their source, so the consumer needs no
+    per-producer queues. `send` blocks while the channel is full, which throttles
+    fast producers to the consumer's pace. The consumer reads everything that is
+    already queued in one batch per wake-up.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CHANNEL_SIZE):
+        self._queue: asyncio.Queue = asyncio.Queue(max(1, maxsize))
+        self._open = 0
+
+    @property
+    def open_producers(self) -> int:
+        return self._open
+
+    def register(self) -> None:
+        """Announce a producer. Every registered producer must call close() exactly once."""
+        self._open += 1
+
+    async def send(self, source: Any, item: Any) -> None:
+        await self._queue.put(ChannelMessage(source, item))
+
+    async def close(self, source: Any, error: Optional[BaseException] = None) -> None:
+        await self._queue.put(ChannelMessage(source, closed=True, error=error))
+
+    async def batches(self, max_batch: int = DEFAULT_BATCH_SIZE) -> AsyncGenerator[List[ChannelMessage], None]:
+        """
+        Yield lists of messages until every registered producer has closed.
+
+        Producers registered while a batch is being processed are picked up,
+        so the consumer may start new producers in reaction to a close message.
+
+        Args:
+            max_batch: Upper bound on messages returned per wake-up
+        """
+        while self._open > 0:
+            batch = [await self._queue.get()]
+            while len(batch) < max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            self._open -= sum(1 for message in batch if message.closed)
+            yield batch
@@ -1,13 +1,37 @@
 #!/usr/bin/env python3
 """
 Log Manager for archiving logs by date range
+
+Date ranges are located through a sparse timestamp index per log file (see
+LogIndex) and streamed into compressed archives, so neither archiving nor
+removal reads whole log files.
 """
 
+import bisect
+import gzip
+import json
+import os
 import re
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    zstandard = None
+    HAS_ZSTD = False
+
+# Bytes between two entries of a LogIndex
+INDEX_STRIDE = 256 * 1024
+# Leading bytes of a log file remembered to detect rotated or replaced files
+INDEX_HEAD_BYTES = 64
+COPY_CHUNK_SIZE = 1024 * 1024
+COMPRESSIONS = ("gzip", "zstd", "none")
+DEFAULT_COMPRESSION = os.getenv("LOG_ARCHIVE_COMPRESSION", "gzip").lower()
+TIMESTAMP_PATTERN = re.compile(rb'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
 
 
 def parse_datetime(date_str: str, time_str: str) -> datetime:
@@ -73,6 +97,250 @@ def extract_timestamp_from_patch_filename(filename: str) -> Optional[datetime]:
     return None
 
 
+class LogIndex:
+    """
+    Sparse timestamp index of one log file, kept next to the logs in .index/.
+    
+    Holds the offset and timestamp of the first timestamped line at or after
+    every `stride` bytes. Log lines are appended in time order, so a timestamp
+    is located by a binary search over the index plus a scan of at most about
+    one stride. Timestamps are compared as "YYYY-MM-DD HH:MM:SS" strings, which
+    sort like the datetimes they denote.
+    
+    Log files only grow between rotations, so a refresh only indexes the new
+    tail; the index is rebuilt if the file shrank or its first bytes changed.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, log_file: Path, stride: int = INDEX_STRIDE):
+        self.log_file = log_file
+        self.index_file = log_file.parent / ".index" / f"{log_file.name}.json"
+        self.stride = max(1, stride)
+        self.size = 0
+        self.head = b""
+        self.next_boundary = 0
+        self.entries: List[Tuple[int, bytes]] = []
+    
+    @classmethod
+    def load(cls, log_file: Path, stride: int = INDEX_STRIDE) -> "LogIndex":
+        """Index of a log file, read from disk if present and brought up to date."""
+        index = cls(log_file, stride)
+        try:
+            with open(index.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == cls.VERSION and data.get("stride") == index.stride:
+                index.size = data["size"]
+                index.head = bytes.fromhex(data["head"])
+                index.next_boundary = data["next_boundary"]
+                index.entries = [(offset, ts.encode("ascii")) for offset, ts in data["entries"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        index.refresh()
+        return index
+    
+    def save(self) -> None:
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "version": self.VERSION,
+                    "stride": self.stride,
+                    "size": self.size,
+                    "head": self.head.hex(),
+                    "next_boundary": self.next_boundary,
+                    "entries": [[offset, ts.decode("ascii")] for offset, ts in self.entries],
+                }, f)
+        except OSError as e:
+            print(f"Warning: Failed to save log index {self.index_file}: {e}")
+    
+    @staticmethod
+    def _timestamp(line: bytes) -> Optional[bytes]:
+        line = line.lstrip()
+        return line[:19] if TIMESTAMP_PATTERN.match(line) else None
+    
+    def _read_head(self, f: BinaryIO) -> bytes:
+        f.seek(0)
+        return f.read(INDEX_HEAD_BYTES)
+    
+    def _first_timestamp_after(self, f: BinaryIO, position: int, limit: int) -> Optional[Tuple[int, bytes]]:
+        """Offset and timestamp of the first timestamped line starting at or after `position`."""
+        if position > 0:
+            f.seek(position - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        offset = f.tell()
+        while offset < limit:
+            line = f.readline()
+            if not line:
+                break
+            timestamp = self._timestamp(line)
+            if timestamp is not None:
+                return offset, timestamp
+            offset += len(line)
+        return None
+    
+    def refresh(self) -> None:
+        """Index the bytes appended since the last refresh (everything, if the file was replaced)."""
+        size = self.log_file.stat().st_size
+        with open(self.log_file, 'rb') as f:
+            head = self._read_head(f)
+            if size < self.size or not head.startswith(self.head):
+                self.entries = []
+                self.next_boundary = 0
+            boundary = self.next_boundary
+            while boundary < size:
+                found = self._first_timestamp_after(f, boundary, size)
+                if found is None:
+                    # No timestamped line yet; retried on the next refresh
+                    break
+                offset, timestamp = found
+                if not self.entries or offset > self.entries[-1][0]:
+                    self.entries.append((offset, timestamp))
+                # Skip boundaries that fall inside the same (long) record
+                boundary = max(boundary + self.stride, (offset // self.stride + 1) * self.stride)
+            self.next_boundary = boundary
+        self.size = size
+        self.head = head
+    
+    def earliest(self) -> Optional[bytes]:
+        """Timestamp of the first timestamped line."""
+        return self.entries[0][1] if self.entries else None
+    
+    def offset_of(self, timestamp: bytes) -> int:
+        """
+        Offset of the first timestamped line with a timestamp >= `timestamp`.
+        
+        Returns:
+            The offset, or the indexed size if there is no such line
+        """
+        i = bisect.bisect_left([ts for _, ts in self.entries], timestamp)
+        if i == 0:
+            return self.entries[0][0] if self.entries else self.size
+        with open(self.log_file, 'rb') as f:
+            f.seek(self.entries[i - 1][0])
+            offset = self.entries[i - 1][0]
+            while offset < self.size:
+                line = f.readline()
+                if not line:
+                    break
+                line_timestamp = self._timestamp(line)
+                if line_timestamp is not None and line_timestamp >= timestamp:
+                    return offset
+                offset += len(line)
+        return self.size
+    
+    def removed(self, start: int) -> None:
+        """Update the index after the bytes from `start` on were cut out of the file."""
+        self.entries = [(offset, ts) for offset, ts in self.entries if offset < start]
+        self.next_boundary = (start // self.stride) * self.stride
+        self.size = 0
+        self.head = b""
+        self.refresh()
+
+
+def _default_logs_dir(logs_dir: Optional[str]) -> Path:
+    if logs_dir is None:
+        # Default to logs/logs relative to project root
+        project_root = Path(__file__).parent.parent.parent
+        return project_root / "logs" / "logs"
+    return Path(logs_dir)
+
+
+def _timestamp_key(dt: datetime) -> bytes:
+    return dt.strftime("%Y-%m-%d %H:%M:%S").encode("ascii")
+
+
+def _log_ranges(logs_dir: Path, start_dt: datetime, end_dt: datetime, index_stride: int
+                ) -> Iterator[Tuple[Path, LogIndex, int, int]]:
+    """
+    Byte range of every log file that holds the records in [start_dt, end_dt).
+    
+    A range starts at the first line with a timestamp >= start_dt and ends
+    before the first line after it with a timestamp >= end_dt; lines without a
+    timestamp belong to the record above them.
+    
+    Yields:
+        (log file, its index, start offset, end offset) for non-empty ranges
+    """
+    start_key = _timestamp_key(start_dt)
+    end_key = _timestamp_key(end_dt)
+    for log_file in sorted(logs_dir.glob("*.log")):
+        if not log_file.is_file():
+            continue
+        try:
+            index = LogIndex.load(log_file, index_stride)
+            start = index.offset_of(start_key)
+            end = max(start, index.offset_of(end_key))
+        except OSError as e:
+            print(f"Warning: Failed to read {log_file}: {e}")
+            continue
+        if end > start:
+            yield log_file, index, start, end
+        else:
+            index.save()
+
+
+def _open_archive(path: Path, compression: str) -> Tuple[BinaryIO, Path]:
+    """Writable archive file; the suffix of the compression is appended to the path."""
+    if compression == "zstd":
+        if HAS_ZSTD:
+            path = path.with_name(path.name + ".zst")
+            return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'), closefd=True), path
+        print("Warning: zstandard is not installed, archiving with gzip instead")
+        compression = "gzip"
+    if compression == "gzip":
+        path = path.with_name(path.name + ".gz")
+        return gzip.open(path, 'wb', compresslevel=6), path
+    if compression == "none":
+        return open(path, 'wb'), path
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def _copy_range(log_file: Path, start: int, end: int, archive_file: Path, compression: str) -> Tuple[int, Path]:
+    """
+    Stream bytes [start, end) of a log file into a (compressed) archive file.
+    
+    Returns:
+        Number of lines copied and the path of the archive file
+    """
+    lines = 0
+    out, archive_file = _open_archive(archive_file, compression)
+    with open(log_file, 'rb') as src, out:
+        src.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = src.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            out.write(chunk)
+            lines += chunk.count(b"\n")
+            remaining -= len(chunk)
+    return lines, archive_file
+
+
+def _cut_range(log_file: Path, start: int, end: int) -> None:
+    """
+    Remove bytes [start, end) from a log file in place.
+    
+    The tail is moved down chunk by chunk and the file truncated, so memory use
+    is constant and processes appending to the file keep the same inode.
+    """
+    with open(log_file, 'r+b') as f:
+        read_pos, write_pos = end, start
+        while True:
+            f.seek(read_pos)
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            f.seek(write_pos)
+            f.write(chunk)
+            read_pos += len(chunk)
+            write_pos += len(chunk)
+        f.truncate(write_pos)
+
+
 def archive_logs_by_date_range(
     start_date: str,
     start_time: str,
@@ -80,11 +348,16 @@ def archive_logs_by_date_range(
     end_time: str,
     logs_dir: Optional[str] = None,
     remove_records: bool = False,
-    comment: Optional[str] = None
+    comment: Optional[str] = None,
+    compression: str = DEFAULT_COMPRESSION,
+    index_stride: int = INDEX_STRIDE
 ) -> str:
     """
     Archive logs from logs/logs directory based on date and time range.
     
+    Each log file's range is located through its LogIndex and streamed into
+    the archive, so files are never read into memory as a whole.
+    
     Args:
         start_date: Start date in format YYYY-MM-DD
         start_time: Start time in format HH:MM:SS
@@ -93,6 +366,8 @@ def archive_logs_by_date_range(
         logs_dir: Base logs directory (default: logs/logs relative to project root)
         remove_records: If True, remove archived records from original log files
         comment: Optional comment to append to archive directory name
+        compression: "gzip", "zstd" (requires zstandard) or "none"
+        index_stride: Bytes between two LogIndex entries
     
     Returns:
         Path to the archive directory
@@ -109,14 +384,11 @@ def archive_logs_by_date_range(
     
     if start_dt > end_dt:
         raise ValueError("Start datetime must be before end datetime")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
     
     # Determine logs directory
-    if logs_dir is None:
-        # Default to logs/logs relative to project root
-        project_root = Path(__file__).parent.parent.parent
-        logs_dir = project_root / "logs" / "logs"
-    else:
-        logs_dir = Path(logs_dir)
+    logs_dir = _default_logs_dir(logs_dir)
     
     if not logs_dir.exists():
         raise ValueError(f"Logs directory does not exist: {logs_dir}")
@@ -139,83 +411,30 @@ def archive_logs_by_date_range(
     archive_dir = logs_dir / "archived" / archive_dir_name
     archive_dir.mkdir(parents=True, exist_ok=True)
     
-    # Process all .log files in logs/logs directory
-    log_files = list(logs_dir.glob("*.log"))
-    
     archived_count = 0
     total_lines_archived = 0
     
-    for log_file in log_files:
-        if not log_file.is_file():
-            continue
-        
-        archived_lines = []
-        remaining_lines = []
-        
-        # Read log file and filter lines by date range
+    # Process all .log files in logs/logs directory
+    for log_file, index, start, end in _log_ranges(logs_dir, start_dt, end_dt, index_stride):
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-            
-            # Find the start of the range: first line with timestamp >= start_dt
-            start_index = None
-            for i, line in enumerate(all_lines):
-                timestamp = extract_timestamp_from_log_line(line)
-                if timestamp is not None and timestamp >= start_dt:
-                    start_index = i
-                    break
-            
-            # If no start found, nothing to archive
-            if start_index is None:
-                remaining_lines = all_lines
-            else:
-                # Add all lines before start_index to remaining_lines
-                remaining_lines.extend(all_lines[:start_index])
-                
-                # Process lines from start_index onwards
-                archiving = True
-                for i in range(start_index, len(all_lines)):
-                    line = all_lines[i]
-                    timestamp = extract_timestamp_from_log_line(line)
-                    
-                    if archiving:
-                        if timestamp is not None and timestamp >= end_dt:
-                            # Found end boundary: stop archiving, add this line to remaining
-                            archiving = False
-                            remaining_lines.append(line)
-                        else:
-                            # Continue archiving: add to archived_lines
-                            archived_lines.append(line)
-                            # Also add to remaining_lines if not removing records
-                            if not remove_records:
-                                remaining_lines.append(line)
-                    else:
-                        # Already stopped archiving, add to remaining_lines
-                        remaining_lines.append(line)
+            lines, archive_file = _copy_range(log_file, start, end, archive_dir / log_file.name, compression)
         except Exception as e:
-            print(f"Warning: Failed to read {log_file}: {e}")
+            print(f"Warning: Failed to write archive file for {log_file.name}: {e}")
+            index.save()
             continue
+        archived_count += 1
+        total_lines_archived += lines
+        print(f"Archived {lines} lines from {log_file.name} to {archive_file}")
         
-        # Write archived lines to archive file
-        if archived_lines:
-            archive_file = archive_dir / log_file.name
+        # Remove archived lines from original file if requested
+        if remove_records:
             try:
-                with open(archive_file, 'w', encoding='utf-8') as f:
-                    f.writelines(archived_lines)
-                archived_count += 1
-                total_lines_archived += len(archived_lines)
-                print(f"Archived {len(archived_lines)} lines from {log_file.name} to {archive_file}")
-                
-                # Remove archived lines from original file if requested
-                if remove_records:
-                    try:
-                        with open(log_file, 'w', encoding='utf-8') as f:
-                            f.writelines(remaining_lines)
-                        print(f"  Removed {len(archived_lines)} lines from {log_file.name}")
-                    except Exception as e:
-                        print(f"Warning: Failed to update {log_file.name}: {e}")
+                _cut_range(log_file, start, end)
+                index.removed(start)
+                print(f"  Removed {lines} lines from {log_file.name}")
             except Exception as e:
-                print(f"Warning: Failed to write archive file {archive_file}: {e}")
+                print(f"Warning: Failed to update {log_file.name}: {e}")
+        index.save()
     
     # Archive patch files
     print("\nArchiving patch files...")
@@ -260,13 +479,13 @@ def archive_logs_by_date_range(
     else:
         print(f"Warning: Patches directory does not exist: {patches_dir}")
     
-    print(f"\nArchive completed:")
+    print("\nArchive completed:")
     print(f"  Archive directory: {archive_dir}")
     print(f"  Log files archived: {archived_count}")
     print(f"  Total log lines archived: {total_lines_archived}")
     print(f"  Patch files archived: {patches_archived_count}")
     if remove_records:
-        print(f"  Records removed from original files: Yes")
+        print("  Records removed from original files: Yes")
     print(f"  Date range: {start_dt} to {end_dt}")
     
     return str(archive_dir)
@@ -277,7 +496,8 @@ def remove_logs_by_date_range(
     start_time: str,
     end_date: str,
     end_time: str,
-    logs_dir: Optional[str] = None
+    logs_dir: Optional[str] = None,
+    index_stride: int = INDEX_STRIDE
 ) -> None:
     """
     Remove log records and patch files from logs/logs and logs/patches directories
@@ -289,6 +509,7 @@ def remove_logs_by_date_range(
         end_date: End date in format YYYY-MM-DD
         end_time: End time in format HH:MM:SS
         logs_dir: Base logs directory (default: logs/logs relative to project root)
+        index_stride: Bytes between two LogIndex entries
     
     Raises:
         ValueError: If date/time format is invalid or start > end
@@ -304,80 +525,25 @@ def remove_logs_by_date_range(
         raise ValueError("Start datetime must be before end datetime")
     
     # Determine logs directory
-    if logs_dir is None:
-        project_root = Path(__file__).parent.parent.parent
-        logs_dir = project_root / "logs" / "logs"
-    else:
-        logs_dir = Path(logs_dir)
+    logs_dir = _default_logs_dir(logs_dir)
     
     if not logs_dir.exists():
         raise ValueError(f"Logs directory does not exist: {logs_dir}")
     
-    # Process all .log files in logs/logs directory
-    log_files = list(logs_dir.glob("*.log"))
-    
     removed_count = 0
-    total_lines_removed = 0
+    total_bytes_removed = 0
     
     print("Removing log records...")
-    for log_file in log_files:
-        if not log_file.is_file():
-            continue
-        
-        remaining_lines = []
-        removed_lines_count = 0
-        
-        # Read log file and filter lines by date range
+    for log_file, index, start, end in _log_ranges(logs_dir, start_dt, end_dt, index_stride):
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                all_lines = f.readlines()
-            
-            # Find the start of the range: first line with timestamp >= start_dt
-            start_index = None
-            for i, line in enumerate(all_lines):
-                timestamp = extract_timestamp_from_log_line(line)
-                if timestamp is not None and timestamp >= start_dt:
-                    start_index = i
-                    break
-            
-            # If no start found, nothing to remove
-            if start_index is None:
-                remaining_lines = all_lines
-            else:
-                # Add all lines before start_index to remaining_lines
-                remaining_lines.extend(all_lines[:start_index])
-                
-                # Process lines from start_index onwards
-                removing = True
-                for i in range(start_index, len(all_lines)):
-                    line = all_lines[i]
-                    timestamp = extract_timestamp_from_log_line(line)
-                    
-                    if removing:
-                        if timestamp is not None and timestamp >= end_dt:
-                            # Found end boundary: stop removing, add this line to remaining
-                            removing = False
-                            remaining_lines.append(line)
-                        else:
-                            # Continue removing: count but don't add to remaining_lines
-                            removed_lines_count += 1
-                    else:
-                        # Already stopped removing, add to remaining_lines
-                        remaining_lines.append(line)
+            _cut_range(log_file, start, end)
+            index.removed(start)
+            removed_count += 1
+            total_bytes_removed += end - start
+            print(f"Removed {(end - start) / 1024:.1f} KB from {log_file.name}")
         except Exception as e:
-            print(f"Warning: Failed to read {log_file}: {e}")
-            continue
-        
-        # Write remaining lines back to file
-        if removed_lines_count > 0:
-            try:
-                with open(log_file, 'w', encoding='utf-8') as f:
-                    f.writelines(remaining_lines)
-                removed_count += 1
-                total_lines_removed += removed_lines_count
-                print(f"Removed {removed_lines_count} lines from {log_file.name}")
-            except Exception as e:
-                print(f"Warning: Failed to update {log_file.name}: {e}")
+            print(f"Warning: Failed to update {log_file.name}: {e}")
+        index.save()
     
     # Remove patch files
     print("\nRemoving patch files...")
@@ -407,9 +573,9 @@ def remove_logs_by_date_range(
     else:
         print(f"Warning: Patches directory does not exist: {patches_dir}")
     
-    print(f"\nRemoval completed:")
+    print("\nRemoval completed:")
     print(f"  Log files modified: {removed_count}")
-    print(f"  Total log lines removed: {total_lines_removed}")
+    print(f"  Total log data removed: {total_bytes_removed / 1024:.1f} KB")
     print(f"  Patch files removed: {patches_removed_count}")
     print(f"  Date range: {start_dt} to {end_dt}")
 
@@ -506,7 +672,7 @@ def validate_second(second_str: str) -> bool:
 
 def find_earliest_log_timestamp(logs_dir: Optional[str] = None) -> Optional[datetime]:
     """
-    Scan all log files and find the earliest timestamp.
+    Find the earliest timestamp of all log files (from their LogIndex).
     
     Args:
         logs_dir: Base logs directory (default: logs/logs relative to project root)
@@ -515,11 +681,7 @@ def find_earliest_log_timestamp(logs_dir: Optional[str] = None) -> Optional[date
         Earliest datetime found, or None if no valid timestamps found
     """
     # Determine logs directory
-    if logs_dir is None:
-        project_root = Path(__file__).parent.parent.parent
-        logs_dir = project_root / "logs" / "logs"
-    else:
-        logs_dir = Path(logs_dir)
+    logs_dir = _default_logs_dir(logs_dir)
     
     if not logs_dir.exists():
         return None
@@ -527,25 +689,23 @@ def find_earliest_log_timestamp(logs_dir: Optional[str] = None) -> Optional[date
     earliest_timestamp = None
     
     # Process all .log files in logs/logs directory
-    log_files = list(logs_dir.glob("*.log"))
-    
-    for log_file in log_files:
+    for log_file in logs_dir.glob("*.log"):
         if not log_file.is_file():
             continue
         
-        # Read log file and find earliest timestamp
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    timestamp = extract_timestamp_from_log_line(line)
-                    if timestamp is not None:
-                        if earliest_timestamp is None or timestamp < earliest_timestamp:
-                            earliest_timestamp = timestamp
-        except Exception:
+            index = LogIndex.load(log_file)
+            index.save()
+        except OSError:
             # Skip files that can't be read
             continue
+        timestamp = index.earliest()
+        if timestamp is not None and (earliest_timestamp is None or timestamp < earliest_timestamp):
+            earliest_timestamp = timestamp
     
-    return earliest_timestamp
+    if earliest_timestamp is None:
+        return None
+    return datetime.strptime(earliest_timestamp.decode("ascii"), "%Y-%m-%d %H:%M:%S")
 
 
 def prompt_date(prompt_text: str, default_dt: Optional[datetime] = None) -> str:
@@ -759,7 +919,7 @@ def main():
             print("Starting removal only...")
             print()
             remove_logs_by_date_range(start_date, start_time, end_date, end_time)
-            print(f"\nSuccess! Records removed.")
+            print("\nSuccess! Records removed.")
         
     except ValueError as e:
         print(f"\nError: {e}", file=sys.stderr)
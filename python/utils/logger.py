@@ -2,19 +2,169 @@
 """
 Logger module for Python services
 Provides a reusable logger class that outputs to stderr and optionally to log files.
+
+Records are handed to a background thread through a queue (QueueHandler /
+QueueListener), so line formatting and disk I/O happen off the calling thread.
+Set LOG_ASYNC=false to write synchronously instead.
 """
 
+import atexit
+import copy
+import os
+import queue
+import random
 import sys
 import logging
-from logging.handlers import RotatingFileHandler
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Optional, Union
+
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Default cap for payloads logged through Logger.payload (head and tail are kept)
+DEFAULT_PAYLOAD_MAX_CHARS = 2000
+
+
+def _parse_level(level: str) -> Optional[int]:
+    level = level.strip().upper()
+    if level.isdigit():
+        return int(level)
+    value = logging.getLevelName(level)
+    return value if isinstance(value, int) else None
+
+
+def _env_level(name: str) -> Optional[int]:
+    """
+    Level configured for a logger by LOG_LEVELS ("chat_llm=INFO,lint_engine=WARNING")
+    or, for every logger, by LOG_LEVEL.
+    """
+    for entry in os.getenv("LOG_LEVELS", "").split(","):
+        module, _, level = entry.partition("=")
+        if module.strip() == name and _parse_level(level) is not None:
+            return _parse_level(level)
+    return _parse_level(os.getenv("LOG_LEVEL", ""))
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+class _MessageQueueHandler(QueueHandler):
+    """
+    QueueHandler that renders the message on the calling thread.
+    
+    %-args are merged at call time, so mutable arguments are logged with the
+    values they had then. Unlike the stock handler, the line format (timestamp,
+    level) is left to the listener's formatter.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _router.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """Listener-side handler: every record goes to stderr, and to the log file of its logger if it has one."""
+    
+    def __init__(self, stderr_handler: logging.Handler):
+        super().__init__()
+        self.stderr_handler = stderr_handler
+        self.file_handlers: Dict[str, logging.Handler] = {}
+        self._lock_files = threading.Lock()
+    
+    def set_file_handler(self, name: str, handler: Optional[logging.Handler]) -> None:
+        with self._lock_files:
+            previous = self.file_handlers.pop(name, None)
+            if handler is not None:
+                self.file_handlers[name] = handler
+        if previous is not None:
+            previous.close()
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        self.stderr_handler.handle(record)
+        file_handler = self.file_handlers.get(record.name)
+        if file_handler is not None:
+            file_handler.handle(record)
+        return True
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+    
+    def close(self) -> None:
+        with self._lock_files:
+            handlers = list(self.file_handlers.values())
+            self.file_handlers.clear()
+        for handler in handlers:
+            handler.close()
+        super().close()
+
+
+class _LogRouter:
+    """Process-wide queue and listener thread shared by all Logger instances."""
+    
+    def __init__(self):
+        self.formatter = logging.Formatter(fmt=LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+        stderr_handler = logging.StreamHandler(sys.stderr)
+        stderr_handler.setFormatter(self.formatter)
+        self.routing = _RoutingHandler(stderr_handler)
+        self.queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        self.listener: Optional[QueueListener] = None
+        self._lock = threading.Lock()
+    
+    def queue_handler(self) -> logging.Handler:
+        with self._lock:
+            if self.listener is None:
+                self.listener = QueueListener(self.queue, self.routing)
+                self.listener.start()
+        return _MessageQueueHandler(self.queue)
+    
+    def flush(self) -> None:
+        """Wait until every queued record has been written (restarts the listener)."""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = QueueListener(self.queue, self.routing)
+                self.listener.start()
+    
+    def stop(self) -> None:
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+        for handler in [self.routing.stderr_handler, *self.routing.file_handlers.values()]:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                # stderr may already be closed at interpreter exit
+                pass
+
+
+_router = _LogRouter()
+atexit.register(_router.stop)
+
+
+def flush_logs() -> None:
+    """Write out all queued log records."""
+    _router.flush()
 
 
 class Logger:
     """
     A reusable logger class that writes logs to stderr (and optionally to a file).
     This ensures logs don't interfere with stdout JSON output for service communication.
+    
+    The level can be overridden per logger name with LOG_LEVELS
+    (e.g. "chat_llm=INFO,lint_engine=WARNING") or for all loggers with LOG_LEVEL.
+    Messages accept %-style args, which are only formatted if the record is written.
     """
     
     def __init__(
@@ -34,8 +184,8 @@ class Logger:
             name: Logger name (typically module name like 'ai_service', 'worker', etc.)
             log_to_file: Whether to also write logs to a file (default: False)
             log_file_path: Path to log file (if None, uses default: {name}.log in project root directory)
-            log_level: Logging level (default: logging.DEBUG)
-            base_dir: Base directory for log files (if None, uses project root directory)
+            log_level: Logging level (default: logging.DEBUG; LOG_LEVELS / LOG_LEVEL take precedence)
+            base_dir: Base directory for log files (if None, uses LOG_DIR or the project root directory)
             max_bytes: Maximum size of log file before rotation (default: 10MB)
             backup_count: Number of backup log files to keep (default: 5)
         """
@@ -45,22 +195,29 @@ class Logger:
         # self.log_to_file = log_to_file
         self.log_to_file = True
         
-        self.log_level = log_level
+        env_level = _env_level(name)
+        self.log_level = log_level if env_level is None else env_level
         self.max_bytes = max_bytes
         self.backup_count = backup_count
+        self.async_logging = os.getenv("LOG_ASYNC", "true").lower() in ("true", "1", "yes", "on")
+        # Payload logs: share of calls that are logged, and their size cap
+        self.payload_sample_rate = _env_float("LOG_PAYLOAD_SAMPLE_RATE", 1.0)
+        try:
+            self.payload_max_chars = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", str(DEFAULT_PAYLOAD_MAX_CHARS)))
+        except ValueError:
+            self.payload_max_chars = DEFAULT_PAYLOAD_MAX_CHARS
         
         # Get logger instance
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(log_level)
+        self.logger.setLevel(self.log_level)
         
         # Remove existing handlers to avoid duplicates
-        self.logger.handlers.clear()
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        _router.routing.set_file_handler(name, None)
         
         # Create formatter with timestamp, level, and message
-        self.formatter = logging.Formatter(
-            fmt='%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        self.formatter = _router.formatter
         
         # Handler for stderr - always enabled
         self._setup_stderr_handler()
@@ -69,6 +226,7 @@ class Logger:
         if self.log_to_file:
             if log_file_path is None:
                 # Default log file location
+                base_dir = base_dir or os.getenv("LOG_DIR")
                 if base_dir:
                     log_dir = Path(base_dir)
                 else:
@@ -77,12 +235,14 @@ class Logger:
                     log_dir = project_root / "logs" / "logs"
                 log_file_path = log_dir / f"{name}.log"
             
-            self._setup_file_handler(log_file_path, max_bytes, backup_count)
+            self._setup_file_handler(Path(log_file_path), max_bytes, backup_count)
     
     def _setup_stderr_handler(self):
-        """Setup stderr handler for logging."""
+        """Setup stderr handler for logging (through the shared queue unless LOG_ASYNC=false)."""
+        if self.async_logging:
+            self.logger.addHandler(_router.queue_handler())
+            return
         stderr_handler = logging.StreamHandler(sys.stderr)
-        stderr_handler.setLevel(self.log_level)
         stderr_handler.setFormatter(self.formatter)
         self.logger.addHandler(stderr_handler)
     
@@ -98,39 +258,76 @@ class Logger:
                 maxBytes=max_bytes,
                 backupCount=backup_count,
                 encoding='utf-8',
-                mode='a'
+                mode='a',
+                # Opened by the listener thread on the first record
+                delay=True
             )
-            file_handler.setLevel(self.log_level)
             file_handler.setFormatter(self.formatter)
-            self.logger.addHandler(file_handler)
+            if self.async_logging:
+                _router.routing.set_file_handler(self.name, file_handler)
+            else:
+                self.logger.addHandler(file_handler)
             
             self.logger.info(
-                f"Logging to file: {log_file_path} "
-                f"(max size: {max_bytes / (1024 * 1024):.1f}MB, backups: {backup_count})"
+                "Logging to file: %s (max size: %.1fMB, backups: %d)",
+                log_file_path, max_bytes / (1024 * 1024), backup_count
             )
         except Exception as e:
             # Use stderr to report file logging setup failure
             sys.stderr.write(f"ERROR: Failed to setup file logging to {log_file_path}: {e}\n")
     
-    def debug(self, message: str):
+    def debug(self, message: str, *args):
         """Log a debug message."""
-        self.logger.debug(message)
+        self.logger.debug(message, *args)
     
-    def info(self, message: str):
+    def info(self, message: str, *args):
         """Log an info message."""
-        self.logger.info(message)
+        self.logger.info(message, *args)
     
-    def warning(self, message: str):
+    def warning(self, message: str, *args):
         """Log a warning message."""
-        self.logger.warning(message)
+        self.logger.warning(message, *args)
     
-    def error(self, message: str, exc_info: bool = False):
+    def error(self, message: str, *args, exc_info: bool = False):
         """Log an error message."""
-        self.logger.error(message, exc_info=exc_info)
+        self.logger.error(message, *args, exc_info=exc_info)
     
-    def critical(self, message: str):
+    def critical(self, message: str, *args):
         """Log a critical message."""
-        self.logger.critical(message)
+        self.logger.critical(message, *args)
+    
+    def is_enabled(self, level: int) -> bool:
+        """Whether a message at `level` would be written; use it to skip building expensive messages."""
+        return self.logger.isEnabledFor(level)
+    
+    def payload(self, label: str, text: Union[str, Callable[[], str]], level: int = logging.INFO,
+                max_chars: Optional[int] = None):
+        """
+        Log a bulky payload (prompt, response, tool args) with sampling and a size cap.
+        
+        Nothing is built when the level is disabled or the call is not sampled
+        (LOG_PAYLOAD_SAMPLE_RATE). Payloads longer than the cap
+        (LOG_PAYLOAD_MAX_CHARS) keep their head and tail.
+        
+        Args:
+            label: Short description, logged with the payload length
+            text: Payload, or a function that builds it
+            level: Logging level (default: INFO)
+            max_chars: Size cap (defaults to LOG_PAYLOAD_MAX_CHARS)
+        """
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.payload_sample_rate < 1.0 and random.random() >= self.payload_sample_rate:
+            return
+        if callable(text):
+            text = text()
+        text = text if isinstance(text, str) else str(text)
+        max_chars = self.payload_max_chars if max_chars is None else max_chars
+        length = len(text)
+        if max_chars > 0 and length > max_chars:
+            half = max_chars // 2
+            text = text[:half] + "\n... [truncated] ...\n" + text[-half:]
+        self.logger.log(level, "%s (length: %d):\n%s", label, length, text)
     
     def get_logger(self) -> logging.Logger:
         """
@@ -148,4 +345,3 @@ class Logger:
         self.logger.setLevel(level)
         for handler in self.logger.handlers:
             handler.setLevel(level)
-
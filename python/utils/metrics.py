@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Metrics - In-process registry of tool and LLM call latencies, error rates and payload sizes
+"""
+
+import bisect
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.logger import Logger
+
+logger = Logger('metrics', log_to_file=False)
+
+# Upper bounds of the latency histogram buckets, in seconds (the last bucket is open)
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def payload_size(payload: Any) -> int:
+    """Size in bytes of a payload as it is sent to the LLM (JSON)."""
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return len(str(payload).encode('utf-8'))
+
+
+@dataclass
+class ToolStats:
+    """Aggregated measurements of one tool."""
+    calls: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    cache_hits: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    args_bytes: int = 0
+    result_bytes: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+
+    def observe(self, seconds: float, error: bool, timed_out: bool, cached: bool,
+                args_bytes: int, result_bytes: int) -> None:
+        self.calls += 1
+        self.errors += int(error)
+        self.timeouts += int(timed_out)
+        self.cache_hits += int(cached)
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.args_bytes += args_bytes
+        self.result_bytes += result_bytes
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-quantile (max latency for the open bucket)."""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max_seconds
+        return self.max_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cache_hits": self.cache_hits,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "total_seconds": round(self.total_seconds, 6),
+            "mean_seconds": round(self.total_seconds / self.calls, 6) if self.calls else 0.0,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "max_seconds": round(self.max_seconds, 6),
+            "args_bytes": self.args_bytes,
+            "result_bytes": self.result_bytes,
+            "histogram": {
+                **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+@dataclass
+class LLMStats(ToolStats):
+    """Aggregated measurements of the LLM calls to one model (latency covers retries and throttling)."""
+    attempts: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    throttled_seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = super().to_dict()
+        for key in ("timeouts", "args_bytes", "result_bytes"):
+            data.pop(key)
+        data.update({
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "throttled_seconds": round(self.throttled_seconds, 6),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        })
+        return data
+
+
+class MetricsRegistry:
+    """Per-tool and per-model statistics of the current process."""
+
+    def __init__(self):
+        self._tools: Dict[str, ToolStats] = {}
+        self._llm: Dict[str, LLMStats] = {}
+        self.started_at = time.time()
+
+    def record_tool_call(self, tool_name: str, seconds: float, error: bool = False, timed_out: bool = False,
+                         cached: bool = False, args_bytes: int = 0, result_bytes: int = 0) -> None:
+        stats = self._tools.get(tool_name)
+        if stats is None:
+            stats = self._tools[tool_name] = ToolStats()
+        stats.observe(seconds, error, timed_out, cached, args_bytes, result_bytes)
+
+    def record_llm_call(self, model: str, seconds: float, error: bool = False, cached: bool = False, attempts: int = 1,
+                        rate_limited: int = 0, hedged: bool = False, hedge_won: bool = False,
+                        throttled_seconds: float = 0.0, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        stats = self._llm.get(model)
+        if stats is None:
+            stats = self._llm[model] = LLMStats()
+        stats.observe(seconds, error, False, cached, 0, 0)
+        stats.attempts += attempts
+        stats.retries += max(0, attempts - 1)
+        stats.rate_limited += rate_limited
+        stats.hedges += int(hedged)
+        stats.hedge_wins += int(hedge_won)
+        stats.throttled_seconds += throttled_seconds
+        stats.prompt_tokens += prompt_tokens
+        stats.completion_tokens += completion_tokens
+
+    def tool_stats(self, tool_name: str) -> Optional[ToolStats]:
+        return self._tools.get(tool_name)
+
+    def llm_stats(self, model: str) -> Optional[LLMStats]:
+        return self._llm.get(model)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "tools": {name: stats.to_dict() for name, stats in sorted(self._tools.items())},
+            "llm": {model: stats.to_dict() for model, stats in sorted(self._llm.items())},
+        }
+
+    def format_summary(self) -> str:
+        """One line per tool, slowest total time first."""
+        if not self._tools:
+            return "No tool calls recorded"
+        lines = ["tool                       calls  errors  timeouts  hits   total(s)  p50(s)  p95(s)  max(s)  result(KB)"]
+        for name, stats in sorted(self._tools.items(), key=lambda item: -item[1].total_seconds):
+            lines.append(
+                f"{name:<26} {stats.calls:>5}  {stats.errors:>6}  {stats.timeouts:>8}  {stats.cache_hits:>4}  "
+                f"{stats.total_seconds:>8.2f}  {stats.quantile(0.5):>6.2f}  {stats.quantile(0.95):>6.2f}  "
+                f"{stats.max_seconds:>6.2f}  {stats.result_bytes / 1024:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def format_llm_summary(self) -> str:
+        """One line per model."""
+        if not self._llm:
+            return "No LLM calls recorded"
+        lines = ["model                      calls  hits  errors  retries  429s  hedges(won)  throttled(s)  p50(s)  p95(s)  max(s)"]
+        for model, stats in sorted(self._llm.items()):
+            lines.append(
+                f"{model[:26]:<26} {stats.calls:>5}  {stats.cache_hits:>4}  {stats.errors:>6}  {stats.retries:>7}  {stats.rate_limited:>4}  "
+                f"{stats.hedges:>6}({stats.hedge_wins:>3})  {stats.throttled_seconds:>12.2f}  "
+                f"{stats.quantile(0.5):>6.2f}  {stats.quantile(0.95):>6.2f}  {stats.max_seconds:>6.2f}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Log the summary and, if a path is given (default: TOOL_METRICS_FILE), append
+        the snapshot to it as one JSON line.
+
+        Args:
+            path: JSONL file to append to
+
+        Returns:
+            The snapshot
+        """
+        snapshot = self.snapshot()
+        if self._tools:
+            logger.info(f"Tool metrics:\n{self.format_summary()}")
+        if self._llm:
+            logger.info(f"LLM metrics:\n{self.format_llm_summary()}")
+        path = path or os.getenv("TOOL_METRICS_FILE")
+        if path:
+            try:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(snapshot, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"Failed to write tool metrics to {path}: {e}")
+        return snapshot
+
+    def reset(self) -> None:
+        self._tools.clear()
+        self._llm.clear()
+        self.started_at = time.time()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Process-wide metrics registry."""
+    return _registry
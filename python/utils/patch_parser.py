@@ -5,7 +5,16 @@ Functions for detecting and extracting patch information from text.
 """
 
 import re
-from typing import List, Optional, Tuple
+from typing import List, NamedTuple, Optional, Tuple
+
+HUNK_HEADER_PATTERN = r'^@@\s*-(\d+)(?:,(\d+))?\s*\+\d+(?:,\d+)?\s*@@'
+
+
+class PatchHunk(NamedTuple):
+    """One hunk of a file patch; old_start is the 1-based line from its @@ header, if any."""
+    old_start: Optional[int]
+    old_lines: List[str]
+    new_lines: List[str]
 
 
 def is_patch_content(text: str) -> bool:
@@ -150,3 +159,101 @@ def extract_patch_info(text: str) -> Optional[List[Tuple[str, str]]]:
     # The patch tool might be able to parse it, but we need a file path
     return None
 
+
+def _hunk_start(line: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """
+    Parse a hunk header line.
+    
+    Returns:
+        None if the line is not a hunk header, else (old start line, old line count), each None if unknown
+    """
+    if not line.startswith('@@'):
+        return None
+    match = re.match(HUNK_HEADER_PATTERN, line)
+    if match:
+        return int(match.group(1)), int(match.group(2)) if match.group(2) is not None else 1
+    # Slightly malformed headers, e.g. "@@-1,5+1,5@@"
+    old_start = re.search(r'-(\d+)', line)
+    if old_start and re.search(r'\+\d+', line):
+        return int(old_start.group(1)), None
+    if line.strip().endswith('@@') and re.search(r'\d+', line):
+        return None, None
+    return None
+
+
+def parse_hunks(file_patch: str) -> List[PatchHunk]:
+    """
+    Split the patch of one file (as returned by extract_patch_info) into hunks.
+    
+    Lines with a change prefix that come before any @@ header form a hunk of
+    their own, without a start line.
+    
+    Args:
+        file_patch: Unified diff of a single file, with or without its ---/+++ header
+        
+    Returns:
+        Hunks in patch order
+    """
+    hunks = []
+    old_start = old_count = None
+    old_lines: Optional[List[str]] = None
+    new_lines: List[str] = []
+    # Trailing lines of the hunk that were completely empty in the patch
+    blank_tail = 0
+    
+    def close():
+        if old_lines is None:
+            return
+        if old_count is not None:
+            # Empty lines past the header's line count are the patch's trailing newline
+            extra = min(blank_tail, len(old_lines) - old_count)
+            if extra > 0:
+                del old_lines[-extra:]
+                del new_lines[-extra:]
+        if old_lines or new_lines:
+            hunks.append(PatchHunk(old_start, old_lines, new_lines))
+    
+    lines = file_patch.split('\n')
+    if lines and lines[-1] == '':
+        # Final newline of the patch, not an empty context line
+        lines.pop()
+    i = 0
+    # Skip the file header
+    while i < len(lines) and (lines[i].startswith('---') or lines[i].startswith('+++')):
+        i += 1
+    for line in lines[i:]:
+        header = _hunk_start(line)
+        if header is not None:
+            close()
+            (old_start, old_count), old_lines, new_lines, blank_tail = header, [], [], 0
+            continue
+        if line.startswith('@@'):
+            # Not a usable header: end the current hunk
+            close()
+            old_lines = None
+            continue
+        if old_lines is None:
+            if not line.startswith((' ', '-', '+')):
+                continue
+            old_start, old_count, old_lines, new_lines = None, None, [], []
+        blank_tail = blank_tail + 1 if line == '' else 0
+        if line.startswith(' '):
+            old_lines.append(line[1:])
+            new_lines.append(line[1:])
+        elif line.startswith('-'):
+            old_lines.append(line[1:])
+        elif line.startswith('+'):
+            new_lines.append(line[1:])
+        elif line.strip() == '':
+            # Editors often strip the space of empty context lines
+            old_lines.append('')
+            new_lines.append('')
+        elif line.startswith('\\'):
+            # No newline at end of file marker
+            continue
+        else:
+            close()
+            old_lines = None
+    close()
+    return hunks
+
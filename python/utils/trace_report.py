@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Trace Report - Latency waterfall and aggregate span statistics of a trace file
+
+Usage:
+    python -m utils.trace_report <session.jsonl>              # waterfall of the last run
+    python -m utils.trace_report <session.jsonl> --trace ID   # waterfall of one run
+    python -m utils.trace_report <session.jsonl> --list       # runs in the file
+    python -m utils.trace_report <session.jsonl> --stats      # statistics over all runs
+"""
+
+import argparse
+import json
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Attributes shown next to a span name in the waterfall
+LABEL_ATTRS = ("tool", "step_id", "iteration", "index")
+
+
+def load_traces(path: str) -> "OrderedDict[str, List[Dict[str, Any]]]":
+    """
+    Read a trace file.
+
+    Returns:
+        Spans grouped by trace id, in file order (malformed lines are skipped)
+    """
+    traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            traces.setdefault(record.get("trace_id", ""), []).append(record)
+    return traces
+
+
+def _label(record: Dict[str, Any]) -> str:
+    attrs = record.get("attrs") or {}
+    details = [f"{key}={attrs[key]}" for key in LABEL_ATTRS if key in attrs]
+    return f"{record['name']} {' '.join(details)}".strip()
+
+
+def render_waterfall(spans: List[Dict[str, Any]], width: int = 40) -> str:
+    """
+    One line per span, children below their parent in start order, with the
+    offset from the start of the run, the duration and a bar on a shared time axis.
+    """
+    if not spans:
+        return "No spans"
+    ids = {record["span_id"] for record in spans}
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for record in spans:
+        parent = record.get("parent_id")
+        children.setdefault(parent if parent in ids else None, []).append(record)
+    for siblings in children.values():
+        siblings.sort(key=lambda record: record["start"])
+
+    origin = min(record["start"] for record in spans)
+    total = max(record["end"] for record in spans) - origin or 1e-9
+    lines = [f"{'span':<44} {'start(s)':>9} {'dur(s)':>8}  timeline"]
+
+    def walk(record: Dict[str, Any], depth: int) -> None:
+        offset = record["start"] - origin
+        begin = int(offset / total * width)
+        length = max(1, int(round(record["duration"] / total * width)))
+        bar = " " * begin + "█" * min(length, width - begin)
+        marker = "" if record.get("status", "ok") == "ok" else f"  [{record['status']}]"
+        name = ("  " * depth + _label(record))[:44]
+        lines.append(f"{name:<44} {offset:>9.3f} {record['duration']:>8.3f}  |{bar:<{width}}|{marker}")
+        for child in children.get(record["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return "\n".join(lines)
+
+
+def _quantile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def aggregate(spans: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Statistics per span kind (the name, and the tool for tool calls): count,
+    errors, latency total/mean/p50/p95/max, token usage and payload bytes.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for record in spans:
+        attrs = record.get("attrs") or {}
+        key = f"{record['name']}:{attrs['tool']}" if "tool" in attrs else record["name"]
+        groups.setdefault(key, []).append(record)
+
+    stats = {}
+    for key, records in groups.items():
+        durations = [record["duration"] for record in records]
+        entry = {
+            "count": len(records),
+            "errors": sum(1 for r in records if r.get("status") == "error" or (r.get("attrs") or {}).get("error")),
+            "total_seconds": round(sum(durations), 6),
+            "mean_seconds": round(sum(durations) / len(durations), 6),
+            "p50_seconds": round(_quantile(durations, 0.5), 6),
+            "p95_seconds": round(_quantile(durations, 0.95), 6),
+            "max_seconds": round(max(durations), 6),
+        }
+        for field in ("prompt_tokens", "completion_tokens", "args_bytes", "result_bytes"):
+            values = [(r.get("attrs") or {}).get(field) for r in records]
+            if any(isinstance(value, int) for value in values):
+                entry[field] = sum(value for value in values if isinstance(value, int))
+        stats[key] = entry
+    return stats
+
+
+def format_stats(stats: Dict[str, Dict[str, Any]]) -> str:
+    """One line per span kind, slowest total time first."""
+    if not stats:
+        return "No spans"
+    lines = [f"{'span':<34} {'count':>5} {'errors':>6} {'total(s)':>9} {'mean(s)':>8} {'p50(s)':>7} {'p95(s)':>7} {'max(s)':>7} {'tokens':>8} {'result(KB)':>10}"]
+    for key, entry in sorted(stats.items(), key=lambda item: -item[1]["total_seconds"]):
+        tokens = entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0)
+        lines.append(
+            f"{key[:34]:<34} {entry['count']:>5} {entry['errors']:>6} {entry['total_seconds']:>9.2f} "
+            f"{entry['mean_seconds']:>8.2f} {entry['p50_seconds']:>7.2f} {entry['p95_seconds']:>7.2f} "
+            f"{entry['max_seconds']:>7.2f} {tokens or '':>8} {entry.get('result_bytes', 0) / 1024:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render a JSONL trace file written by utils.tracing")
+    parser.add_argument("path", help="Trace file (logs/traces/<session>.jsonl)")
+    parser.add_argument("--trace", help="Trace id of the run to render (default: the last run)")
+    parser.add_argument("--list", action="store_true", help="List the runs in the file")
+    parser.add_argument("--stats", action="store_true", help="Only print statistics over all runs")
+    parser.add_argument("--width", type=int, default=40, help="Width of the timeline (default: 40)")
+    args = parser.parse_args(argv)
+
+    try:
+        traces = load_traces(args.path)
+    except OSError as e:
+        print(f"Cannot read {args.path}: {e}", file=sys.stderr)
+        return 1
+    if not traces:
+        print("No spans in trace file", file=sys.stderr)
+        return 1
+
+    if args.list:
+        for trace_id, spans in traces.items():
+            start = min(record["start"] for record in spans)
+            duration = max(record["end"] for record in spans) - start
+            print(f"{trace_id}  spans={len(spans):<5} duration={duration:.3f}s")
+        return 0
+
+    if args.stats:
+        print(format_stats(aggregate([record for spans in traces.values() for record in spans])))
+        return 0
+
+    trace_id = args.trace or next(reversed(traces))
+    spans = traces.get(trace_id)
+    if spans is None:
+        print(f"Trace not found: {trace_id}", file=sys.stderr)
+        return 1
+    print(f"Trace {trace_id}\n")
+    print(render_waterfall(spans, width=args.width))
+    print()
+    print(format_stats(aggregate(spans)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
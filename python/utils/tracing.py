@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Tracing - Nested timing spans of an agent run, written as JSONL per session
+
+A trace is started per request (see ai_service); inside it, `span()` opens a
+child of the current span. The current span travels in a contextvar, so spans
+opened in tasks (plan steps, parallel subtasks) nest under the span that
+created the task. Outside a trace, `span()` is a no-op.
+
+Every finished span becomes one JSON line of <TRACE_DIR>/<session_id>.jsonl
+(default: logs/traces). Lines are buffered per trace and appended by a
+background writer thread when the root span ends (or every FLUSH_SPANS spans),
+so ending a span does no disk I/O. Set TRACE_ENABLED=false to disable tracing.
+Render a trace with `python -m utils.trace_report`.
+"""
+
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.logger import Logger
+
+logger = Logger('tracing', log_to_file=False)
+
+# Buffered spans of a running trace handed to the writer at once
+FLUSH_SPANS = 256
+FLUSH_TIMEOUT_SECONDS = 5.0
+
+
+class _TraceWriter:
+    """Background thread appending batches of span lines to trace files."""
+
+    def __init__(self):
+        self.queue: "queue.SimpleQueue[Tuple[Optional[Path], Any]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, path: Path, lines: List[str]) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+                self._thread.start()
+        self.queue.put((path, lines))
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT_SECONDS) -> None:
+        """Wait until every submitted batch has been written."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self.queue.put((None, done))
+        done.wait(timeout)
+
+    def _run(self) -> None:
+        while True:
+            path, lines = self.queue.get()
+            if path is None:
+                lines.set()
+                continue
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.writelines(lines)
+            except OSError as e:
+                logger.warning(f"Failed to write {len(lines)} trace spans to {path}: {e}")
+
+
+_writer = _TraceWriter()
+atexit.register(_writer.flush)
+
+
+class _NoopSpan:
+    """Span used outside a trace: accepts attributes and records nothing."""
+
+    recording = False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+class Trace:
+    """One run (request) of a session; its spans are appended to the session's trace file."""
+
+    def __init__(self, tracer: "Tracer", session_id: str):
+        self.tracer = tracer
+        self.session_id = session_id
+        self.trace_id = uuid.uuid4().hex[:16]
+        self._span_ids = itertools.count(1)
+        # Span lines not yet handed to the writer; spans ending after the root are written at once
+        self.pending: List[str] = []
+        self.finished = False
+
+    def next_span_id(self) -> int:
+        return next(self._span_ids)
+
+
+class Span:
+    """
+    A timed operation. Use as a context manager; attributes can be added
+    with `set()` until it ends.
+    """
+
+    recording = True
+
+    def __init__(self, trace: Trace, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.parent = parent
+        self.span_id = trace.next_span_id()
+        self.attrs = attrs
+        self.start = 0.0
+        self._started = 0.0
+        self._token: Optional[contextvars.Token] = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        duration = time.perf_counter() - self._started
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # Ended in another context (e.g. an async generator closed by another task)
+            _current_span.set(self.parent)
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "end": round(self.start + duration, 6),
+            "duration": round(duration, 6),
+            "status": "ok",
+            "attrs": self.attrs,
+        }
+        if exc_type is not None:
+            # GeneratorExit/CancelledError: the consumer stopped early
+            cancelled = not issubclass(exc_type, Exception)
+            record["status"] = "cancelled" if cancelled else "error"
+            if not cancelled:
+                record["error"] = f"{exc_type.__name__}: {exc}"
+        self.trace.tracer.write(self.trace, record)
+        return False
+
+
+class Tracer:
+    """Creates traces and writes their spans to one JSONL file per session."""
+
+    def __init__(self, directory: Optional[Path] = None, enabled: bool = True):
+        if directory is None:
+            project_root = Path(__file__).parent.parent.parent
+            directory = project_root / "logs" / "traces"
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        directory = os.getenv("TRACE_DIR")
+        return cls(
+            directory=Path(directory) if directory else None,
+            enabled=os.getenv("TRACE_ENABLED", "true").lower() in ("true", "1", "yes", "on"),
+        )
+
+    def path_for(self, session_id: str) -> Path:
+        return self.directory / f"{re.sub(r'[^A-Za-z0-9_.-]', '_', session_id) or 'default'}.jsonl"
+
+    def start_trace(self, name: str, session_id: str, **attrs: Any):
+        """
+        Root span of a new trace.
+
+        Args:
+            name: Span name, e.g. "request"
+            session_id: Session whose trace file receives the spans
+            **attrs: Span attributes
+
+        Returns:
+            Span context manager (a no-op one if tracing is disabled)
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(Trace(self, session_id), name, None, {"session_id": session_id, **attrs})
+
+    def write(self, trace: Trace, record: Dict[str, Any]) -> None:
+        """Buffer a finished span; the batch goes to the writer thread when the root span ends."""
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            trace.pending.append(line)
+            if record["parent_id"] is None:
+                trace.finished = True
+            elif not trace.finished and len(trace.pending) < FLUSH_SPANS:
+                return
+            lines, trace.pending = trace.pending, []
+        _writer.submit(self.path_for(trace.session_id), lines)
+
+    def flush(self) -> None:
+        """Wait until the spans of finished traces are on disk."""
+        _writer.flush()
+
+
+def span(name: str, **attrs: Any):
+    """
+    Child span of the current span.
+
+    Args:
+        name: Span name, e.g. "llm_call" or "tool_call"
+        **attrs: Span attributes
+
+    Returns:
+        Span context manager (a no-op one outside a trace)
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent, attrs)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer."""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer.from_env()
+    return _tracer
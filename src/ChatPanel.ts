@@ -1000,7 +1000,12 @@ export class ChatPanel {
                                     isSuccessful = true;
                                 }
                                 
-                                toolLabel = isSuccessful ? '✅ Tool Completed' : '⚠️ Tool Completed';
+                                if (evt.progress) {
+                                    // Intermediate output of a tool that is still running
+                                    toolLabel = '⏳ Tool Running';
+                                } else {
+                                    toolLabel = isSuccessful ? '✅ Tool Completed' : '⚠️ Tool Completed';
+                                }
                             }
                             contentHtml = '<div class="tool-header"><strong>' + toolLabel + ':</strong> <code>' + toolName + '</code></div>';
                             if (evt.message) {